@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+🌐 HTTP API ОТЧЁТНЫХ ЦИФР
+Лёгкий сервис только для чтения (stdlib: ThreadingHTTPServer, keep-alive):
+те же цифры, что в xlsx и png, но в JSON — для своих таблиц и дашбордов.
+
+Эндпоинты (GET, ответ — JSON):
+    /api/snapshots                               — снимки и число вакансий в них
+    /api/stats?date=&role=&area=&by=             — сводка среза куба; by: role, area, employer
+    /api/dynamics?from=&to=&role=&area=          — сводка по каждому снимку и изменения
+    /api/companies/top?date=&role=&area=&limit=  — топ работодателей по вакансиям с зарплатой
+    /api/search?q=&company=&role=&min_salary=&max_salary=&since=&until=&page=&per_page=
+
+Цифры берутся из куба rollup_cube и поискового индекса search_index — сервер
+их не пересчитывает (это делает пайплайн). Версия данных — размеры и mtime
+этих баз и индекса работодателей: пока она не изменилась, ответ на тот же
+запрос берётся из LRU-кэша в памяти, а клиент с совпавшим If-None-Match
+получает 304 без тела. Куб держится в памяти и перечитывается при смене версии.
+
+Запуск из корня проекта:
+    python api_server.py                       # http://127.0.0.1:8080
+    python api_server.py --host 0.0.0.0 --port 9000 --cache-size 2048
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import sys
+import threading
+import urllib.parse
+from collections import OrderedDict
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import employers
+import metrics
+import rollup_cube
+import search_index
+
+# Ответов в LRU-кэше
+CACHE_SIZE = 1024
+
+# Постраничная выдача поиска
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+MAX_TOP_LIMIT = 100
+
+# Базы, от которых зависят ответы: изменились размер или mtime — новая версия данных
+VERSION_SOURCES = [rollup_cube.CUBE_DB, search_index.INDEX_DB, employers.INDEX_FILE]
+
+# Группировки /api/stats: параметр by → измерение куба
+GROUPINGS = {"role": "role", "area": "area", "employer": "employer_key"}
+
+# Показатели, для которых /api/dynamics считает изменение между первым и последним снимком
+CHANGE_KEYS = ['total_vacancies', 'unique_vacancies', 'with_salary', 'unique_companies', 'mean_salary',
+               'trimmed_mean_salary', 'median_salary']
+
+
+class ApiError(Exception):
+    """Ошибка запроса: HTTP-статус и сообщение для клиента"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class LRUCache:
+    """Потокобезопасный LRU-кэш готовых ответов: ключ → (ETag, тело)"""
+
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+        metrics.increment("api_cache_hits" if value is not None else "api_cache_misses")
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+
+def data_version() -> str:
+    """Версия данных: размеры и mtime баз VERSION_SOURCES"""
+    parts = []
+    for path in VERSION_SOURCES:
+        try:
+            stat = path.stat()
+            parts.append(f"{path}:{stat.st_size}:{stat.st_mtime_ns}")
+        except FileNotFoundError:
+            parts.append(f"{path}:-")
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class ApiState:
+    """Общее состояние сервера: куб в памяти (перечитывается при смене версии) и кэш ответов"""
+
+    def __init__(self, cache_size: int = CACHE_SIZE):
+        self.cache = LRUCache(cache_size)
+        self._lock = threading.Lock()
+        self._cube = None
+        self._cube_version = None
+
+    def cube(self, version: str):
+        with self._lock:
+            if self._cube is None or self._cube_version != version:
+                self._cube = rollup_cube.load_cube(update=False)
+                self._cube_version = version
+                metrics.increment("api_cube_loads")
+            return self._cube
+
+
+def _plain(value):
+    """Числа NumPy → числа Python, NaN → None (JSON без NaN)"""
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return None if math.isnan(value) else float(value)
+    return value
+
+
+def _records(frame, index_name: str) -> list:
+    """Строки DataFrame сводки как список словарей (индекс — поле index_name)"""
+    return [{index_name: _plain(key), **{column: _plain(value) for column, value in row.items()}}
+            for key, row in zip(frame.index, frame.to_dict("records"))]
+
+
+def _param(params: dict, name: str, default=None):
+    values = params.get(name)
+    return values[-1] if values else default
+
+
+def _number(params: dict, name: str, default=None, cast=float, minimum=None, maximum=None):
+    raw = _param(params, name)
+    if raw is None or raw == "":
+        return default
+    try:
+        value = cast(raw)
+    except ValueError:
+        raise ApiError(400, f"параметр {name}: ожидалось число, получено {raw!r}")
+    if not math.isfinite(value):
+        raise ApiError(400, f"параметр {name}: ожидалось конечное число, получено {raw!r}")
+    if minimum is not None and value < minimum:
+        raise ApiError(400, f"параметр {name}: не меньше {minimum}")
+    if maximum is not None:
+        value = min(value, maximum)
+    return value
+
+
+def _date(params: dict, name: str):
+    """Дата YYYY-MM-DD; в поиске она сравнивается со строкой даты публикации"""
+    raw = _param(params, name)
+    if raw is None or raw == "":
+        return None
+    try:
+        return date.fromisoformat(raw).isoformat()
+    except ValueError:
+        raise ApiError(400, f"параметр {name}: ожидалась дата YYYY-MM-DD, получено {raw!r}")
+
+
+def _filtered(cube, params: dict):
+    """Срез куба по параметрам role и area (если заданы)"""
+    filters = {name: _param(params, name) for name in ("role", "area") if _param(params, name)}
+    return cube.slice(**filters) if filters else cube
+
+
+def _snapshot(cube, params: dict) -> str:
+    """Снимок из параметра date (по умолчанию — последний в кубе)"""
+    snapshots = cube.snapshots
+    date_str = _param(params, "date") or (snapshots[-1] if snapshots else None)
+    if date_str not in snapshots:
+        raise ApiError(404, f"снимок {date_str} не найден" if date_str else "снимков нет")
+    return date_str
+
+
+def handle_snapshots(state, version, params) -> dict:
+    cube = state.cube(version)
+    totals = cube.rollup("snapshot")
+    return {"snapshots": [{"date": str(date_str), "vacancies": int(row["vacancies"]),
+                           "with_salary": int(row["with_salary"])} for date_str, row in totals.iterrows()]}
+
+
+def handle_stats(state, version, params) -> dict:
+    cube = state.cube(version)
+    date_str = _snapshot(cube, params)
+    cube_slice = _filtered(cube.slice(snapshot=date_str), params)
+    response = {"date": date_str, "filters": {name: _param(params, name) for name in ("role", "area")},
+                "stats": {key: _plain(value) for key, value in cube_slice.stats(date_str).items()}}
+    by = _param(params, "by")
+    if by:
+        if by not in GROUPINGS:
+            raise ApiError(400, f"параметр by: одно из {', '.join(GROUPINGS)}")
+        summary = cube_slice.summary(GROUPINGS[by])
+        groups = _records(summary, by)
+        if by == "employer":
+            names = cube_slice.employer_names()
+            for group in groups:
+                group["name"] = names.get(group["employer"], "")
+        response["groups"] = groups
+    return response
+
+
+def handle_dynamics(state, version, params) -> dict:
+    full_cube = state.cube(version)
+    cube = _filtered(full_cube, params)
+    date_from, date_to = _param(params, "from"), _param(params, "to")
+    dates = [date_str for date_str in full_cube.snapshots
+             if (not date_from or date_str >= date_from) and (not date_to or date_str <= date_to)]
+    series = [{key: _plain(value) for key, value in cube.slice(snapshot=date_str).stats(date_str).items()}
+              for date_str in dates]
+    changes = {}
+    if len(series) >= 2:
+        first, last = series[0], series[-1]
+        for key in CHANGE_KEYS:
+            if first[key]:
+                changes[key] = {"old": first[key], "new": last[key], "change": last[key] - first[key],
+                                "change_pct": (last[key] - first[key]) / first[key] * 100}
+    return {"filters": {name: _param(params, name) for name in ("role", "area", "from", "to")},
+            "series": series, "changes": changes}
+
+
+def handle_top_companies(state, version, params) -> dict:
+    cube = state.cube(version)
+    date_str = _snapshot(cube, params)
+    limit = _number(params, "limit", 15, int, minimum=1, maximum=MAX_TOP_LIMIT)
+    cube_slice = _filtered(cube.slice(snapshot=date_str), params)
+    summary = cube_slice.summary("employer_key")
+    summary = summary.sort_values("count", ascending=False, kind="stable").head(limit)
+    names = cube_slice.employer_names()
+    companies = [{"company": names.get(key, ""), "employer_key": int(key), "vacancies": int(row["count"]),
+                  "mean_salary": _plain(row["mean"]), "median_salary": _plain(row["median"])}
+                 for key, row in summary.iterrows()]
+    return {"date": date_str, "filters": {name: _param(params, name) for name in ("role", "area")},
+            "companies": companies}
+
+
+def handle_search(state, version, params) -> dict:
+    if not search_index.INDEX_DB.exists():
+        raise ApiError(503, "поисковый индекс ещё не построен: python search_index.py update")
+    page = _number(params, "page", 1, int, minimum=1)
+    per_page = _number(params, "per_page", DEFAULT_PER_PAGE, int, minimum=1, maximum=MAX_PER_PAGE)
+    filters = {
+        "text": _param(params, "q", ""),
+        "company": _param(params, "company", ""),
+        "role": _param(params, "role"),
+        "min_salary": _number(params, "min_salary"),
+        "max_salary": _number(params, "max_salary"),
+        "since": _date(params, "since"),
+        "until": _date(params, "until"),
+    }
+    connection = search_index.connect()
+    try:
+        total = search_index.count_matches(**filters, connection=connection)
+        items = search_index.search(**filters, limit=per_page, offset=(page - 1) * per_page, connection=connection)
+    finally:
+        connection.close()
+    pages = max(1, math.ceil(total / per_page))
+    next_page = None
+    if page < pages:
+        query = {name: values[-1] for name, values in params.items()}
+        query.update(page=page + 1, per_page=per_page)
+        next_page = "/api/search?" + urllib.parse.urlencode(query)
+    return {"total": total, "page": page, "per_page": per_page, "pages": pages, "next": next_page, "items": items}
+
+
+ROUTES = {
+    "/api/snapshots": handle_snapshots,
+    "/api/stats": handle_stats,
+    "/api/dynamics": handle_dynamics,
+    "/api/companies/top": handle_top_companies,
+    "/api/search": handle_search,
+}
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Заголовки и тело уходят разными write: без TCP_NODELAY keep-alive ждёт отложенный ACK (~40 мс)
+    disable_nagle_algorithm = True
+    state: ApiState = None
+    verbose = False
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+    def send_body(self, status: int, payload: bytes, etag: str = None):
+        self.send_response(status)
+        if payload or status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        if etag:
+            self.send_header("ETag", etag)
+            # Кэшировать можно, но перед использованием — перепроверить по ETag
+            self.send_header("Cache-Control", "no-cache")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if payload and self.command != "HEAD":
+            self.wfile.write(payload)
+
+    def do_GET(self):
+        timer = metrics.timer("api_request")
+        parsed = urllib.parse.urlsplit(self.path)
+        handler = ROUTES.get(parsed.path.rstrip("/") or "/")
+        if handler is None:
+            self.send_body(404, json.dumps({"error": "не найдено", "endpoints": sorted(ROUTES)},
+                                           ensure_ascii=False).encode("utf-8"))
+            return
+        params = urllib.parse.parse_qs(parsed.query)
+        version = data_version()
+        # Ключ кэша: путь, параметры в каноническом порядке и версия данных
+        key = (parsed.path, tuple(sorted((name, tuple(values)) for name, values in params.items())), version)
+
+        cached = self.state.cache.get(key)
+        if cached is None:
+            try:
+                body = handler(self.state, version, params)
+            except ApiError as e:
+                self.send_body(e.status, json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8"))
+                return
+            payload = json.dumps({"data_version": version, **body}, ensure_ascii=False, default=_plain).encode("utf-8")
+            cached = ('"' + hashlib.sha1(payload).hexdigest() + '"', payload)
+            self.state.cache.put(key, cached)
+
+        etag, payload = cached
+        if etag in (tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")):
+            metrics.increment("api_not_modified")
+            self.send_body(304, b"", etag)
+        else:
+            self.send_body(200, payload, etag)
+        timer.stop()
+
+    do_HEAD = do_GET
+
+
+def start_server(host: str = "127.0.0.1", port: int = 8080, cache_size: int = CACHE_SIZE, verbose: bool = False):
+    """Запускает сервер в фоновом потоке; возвращает (сервер, базовый URL)"""
+    handler = type("ConfiguredApiHandler", (ApiHandler,), {"state": ApiState(cache_size), "verbose": verbose})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="HTTP JSON API по кубу агрегатов и поисковому индексу")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE, help="ответов в LRU-кэше")
+    parser.add_argument("--verbose", action="store_true", help="печатать каждый запрос")
+    args = parser.parse_args()
+
+    if not rollup_cube.CUBE_DB.exists():
+        print("❌ Куб ещё не построен: python rollup_cube.py (или python pipeline.py --skip-fetch)")
+        return 1
+    server, base_url = start_server(args.host, args.port, args.cache_size, args.verbose)
+    print("🌐 HTTP API ОТЧЁТНЫХ ЦИФР")
+    print("=" * 60)
+    print(f"  🔗 {base_url}")
+    for path in ROUTES:
+        print(f"  • {base_url}{path}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print("\n🛑 Остановка сервера")
+    finally:
+        server.shutdown()
+        metrics.write_metrics("api_server")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
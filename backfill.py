@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+"""
+⏪ ИСТОРИЧЕСКИЙ СБОР (BACKFILL) ПО ОКНАМ ПУБЛИКАЦИИ
+Восстанавливает снимки data/<дата>/ за прошедшие дни, в которые сбор не
+запускался. Каждый запрос профиля режется на окна публикации — сутки или
+часы (параметры date_from/date_to поиска /vacancies):
+
+- окно — «срез»: все страницы выдачи запроса за это окно; срезы качаются
+  параллельно через общий клиент hh_api, так что темп запросов по-прежнему
+  задаёт его адаптивный лимитер;
+- если за сутки вакансий больше, чем API отдаёт вглубь (MAX_SEARCH_DEPTH),
+  срез делится на 24 часовых;
+- готовый срез записывается в контрольную точку — файл SQLite
+  data/backfill/<от>_<до>_<окно>.sqlite — одной транзакцией вместе с его
+  вакансиями; прерванный сбор (Ctrl+C, SIGTERM, падение) при повторном
+  запуске той же команды продолжается с невыполненных срезов.
+
+Снимок дня D собирается из срезов так же, как его собрал бы парсер в конце
+дня D: вакансии не старше 3 суток (is_recent_vacancy парсера относительно
+полуночи после D), первое вхождение в порядке QUERIES. Снимки публикуются
+через save_vacancies_csv парсера — в то же хранилище data/<дата>/ с
+манифестами (snapshot_store), что и живой сбор; в .meta.json снимка есть
+раздел "backfill". Снимки живого сбора не перезаписываются (см. --overwrite).
+
+Поиск API отдаёт только ещё открытые вакансии, поэтому исторический снимок —
+нижняя оценка рынка того дня: закрытые с тех пор вакансии в него не попадут.
+
+Запуск из корня проекта:
+    python backfill.py run --from 2025-09-01 --to 2025-09-30            # окна по суткам
+    python backfill.py run --from 2025-10-01 --to 2025-10-03 --window hour --workers 8
+    python backfill.py status --from 2025-09-01 --to 2025-09-30
+    python backfill.py publish --from 2025-09-01 --to 2025-09-30 --force  # опубликовать и неполные дни
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import signal
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta, timezone
+from itertools import groupby
+from pathlib import Path
+
+import hh_api
+import metrics
+from crawl_queue import DEFAULT_AREAS, PROFILES
+from hh_api import MAX_SEARCH_DEPTH
+from rate_limiter import AdaptiveRateLimiter, FetchError
+
+BACKFILL_DIR = Path("data") / "backfill"
+
+# Длина окна публикации одного среза
+WINDOWS = {"day": timedelta(days=1), "hour": timedelta(hours=1)}
+
+# Окна считаются в часовом поясе региона по умолчанию (22 = Владивосток, UTC+10);
+# в нём же API отдаёт published_at, а парсеры пишут «Дата публикации»
+AREA_TZ = timezone(timedelta(hours=10))
+
+# Снимок дня D — вакансии, свежие на полночь после D по правилу парсеров
+# (is_recent_vacancy: не больше 3 полных суток), то есть окна D-3 … D
+LOOKBACK_DAYS = 4
+
+# Потоков, одновременно ждущих ответа API (общий темп всё равно задаёт лимитер)
+BACKFILL_WORKERS = 4
+
+# Попыток на срез (каждая — уже с повторами клиента hh_api внутри)
+MAX_ATTEMPTS = 4
+
+# Ошибки, после которых продолжать бессмысленно: API недоступен или сбор остановлен
+FATAL_ERRORS = ("circuit_open", "stopped")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS slices (
+    key TEXT PRIMARY KEY,
+    profile TEXT NOT NULL,
+    area TEXT NOT NULL,
+    area_rank INTEGER NOT NULL,
+    query TEXT NOT NULL,
+    query_rank INTEGER NOT NULL,
+    window_start TEXT NOT NULL,
+    window_end TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    found INTEGER,
+    pages INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error_class TEXT,
+    last_error TEXT,
+    http_status INTEGER,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS slices_window ON slices(profile, window_start, status);
+CREATE TABLE IF NOT EXISTS items (
+    slice_key TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    item TEXT NOT NULL,
+    PRIMARY KEY (slice_key, page, position)
+);
+CREATE TABLE IF NOT EXISTS published (
+    profile TEXT NOT NULL,
+    date_str TEXT NOT NULL,
+    run_id TEXT,
+    csv_file TEXT NOT NULL,
+    vacancies INTEGER NOT NULL,
+    complete INTEGER NOT NULL,
+    published_at TEXT NOT NULL,
+    PRIMARY KEY (profile, date_str)
+);
+"""
+
+
+def slice_key(profile: str, area: str, query: str, window_start: datetime, window_end: datetime) -> str:
+    return f"{profile}|{area}|{query}|{window_start.isoformat()}|{window_end.isoformat()}"
+
+
+def checkpoint_path(start: date, end: date, window: str) -> Path:
+    """Контрольная точка диапазона: повторный запуск той же команды находит её сам"""
+    return BACKFILL_DIR / f"{start.isoformat()}_{end.isoformat()}_{window}.sqlite"
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=60)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def iter_windows(start: datetime, end: datetime, step: timedelta):
+    """Окна [начало, конец) с шагом step от start до end"""
+    current = start
+    while current < end:
+        yield current, min(current + step, end)
+        current += step
+
+
+def plan_backfill(connection: sqlite3.Connection, profiles: list, start: date, end: date, window: str,
+                  areas: list = DEFAULT_AREAS) -> int:
+    """Добавляет срезы диапазона (с окнами за LOOKBACK_DAYS до start); возвращает число новых срезов"""
+    range_start = datetime.combine(start - timedelta(days=LOOKBACK_DAYS - 1), datetime.min.time())
+    range_end = datetime.combine(end + timedelta(days=1), datetime.min.time())
+    rows = []
+    for profile in profiles:
+        module, _ = PROFILES[profile]
+        for area_rank, area in enumerate(areas):
+            for query_rank, query in enumerate(module.QUERIES):
+                for window_start, window_end in iter_windows(range_start, range_end, WINDOWS[window]):
+                    rows.append((slice_key(profile, area, query, window_start, window_end), profile, area,
+                                 area_rank, query, query_rank, window_start.isoformat(), window_end.isoformat()))
+    with connection:
+        planned_profiles = set(json.loads((connection.execute(
+            "SELECT value FROM meta WHERE key = 'profiles'").fetchone() or ["[]"])[0]))
+        connection.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [
+            ("from", start.isoformat()),
+            ("to", end.isoformat()),
+            ("window", window),
+            ("profiles", json.dumps(sorted(planned_profiles | set(profiles)))),
+        ])
+        connection.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('created_at', ?)",
+                           (datetime.now().isoformat(timespec="seconds"),))
+        before = connection.total_changes
+        connection.executemany(
+            "INSERT OR IGNORE INTO slices (key, profile, area, area_rank, query, query_rank, window_start, window_end)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        added = connection.total_changes - before
+    return added
+
+
+def api_time(value: datetime) -> str:
+    """Время окна для date_from/date_to: ISO 8601 с часовым поясом региона"""
+    return value.replace(tzinfo=AREA_TZ).isoformat()
+
+
+def fetch_slice(row: tuple, stop_event=None) -> tuple:
+    """Качает срез: ("split", found, []) — окно слишком глубокое, иначе ("done", found, [(страница, items)])"""
+    key, profile, area, query, window_start, window_end = row
+    module, _ = PROFILES[profile]
+    date_from = api_time(datetime.fromisoformat(window_start))
+    date_to = api_time(datetime.fromisoformat(window_end))
+    with metrics.timer("backfill_slice"):
+        data = module.search_page(query, area, 0, stop_event, date_from, date_to)
+        found = data.get("found") or 0
+        window_length = datetime.fromisoformat(window_end) - datetime.fromisoformat(window_start)
+        if found > MAX_SEARCH_DEPTH and window_length > WINDOWS["hour"]:
+            return "split", found, []
+        pages = [(0, data.get("items") or [])]
+        for page in range(1, module.search_depth(data)):
+            pages.append((page, module.search_page(query, area, page, stop_event, date_from, date_to)
+                          .get("items") or []))
+    return "done", found, pages
+
+
+def complete_slice(connection: sqlite3.Connection, key: str, found: int, pages: list):
+    """Контрольная точка: вакансии среза и его статус пишутся одной транзакцией"""
+    with connection:
+        connection.execute("DELETE FROM items WHERE slice_key = ?", (key,))
+        connection.executemany(
+            "INSERT INTO items (slice_key, page, position, item) VALUES (?, ?, ?, ?)",
+            [(key, page, position, json.dumps(item, ensure_ascii=False))
+             for page, items in pages for position, item in enumerate(items)])
+        connection.execute("UPDATE slices SET status = 'done', found = ?, pages = ?, error_class = NULL,"
+                           " last_error = NULL, http_status = NULL, finished_at = ? WHERE key = ?",
+                           (found, len(pages), datetime.now().isoformat(timespec="seconds"), key))
+
+
+def split_slice(connection: sqlite3.Connection, key: str, found: int) -> list:
+    """Делит суточный срез на часовые; возвращает строки новых срезов для загрузки"""
+    profile, area, area_rank, query, query_rank, window_start, window_end = connection.execute(
+        "SELECT profile, area, area_rank, query, query_rank, window_start, window_end FROM slices WHERE key = ?",
+        (key,)).fetchone()
+    children = [(slice_key(profile, area, query, start, end), profile, area, area_rank, query, query_rank,
+                 start.isoformat(), end.isoformat())
+                for start, end in iter_windows(datetime.fromisoformat(window_start),
+                                               datetime.fromisoformat(window_end), WINDOWS["hour"])]
+    with connection:
+        connection.executemany(
+            "INSERT OR IGNORE INTO slices (key, profile, area, area_rank, query, query_rank, window_start, window_end)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", children)
+        connection.execute("UPDATE slices SET status = 'split', found = ?, finished_at = ? WHERE key = ?",
+                           (found, datetime.now().isoformat(timespec="seconds"), key))
+    return [(child[0], profile, area, query, child[6], child[7]) for child in children]
+
+
+def fail_slice(connection: sqlite3.Connection, key: str, error: FetchError) -> bool:
+    """Учитывает неудачную попытку; True — срез можно попробовать ещё раз в этом запуске"""
+    attempts, = connection.execute("SELECT attempts FROM slices WHERE key = ?", (key,)).fetchone()
+    if error.error_class == "stopped":
+        return False
+    attempts += 1
+    retry = error.error_class != "client" and error.error_class not in FATAL_ERRORS and attempts < MAX_ATTEMPTS
+    with connection:
+        connection.execute("UPDATE slices SET status = ?, attempts = ?, error_class = ?, last_error = ?,"
+                           " http_status = ? WHERE key = ?",
+                           ("pending" if retry or error.error_class in FATAL_ERRORS else "failed", attempts,
+                            error.error_class, str(error), error.status, key))
+    return retry
+
+
+def pending_slices(connection: sqlite3.Connection) -> list:
+    """Срезы, которые ещё нужно скачать: сначала свежие окна, внутри окна — в порядке запросов"""
+    return connection.execute(
+        "SELECT key, profile, area, query, window_start, window_end FROM slices WHERE status = 'pending'"
+        " ORDER BY window_start DESC, profile, area_rank, query_rank").fetchall()
+
+
+@metrics.timed()
+def run_backfill(path: Path, workers: int = BACKFILL_WORKERS, stop_event=None) -> dict:
+    """Качает все невыполненные срезы контрольной точки; возвращает счётчики запуска"""
+    stop_event = stop_event or threading.Event()
+    connection = connect(path)
+    counts = {"pending": 0, "done": 0, "split": 0, "failed": 0, "items": 0, "aborted": False}
+    try:
+        tasks = deque(pending_slices(connection))
+        counts["pending"] = len(tasks)
+        print(f"  🧩 Срезов к загрузке: {len(tasks)}")
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            while True:
+                # Очередь ограничена: новые срезы ставятся по мере завершения старых
+                while not counts["aborted"] and tasks and len(in_flight) < 2 * max(workers, 1):
+                    row = tasks.popleft()
+                    in_flight[pool.submit(fetch_slice, row, stop_event)] = row
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    row = in_flight.pop(future)
+                    key = row[0]
+                    try:
+                        status, found, pages = future.result()
+                    except FetchError as e:
+                        if fail_slice(connection, key, e):
+                            tasks.append(row)
+                        elif e.error_class in FATAL_ERRORS:
+                            if not counts["aborted"]:
+                                counts["aborted"] = True
+                                print(f"  🛑 Сбор прерван ({e.error_class}): {e}")
+                        else:
+                            counts["failed"] += 1
+                            metrics.increment("backfill_slices_failed")
+                            print(f"  ❌ {key}: {e.error_class} ({e})")
+                        continue
+                    if status == "split":
+                        children = split_slice(connection, key, found)
+                        tasks.extendleft(reversed(children))
+                        counts["split"] += 1
+                        metrics.increment("backfill_slices_split")
+                        print(f"  ✂️ {key}: {found} вакансий за окно — делим на {len(children)} часовых")
+                        continue
+                    complete_slice(connection, key, found, pages)
+                    items = sum(len(page_items) for _, page_items in pages)
+                    counts["done"] += 1
+                    counts["items"] += items
+                    metrics.increment("backfill_slices_done")
+                    metrics.increment("backfill_items", items)
+                    if counts["done"] % 50 == 0:
+                        print(f"  ⏳ Срезов готово: {counts['done']}, осталось: {len(tasks) + len(in_flight)}")
+    finally:
+        connection.close()
+    return counts
+
+
+def slice_counts(connection: sqlite3.Connection) -> dict:
+    """Срезы по статусам"""
+    return dict(connection.execute("SELECT status, COUNT(*) FROM slices GROUP BY status").fetchall())
+
+
+def snapshot_vacancies(connection: sqlite3.Connection, profile: str, window_start: datetime,
+                       snapshot_end: datetime) -> list:
+    """Вакансии исторического снимка: первое вхождение в порядке запросов, регионов и окон (свежие — раньше)"""
+    module, is_relevant = PROFILES[profile]
+    rows = connection.execute(
+        "SELECT s.query_rank, s.query, i.item FROM slices s JOIN items i ON i.slice_key = s.key"
+        " WHERE s.profile = ? AND s.status = 'done' AND s.window_start >= ? AND s.window_end <= ?"
+        " ORDER BY s.query_rank, s.area_rank, s.window_start DESC, i.page, i.position",
+        (profile, window_start.isoformat(), snapshot_end.isoformat()))
+    unique = {}
+    for (_, query), group in groupby(rows, key=lambda row: (row[0], row[1])):
+        items = [json.loads(item) for _, _, item in group]
+        # Парсер печатает каждую вакансию — для тысяч строк истории это лишнее
+        with contextlib.redirect_stdout(io.StringIO()):
+            vacancies = module.items_to_vacancies(items, query, now=snapshot_end)
+        for vacancy in vacancies:
+            if is_relevant(vacancy.title):
+                unique.setdefault(vacancy.key, vacancy)
+    return list(unique.values())
+
+
+def is_backfill_snapshot(meta_file: Path) -> bool:
+    """Снимок записан этим же инструментом (а не живым сбором)"""
+    try:
+        return "backfill" in json.loads(meta_file.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return False
+
+
+def publish_snapshots(path: Path, overwrite: bool = False, force: bool = False) -> list:
+    """Публикует снимки дней диапазона, для которых все срезы готовы; возвращает пути CSV.
+
+    Дни с невыполненными срезами пропускаются (force — опубликовать как неполные);
+    срезы, исчерпавшие попытки, попадают в метаданные снимка как неудавшиеся запросы.
+    """
+    connection = connect(path)
+    written = []
+    try:
+        meta = dict(connection.execute("SELECT key, value FROM meta").fetchall())
+        start, end = date.fromisoformat(meta["from"]), date.fromisoformat(meta["to"])
+        for profile in json.loads(meta["profiles"]):
+            module, _ = PROFILES[profile]
+            day = start
+            while day <= end:
+                date_str = day.isoformat()
+                snapshot_end = datetime.combine(day + timedelta(days=1), datetime.min.time())
+                window_start = snapshot_end - timedelta(days=LOOKBACK_DAYS)
+                day += timedelta(days=1)
+
+                statuses = dict(connection.execute(
+                    "SELECT status, COUNT(*) FROM slices WHERE profile = ? AND window_start >= ? AND window_end <= ?"
+                    " GROUP BY status", (profile, window_start.isoformat(), snapshot_end.isoformat())).fetchall())
+                if statuses.get("pending") and not force:
+                    print(f"  ⏳ {profile} {date_str}: срезов не готово — {statuses['pending']}")
+                    continue
+                already = connection.execute("SELECT csv_file FROM published WHERE profile = ? AND date_str = ?",
+                                             (profile, date_str)).fetchone()
+                if already and not overwrite:
+                    continue
+                target = Path("data") / date_str / f"{module.CSV_PREFIX}_{date_str}.csv"
+                if target.exists() and not overwrite and not is_backfill_snapshot(target.with_suffix(".meta.json")):
+                    print(f"  ⏭️ {profile} {date_str}: есть снимок живого сбора")
+                    continue
+
+                failed_queries = [
+                    {"query": query, "area": area, "window": [start_at, end_at],
+                     "error_class": error_class or "unfinished", "attempts": attempts, "status": http_status,
+                     "message": last_error or ""}
+                    for query, area, start_at, end_at, error_class, attempts, http_status, last_error
+                    in connection.execute(
+                        "SELECT query, area, window_start, window_end, error_class, attempts, http_status, last_error"
+                        " FROM slices WHERE profile = ? AND status IN ('pending', 'failed')"
+                        " AND window_start >= ? AND window_end <= ? ORDER BY query_rank, area_rank, window_start",
+                        (profile, window_start.isoformat(), snapshot_end.isoformat()))]
+                vacancies = snapshot_vacancies(connection, profile, window_start, snapshot_end)
+                if not vacancies:
+                    print(f"  ❌ {profile} {date_str}: нет данных")
+                    continue
+                csv_file = module.save_vacancies_csv(vacancies, failed_queries, module.QUERIES, date_str=date_str,
+                                                     extra_metadata={"backfill": {
+                                                         "checkpoint": str(path),
+                                                         "window": meta["window"],
+                                                         "published_from": window_start.isoformat(),
+                                                         "published_to": snapshot_end.isoformat(),
+                                                     }})
+                meta_file = csv_file.with_suffix(".meta.json")
+                run_id = json.loads(meta_file.read_text(encoding="utf-8")).get("run_id")
+                with connection:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO published (profile, date_str, run_id, csv_file, vacancies, complete,"
+                        " published_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (profile, date_str, run_id, str(csv_file), len(vacancies), int(not failed_queries),
+                         datetime.now().isoformat(timespec="seconds")))
+                metrics.increment("backfill_snapshots_published")
+                written.append(csv_file)
+        return written
+    finally:
+        connection.close()
+
+
+def print_status(path: Path):
+    """Прогресс контрольной точки: срезы по статусам и опубликованные дни"""
+    connection = connect(path)
+    counts = slice_counts(connection)
+    items, = connection.execute("SELECT COUNT(*) FROM items").fetchone()
+    published = connection.execute("SELECT profile, date_str, vacancies, complete FROM published"
+                                   " ORDER BY profile, date_str").fetchall()
+    connection.close()
+    total = sum(count for status, count in counts.items() if status != "split")
+    print(f"📊 Срезы: {', '.join(f'{name} {count}' for name, count in sorted(counts.items())) or 'нет'}"
+          f" (готово {counts.get('done', 0)}/{total})")
+    print(f"📦 Элементов выдачи: {items}")
+    for profile, date_str, vacancies, complete in published:
+        print(f"  📅 {profile} {date_str}: {vacancies} вакансий{'' if complete else ' (неполный)'}")
+
+
+def parse_day(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"нужна дата YYYY-MM-DD: {value}")
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Исторический сбор вакансий по окнам публикации")
+    parser.add_argument("command", nargs="?", choices=["run", "status", "publish"], default="run")
+    parser.add_argument("--from", dest="start", type=parse_day, required=True, help="первый день YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", type=parse_day, required=True, help="последний день YYYY-MM-DD")
+    parser.add_argument("--window", choices=sorted(WINDOWS), default="day", help="длина окна среза")
+    parser.add_argument("--profiles", nargs="+", choices=sorted(PROFILES), default=sorted(PROFILES))
+    parser.add_argument("--areas", nargs="+", default=DEFAULT_AREAS, help="id регионов hh.ru")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS, help="потоков загрузки")
+    parser.add_argument("--rate", type=float, help="потолок запросов/с (по умолчанию — лимитер hh_api)")
+    parser.add_argument("--checkpoint", type=Path, help="файл контрольной точки (по умолчанию по диапазону и окну)")
+    parser.add_argument("--no-publish", action="store_true", help="run: только скачать срезы")
+    parser.add_argument("--overwrite", action="store_true", help="перезаписать уже опубликованные и живые снимки")
+    parser.add_argument("--force", action="store_true", help="публиковать и дни с невыполненными срезами")
+    args = parser.parse_args()
+
+    if args.start > args.end:
+        parser.error("--from позже --to")
+    if args.end >= date.today():
+        parser.error("--to должен быть в прошлом: сегодняшний снимок собирает живой сбор")
+    path = args.checkpoint or checkpoint_path(args.start, args.end, args.window)
+
+    print("⏪ ИСТОРИЧЕСКИЙ СБОР")
+    print("=" * 60)
+    print(f"📁 Контрольная точка: {path}")
+    if args.command != "run" and not path.exists():
+        print("❌ Контрольной точки нет — сначала запустите run")
+        return 1
+
+    if args.command == "run":
+        if args.rate:
+            hh_api.configure_client(hh_api.API_BASE_URL,
+                                    limiter=AdaptiveRateLimiter(initial_rate=args.rate, max_rate=args.rate))
+        connection = connect(path)
+        added = plan_backfill(connection, args.profiles, args.start, args.end, args.window, args.areas)
+        connection.close()
+        print(f"📋 Новых срезов: {added} ({', '.join(args.profiles)}; {args.start} … {args.end}, окно {args.window})")
+
+        stop_event = threading.Event()
+
+        def handle_signal(signum, frame):
+            print(f"\n🛑 Получен сигнал {signal.Signals(signum).name}, сохраняем прогресс...")
+            stop_event.set()
+
+        signal.signal(signal.SIGTERM, handle_signal)
+        signal.signal(signal.SIGINT, handle_signal)
+        started = time.perf_counter()
+        counts = run_backfill(path, args.workers, stop_event)
+        hh_api.get_client().close()
+        print(f"✅ Срезов: готово {counts['done']}, разделено {counts['split']}, ошибок {counts['failed']}, "
+              f"элементов {counts['items']} ({time.perf_counter() - started:.1f} сек)")
+        if counts["aborted"]:
+            print("↩️ Запустите ту же команду ещё раз — сбор продолжится с невыполненных срезов")
+
+    if args.command == "status":
+        print_status(path)
+    elif args.command == "publish" or not args.no_publish:
+        for csv_file in publish_snapshots(path, args.overwrite, args.force):
+            print(f"  ✅ {csv_file}")
+
+    metrics.write_metrics("backfill")
+    return 1 if args.command == "run" and counts["aborted"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
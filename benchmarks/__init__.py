@@ -0,0 +1 @@
+"""Бенчмарки HH_Watcher: локальный стенд API и синтетические данные"""
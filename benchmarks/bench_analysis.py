@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+⏱️ БЕНЧМАРК АНАЛИТИКИ
+Замеряет время и память шагов анализа (чтение в схеме frame_schema, mark_duplicates, clean_salary_data, categorize_roles,
+grouped_summary, сборка ячеек куба rollup_cube и запросы отчётов к нему: calculate_detailed_statistics,
+calculate_comparison_stats, сводки по ролям и компаниям) на синтетических снимках
+10k / 100k / 1M / 10M строк в схеме data/<дата>/*.csv.
+
+Каждый размер прогоняется в отдельном процессе: пиковый RSS не смешивается
+между размерами, а падение по памяти на большом наборе не обрывает весь прогон.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_analysis --sizes 10k,100k,1m
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.common import ROOT_DIR, git_revision, peak_rss_mb, save_result
+from benchmarks.synthetic_data import DATASET_SIZES, write_snapshot_csv
+from vacancy_record import CSV_HEADERS
+
+DATASETS_DIR = Path(__file__).resolve().parent / "datasets"
+
+
+def _has_current_schema(path: Path) -> bool:
+    with path.open("r", encoding="utf-8-sig") as f:
+        return f.readline().rstrip("\r\n").split(";") == CSV_HEADERS
+
+
+def dataset_path(size: str, seed: int) -> Path:
+    """Путь к закэшированному синтетическому снимку; генерирует его при отсутствии"""
+    path = DATASETS_DIR / f"snapshot_{size}_seed{seed}.csv"
+    if not path.exists() or not _has_current_schema(path):
+        print(f"🧪 Генерируем {size} строк: {path.name}", file=sys.stderr)
+        write_snapshot_csv(path, DATASET_SIZES[size], seed)
+    return path
+
+
+def measure(name: str, func, trace_memory: bool, results: list):
+    """Выполняет шаг, записывает время и пик аллокаций Python (tracemalloc)"""
+    if trace_memory:
+        tracemalloc.reset_peak()
+        memory_before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        value = func()
+    step = {"step": name, "seconds": round(time.perf_counter() - started, 4)}
+    if trace_memory:
+        step["alloc_peak_mb"] = round((tracemalloc.get_traced_memory()[1] - memory_before) / 2**20, 1)
+    results.append(step)
+    return value
+
+
+def run_size(size: str, seed: int, trace_memory: bool) -> dict:
+    """Все шаги анализа на одном наборе (вызывается в дочернем процессе)"""
+    import pandas as pd
+    import employers
+    import frame_schema
+    import near_duplicates
+    import robust_stats
+    import rollup_cube
+    import vacancy_analysis_oct5
+    import vacancy_dynamics_comparison
+
+    path = dataset_path(size, seed)
+    steps = []
+    if trace_memory:
+        tracemalloc.start()
+
+    raw = measure("read_csv", lambda: pd.read_csv(path, sep=';', encoding='utf-8-sig'), trace_memory, steps)
+    df = measure("read_snapshot_csv", lambda: frame_schema.read_snapshot_csv(path), trace_memory, steps)
+    rows = len(df)
+    frame_mb = {"raw": float(frame_schema.memory_report(raw).loc["Итого", "mb"]),
+                "schema": float(frame_schema.memory_report(df).loc["Итого", "mb"])}
+    # Группировка по строковой и по категориальной компании
+    measure("groupby_company_raw", lambda: raw.groupby("Компания").size(), trace_memory, steps)
+    measure("groupby_company_schema", lambda: df.groupby("Компания").size(), trace_memory, steps)
+    del raw
+    # Куб: ячейки снимка считаются по строкам один раз, запросы отчётов — только по ячейкам
+    index = employers.EmployerIndex()
+    cells, sketch = measure("snapshot_cells", lambda: rollup_cube.snapshot_cells(df), trace_memory, steps)
+    cells.insert(0, "snapshot", "synthetic")
+    cube = measure("make_cube", lambda: rollup_cube.make_cube(cells, sketch, index), trace_memory, steps)
+    cube_size = {"cells": len(cube.cells), "sketch": len(cube.sketch)}
+    measure("calculate_detailed_statistics", lambda: vacancy_analysis_oct5.calculate_detailed_statistics(cube),
+            trace_memory, steps)
+    measure("calculate_comparison_stats",
+            lambda: vacancy_dynamics_comparison.calculate_comparison_stats(cube, cube), trace_memory, steps)
+    measure("cube_summary_roles", lambda: cube.summary('role'), trace_memory, steps)
+    measure("cube_summary_companies", lambda: cube.summary('employer_key'), trace_memory, steps)
+    measure("cube_top_employers", lambda: cube.top_employers(15), trace_memory, steps)
+
+    df = measure("add_employer_keys", lambda: employers.add_employer_keys(df, index), trace_memory, steps)
+    df = measure("mark_duplicates", lambda: near_duplicates.mark_duplicates(df), trace_memory, steps)
+    df = measure("clean_salary_data", lambda: vacancy_analysis_oct5.clean_salary_data(df), trace_memory, steps)
+    df = measure("categorize_roles", lambda: vacancy_analysis_oct5.categorize_roles(df), trace_memory, steps)
+    # Те же сводки по строкам — для сравнения с запросами к кубу
+    measure("grouped_summary_roles", lambda: robust_stats.grouped_summary(df, 'role_category'), trace_memory, steps)
+    measure("grouped_summary_companies", lambda: robust_stats.grouped_summary(df, 'employer_key'), trace_memory, steps)
+
+    if trace_memory:
+        tracemalloc.stop()
+    return {"size": size, "rows": rows, "frame_mb": frame_mb, "cube": cube_size, "steps": steps,
+            "peak_rss_mb": round(peak_rss_mb(), 1)}
+
+
+def run_size_subprocess(size: str, seed: int, trace_memory: bool, timeout: float) -> dict:
+    """Запускает замер одного размера отдельным процессом"""
+    dataset_path(size, seed)
+    command = [sys.executable, "-m", "benchmarks.bench_analysis", "--worker", size, "--seed", str(seed)]
+    if not trace_memory:
+        command.append("--no-tracemalloc")
+    try:
+        process = subprocess.run(command, cwd=ROOT_DIR, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"size": size, "error": f"timeout после {timeout:.0f} с"}
+    if process.returncode != 0:
+        tail = (process.stderr.strip().splitlines() or ["убит (вероятно, нехватка памяти)"])[-1]
+        return {"size": size, "error": f"код {process.returncode}: {tail}"}
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Бенчмарк шагов анализа на синтетических снимках")
+    parser.add_argument("--sizes", default="10k,100k", help=f"через запятую из {', '.join(DATASET_SIZES)}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-tracemalloc", action="store_true", help="без учёта аллокаций (быстрее)")
+    parser.add_argument("--timeout", type=float, default=3600, help="лимит на один размер, с")
+    parser.add_argument("--no-save", action="store_true", help="не сохранять результат в benchmarks/results")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_size(args.worker, args.seed, not args.no_tracemalloc), ensure_ascii=False))
+        return
+
+    sizes = [size.strip().lower() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in DATASET_SIZES]
+    if unknown:
+        parser.error(f"неизвестные размеры: {', '.join(unknown)}")
+
+    print("⏱️ БЕНЧМАРК АНАЛИТИКИ")
+    print("=" * 50)
+
+    runs = []
+    for size in sizes:
+        run = run_size_subprocess(size, args.seed, not args.no_tracemalloc, args.timeout)
+        runs.append(run)
+        if "error" in run:
+            print(f"\n❌ {size}: {run['error']}")
+            continue
+        print(f"\n📊 {size} ({run['rows']:,} строк), пиковый RSS {run['peak_rss_mb']} МБ")
+        print(f"  🧱 Таблица: {run['frame_mb']['raw']:.1f} МБ в исходных типах, "
+              f"{run['frame_mb']['schema']:.1f} МБ в схеме")
+        print(f"  🧊 Куб: {run['cube']['cells']:,} ячеек, {run['cube']['sketch']:,} значений в скетчах")
+        for step in run["steps"]:
+            memory = f", аллокации {step['alloc_peak_mb']} МБ" if "alloc_peak_mb" in step else ""
+            print(f"  • {step['step']}: {step['seconds']:.3f} с{memory}")
+
+    result = {
+        "benchmark": "analysis",
+        "git_revision": git_revision(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "params": {"sizes": sizes, "seed": args.seed, "tracemalloc": not args.no_tracemalloc},
+        "runs": runs,
+    }
+    if not args.no_save:
+        path = save_result("analysis", result)
+        print(f"\n✅ Результат: {path.relative_to(ROOT_DIR)}")
+
+
+if __name__ == "__main__":
+    main()
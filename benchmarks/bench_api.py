@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+⏱️ БЕНЧМАРК HTTP API
+Запускает api_server.py отдельным процессом и гоняет по нему несколько
+клиентских потоков с keep-alive: запросы/с и задержки p50/p99 для ответов из
+кэша (повтор одних и тех же запросов), с If-None-Match (304) и для первых,
+ещё не закэшированных запросов. Результат — в benchmarks/results/*.json.
+
+Нужен построенный куб (python pipeline.py --skip-fetch) в папке --data-root.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_api --clients 8 --requests 500
+    python -m benchmarks.bench_api --data-root /path/to/checkout-with-data
+"""
+
+import argparse
+import contextlib
+import http.client
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.common import ROOT_DIR, git_revision, save_result
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import metrics
+
+# Смесь запросов, которую гоняют клиенты
+PATHS = [
+    "/api/snapshots",
+    "/api/stats",
+    "/api/stats?by=role",
+    "/api/stats?by=area",
+    "/api/dynamics",
+    "/api/companies/top?limit=15",
+    "/api/search?q=%D0%BC%D0%B5%D0%BD%D0%B5%D0%B4%D0%B6%D0%B5%D1%80&per_page=20",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def api_server(data_root: Path, cache_size: int):
+    """Запускает сервер отдельным процессом, чтобы его CPU не смешивался с клиентами"""
+    port = free_port()
+    command = [sys.executable, str(ROOT_DIR / "api_server.py"), "--port", str(port), "--cache-size", str(cache_size)]
+    process = subprocess.Popen(command, cwd=data_root, stdout=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+                connection.request("HEAD", "/api/snapshots")
+                connection.getresponse().read()
+                connection.close()
+                break
+            except OSError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("сервер не запустился (куб построен?)")
+                time.sleep(0.1)
+        yield port
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def run_phase(name: str, port: int, clients: int, requests: int, paths: list, conditional: bool = False) -> dict:
+    """clients потоков по requests запросов; каждый поток — своё keep-alive соединение"""
+    statuses = {}
+    lock = threading.Lock()
+
+    def client(offset: int):
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        etags = {}
+        for i in range(requests):
+            path = paths[(offset * requests + i) % len(paths)]
+            headers = {"If-None-Match": etags[path]} if conditional and path in etags else {}
+            with metrics.timer(name):
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+            etags[path] = response.getheader("ETag")
+            with lock:
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+        connection.close()
+
+    threads = [threading.Thread(target=client, args=(offset,)) for offset in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    timer = metrics.snapshot()["timers"][name]
+    return {
+        "requests": timer["count"],
+        "wall_sec": round(wall, 3),
+        "requests_per_sec": round(timer["count"] / wall, 1) if wall else 0.0,
+        "latency_p50_ms": round(timer["p50_sec"] * 1000, 2),
+        "latency_p99_ms": round(timer["p99_sec"] * 1000, 2),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Бенчмарк HTTP API отчётных цифр")
+    parser.add_argument("--data-root", type=Path, default=ROOT_DIR, help="папка, где лежит data/ с кубом")
+    parser.add_argument("--clients", type=int, default=8, help="параллельных клиентов")
+    parser.add_argument("--requests", type=int, default=500, help="запросов на клиента")
+    parser.add_argument("--cache-size", type=int, default=1024)
+    parser.add_argument("--no-save", action="store_true", help="не сохранять результат в benchmarks/results")
+    args = parser.parse_args()
+
+    print("⏱️ БЕНЧМАРК HTTP API")
+    print("=" * 50)
+
+    phases = {}
+    with api_server(args.data_root.resolve(), args.cache_size) as port:
+        # Первые запросы: каждый уникальный путь считается сервером (страницы поиска — все разные)
+        cold_paths = [f"/api/search?per_page=10&page={page}" for page in range(1, args.clients * 10 + 1)]
+        phases["cold"] = run_phase("api_cold", port, args.clients, 10, cold_paths)
+        phases["cached"] = run_phase("api_cached", port, args.clients, args.requests, PATHS)
+        phases["not_modified"] = run_phase("api_not_modified", port, args.clients, args.requests, PATHS,
+                                           conditional=True)
+
+    result = {
+        "benchmark": "api",
+        "git_revision": git_revision(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "params": {key: (str(value) if isinstance(value, Path) else value) for key, value in vars(args).items()},
+        "phases": phases,
+    }
+
+    for name, phase in phases.items():
+        print(f"📡 {name:<13} {phase['requests']:>6} запросов, {phase['requests_per_sec']:>8} запр/с, "
+              f"p50/p99 {phase['latency_p50_ms']} / {phase['latency_p99_ms']} мс, статусы {phase['statuses']}")
+
+    if not args.no_save:
+        path = save_result("api", result)
+        print(f"✅ Результат: {path.relative_to(ROOT_DIR)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+⏱️ БЕНЧМАРК РАСПРЕДЕЛЁННОГО СБОРА
+Прогоняет crawl_queue (план → N воркеров-процессов → слияние) против
+локального стенда API (benchmarks/hh_stub_server.py) для нескольких чисел
+воркеров. У каждого воркера свой потолок запросов/с (--rate) — как у
+отдельной машины со своим IP, поэтому ожидается почти линейное ускорение,
+пока стенд успевает отвечать. Проверяется, что слитые снимки содержат одни
+и те же вакансии в одном порядке.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_crawl --workers 1,2,4 --rate 3 --profiles zakup
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.bench_fetch import stub_server
+from benchmarks.common import ROOT_DIR, git_revision, save_result
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import crawl_queue
+
+
+def snapshot_urls(paths: list) -> dict:
+    """Ссылки вакансий каждого слитого CSV по порядку (время публикации на стенде «плывёт» вместе с часами)"""
+    urls = {}
+    for path in paths:
+        with Path(path).open(encoding="utf-8-sig", newline="") as f:
+            urls[Path(path).name.split("_3дня")[0]] = [row["Ссылка"] for row in csv.DictReader(f, delimiter=";")]
+    return urls
+
+
+def run_crawl(workers: int, args) -> tuple:
+    """Полный распределённый сбор во временной папке; возвращает (замер, ссылки слитых снимков)"""
+    with tempfile.TemporaryDirectory() as workdir:
+        previous_dir = os.getcwd()
+        os.chdir(workdir)
+        try:
+            path = Path("queue.sqlite")
+            planned = crawl_queue.plan_crawl(path, args.profiles)
+            started = time.perf_counter()
+            codes = crawl_queue.spawn_workers(path, workers, args.rate, args.visibility, quiet=True)
+            crawl_sec = time.perf_counter() - started
+            with contextlib.redirect_stdout(io.StringIO()):
+                written = crawl_queue.merge_results(path)
+            connection = crawl_queue.connect(path)
+            counts = crawl_queue.queue_counts(connection)
+            connection.close()
+            urls = snapshot_urls(written)
+        finally:
+            os.chdir(previous_dir)
+    run = {
+        "workers": workers,
+        "first_pages": planned,
+        "jobs": counts,
+        "crawl_sec": round(crawl_sec, 3),
+        "jobs_per_sec": round(sum(counts.values()) / crawl_sec, 2),
+        "vacancies": {name: len(values) for name, values in urls.items()},
+        "worker_exit_codes": codes,
+    }
+    return run, urls
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Бенчмарк распределённого сбора против локального стенда API")
+    parser.add_argument("--workers", default="1,2,4", help="числа воркеров через запятую")
+    parser.add_argument("--profiles", nargs="+", choices=sorted(crawl_queue.PROFILES), default=["zakup"])
+    parser.add_argument("--rate", type=float, default=3.0, help="потолок запросов/с одного воркера")
+    parser.add_argument("--visibility", type=float, default=30.0)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=0)
+    parser.add_argument("--total-found", type=int, default=1000)
+    parser.add_argument("--no-save", action="store_true", help="не сохранять результат в benchmarks/results")
+    args = parser.parse_args()
+    args.record_dir = None
+
+    print("⏱️ БЕНЧМАРК РАСПРЕДЕЛЁННОГО СБОРА")
+    print("=" * 50)
+
+    runs = []
+    baseline_urls = None
+    with stub_server(args) as base_url:
+        # Воркеры — отдельные процессы: адрес стенда они берут из окружения
+        os.environ["HH_API_BASE_URL"] = base_url
+        for workers in [int(value) for value in args.workers.split(",")]:
+            run, urls = run_crawl(workers, args)
+            if baseline_urls is None:
+                baseline_urls = urls
+            run["speedup"] = round(runs[0]["crawl_sec"] / run["crawl_sec"] * runs[0]["workers"], 2) if runs else 1.0
+            run["same_vacancies"] = urls == baseline_urls
+            runs.append(run)
+            print(f"🧵 {workers} воркеров: {run['crawl_sec']} с, {run['jobs_per_sec']} заданий/с, "
+                  f"ускорение ×{run['speedup']}, вакансий {run['vacancies']}, "
+                  f"совпадают {'✅' if run['same_vacancies'] else '❌'}")
+
+    result = {
+        "benchmark": "crawl",
+        "git_revision": git_revision(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "params": {key: value for key, value in vars(args).items() if key != "record_dir"},
+        "runs": runs,
+    }
+    if not args.no_save:
+        path = save_result("crawl", result)
+        print(f"✅ Результат: {path.relative_to(ROOT_DIR)}")
+
+
+if __name__ == "__main__":
+    main()
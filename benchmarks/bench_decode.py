@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+⏱️ БЕНЧМАРК РАЗБОРА СТРАНИЦ /vacancies
+Сравнивает бэкенды vacancy_decode (full / orjson / ijson / stream) на сжатых
+gzip синтетических страницах: время и пик аллокаций (tracemalloc) на страницу,
+включая потоковую распаковку кусками, как это делает hh_api.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_decode --pages 50 --per-page 100
+"""
+
+import argparse
+import gzip
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.common import ROOT_DIR, git_revision, save_result
+from benchmarks.synthetic_data import make_page
+from hh_api import iter_decompressed
+from vacancy_decode import available_backends, decode_vacancies_page
+
+# Размер куска, который клиент читает из сокета
+READ_CHUNK = 65536
+
+
+def iter_gzip_chunks(compressed: bytes):
+    """Распаковывает gzip кусками — так же, как HHClient._iter_body"""
+    raw_chunks = (compressed[start:start + READ_CHUNK] for start in range(0, len(compressed), READ_CHUNK))
+    return iter_decompressed(raw_chunks, "gzip")
+
+
+def bench_backend(backend: str, pages: list) -> dict:
+    """Время и пик аллокаций на страницу для одного бэкенда"""
+    seconds = []
+    peaks = []
+    items = 0
+    for compressed in pages:
+        tracemalloc.start()
+        started = time.perf_counter()
+        page = decode_vacancies_page(iter_gzip_chunks(compressed), backend)
+        elapsed = time.perf_counter() - started
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        seconds.append(elapsed)
+        items += len(page["items"])
+
+    # Время без накладных расходов tracemalloc
+    started = time.perf_counter()
+    for compressed in pages:
+        decode_vacancies_page(iter_gzip_chunks(compressed), backend)
+    clean_seconds = time.perf_counter() - started
+
+    return {
+        "backend": backend,
+        "items": items,
+        "ms_per_page": round(clean_seconds / len(pages) * 1000, 3),
+        "ms_per_page_traced_median": round(statistics.median(seconds) * 1000, 3),
+        "alloc_peak_kb_per_page_median": round(statistics.median(peaks) / 1024, 1),
+        "alloc_peak_kb_per_page_max": round(max(peaks) / 1024, 1),
+    }
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Бенчмарк потокового разбора страниц /vacancies")
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--per-page", type=int, default=100)
+    parser.add_argument("--backends", help="через запятую (по умолчанию все доступные)")
+    parser.add_argument("--no-save", action="store_true", help="не сохранять результат в benchmarks/results")
+    args = parser.parse_args()
+
+    backends = args.backends.split(",") if args.backends else available_backends()
+    raw_pages = [json.dumps(make_page(f"запрос {i}", 0, args.per_page, args.per_page), ensure_ascii=False).encode("utf-8")
+                 for i in range(args.pages)]
+    pages = [gzip.compress(raw, compresslevel=5) for raw in raw_pages]
+
+    print("⏱️ БЕНЧМАРК РАЗБОРА СТРАНИЦ /vacancies")
+    print("=" * 50)
+    print(f"📄 Страниц: {len(pages)}, средний размер {sum(map(len, raw_pages)) / len(raw_pages) / 1024:.0f} КБ "
+          f"(gzip {sum(map(len, pages)) / len(pages) / 1024:.0f} КБ)")
+
+    runs = []
+    for backend in backends:
+        run = bench_backend(backend, pages)
+        runs.append(run)
+        print(f"  • {backend}: {run['ms_per_page']} мс/стр, аллокации (медиана) {run['alloc_peak_kb_per_page_median']} КБ/стр")
+
+    result = {
+        "benchmark": "decode",
+        "git_revision": git_revision(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "params": {"pages": args.pages, "per_page": args.per_page},
+        "runs": runs,
+    }
+    if not args.no_save:
+        path = save_result("decode", result)
+        print(f"✅ Результат: {path.relative_to(ROOT_DIR)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+⏱️ БЕНЧМАРК ПУТИ ЗАГРУЗКИ
+Прогоняет сбор → фильтрацию → запись CSV парсера против локального стенда API
+(benchmarks/hh_stub_server.py) и сохраняет результат в benchmarks/results/*.json,
+чтобы регрессии были видны между коммитами.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_fetch --profile sales --rounds 5 --latency-ms 20 --throttle-rate 0.02
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.common import ROOT_DIR, git_revision, peak_rss_mb, save_result
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import hh_api
+import metrics
+import sales_parser
+import zakup_parser
+from rate_limiter import AdaptiveRateLimiter, CircuitBreaker
+from vacancy_decode import available_backends, default_backend
+
+PROFILES = {"sales": sales_parser, "zakup": zakup_parser}
+
+
+@contextlib.contextmanager
+def stub_server(args):
+    """Запускает стенд отдельным процессом, чтобы его CPU не смешивался с замером клиента"""
+    command = [sys.executable, "-m", "benchmarks.hh_stub_server", "--port", "0",
+               "--latency-ms", str(args.latency_ms), "--latency-jitter-ms", str(args.latency_jitter_ms),
+               "--error-rate", str(args.error_rate), "--throttle-rate", str(args.throttle_rate),
+               "--retry-after", str(args.retry_after), "--total-found", str(args.total_found)]
+    if args.record_dir:
+        command += ["--record-dir", str(args.record_dir.resolve())]
+    process = subprocess.Popen(command, cwd=ROOT_DIR, stdout=subprocess.PIPE, text=True)
+    try:
+        line = process.stdout.readline().strip()
+        if not line.startswith("PORT="):
+            raise RuntimeError(f"стенд не запустился: {line!r}")
+        yield f"http://127.0.0.1:{line.split('=', 1)[1]}"
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def run_benchmark(module, rounds: int, rate: float) -> dict:
+    """Несколько полных проходов сбора; возвращает сводку замеров"""
+    vacancies_total = 0
+    failed_total = 0
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        previous_dir = os.getcwd()
+        os.chdir(workdir)
+        try:
+            for _ in range(rounds):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    final_vacancies, failed_queries = module.collect_vacancies()
+                    module.save_vacancies_csv(final_vacancies, failed_queries)
+                vacancies_total += len(final_vacancies)
+                failed_total += len(failed_queries)
+        finally:
+            os.chdir(previous_dir)
+
+    wall = time.perf_counter() - started
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+    data = metrics.snapshot()
+    request_timer = data["timers"].get("http_request", {"count": 0, "p50_sec": 0.0, "p99_sec": 0.0})
+    counters = data["counters"]
+    return {
+        "wall_sec": round(wall, 3),
+        "requests": request_timer["count"],
+        "requests_per_sec": round(request_timer["count"] / wall, 2) if wall else 0.0,
+        "latency_p50_ms": round(request_timer["p50_sec"] * 1000, 2),
+        "latency_p99_ms": round(request_timer["p99_sec"] * 1000, 2),
+        "cpu_user_sec": round(usage_after.ru_utime - usage_before.ru_utime, 3),
+        "cpu_system_sec": round(usage_after.ru_stime - usage_before.ru_stime, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "vacancies_saved": vacancies_total,
+        "queries_failed": failed_total,
+        "throttled": counters.get("http_throttled", 0),
+        "bytes_received": counters.get("http_bytes", 0),
+        "timers": data["timers"],
+    }
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Бенчмарк загрузки вакансий против локального стенда API")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="sales")
+    parser.add_argument("--rounds", type=int, default=3, help="полных проходов по всем запросам")
+    parser.add_argument("--rate", type=float, default=200.0, help="потолок запросов/с лимитера")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=0)
+    parser.add_argument("--total-found", type=int, default=500)
+    parser.add_argument("--record-dir", type=Path, help="папка с записанными страницами *.json")
+    parser.add_argument("--json-backend", choices=available_backends(), default=default_backend(),
+                        help="бэкенд разбора страниц (vacancy_decode)")
+    parser.add_argument("--no-save", action="store_true", help="не сохранять результат в benchmarks/results")
+    args = parser.parse_args()
+
+    print("⏱️ БЕНЧМАРК ЗАГРУЗКИ ВАКАНСИЙ")
+    print("=" * 50)
+    os.environ["HH_JSON_BACKEND"] = args.json_backend
+
+    with stub_server(args) as base_url:
+        hh_api.configure_client(
+            base_url,
+            limiter=AdaptiveRateLimiter(initial_rate=args.rate, max_rate=args.rate),
+            breaker=CircuitBreaker(failure_threshold=1000),
+        )
+        metrics.reset()
+        summary = run_benchmark(PROFILES[args.profile], args.rounds, args.rate)
+
+    result = {
+        "benchmark": "fetch",
+        "git_revision": git_revision(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "params": {key: (str(value) if isinstance(value, Path) else value) for key, value in vars(args).items()},
+        **summary,
+    }
+
+    print(f"📡 Запросов: {result['requests']} за {result['wall_sec']} с ({result['requests_per_sec']} запр/с)")
+    print(f"⏱️ Задержка p50/p99: {result['latency_p50_ms']} / {result['latency_p99_ms']} мс")
+    print(f"🧮 CPU: user {result['cpu_user_sec']} с, system {result['cpu_system_sec']} с")
+    print(f"💾 Пиковый RSS: {result['peak_rss_mb']} МБ")
+    print(f"📋 Сохранено вакансий: {result['vacancies_saved']}, неудачных запросов: {result['queries_failed']}")
+
+    if not args.no_save:
+        path = save_result("fetch", result)
+        print(f"✅ Результат: {path.relative_to(ROOT_DIR)}")
+
+
+if __name__ == "__main__":
+    main()
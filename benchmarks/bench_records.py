@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+⏱️ БЕНЧМАРК ПАМЯТИ НА ВАКАНСИЮ
+Сравнивает прежнее представление (dict с кириллическими ключами) и слотовую
+запись vacancy_record.Vacancy на синтетическом наборе: удерживаемая память на
+вакансию (tracemalloc) и время записи CSV.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_records --count 1000000
+"""
+
+import argparse
+import csv
+import io
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.common import ROOT_DIR, git_revision, save_result
+from benchmarks.synthetic_data import make_csv_row
+from vacancy_record import CSV_HEADERS, Vacancy, iter_rows
+
+
+def synthetic_rows(count: int, seed: int):
+    """Строки снимка; строки каждый раз новые, как после разбора JSON"""
+    rng = random.Random(seed)
+    now = datetime(2025, 10, 5, 12, 0)
+    for i in range(count):
+        yield str(120000000 + i), make_csv_row(rng, 120000000 + i, now)
+
+
+def build_dicts(count: int, seed: int) -> list:
+    return [{"id": vacancy_id, **dict(zip(CSV_HEADERS, row))} for vacancy_id, row in synthetic_rows(count, seed)]
+
+
+def build_records(count: int, seed: int) -> list:
+    return [Vacancy(vacancy_id, *row) for vacancy_id, row in synthetic_rows(count, seed)]
+
+
+def write_dicts(vacancies: list, out):
+    writer = csv.writer(out, delimiter=";")
+    writer.writerow(CSV_HEADERS)
+    for vacancy in vacancies:
+        writer.writerow([vacancy.get(header, "") for header in CSV_HEADERS])
+
+
+def write_records(vacancies: list, out):
+    writer = csv.writer(out, delimiter=";")
+    writer.writerow(CSV_HEADERS)
+    writer.writerows(iter_rows(vacancies))
+
+
+def measure(name: str, build, write, count: int, seed: int) -> dict:
+    """Удерживаемая память после построения списка и время записи CSV в память"""
+    tracemalloc.start()
+    vacancies = build(count, seed)
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    write(vacancies, io.StringIO())
+    write_seconds = time.perf_counter() - started
+    return {
+        "representation": name,
+        "count": count,
+        "retained_mb": round(retained / 2**20, 1),
+        "bytes_per_vacancy": round(retained / count, 1),
+        "csv_write_sec": round(write_seconds, 3),
+    }
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Память на вакансию: dict против Vacancy")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-save", action="store_true", help="не сохранять результат в benchmarks/results")
+    args = parser.parse_args()
+
+    print("⏱️ БЕНЧМАРК ПАМЯТИ НА ВАКАНСИЮ")
+    print("=" * 50)
+
+    runs = [
+        measure("dict", build_dicts, write_dicts, args.count, args.seed),
+        measure("Vacancy", build_records, write_records, args.count, args.seed),
+    ]
+    for run in runs:
+        print(f"  • {run['representation']}: {run['bytes_per_vacancy']:.0f} байт/вакансию "
+              f"({run['retained_mb']} МБ), запись CSV {run['csv_write_sec']} с")
+    factor = runs[0]["retained_mb"] / runs[1]["retained_mb"] if runs[1]["retained_mb"] else 0.0
+    print(f"📉 Экономия памяти: в {factor:.2f} раза")
+
+    result = {
+        "benchmark": "records",
+        "git_revision": git_revision(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "params": {"count": args.count, "seed": args.seed},
+        "runs": runs,
+        "memory_factor": round(factor, 2),
+    }
+    if not args.no_save:
+        path = save_result("records", result)
+        print(f"✅ Результат: {path.relative_to(ROOT_DIR)}")
+
+
+if __name__ == "__main__":
+    main()
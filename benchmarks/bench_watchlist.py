@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+⏱️ БЕНЧМАРК WATCHLIST
+Сопоставление вакансий синтетического снимка с подписками: индекс watchlist
+(автомат ключевых слов + хэш работодателей + дерево интервалов зарплат)
+против прямого перебора «каждая подписка × каждая вакансия». Подписки —
+смесь наблюдения за работодателями и сохранённых поисков (ключевые слова,
+диапазон зарплаты, регион). Проверяется, что совпадения одинаковые.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_watchlist --size 100k --subscriptions 10,100,1000
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.bench_analysis import dataset_path
+from benchmarks.common import ROOT_DIR, git_revision, peak_rss_mb, save_result
+from benchmarks.synthetic_data import AREAS, DATASET_SIZES, TITLES, make_company
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import watchlist
+from employers import normalize_company_name
+from frame_schema import read_snapshot_csv
+from salary_normalization import normalize_salaries
+
+# Ключевые слова сохранённых поисков: части названий синтетических вакансий
+KEYWORDS = sorted({word.lower() for title in TITLES for word in title.split() if len(word) > 4})
+
+
+def make_subscriptions(count: int, seed: int) -> list:
+    """Три четверти — работодатели, остальное — поиски по словам с зарплатой и регионом"""
+    rng = random.Random(seed)
+    subscriptions = []
+    for i in range(count):
+        if rng.random() < 0.75:
+            employer_id, name = make_company(rng)
+            subscription = watchlist.Subscription(id=f"employer_{i}", companies=[name])
+        else:
+            subscription = watchlist.Subscription(
+                id=f"search_{i}", keywords=rng.sample(KEYWORDS, rng.randint(1, 3)),
+                min_salary=rng.choice([None, 80000, 120000, 150000]),
+                max_salary=rng.choice([None, None, 250000]),
+                areas=[rng.choice(AREAS)[1]] if rng.random() < 0.5 else [])
+            if not subscription.conditions:
+                subscription.min_salary = 100000
+        subscriptions.append(subscription)
+    return subscriptions
+
+
+def naive_match(subscriptions: list, df) -> dict:
+    """Прямой перебор: каждая подписка проверяется на каждой вакансии"""
+    df = normalize_salaries(df)
+    rows = [(watchlist._normalize_text(title), normalize_company_name(company),
+             watchlist._normalize_text(area) if isinstance(area, str) else "",
+             None if salary != salary or salary is None else float(salary))
+            for title, company, area, salary in zip(df["Название вакансии"], df["Компания"], df["Регион"],
+                                                    df["salary_avg"].astype("float64"))]
+    matches = {}
+    for subscription in subscriptions:
+        keywords = [watchlist._normalize_text(keyword) for keyword in subscription.keywords]
+        companies = {normalize_company_name(company) for company in subscription.companies}
+        company_parts = [normalize_company_name(part) for part in subscription.company_contains]
+        areas = {watchlist._normalize_text(area) for area in subscription.areas}
+        found = 0
+        for title, company, area, salary in rows:
+            if keywords and not any(keyword in title for keyword in keywords):
+                continue
+            if (companies or company_parts) and company not in companies and not any(
+                    part in company for part in company_parts):
+                continue
+            if areas and area not in areas:
+                continue
+            if subscription.has_salary_range and (
+                    salary is None or (subscription.min_salary is not None and salary < subscription.min_salary)
+                    or (subscription.max_salary is not None and salary > subscription.max_salary)):
+                continue
+            found += 1
+        matches[subscription.id] = found
+    return matches
+
+
+def timed(func):
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        value = func()
+    return value, round(time.perf_counter() - started, 3)
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Бенчмарк сопоставления вакансий с подписками watchlist")
+    parser.add_argument("--size", choices=sorted(DATASET_SIZES), default="100k")
+    parser.add_argument("--subscriptions", default="10,100,1000", help="числа подписок через запятую")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-naive", action="store_true", help="без прямого перебора (он медленный)")
+    parser.add_argument("--no-save", action="store_true", help="не сохранять результат в benchmarks/results")
+    args = parser.parse_args()
+
+    print("⏱️ БЕНЧМАРК WATCHLIST")
+    print("=" * 50)
+    df = read_snapshot_csv(dataset_path(args.size, args.seed))
+    runs = []
+    for count in [int(value) for value in args.subscriptions.split(",")]:
+        subscriptions = make_subscriptions(count, args.seed)
+        index, compile_sec = timed(lambda: watchlist.WatchlistIndex(subscriptions))
+        matches, indexed_sec = timed(lambda: index.match_frame(df))
+        run = {"subscriptions": count, "vacancies": len(df), "compile_sec": compile_sec,
+               "indexed_sec": indexed_sec, "matches": sum(len(found) for found in matches.values())}
+        if not args.no_naive:
+            expected, run["naive_sec"] = timed(lambda: naive_match(subscriptions, df))
+            run["same_matches"] = expected == {key: len(found) for key, found in matches.items()}
+        runs.append(run)
+        line = (f"📋 {count:>5} подписок: индекс {indexed_sec} с (+{compile_sec} с сборка), "
+                f"совпадений {run['matches']}")
+        if "naive_sec" in run:
+            line += f", перебор {run['naive_sec']} с, совпадения {'✅' if run['same_matches'] else '❌'}"
+        print(line)
+
+    result = {
+        "benchmark": "watchlist",
+        "git_revision": git_revision(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "params": vars(args),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "runs": runs,
+    }
+    if not args.no_save:
+        path = save_result("watchlist", result)
+        print(f"✅ Результат: {path.relative_to(ROOT_DIR)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+🧰 ОБЩЕЕ ДЛЯ БЕНЧМАРКОВ
+Версия кода, пиковый RSS и сохранение результатов в benchmarks/results/.
+"""
+
+import hashlib
+import json
+import resource
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+# Результаты бенчмарков не делают дерево «грязным»: их коммитят вместе с изменением
+RESULTS_PATHSPEC = ":(exclude)benchmarks/results"
+
+
+def _git(*args) -> bytes:
+    return subprocess.run(["git", *args], cwd=ROOT_DIR, capture_output=True, check=True).stdout
+
+
+def git_revision() -> str:
+    """Короткий хэш текущего коммита (или 'unknown' вне git).
+
+    Замер обычно делают до коммита изменения, поэтому при незакоммиченных правках
+    к хэшу добавляется '-dirty-<sha256 diff>' (diff относительно HEAD и новые файлы):
+    результат не выдаётся за замер самого HEAD, а одинаковые правки дают одинаковую метку.
+    """
+    try:
+        revision = _git("rev-parse", "--short", "HEAD").decode().strip()
+        diff = _git("diff", "HEAD", "--binary", "--", ".", RESULTS_PATHSPEC)
+        untracked = _git("ls-files", "--others", "--exclude-standard", "-z", "--", ".", RESULTS_PATHSPEC)
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    if not diff and not untracked:
+        return revision
+    digest = hashlib.sha256(diff)
+    for name in sorted(filter(None, untracked.split(b"\0"))):
+        digest.update(name)
+        digest.update((ROOT_DIR / name.decode()).read_bytes())
+    return f"{revision}-dirty-{digest.hexdigest()[:8]}"
+
+
+def peak_rss_mb() -> float:
+    """Пиковый RSS процесса в МБ (ru_maxrss в КБ на Linux, в байтах на macOS)"""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+
+def save_result(benchmark: str, result: dict) -> Path:
+    """Сохраняет результат в benchmarks/results/<бенчмарк>_<время>_<коммит>.json"""
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = RESULTS_DIR / f"{benchmark}_{stamp}_{result['git_revision']}.json"
+    path.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    return path
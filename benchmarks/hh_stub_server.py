@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+🧪 ЛОКАЛЬНЫЙ СТЕНД API HH.RU
+HTTP-сервер, который отдаёт записанные или синтетические страницы /vacancies
+с настраиваемой задержкой, ошибками 5xx и ответами 429 (Retry-After).
+Карточки /vacancies/{id} отдаются с ETag и отвечают 304 на If-None-Match.
+С date_from/date_to выдача состоит из вакансий, опубликованных в этом окне
+(--total-found — число вакансий за сутки).
+
+Запуск: python -m benchmarks.hh_stub_server --port 8765 --latency-ms 50 --throttle-rate 0.05
+После старта печатает строку PORT=<порт> (удобно при --port 0).
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+import urllib.parse
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from benchmarks.synthetic_data import make_detail, make_page
+
+VACANCY_PATH_RE = re.compile(r'^/vacancies/(\d+)$')
+
+
+class StubConfig:
+    """Параметры поведения стенда"""
+
+    def __init__(self, latency_ms: float = 0.0, latency_jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, retry_after: int = 1, total_found: int = 500,
+                 record_dir: Path = None, gzip_enabled: bool = True, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.total_found = total_found
+        self.gzip_enabled = gzip_enabled
+        self.seed = seed
+        self.recorded_pages = []
+        if record_dir:
+            self.recorded_pages = [p.read_bytes() for p in sorted(Path(record_dir).glob("*.json"))]
+        self.stats = {"requests": 0, "errors": 0, "throttled": 0, "not_modified": 0}
+        self.lock = threading.Lock()
+        self.rng = random.Random(seed)
+
+    def roll(self) -> float:
+        with self.lock:
+            return self.rng.random()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config: StubConfig = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status: int, payload: bytes, extra_headers: dict = None):
+        headers = {"Content-Type": "application/json; charset=utf-8"}
+        headers.update(extra_headers or {})
+        if self.config.gzip_enabled and "gzip" in self.headers.get("Accept-Encoding", "") and payload:
+            payload = gzip.compress(payload, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        config = self.config
+        with config.lock:
+            config.stats["requests"] += 1
+
+        delay = config.latency_ms + random.uniform(-config.latency_jitter_ms, config.latency_jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        roll = config.roll()
+        if roll < config.throttle_rate:
+            with config.lock:
+                config.stats["throttled"] += 1
+            self.send_body(429, b'{"errors":[{"type":"too_many_requests"}]}', {"Retry-After": str(config.retry_after)})
+            return
+        if roll < config.throttle_rate + config.error_rate:
+            with config.lock:
+                config.stats["errors"] += 1
+            self.send_body(503, b'{"errors":[{"type":"service_unavailable"}]}')
+            return
+
+        parsed = urllib.parse.urlsplit(self.path)
+        params = urllib.parse.parse_qs(parsed.query)
+
+        if parsed.path == "/vacancies":
+            page = int(params.get("page", ["0"])[0])
+            per_page = int(params.get("per_page", ["20"])[0])
+            if config.recorded_pages:
+                payload = config.recorded_pages[page % len(config.recorded_pages)]
+            else:
+                query = params.get("text", [""])[0]
+                window = None
+                if "date_from" in params:
+                    # Время публикации в окне — в часовом поясе запроса, как у API
+                    date_from = datetime.fromisoformat(params["date_from"][0])
+                    date_to = (datetime.fromisoformat(params["date_to"][0]) if "date_to" in params
+                               else datetime.now(date_from.tzinfo))
+                    window = (date_from.replace(tzinfo=None), date_to.replace(tzinfo=None))
+                payload = json.dumps(make_page(query, page, per_page, config.total_found, config.seed, window),
+                                     ensure_ascii=False).encode("utf-8")
+            self.send_body(200, payload)
+            return
+
+        match = VACANCY_PATH_RE.match(parsed.path)
+        if match:
+            payload = json.dumps(make_detail(int(match.group(1))), ensure_ascii=False).encode("utf-8")
+            etag = '"' + hashlib.md5(payload).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                with config.lock:
+                    config.stats["not_modified"] += 1
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_body(200, payload, {"ETag": etag})
+            return
+
+        self.send_body(404, b'{"errors":[{"type":"not_found"}]}')
+
+
+def start_server(config: StubConfig, host: str = "127.0.0.1", port: int = 0):
+    """Запускает стенд в фоновом потоке; возвращает (сервер, базовый URL)"""
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Локальный стенд API hh.ru")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--total-found", type=int, default=500, help="вакансий на запрос (синтетика)")
+    parser.add_argument("--record-dir", type=Path, help="папка с записанными страницами *.json")
+    parser.add_argument("--no-gzip", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = StubConfig(args.latency_ms, args.latency_jitter_ms, args.error_rate, args.throttle_rate,
+                        args.retry_after, args.total_found, args.record_dir, not args.no_gzip, args.seed)
+    server, base_url = start_server(config, args.host, args.port)
+    print(f"PORT={server.server_address[1]}", flush=True)
+    print(f"🧪 Стенд API hh.ru: {base_url}", file=sys.stderr, flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        print(f"📊 Статистика стенда: {config.stats}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
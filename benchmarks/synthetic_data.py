@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+🧪 СИНТЕТИЧЕСКИЕ ВАКАНСИИ
+Генератор правдоподобных вакансий (русские названия, компании, зарплаты)
+в формате элементов /vacancies API hh.ru и в схеме CSV-снимков data/<дата>/*.csv.
+"""
+
+import csv
+import random
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from vacancy_record import CSV_HEADERS
+
+TITLES = [
+    "Менеджер по продажам", "Менеджер по активным продажам", "Руководитель отдела продаж",
+    "Директор по продажам", "Специалист по продажам", "Менеджер оптовых продаж",
+    "Категорийный менеджер", "Коммерческий директор", "Менеджер по развитию бизнеса",
+    "Key Account Manager", "Менеджер по работе с ключевыми клиентами", "Торговый представитель",
+    "Супервайзер", "Региональный менеджер", "Менеджер B2B продаж", "Менеджер интернет-продаж",
+    "Менеджер по закупкам", "Специалист по закупкам", "Закупщик", "Менеджер по снабжению",
+    "Руководитель проектов", "Менеджер проектов", "Project Manager", "Аналитик продаж",
+]
+
+TITLE_SUFFIXES = ["", "", "", " (B2B)", " автозапчастей", " строительных материалов",
+                  " продуктов питания", " в автосалон", " оборудования", " (удалённо)"]
+
+COMPANY_STEMS = [
+    "Восток", "Приморье", "Дальрыба", "Тихоокеанская", "Владпромснаб", "Золотой Рог",
+    "Дикий Улов", "Авто Под Заказ", "Тайгер Снаб", "Восток Пак", "Дальтранс", "Амур",
+    "Седанка", "Эгершельд", "Находка Логистик", "ДВ Трейд", "Русский Остров", "Океан",
+]
+
+LEGAL_FORMS = ["ООО ", "АО ", "ИП ", "", "", "ГК "]
+
+CURRENCIES = ["RUR"] * 18 + ["USD", "KZT"]
+
+QUERIES = ["менеджер по продажам", "менеджер по закупкам", "руководитель проектов",
+           "коммерческий директор", "специалист по снабжению", "торговый представитель"]
+
+# Размеры наборов для бенчмарков аналитики
+DATASET_SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+AREAS = [("22", "Владивосток"), ("22", "Владивосток"), ("22", "Владивосток"), ("1", "Москва"), ("2", "Санкт-Петербург")]
+
+# Поля карточки /vacancies/{id}, которых нет в выдаче поиска
+EXPERIENCES = [("noExperience", "Нет опыта"), ("between1And3", "От 1 года до 3 лет"),
+               ("between3And6", "От 3 до 6 лет"), ("moreThan6", "Более 6 лет")]
+EMPLOYMENTS = [("full", "Полная занятость"), ("full", "Полная занятость"), ("part", "Частичная занятость"),
+               ("project", "Проектная работа")]
+SCHEDULES = [("fullDay", "Полный день"), ("fullDay", "Полный день"), ("shift", "Сменный график"),
+             ("flexible", "Гибкий график"), ("remote", "Удаленная работа")]
+KEY_SKILLS = ["Активные продажи", "Ведение переговоров", "B2B продажи", "1С: Предприятие", "CRM",
+              "Холодные звонки", "Закупки", "Работа с поставщиками", "Деловая переписка", "Английский язык",
+              "Управление проектами", "MS Excel", "Логистика", "ВЭД"]
+
+# Фиксированный «момент публикации» карточек: у одного id тело и ETag не меняются между запросами
+DETAIL_EPOCH = datetime(2025, 10, 5, 9, 0)
+
+
+def make_company(rng: random.Random) -> tuple:
+    """Возвращает (id работодателя, название)"""
+    index = rng.randrange(len(COMPANY_STEMS) * 40)
+    stem = COMPANY_STEMS[index % len(COMPANY_STEMS)]
+    number = index // len(COMPANY_STEMS)
+    name = f"{LEGAL_FORMS[index % len(LEGAL_FORMS)]}{stem}" + (f" {number}" if number else "")
+    return str(1000 + index), name
+
+
+def make_salary(rng: random.Random):
+    """Зарплата в формате API или None (примерно у трети вакансий её нет)"""
+    if rng.random() < 0.33:
+        return None
+    currency = rng.choice(CURRENCIES)
+    base = rng.lognormvariate(11.6, 0.35)
+    if currency == "USD":
+        base /= 90
+    elif currency == "KZT":
+        base *= 5.5
+    base = int(round(base, -3)) or 1000
+    kind = rng.random()
+    salary = {"from": None, "to": None, "currency": currency, "gross": rng.random() < 0.6}
+    if kind < 0.5:
+        salary["from"], salary["to"] = base, int(base * rng.uniform(1.1, 1.8))
+    elif kind < 0.85:
+        salary["from"] = base
+    else:
+        salary["to"] = base
+    return salary
+
+
+def make_item(rng: random.Random, vacancy_id: int, now: datetime = None, window: tuple = None) -> dict:
+    """Один элемент items[] ответа /vacancies (window — (начало, конец) времени публикации)"""
+    now = now or datetime.now()
+    employer_id, employer_name = make_company(rng)
+    area_id, area_name = rng.choice(AREAS)
+    if window:
+        published = window[0] + timedelta(seconds=rng.randrange(max(int((window[1] - window[0]).total_seconds()), 1)))
+    else:
+        published = now - timedelta(minutes=rng.randrange(3 * 24 * 60))
+    return {
+        "id": str(vacancy_id),
+        "name": rng.choice(TITLES) + rng.choice(TITLE_SUFFIXES),
+        "area": {"id": area_id, "name": area_name, "url": f"https://api.hh.ru/areas/{area_id}"},
+        "salary": make_salary(rng),
+        "type": {"id": "open", "name": "Открытая"},
+        "published_at": published.strftime("%Y-%m-%dT%H:%M:%S+1000"),
+        "created_at": published.strftime("%Y-%m-%dT%H:%M:%S+1000"),
+        "archived": False,
+        "alternate_url": f"https://hh.ru/vacancy/{vacancy_id}",
+        "url": f"https://api.hh.ru/vacancies/{vacancy_id}",
+        "employer": {
+            "id": employer_id,
+            "name": employer_name,
+            "url": f"https://api.hh.ru/employers/{employer_id}",
+            "alternate_url": f"https://hh.ru/employer/{employer_id}",
+            "trusted": True,
+        },
+        "snippet": {
+            "requirement": "Опыт в продажах от 1 года. Уверенный пользователь ПК.",
+            "responsibility": "Поиск и привлечение клиентов, ведение переговоров, заключение договоров.",
+        },
+        "schedule": {"id": "fullDay", "name": "Полный день"},
+        "professional_roles": [{"id": "70", "name": "Менеджер по продажам, менеджер по работе с клиентами"}],
+    }
+
+
+def make_detail(vacancy_id: int) -> dict:
+    """Карточка /vacancies/{id}: элемент выдачи плюс опыт, занятость, навыки и описание"""
+    rng = random.Random(vacancy_id)
+    item = make_item(rng, vacancy_id, DETAIL_EPOCH)
+    experience, employment, schedule = rng.choice(EXPERIENCES), rng.choice(EMPLOYMENTS), rng.choice(SCHEDULES)
+    item.update({
+        "experience": {"id": experience[0], "name": experience[1]},
+        "employment": {"id": employment[0], "name": employment[1]},
+        "schedule": {"id": schedule[0], "name": schedule[1]},
+        "key_skills": [{"name": name} for name in rng.sample(KEY_SKILLS, rng.randint(0, 5))],
+        "description": (f"<p><strong>Обязанности:</strong></p><ul><li>{item['snippet']['responsibility']}</li></ul>"
+                        f"<p><strong>Требования:</strong></p><ul><li>{item['snippet']['requirement']}</li></ul>"),
+    })
+    return item
+
+
+def make_page(query: str, page: int, per_page: int, total_found: int = 500, seed: int = 0,
+              window: tuple = None) -> dict:
+    """Детерминированная страница ответа /vacancies для запроса.
+    С окном публикации (date_from/date_to) total_found — вакансий за сутки, id зависят от окна"""
+    key = f"{seed}:{query}"
+    if window:
+        key += f":{window[0].isoformat()}"
+        total_found = -(-total_found * int((window[1] - window[0]).total_seconds()) // 86400)
+    rng = random.Random(f"{key}:{page}")
+    pages = max(1, -(-total_found // per_page))
+    start = page * per_page
+    count = max(0, min(per_page, total_found - start))
+    if window:
+        base_id = 200000000 + (zlib.crc32(key.encode("utf-8")) % 100000) * 10000
+    else:
+        base_id = 100000000 + (zlib.crc32(key.encode("utf-8")) % 1000) * 100000
+    items = [make_item(rng, base_id + start + i, window=window) for i in range(count)]
+    return {"items": items, "found": total_found, "pages": pages, "page": page, "per_page": per_page}
+
+
+def format_salary(salary) -> str:
+    """Текст зарплаты так же, как его пишут парсеры"""
+    if not salary:
+        return "не указано"
+    salary_from, salary_to, currency = salary["from"], salary["to"], salary["currency"]
+    if salary_from and salary_to:
+        return f"{salary_from:,}–{salary_to:,} {currency}"
+    if salary_from:
+        return f"от {salary_from:,} {currency}"
+    return f"до {salary_to:,} {currency}"
+
+
+def make_csv_row(rng: random.Random, vacancy_id: int, now: datetime) -> list:
+    """Строка CSV-снимка (колонки CSV_HEADERS)"""
+    employer_id, company = make_company(rng)
+    published = now - timedelta(minutes=rng.randrange(3 * 24 * 60))
+    days = (now.date() - published.date()).days
+    relative_date = "сегодня" if days == 0 else "вчера" if days == 1 else f"{days} дней назад"
+    salary = make_salary(rng)
+    return [
+        rng.choice(TITLES) + rng.choice(TITLE_SUFFIXES),
+        company,
+        f"https://hh.ru/vacancy/{vacancy_id}",
+        published.strftime("%Y-%m-%d %H:%M"),
+        relative_date,
+        format_salary(salary),
+        rng.choice(QUERIES),
+        employer_id,
+        ("да" if salary["gross"] else "нет") if salary else "",
+        rng.choice(AREAS)[1],
+    ]
+
+
+def write_snapshot_csv(path: Path, rows: int, seed: int = 0, now: datetime = None) -> Path:
+    """Пишет синтетический снимок потоково (10M строк не держатся в памяти целиком)"""
+    rng = random.Random(seed)
+    now = now or datetime(2025, 10, 5, 12, 0)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with tmp_path.open("w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(CSV_HEADERS)
+        base_id = 120000000 + seed * 20_000_000
+        batch = []
+        for i in range(rows):
+            batch.append(make_csv_row(rng, base_id + i, now))
+            if len(batch) == 10000:
+                writer.writerows(batch)
+                batch.clear()
+        writer.writerows(batch)
+    tmp_path.replace(path)
+    return path
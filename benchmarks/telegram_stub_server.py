@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+🧪 ЛОКАЛЬНЫЙ СТЕНД TELEGRAM BOT API
+Принимает POST /bot<токен>/sendMessage как Bot API: отвечает 429 с
+parameters.retry_after, если в чат пишут чаще --chat-interval, случайными
+502 (--error-rate) и 400 «chat not found» для чатов из --missing-chats.
+Принятые сообщения видны по GET /messages — так notifier.py проверяется без
+настоящего бота:
+
+    python -m benchmarks.telegram_stub_server --port 0
+    TELEGRAM_BOT_TOKEN=test TELEGRAM_API_BASE_URL=http://127.0.0.1:<порт> python notifier.py
+
+После старта печатает строку PORT=<порт> (удобно при --port 0).
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SEND_PATH_RE = re.compile(r'^/bot([^/]+)/sendMessage$')
+
+
+class StubConfig:
+    """Параметры поведения стенда и принятые сообщения"""
+
+    def __init__(self, chat_interval: float = 1.0, error_rate: float = 0.0, missing_chats: list = None,
+                 latency_ms: float = 0.0, seed: int = 0):
+        self.chat_interval = chat_interval
+        self.error_rate = error_rate
+        self.missing_chats = set(missing_chats or [])
+        self.latency_ms = latency_ms
+        self.messages = []
+        self.last_sent = {}
+        self.stats = {"requests": 0, "sent": 0, "errors": 0, "throttled": 0, "rejected": 0}
+        self.lock = threading.Lock()
+        self.rng = random.Random(seed)
+
+    def roll(self) -> float:
+        with self.lock:
+            return self.rng.random()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config: StubConfig = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status: int, data: dict):
+        payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_error_body(self, status: int, description: str, stat: str, parameters: dict = None):
+        with self.config.lock:
+            self.config.stats[stat] += 1
+        data = {"ok": False, "error_code": status, "description": description}
+        if parameters:
+            data["parameters"] = parameters
+        self.send_body(status, data)
+
+    def do_GET(self):
+        if self.path == "/messages":
+            with self.config.lock:
+                self.send_body(200, {"ok": True, "result": list(self.config.messages), "stats": self.config.stats})
+            return
+        self.send_body(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+
+    def do_POST(self):
+        config = self.config
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with config.lock:
+            config.stats["requests"] += 1
+        if config.latency_ms > 0:
+            time.sleep(config.latency_ms / 1000)
+
+        if not SEND_PATH_RE.match(self.path):
+            self.send_body(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+            return
+        try:
+            request = json.loads(body.decode("utf-8"))
+            chat, text = str(request["chat_id"]), request["text"]
+        except (ValueError, KeyError):
+            self.send_error_body(400, "Bad Request: message text is empty", "rejected")
+            return
+        if chat in config.missing_chats:
+            self.send_error_body(400, "Bad Request: chat not found", "rejected")
+            return
+        if len(text) > 4096:
+            self.send_error_body(400, "Bad Request: message is too long", "rejected")
+            return
+        if config.roll() < config.error_rate:
+            self.send_error_body(502, "Bad Gateway", "errors")
+            return
+
+        with config.lock:
+            now = time.monotonic()
+            wait = config.last_sent.get(chat, -config.chat_interval) + config.chat_interval - now
+            if wait <= 0:
+                config.last_sent[chat] = now
+                config.stats["sent"] += 1
+                message_id = len(config.messages) + 1
+                config.messages.append({"message_id": message_id, "chat_id": chat, "text": text})
+        if wait > 0:
+            self.send_error_body(429, f"Too Many Requests: retry after {int(wait) + 1}", "throttled",
+                                 {"retry_after": int(wait) + 1})
+            return
+        self.send_body(200, {"ok": True, "result": {"message_id": message_id, "chat": {"id": chat}, "text": text}})
+
+
+def start_server(config: StubConfig, host: str = "127.0.0.1", port: int = 0):
+    """Запускает стенд в фоновом потоке; возвращает (сервер, базовый URL)"""
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Локальный стенд Telegram Bot API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--chat-interval", type=float, default=1.0, help="минимум секунд между сообщениями в чат")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 502")
+    parser.add_argument("--missing-chats", default="", help="чаты через запятую, которым отвечать «chat not found»")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = StubConfig(args.chat_interval, args.error_rate, [chat for chat in args.missing_chats.split(",") if chat],
+                        args.latency_ms, args.seed)
+    server, base_url = start_server(config, args.host, args.port)
+    print(f"PORT={server.server_address[1]}", flush=True)
+    print(f"🧪 Стенд Telegram Bot API: {base_url}", file=sys.stderr, flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        print(f"📊 Статистика стенда: {config.stats}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+🧵 РАСПРЕДЕЛЁННЫЙ СБОР: ОЧЕРЕДЬ ЗАДАНИЙ С АРЕНДОЙ
+Координатор раскладывает сбор «профиль × регион × запрос × страница» на
+задания в общей очереди — файле SQLite data/crawl/<запуск>.sqlite. Воркеры
+(процессы на одной или нескольких машинах, у каждой свой бюджет запросов к
+API) берут задания в аренду:
+
+- аренда действует --visibility секунд; если воркер упал, задание по
+  истечении аренды снова достаётся другому;
+- первая страница запроса, узнав число страниц выдачи, ставит в очередь
+  остальные страницы;
+- вакансии пишутся в таблицу results с ключом «профиль + id вакансии»,
+  поэтому повторное выполнение задания ничего не дублирует; при встрече
+  вакансии в нескольких запросах остаётся первое вхождение в порядке QUERIES —
+  как у последовательного парсера;
+- неудачное задание повторяется с паузой, после MAX_ATTEMPTS попыток
+  помечается failed и попадает в метаданные снимка как неудавшийся запрос.
+
+Слияние (merge) собирает результаты профиля в обычный CSV-снимок
+data/<дата>/<префикс>_<дата>.csv через save_vacancies_csv парсера.
+
+Очередь — обычный файл SQLite без WAL: воркерам на разных машинах нужен
+общий том с рабочими блокировками файлов (например, общий ./data у
+контейнеров одного хоста); сетевые ФС вроде NFS для этого ненадёжны.
+
+Запуск из корня проекта:
+    python crawl_queue.py run --workers 4                      # план, 4 локальных воркера, слияние
+    python crawl_queue.py plan --profiles sales zakup --areas 22 1
+    python crawl_queue.py worker --queue data/crawl/<запуск>.sqlite --rate 5
+    python crawl_queue.py status --queue data/crawl/<запуск>.sqlite
+    python crawl_queue.py merge --queue data/crawl/<запуск>.sqlite
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+import hh_api
+import metrics
+import sales_parser
+import zakup_parser
+from rate_limiter import AdaptiveRateLimiter, FetchError, backoff_delay
+from vacancy_record import Vacancy
+
+CRAWL_DIR = Path("data") / "crawl"
+
+# Профиль: модуль парсера (QUERIES, CSV_PREFIX, search_page, items_to_vacancies, save_vacancies_csv)
+# и его фильтр релевантности по названию
+PROFILES = {
+    "sales": (sales_parser, sales_parser.is_sales_vacancy),
+    "zakup": (zakup_parser, zakup_parser.is_relevant_vacancy),
+}
+
+# Регион по умолчанию — как у парсеров (22 = Владивосток)
+DEFAULT_AREAS = ["22"]
+
+# Сколько секунд задание принадлежит воркеру, пока тот не отчитался
+VISIBILITY_TIMEOUT = 120.0
+
+# Попыток на задание (каждая — уже с повторами клиента hh_api внутри)
+MAX_ATTEMPTS = 4
+
+# Поля Vacancy в строке results (порядок аргументов конструктора)
+VACANCY_FIELDS = ["id", "title", "company", "url", "published", "relative_date", "salary", "query",
+                  "employer_id", "salary_gross", "area"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    key TEXT PRIMARY KEY,
+    profile TEXT NOT NULL,
+    area TEXT NOT NULL,
+    area_rank INTEGER NOT NULL,
+    query TEXT NOT NULL,
+    query_rank INTEGER NOT NULL,
+    page INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_expires REAL NOT NULL DEFAULT 0,
+    not_before REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error_class TEXT,
+    last_error TEXT,
+    http_status INTEGER,
+    items INTEGER,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, page, query_rank);
+CREATE TABLE IF NOT EXISTS results (
+    profile TEXT NOT NULL,
+    vacancy_key TEXT NOT NULL,
+    query_rank INTEGER NOT NULL,
+    area_rank INTEGER NOT NULL,
+    page INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    vacancy TEXT NOT NULL,
+    PRIMARY KEY (profile, vacancy_key)
+);
+"""
+
+
+@dataclass
+class Job:
+    """Задание очереди: одна страница выдачи по запросу профиля в регионе"""
+    key: str
+    profile: str
+    area: str
+    area_rank: int
+    query: str
+    query_rank: int
+    page: int
+    attempts: int
+
+
+def job_key(profile: str, area: str, query: str, page: int) -> str:
+    return f"{profile}|{area}|{query}|{page}"
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    """Соединение в режиме autocommit: транзакции открываются явно (BEGIN IMMEDIATE)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+@contextlib.contextmanager
+def transaction(connection: sqlite3.Connection):
+    """Пишущая транзакция: блокировка берётся сразу, а не при первой записи"""
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield connection
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
+
+
+def plan_crawl(path: Path, profiles: list, areas: list = DEFAULT_AREAS) -> int:
+    """Создаёт очередь запуска: первые страницы каждого запроса; возвращает число заданий"""
+    connection = connect(path)
+    rows = []
+    for profile in profiles:
+        module, _ = PROFILES[profile]
+        for area_rank, area in enumerate(areas):
+            for query_rank, query in enumerate(module.QUERIES):
+                rows.append((job_key(profile, area, query, 0), profile, area, area_rank, query, query_rank, 0))
+    with transaction(connection):
+        connection.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [
+            ("created_at", datetime.now().isoformat(timespec="seconds")),
+            ("profiles", json.dumps(profiles)),
+            ("areas", json.dumps(areas)),
+        ])
+        connection.executemany("INSERT OR IGNORE INTO jobs (key, profile, area, area_rank, query, query_rank, page)"
+                               " VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    connection.close()
+    return len(rows)
+
+
+def lease_job(connection: sqlite3.Connection, owner: str, visibility: float = VISIBILITY_TIMEOUT):
+    """Берёт в аренду следующее задание (новое или с истёкшей арендой); None — брать нечего"""
+    now = time.time()
+    with transaction(connection):
+        expired = connection.execute(
+            "UPDATE jobs SET status = 'failed', owner = NULL, last_error = 'аренда истекла'"
+            " WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?", (now, MAX_ATTEMPTS)).rowcount
+        row = connection.execute(
+            "SELECT key, profile, area, area_rank, query, query_rank, page, attempts FROM jobs"
+            " WHERE (status = 'pending' AND not_before <= ?) OR (status = 'leased' AND lease_expires < ?)"
+            " ORDER BY page, query_rank, area_rank LIMIT 1", (now, now)).fetchone()
+        if row is None:
+            job = None
+        else:
+            job = Job(*row[:7], attempts=row[7] + 1)
+            connection.execute("UPDATE jobs SET status = 'leased', owner = ?, lease_expires = ?, attempts = ?"
+                               " WHERE key = ?", (owner, now + visibility, job.attempts, job.key))
+    if expired:
+        metrics.increment("crawl_jobs_expired", expired)
+    return job
+
+
+def complete_job(connection: sqlite3.Connection, job: Job, owner: str, vacancies: list, pages: int) -> bool:
+    """Записывает вакансии страницы и закрывает задание; False — его уже выполнил другой воркер.
+
+    Первая страница ставит в очередь остальные страницы выдачи. Из вакансий,
+    встреченных в нескольких заданиях, остаётся вхождение с наименьшим
+    (запрос, регион, страница, позиция) — как у последовательного обхода.
+    """
+    rows = [(job.profile, vacancy.key, job.query_rank, job.area_rank, job.page, position,
+             json.dumps([getattr(vacancy, name) for name in VACANCY_FIELDS], ensure_ascii=False))
+            for position, vacancy in enumerate(vacancies)]
+    with transaction(connection):
+        status, = connection.execute("SELECT status FROM jobs WHERE key = ?", (job.key,)).fetchone()
+        if status == "done":
+            return False
+        connection.executemany(
+            "INSERT INTO results (profile, vacancy_key, query_rank, area_rank, page, position, vacancy)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (profile, vacancy_key) DO UPDATE SET"
+            " query_rank = excluded.query_rank, area_rank = excluded.area_rank, page = excluded.page,"
+            " position = excluded.position, vacancy = excluded.vacancy"
+            " WHERE (excluded.query_rank, excluded.area_rank, excluded.page, excluded.position)"
+            " < (results.query_rank, results.area_rank, results.page, results.position)", rows)
+        if job.page == 0:
+            connection.executemany(
+                "INSERT OR IGNORE INTO jobs (key, profile, area, area_rank, query, query_rank, page)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(job_key(job.profile, job.area, job.query, page), job.profile, job.area, job.area_rank,
+                  job.query, job.query_rank, page) for page in range(1, pages)])
+        connection.execute("UPDATE jobs SET status = 'done', owner = ?, items = ?, finished_at = ?,"
+                           " error_class = NULL, last_error = NULL WHERE key = ?",
+                           (owner, len(vacancies), datetime.now().isoformat(timespec="seconds"), job.key))
+    return True
+
+
+def fail_job(connection: sqlite3.Connection, job: Job, error: FetchError):
+    """Возвращает задание в очередь с паузой или, если попытки кончились, помечает failed"""
+    if error.error_class == "stopped":
+        status, not_before, attempts = "pending", 0.0, job.attempts - 1
+    elif error.error_class == "client" or job.attempts >= MAX_ATTEMPTS:
+        status, not_before, attempts = "failed", 0.0, job.attempts
+    else:
+        status, not_before, attempts = "pending", time.time() + backoff_delay(job.attempts, base=5.0), job.attempts
+    with transaction(connection):
+        connection.execute("UPDATE jobs SET status = ?, owner = NULL, not_before = ?, attempts = ?, error_class = ?,"
+                           " last_error = ?, http_status = ? WHERE key = ? AND status = 'leased'",
+                           (status, not_before, attempts, error.error_class, str(error), error.status, job.key))
+
+
+def queue_counts(connection: sqlite3.Connection) -> dict:
+    """Задания по статусам"""
+    return dict(connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+def run_worker(path: Path, owner: str, visibility: float = VISIBILITY_TIMEOUT, stop_event=None,
+               poll_interval: float = 0.2) -> dict:
+    """Берёт задания, пока в очереди есть невыполненные; возвращает статистику воркера"""
+    stop_event = stop_event or threading.Event()
+    connection = connect(path)
+    stats = {"jobs": 0, "vacancies": 0, "failed": 0, "duplicates": 0}
+    try:
+        while not stop_event.is_set():
+            job = lease_job(connection, owner, visibility)
+            if job is None:
+                counts = queue_counts(connection)
+                if not counts.get("pending") and not counts.get("leased"):
+                    break
+                # Остались задания в аренде у других воркеров или отложенные — ждём
+                stop_event.wait(poll_interval)
+                continue
+
+            module, is_relevant = PROFILES[job.profile]
+            try:
+                with metrics.timer("crawl_job"):
+                    data = module.search_page(job.query, job.area, job.page, stop_event)
+            except FetchError as e:
+                fail_job(connection, job, e)
+                if e.error_class != "stopped":
+                    print(f"  ❌ {job.key}: {e.error_class} ({e}), попытка {job.attempts}/{MAX_ATTEMPTS}")
+                    stats["failed"] += 1
+                    metrics.increment("crawl_jobs_failed")
+                continue
+
+            # Парсер печатает каждую вакансию — воркеру достаточно строки на задание
+            with contextlib.redirect_stdout(io.StringIO()):
+                vacancies = module.items_to_vacancies(data.get("items") or [], job.query)
+            vacancies = [vacancy for vacancy in vacancies if is_relevant(vacancy.title)]
+            if complete_job(connection, job, owner, vacancies, module.search_depth(data)):
+                stats["jobs"] += 1
+                stats["vacancies"] += len(vacancies)
+                metrics.increment("crawl_jobs_done")
+            else:
+                stats["duplicates"] += 1
+                metrics.increment("crawl_jobs_duplicate")
+    finally:
+        connection.close()
+    return stats
+
+
+def merge_results(path: Path, force: bool = False) -> list:
+    """Собирает результаты каждого профиля в CSV-снимок; возвращает пути CSV.
+
+    Пока в очереди есть невыполненные задания, слияние отказывается (force —
+    слить то, что есть); неудавшиеся задания попадают в метаданные снимка.
+    """
+    connection = connect(path)
+    try:
+        counts = queue_counts(connection)
+        if (counts.get("pending") or counts.get("leased")) and not force:
+            raise RuntimeError(f"сбор не завершён: {counts}")
+        profiles = json.loads(connection.execute("SELECT value FROM meta WHERE key = 'profiles'").fetchone()[0])
+        written = []
+        for profile in profiles:
+            module, _ = PROFILES[profile]
+            vacancies = [Vacancy(*json.loads(vacancy)) for vacancy, in connection.execute(
+                "SELECT vacancy FROM results WHERE profile = ?"
+                " ORDER BY query_rank, area_rank, page, position", (profile,))]
+            failed_queries = [
+                {"query": query, "area": area, "page": page, "error_class": error_class or "unfinished",
+                 "attempts": attempts, "status": http_status, "message": last_error or ""}
+                for query, area, page, error_class, attempts, http_status, last_error in connection.execute(
+                    "SELECT query, area, page, error_class, attempts, http_status, last_error FROM jobs"
+                    " WHERE profile = ? AND status != 'done' ORDER BY query_rank, area_rank, page", (profile,))]
+            if not vacancies:
+                print(f"  ❌ {profile}: нет данных")
+                continue
+            written.append(module.save_vacancies_csv(vacancies, failed_queries))
+        return written
+    finally:
+        connection.close()
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def spawn_workers(path: Path, count: int, rate: float = None, visibility: float = VISIBILITY_TIMEOUT,
+                  quiet: bool = False) -> list:
+    """Запускает count локальных воркеров отдельными процессами и ждёт их; возвращает коды выхода"""
+    command = [sys.executable, str(Path(__file__).resolve()), "worker", "--queue", str(path),
+               "--visibility", str(visibility)]
+    if rate:
+        command += ["--rate", str(rate)]
+    processes = [subprocess.Popen(command + ["--worker-id", f"{socket.gethostname()}-local{i}"],
+                                  stdout=subprocess.DEVNULL if quiet else None)
+                 for i in range(count)]
+    return [process.wait() for process in processes]
+
+
+def new_queue_path() -> Path:
+    return CRAWL_DIR / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.sqlite"
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Распределённый сбор вакансий через очередь заданий SQLite")
+    parser.add_argument("command", choices=["run", "plan", "worker", "status", "merge"])
+    parser.add_argument("--queue", type=Path, help="файл очереди (по умолчанию для run/plan — новый в data/crawl/)")
+    parser.add_argument("--profiles", nargs="+", choices=sorted(PROFILES), default=sorted(PROFILES))
+    parser.add_argument("--areas", nargs="+", default=DEFAULT_AREAS, help="id регионов hh.ru")
+    parser.add_argument("--workers", type=int, default=4, help="локальных воркеров для run")
+    parser.add_argument("--worker-id", default=None, help="имя воркера (по умолчанию хост-pid)")
+    parser.add_argument("--rate", type=float, help="потолок запросов/с воркера (по умолчанию — лимитер hh_api)")
+    parser.add_argument("--visibility", type=float, default=VISIBILITY_TIMEOUT, help="срок аренды задания, сек")
+    parser.add_argument("--force", action="store_true", help="merge: слить и незавершённый сбор")
+    args = parser.parse_args()
+
+    if args.command in ("worker", "status", "merge") and not args.queue:
+        parser.error(f"{args.command}: нужен --queue")
+    path = args.queue or new_queue_path()
+
+    if args.command == "worker":
+        if args.rate:
+            hh_api.configure_client(hh_api.API_BASE_URL,
+                                    limiter=AdaptiveRateLimiter(initial_rate=args.rate, max_rate=args.rate))
+        owner = args.worker_id or default_worker_id()
+        print(f"🧵 Воркер {owner}: {path}")
+        stats = run_worker(path, owner, args.visibility)
+        print(f"✅ Воркер {owner}: заданий {stats['jobs']}, вакансий {stats['vacancies']}, "
+              f"ошибок {stats['failed']}, повторно выполненных {stats['duplicates']}")
+        hh_api.get_client().close()
+        metrics.write_metrics(f"crawl_worker_{owner}")
+        return 0
+
+    print("🧵 РАСПРЕДЕЛЁННЫЙ СБОР")
+    print("=" * 60)
+
+    if args.command in ("run", "plan"):
+        jobs = plan_crawl(path, args.profiles, args.areas)
+        print(f"📋 Очередь {path}: {jobs} первых страниц ({', '.join(args.profiles)}; регионы {', '.join(args.areas)})")
+    if args.command == "run":
+        started = time.perf_counter()
+        print(f"🚀 Воркеров: {args.workers}")
+        codes = spawn_workers(path, args.workers, args.rate, args.visibility, quiet=True)
+        print(f"⏱️ Сбор: {time.perf_counter() - started:.1f} сек, коды выхода воркеров {codes}")
+
+    if args.command in ("run", "status", "merge"):
+        connection = connect(path)
+        counts = queue_counts(connection)
+        results = connection.execute("SELECT profile, COUNT(*) FROM results GROUP BY profile").fetchall()
+        connection.close()
+        print(f"📊 Задания: {', '.join(f'{name} {count}' for name, count in sorted(counts.items()))}")
+        print(f"📦 Вакансий: {', '.join(f'{profile} {count}' for profile, count in results) or 'нет'}")
+
+    if args.command in ("run", "merge"):
+        try:
+            for csv_file in merge_results(path, args.force):
+                print(f"✅ {csv_file}")
+        except RuntimeError as e:
+            print(f"❌ {e} (см. --force)")
+            return 1
+
+    metrics.write_metrics("crawl_queue")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,38 +1,58 @@
 #!/usr/bin/env python3
 """
 🤖 АВТОМАТИЧЕСКИЙ ОТЧЁТ С ГРАФИКАМИ
-Создаёт Excel файл с встроенными PNG графиками
+Создаёт Excel файл с нативными диаграммами Excel: они ссылаются на лист
+«Данные графиков», поэтому данные каждой диаграммы видны и правятся в книге.
+PNG-версия сводного графика (matplotlib) строится только по флагу --png.
+Все цифры берутся из срезов куба rollup_cube — строки вакансий не загружаются.
 """
 
+import argparse
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
 from pathlib import Path
-import re
 from datetime import datetime
-from PIL import Image
 import openpyxl
-from openpyxl.drawing.image import Image as ExcelImage
+from openpyxl.chart import BarChart, LineChart, Reference
 from openpyxl.styles import Font, Alignment, PatternFill
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
-# Настройка matplotlib для русских шрифтов
-plt.rcParams['font.family'] = ['DejaVu Sans', 'Arial Unicode MS', 'sans-serif']
-plt.rcParams['axes.unicode_minus'] = False
+import metrics
+from rollup_cube import load_cube
+
+REPORT_DATES = ("2025-09-26", "2025-10-05")
+DATE_LABELS = ("26 сентября", "5 октября")
+
+# Число интервалов гистограммы зарплат
+HISTOGRAM_BINS = 15
+
+# Размер диаграмм на листе «Графики», см
+CHART_WIDTH = 16
+CHART_HEIGHT = 8.5
+
+@metrics.timed()
+def prepare_report_data(cube=None):
+    """Срезы куба по обеим датам и их статистики: (срезы, статистики).
+    cube — уже загруженный куб (демон держит его в памяти); по умолчанию читается из базы"""
+    cube = load_cube(list(REPORT_DATES)) if cube is None else cube.slice(snapshot=list(REPORT_DATES))
+    slices = [cube.slice(snapshot=date_str) for date_str in REPORT_DATES]
+    stats = [cube_slice.stats(label) for cube_slice, label in zip(slices, DATE_LABELS)]
+    return slices, stats
+
+@metrics.timed("chart_summary")
+def create_summary_chart(report_dir, slices, stats):
+    """Создаёт сводный PNG-график (необязательно: в Excel строятся нативные диаграммы)"""
+    import matplotlib.pyplot as plt
+
+    # Настройка matplotlib для русских шрифтов
+    plt.rcParams['font.family'] = ['DejaVu Sans', 'Arial Unicode MS', 'sans-serif']
+    plt.rcParams['axes.unicode_minus'] = False
 
-def create_summary_chart(report_dir):
-    """Создаёт сводный график для отчёта"""
     print("📊 Создаём сводный график для отчёта...")
     
-    # Загружаем данные
-    df_26sep, df_5oct = load_data_by_date()
-    df_26sep = clean_salary_data(df_26sep, "26 сентября")
-    df_5oct = clean_salary_data(df_5oct, "5 октября")
-    
-    # Вычисляем статистики
-    stats_26sep = get_stats(df_26sep, "26 сентября")
-    stats_5oct = get_stats(df_5oct, "5 октября")
+    cube_5oct = slices[1]
+    stats_26sep, stats_5oct = stats
     
     # Создаём сводный график
     fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
@@ -87,9 +107,8 @@ def create_summary_chart(report_dir):
     ax2.grid(True, alpha=0.3)
     
     # График 3: Топ-5 компаний за 5 октября
-    if len(df_5oct) > 0:
-        df_5oct_clean = categorize_roles(df_5oct)
-        top_companies = df_5oct_clean['Компания'].value_counts().head(5)
+    if len(cube_5oct) > 0:
+        top_companies = cube_5oct.top_employers(5)
         
         bars3 = ax3.barh(range(len(top_companies)), top_companies.values, color='lightcoral')
         ax3.set_yticks(range(len(top_companies)))
@@ -105,18 +124,17 @@ def create_summary_chart(report_dir):
     ax3.grid(True, alpha=0.3)
     
     # График 4: Распределение зарплат за 5 октября
-    if len(df_5oct) > 0:
-        df_5oct_clean = categorize_roles(df_5oct)
-        df_with_salary = df_5oct_clean.dropna(subset=['salary_avg'])
-        
-        ax4.hist(df_with_salary['salary_avg'], bins=15, color='skyblue', edgecolor='navy', alpha=0.7)
+    if stats_5oct['with_salary'] > 0:
+        # Столбцы гистограммы — готовые интервалы скетча куба
+        counts, edges = cube_5oct.histogram(HISTOGRAM_BINS)
+        ax4.hist(edges[:-1], bins=edges, weights=counts, color='skyblue', edgecolor='navy', alpha=0.7)
         ax4.set_title('💰 Распределение зарплат (5 октября)', fontsize=14, fontweight='bold')
         ax4.set_xlabel('Зарплата, ₽')
         ax4.set_ylabel('Количество вакансий')
         
         # Статистики
-        mean_salary = np.mean(df_with_salary['salary_avg'])
-        median_salary = np.median(df_with_salary['salary_avg'])
+        mean_salary = stats_5oct['mean_salary']
+        median_salary = stats_5oct['median_salary']
         ax4.axvline(mean_salary, color='red', linestyle='--', linewidth=2, label=f'Средняя: {mean_salary:,.0f} ₽')
         ax4.axvline(median_salary, color='orange', linestyle='--', linewidth=2, label=f'Медиана: {median_salary:,.0f} ₽')
         ax4.legend()
@@ -130,140 +148,95 @@ def create_summary_chart(report_dir):
     plt.close()
     print("  ✅ Создан: summary_chart.png")
 
-def load_data_by_date():
-    """Загружает данные по датам"""
-    data_26sep = []
-    data_5oct = []
-    
-    # Данные за 26 сентября
-    sep_dir = Path("data/2025-09-26")
-    if sep_dir.exists():
-        sep_files = list(sep_dir.glob("*.csv"))
-        for csv_file in sep_files:
-            try:
-                df = pd.read_csv(csv_file, sep=';', encoding='utf-8-sig')
-                data_26sep.append(df)
-            except Exception as e:
-                print(f"  ❌ Ошибка: {e}")
-    
-    # Данные за 5 октября
-    oct_dir = Path("data/2025-10-05")
-    if oct_dir.exists():
-        oct_files = list(oct_dir.glob("*.csv"))
-        for csv_file in oct_files:
-            try:
-                df = pd.read_csv(csv_file, sep=';', encoding='utf-8-sig')
-                data_5oct.append(df)
-            except Exception as e:
-                print(f"  ❌ Ошибка: {e}")
-    
-    df_26sep = pd.concat(data_26sep, ignore_index=True) if data_26sep else pd.DataFrame()
-    df_5oct = pd.concat(data_5oct, ignore_index=True) if data_5oct else pd.DataFrame()
-    
-    return df_26sep, df_5oct
+def write_table(ws, top_row, title, headers, rows):
+    """Пишет таблицу с заголовком на лист; возвращает (первая, последняя) строки данных"""
+    ws.cell(row=top_row, column=1, value=title).font = Font(size=12, bold=True)
+    for j, header in enumerate(headers, 1):
+        cell = ws.cell(row=top_row + 1, column=j, value=header)
+        cell.font = Font(bold=True)
+        cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+    for i, row_data in enumerate(rows, top_row + 2):
+        for j, value in enumerate(row_data, 1):
+            ws.cell(row=i, column=j, value=value)
+    return top_row + 2, top_row + 1 + len(rows)
 
-def clean_salary_data(df, date_name):
-    """Очищает данные о зарплатах"""
-    if len(df) == 0:
-        return df
-    
-    def parse_salary(salary_text):
-        if pd.isna(salary_text) or salary_text == "не указано":
-            return None, None
-        
-        salary_str = str(salary_text).replace(" ", "").replace(",", "").lower()
-        
-        range_match = re.search(r'(\d+)–(\d+)', salary_str)
-        if range_match:
-            from_salary = int(range_match.group(1))
-            to_salary = int(range_match.group(2))
-            return from_salary, to_salary
-        
-        from_match = re.search(r'от(\d+)', salary_str)
-        if from_match:
-            from_salary = int(from_match.group(1))
-            return from_salary, None
-        
-        to_match = re.search(r'до(\d+)', salary_str)
-        if to_match:
-            to_salary = int(to_match.group(1))
-            return None, to_salary
-        
-        return None, None
-    
-    salary_data = df['Зарплата'].apply(parse_salary)
-    df['salary_from'] = salary_data.apply(lambda x: x[0] if x[0] is not None else np.nan)
-    df['salary_to'] = salary_data.apply(lambda x: x[1] if x[1] is not None else np.nan)
-    
-    df['salary_avg'] = np.where(
-        df['salary_to'].notna() & df['salary_from'].notna(),
-        (df['salary_from'] + df['salary_to']) / 2,
-        np.where(
-            df['salary_from'].notna(),
-            df['salary_from'],
-            df['salary_to']
-        )
-    )
-    
-    df = df.dropna(subset=['salary_avg'])
-    return df
+def salary_histogram(cube_slice, bins=HISTOGRAM_BINS):
+    """Строки гистограммы среза куба: (интервал, вакансий, от, до)"""
+    if cube_slice.sketch.empty:
+        return []
+    counts, edges = cube_slice.histogram(bins)
+    return [(f"{low / 1000:,.0f}–{high / 1000:,.0f} тыс.", int(count), round(float(low)), round(float(high)))
+            for count, low, high in zip(counts, edges[:-1], edges[1:])]
 
-def categorize_roles(df):
-    """Определяет категории ролей"""
-    if len(df) == 0:
-        return df
-    
-    def get_role_category(title):
-        if pd.isna(title):
-            return "Неизвестно"
-        
-        title_lower = title.lower()
-        
-        sales_keywords = ["продаж", "sales", "менеджер по продаж", "руководитель продаж"]
-        if any(keyword in title_lower for keyword in sales_keywords):
-            return "Продажи"
-        
-        procurement_keywords = ["закуп", "закупк", "закупщик", "снабжен"]
-        if any(keyword in title_lower for keyword in procurement_keywords):
-            return "Закупки"
-        
-        project_keywords = ["проект", "project", "менеджер проект", "руководитель проект"]
-        if any(keyword in title_lower for keyword in project_keywords):
-            return "Проекты"
-        
-        management_keywords = ["менеджер", "руководитель", "директор"]
-        if any(keyword in title_lower for keyword in management_keywords):
-            return "Менеджмент"
-        
-        return "Другое"
-    
-    df['role_category'] = df['Название вакансии'].apply(get_role_category)
-    return df
+@metrics.timed()
+def write_chart_data(wb, slices, stats):
+    """Лист «Данные графиков»: таблицы, на которые ссылаются диаграммы; возвращает их диапазоны"""
+    ws = wb.create_sheet("📋 Данные графиков")
+    cube_5oct = slices[1]
+    ranges = {}
+
+    ranges['by_date'] = write_table(
+        ws, 1, "Показатели по датам",
+        ['Дата', 'Вакансий с зарплатой', 'Средняя зарплата', 'Медианная зарплата', 'Усечённая средняя (10%)'],
+        [[item['date'], item['with_salary'], round(item['mean_salary']), round(item['median_salary']),
+          round(item['trimmed_mean_salary'])] for item in stats])
+
+    top_companies = cube_5oct.top_employers(5) if len(cube_5oct) else pd.Series(dtype='int64')
+    ranges['companies'] = write_table(
+        ws, ranges['by_date'][1] + 2, "Топ-5 компаний (5 октября)", ['Компания', 'Вакансий'],
+        [[name, int(count)] for name, count in top_companies.items()])
+
+    ranges['histogram'] = write_table(
+        ws, ranges['companies'][1] + 2, "Распределение зарплат (5 октября)",
+        ['Интервал', 'Вакансий', 'От, ₽', 'До, ₽'], salary_histogram(cube_5oct))
+
+    ws.column_dimensions['A'].width = 34
+    for column in 'BCDE':
+        ws.column_dimensions[column].width = 22
+    return ws, ranges
+
+def make_chart(chart_class, title, y_title, ws, header_row, first_row, last_row, columns, x_title=None, **options):
+    """Диаграмма по колонкам `columns` листа ws; подписи категорий — колонка A"""
+    chart = chart_class()
+    chart.title = title
+    chart.y_axis.title = y_title
+    if x_title:
+        chart.x_axis.title = x_title
+    chart.width, chart.height = CHART_WIDTH, CHART_HEIGHT
+    for column in columns:
+        chart.add_data(Reference(ws, min_col=column, min_row=header_row, max_row=last_row), titles_from_data=True)
+    chart.set_categories(Reference(ws, min_col=1, min_row=first_row, max_row=last_row))
+    for name, value in options.items():
+        setattr(chart, name, value)
+    return chart
 
-def get_stats(df, date_name):
-    """Получает статистики для даты"""
-    if len(df) == 0:
-        return {
-            'date': date_name,
-            'total_vacancies': 0,
-            'with_salary': 0,
-            'unique_companies': 0,
-            'mean_salary': 0,
-            'median_salary': 0
-        }
-    
-    salaries = df['salary_avg'].dropna()
-    return {
-        'date': date_name,
-        'total_vacancies': len(df),
-        'with_salary': len(salaries),
-        'unique_companies': df['Компания'].nunique(),
-        'mean_salary': np.mean(salaries),
-        'median_salary': np.median(salaries)
-    }
+@metrics.timed()
+def add_native_charts(ws_charts, ws_chart_data, ranges):
+    """Нативные диаграммы Excel по листу «Данные графиков» (обновляются вместе с данными)"""
+    first, last = ranges['by_date']
+    ws_charts.add_chart(make_chart(
+        BarChart, "Количество вакансий с зарплатой", "Вакансий", ws_chart_data, first - 1, first, last, [2],
+        varyColors=True, legend=None), "A3")
+    ws_charts.add_chart(make_chart(
+        LineChart, "Зарплаты: средняя, медиана, усечённая средняя", "Зарплата, ₽", ws_chart_data,
+        first - 1, first, last, [3, 4, 5]), "K3")
 
-def create_excel_with_charts(report_dir):
-    """Создаёт Excel файл с встроенными графиками"""
+    first, last = ranges['companies']
+    if last >= first:
+        ws_charts.add_chart(make_chart(
+            BarChart, "Топ-5 компаний (5 октября)", "Вакансий", ws_chart_data, first - 1, first, last, [2],
+            type="bar", legend=None), "A21")
+
+    first, last = ranges['histogram']
+    if last >= first:
+        # Гистограмма — столбцы без зазоров по интервалам зарплат
+        ws_charts.add_chart(make_chart(
+            BarChart, "Распределение зарплат (5 октября)", "Вакансий", ws_chart_data, first - 1, first, last, [2],
+            x_title="Зарплата, ₽", gapWidth=0, legend=None), "K21")
+
+@metrics.timed()
+def create_excel_with_charts(report_dir, slices, stats):
+    """Создаёт Excel файл с нативными диаграммами"""
     print("📋 Создаём Excel файл с графиками...")
     
     # Создаём рабочую книгу
@@ -275,13 +248,7 @@ def create_excel_with_charts(report_dir):
     # Создаём лист с данными
     ws_data = wb.create_sheet("📊 Данные и статистика")
     
-    # Загружаем данные
-    df_26sep, df_5oct = load_data_by_date()
-    df_26sep = clean_salary_data(df_26sep, "26 сентября")
-    df_5oct = clean_salary_data(df_5oct, "5 октября")
-    
-    stats_26sep = get_stats(df_26sep, "26 сентября")
-    stats_5oct = get_stats(df_5oct, "5 октября")
+    stats_26sep, stats_5oct = stats
     
     # Заголовок
     ws_data['A1'] = "📈 АВТОМАТИЧЕСКИЙ ОТЧЁТ ПО РЫНКУ ТРУДА ВЛАДИВОСТОКА"
@@ -306,9 +273,14 @@ def create_excel_with_charts(report_dir):
     # Данные
     data_rows = [
         ['Количество вакансий с зарплатой', stats_26sep['with_salary'], stats_5oct['with_salary']],
+        ['Без почти-дубликатов', stats_26sep['unique_vacancies'], stats_5oct['unique_vacancies']],
         ['Уникальных компаний', stats_26sep['unique_companies'], stats_5oct['unique_companies']],
         ['Средняя зарплата', f"{stats_26sep['mean_salary']:,.0f} ₽", f"{stats_5oct['mean_salary']:,.0f} ₽"],
-        ['Медианная зарплата', f"{stats_26sep['median_salary']:,.0f} ₽", f"{stats_5oct['median_salary']:,.0f} ₽"]
+        ['Медианная зарплата', f"{stats_26sep['median_salary']:,.0f} ₽", f"{stats_5oct['median_salary']:,.0f} ₽"],
+        ['Усечённая средняя (10%)', f"{stats_26sep['trimmed_mean_salary']:,.0f} ₽",
+         f"{stats_5oct['trimmed_mean_salary']:,.0f} ₽"],
+        ['Медиана: 95% ДИ', f"{stats_26sep['median_ci_low']:,.0f}–{stats_26sep['median_ci_high']:,.0f} ₽",
+         f"{stats_5oct['median_ci_low']:,.0f}–{stats_5oct['median_ci_high']:,.0f} ₽"]
     ]
     
     for i, row_data in enumerate(data_rows, 7):
@@ -316,7 +288,7 @@ def create_excel_with_charts(report_dir):
             ws_data.cell(row=i, column=j, value=value)
         
         # Вычисляем изменение для числовых показателей
-        if i <= 8:  # Для первых двух строк (количественные показатели)
+        if i <= 9:  # Для первых трёх строк (количественные показатели)
             old_val = row_data[1]
             new_val = row_data[2]
             if old_val > 0:
@@ -332,34 +304,24 @@ def create_excel_with_charts(report_dir):
     ws_data.column_dimensions['C'].width = 20
     ws_data.column_dimensions['D'].width = 15
     
-    # Создаём лист с графиками
+    # Создаём лист с графиками (диаграммы ссылаются на лист данных графиков)
     ws_charts = wb.create_sheet("📊 Графики")
-    
-    # Вставляем график
-    chart_path = report_dir / 'summary_chart.png'
-    if chart_path.exists():
-        img = ExcelImage(chart_path)
-        img.width = 800
-        img.height = 600
-        ws_charts.add_image(img, 'A1')
-        
-        # Заголовок листа
-        ws_charts['A12'] = "📈 Сводная аналитика рынка труда Владивостока"
-        ws_charts['A12'].font = Font(size=14, bold=True)
-        
-        # Описание
-        ws_charts['A13'] = "• График 1: Динамика количества вакансий с зарплатой"
-        ws_charts['A14'] = "• График 2: Динамика средних зарплат"
-        ws_charts['A15'] = "• График 3: Топ-5 компаний по количеству вакансий (5 октября)"
-        ws_charts['A16'] = "• График 4: Распределение зарплат (5 октября)"
+    ws_charts['A1'] = "📈 Сводная аналитика рынка труда Владивостока"
+    ws_charts['A1'].font = Font(size=14, bold=True)
+    ws_chart_data, ranges = write_chart_data(wb, slices, stats)
+    add_native_charts(ws_charts, ws_chart_data, ranges)
     
     # Сохраняем файл
     excel_file = report_dir / 'automated_report.xlsx'
     wb.save(excel_file)
     print(f"  ✅ Создан: {excel_file}")
 
-def main():
-    """Основная функция"""
+def main(argv=None, cube=None):
+    """Основная функция; argv и cube передаёт демон при запуске отчёта в своём процессе"""
+    parser = argparse.ArgumentParser(description="Автоматический отчёт с графиками")
+    parser.add_argument("--png", action="store_true", help="дополнительно сохранить summary_chart.png (matplotlib)")
+    args = parser.parse_args(argv)
+
     print("🤖 СОЗДАНИЕ АВТОМАТИЧЕСКОГО ОТЧЁТА")
     print("=" * 50)
     
@@ -369,24 +331,31 @@ def main():
     print(f"📁 Папка для автоматического отчёта: {report_dir.absolute()}")
     
     try:
-        # 1. Создаём сводный график
-        create_summary_chart(report_dir)
+        # 1. Срезы куба по датам (один раз для всех графиков)
+        slices, stats = prepare_report_data(cube)
         
-        # 2. Создаём Excel с графиками
-        create_excel_with_charts(report_dir)
+        # 2. Создаём Excel с нативными диаграммами
+        create_excel_with_charts(report_dir, slices, stats)
+        
+        # 3. PNG-график — только по запросу
+        if args.png:
+            create_summary_chart(report_dir, slices, stats)
         
         print("\n🎉 АВТОМАТИЧЕСКИЙ ОТЧЁТ СОЗДАН!")
         print(f"📁 Все файлы сохранены в папке: {report_dir.absolute()}")
         print("\n📊 Созданные файлы:")
-        print("  • summary_chart.png - Сводный график")
         print("  • automated_report.xlsx - Excel отчёт с графиками")
+        if args.png:
+            print("  • summary_chart.png - Сводный график")
         
     except Exception as e:
         print(f"❌ Ошибка: {e}")
         return False
+    finally:
+        metrics.write_metrics("create_automated_report")
     
     return True
 
 if __name__ == "__main__":
-    main()
-
+    # Код выхода — для пайплайна: main() возвращает False, если отчёт не построен
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+📺 СТАТИЧЕСКИЙ HTML-ДАШБОРД
+Один файл report_dashboard/index.html для повседневного просмотра вместо
+папок PNG и xlsx: открывается с файловой шары без сервера и интернета,
+графики рисуются в браузере встроенным скриптом (SVG, без библиотек).
+
+Данные — компактные JSON-фрагменты, заранее посчитанные по кубу rollup_cube:
+
+- snapshot_<дата>.json — показатели снимка, роли, регионы, топ работодателей
+  и гистограмма зарплат (HISTOGRAM_BINS интервалов вместо отдельных вакансий);
+- dynamics.json — ряды показателей по всем снимкам; длинные ряды прорежены
+  до MAX_SERIES_POINTS точек (Largest-Triangle-Three-Buckets: форма ряда и
+  пики сохраняются).
+
+Фрагменты лежат в data/dashboard/ вместе с манифестом подписей. Подпись
+фрагмента снимка — подпись снимка в кубе, правила куба и индекс
+работодателей: пересобираются только фрагменты изменившихся снимков, из куба
+читаются только их ячейки. HTML собирается из готовых фрагментов склейкой
+текста и перезаписывается, только если изменился.
+
+Запуск из корня проекта:
+    python dashboard.py            # обновить изменившиеся фрагменты и index.html
+    python dashboard.py --force    # пересобрать все фрагменты
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+from datetime import date
+from pathlib import Path
+
+import metrics
+import rollup_cube
+from employers import INDEX_FILE as EMPLOYER_INDEX_FILE
+from snapshot_diff import DATA_DIR
+
+DASHBOARD_DIR = Path("report_dashboard")
+DASHBOARD_FILE = DASHBOARD_DIR / "index.html"
+FRAGMENTS_DIR = DATA_DIR / "dashboard"
+MANIFEST_FILE = FRAGMENTS_DIR / "manifest.json"
+
+# Меняется вместе с форматом фрагментов — тогда пересобираются все
+FRAGMENT_VERSION = 1
+
+HISTOGRAM_BINS = 30
+TOP_EMPLOYERS = 15
+TOP_AREAS = 12
+MAX_SERIES_POINTS = 120
+
+# Ряды динамики: ключ сводки снимка → подпись
+SERIES = {
+    "with_salary": "Вакансий с зарплатой",
+    "unique_companies": "Компаний",
+    "mean_salary": "Средняя зарплата",
+    "median_salary": "Медиана",
+    "trimmed_mean_salary": "Усечённая средняя",
+}
+
+
+def _json(data) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def _rub(value) -> int:
+    """Зарплата для фрагмента: целые рубли (NaN → 0)"""
+    return int(round(value)) if value == value else 0
+
+
+def downsample(points: list, threshold: int = MAX_SERIES_POINTS) -> list:
+    """Largest-Triangle-Three-Buckets: не больше threshold точек [x, y], первая и последняя сохраняются"""
+    if threshold < 3 or len(points) <= threshold:
+        return list(points)
+    sampled = [points[0]]
+    bucket = (len(points) - 2) / (threshold - 2)
+    previous = points[0]
+    for i in range(threshold - 2):
+        start, end = int(i * bucket) + 1, int((i + 1) * bucket) + 1
+        # Опорная точка — среднее следующей корзины (для последней — последняя точка)
+        next_start, next_end = end, min(int((i + 2) * bucket) + 1, len(points))
+        following = points[next_start:next_end] or [points[-1]]
+        avg_x = sum(x for x, _ in following) / len(following)
+        avg_y = sum(y for _, y in following) / len(following)
+        best = max(points[start:end], key=lambda point: abs(
+            (previous[0] - avg_x) * (point[1] - previous[1]) - (previous[0] - point[0]) * (avg_y - previous[1])))
+        sampled.append(best)
+        previous = best
+    sampled.append(points[-1])
+    return sampled
+
+
+def employer_index_signature() -> str:
+    return hashlib.sha1(EMPLOYER_INDEX_FILE.read_bytes()).hexdigest() if EMPLOYER_INDEX_FILE.exists() else ""
+
+
+def fragment_signatures() -> dict:
+    """Подписи фрагментов снимков по кубу: {дата: подпись}"""
+    connection = rollup_cube.connect()
+    try:
+        rules = connection.execute("SELECT value FROM meta WHERE key = 'rules'").fetchone()
+        snapshots = connection.execute("SELECT date, signature FROM snapshots ORDER BY date").fetchall()
+    finally:
+        connection.close()
+    common = f"{FRAGMENT_VERSION}|{rules[0] if rules else ''}|{employer_index_signature()}"
+    return {date_str: hashlib.sha1(f"{common}|{signature}".encode("utf-8")).hexdigest()
+            for date_str, signature in snapshots}
+
+
+def snapshot_fragment(cube, date_str: str) -> dict:
+    """Фрагмент одного снимка из среза куба"""
+    stats = cube.stats(date_str)
+    roles = cube.summary("role").sort_values("count", ascending=False, kind="stable")
+    areas = cube.summary("area").sort_values("count", ascending=False, kind="stable").head(TOP_AREAS)
+    top = cube.top_employers(TOP_EMPLOYERS)
+    counts, edges = cube.histogram(HISTOGRAM_BINS)
+    return {
+        "date": date_str,
+        "vacancies": int(cube.cells["vacancies"].sum()),
+        "stats": {key: (value if key == "date" else _rub(value) if isinstance(value, float) else int(value))
+                  for key, value in stats.items()},
+        "roles": [[str(name), int(row["count"]), _rub(row["mean"]), _rub(row["median"])]
+                  for name, row in roles.iterrows()],
+        "areas": [[str(name), int(row["count"]), _rub(row["median"])] for name, row in areas.iterrows()],
+        "employers": [[str(name), int(count)] for name, count in top.items()],
+        "histogram": {"edges": [_rub(edge) for edge in edges], "counts": [int(count) for count in counts]},
+    }
+
+
+def dynamics_fragment(fragments: dict) -> dict:
+    """Ряды показателей по снимкам (из фрагментов снимков), длинные — прорежены"""
+    series = {}
+    for key, label in SERIES.items():
+        points = [[date.fromisoformat(date_str).toordinal(), fragment["stats"][key]]
+                  for date_str, fragment in sorted(fragments.items())]
+        series[key] = {"label": label, "points": [[date.fromordinal(x).isoformat(), y]
+                                                  for x, y in downsample(points)]}
+    return {"snapshots": len(fragments), "series": series}
+
+
+def write_if_changed(path: Path, text: str) -> bool:
+    """Пишет файл, только если содержимое другое (mtime не меняется зря — пайплайн не перезапускает этапы)"""
+    if path.exists() and path.read_text(encoding="utf-8") == text:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return True
+
+
+@metrics.timed("dashboard_build")
+def build_dashboard(force: bool = False) -> dict:
+    """Обновляет фрагменты изменившихся снимков и собирает index.html; возвращает счётчики"""
+    signatures = fragment_signatures()
+    manifest = json.loads(MANIFEST_FILE.read_text(encoding="utf-8")) if MANIFEST_FILE.exists() else {}
+
+    stale = [date_str for date_str, signature in signatures.items()
+             if force or manifest.get(date_str) != signature
+             or not (FRAGMENTS_DIR / f"snapshot_{date_str}.json").exists()]
+    if stale:
+        cube = rollup_cube.load_cube(stale, update=False)
+        for date_str in stale:
+            fragment = snapshot_fragment(cube.slice(snapshot=date_str), date_str)
+            write_if_changed(FRAGMENTS_DIR / f"snapshot_{date_str}.json", _json(fragment))
+            manifest[date_str] = signatures[date_str]
+            metrics.increment("dashboard_fragments_built")
+            print(f"  🧩 Фрагмент снимка {date_str} пересобран")
+    for date_str in set(manifest) - set(signatures):
+        (FRAGMENTS_DIR / f"snapshot_{date_str}.json").unlink(missing_ok=True)
+        del manifest[date_str]
+        print(f"  🗑️ Фрагмент снимка {date_str} удалён")
+    write_if_changed(MANIFEST_FILE, json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True))
+
+    texts = {date_str: (FRAGMENTS_DIR / f"snapshot_{date_str}.json").read_text(encoding="utf-8")
+             for date_str in sorted(signatures)}
+    dynamics = _json(dynamics_fragment({date_str: json.loads(text) for date_str, text in texts.items()}))
+    write_if_changed(FRAGMENTS_DIR / "dynamics.json", dynamics)
+
+    # Фрагменты вклеиваются как есть; «</» экранируется, чтобы название не закрыло <script>
+    data = ('{"snapshots":{' + ",".join(f'"{date_str}":{text}' for date_str, text in texts.items())
+            + '},"dynamics":' + dynamics + "}").replace("</", "<\\/")
+    latest = max(signatures) if signatures else "—"
+    html = (HTML_TEMPLATE.replace("__LATEST__", latest)
+            .replace("__SNAPSHOTS__", str(len(signatures)))
+            .replace("__DATA__", data))
+    changed = write_if_changed(DASHBOARD_FILE, html)
+    return {"snapshots": len(signatures), "rebuilt": len(stale), "html_changed": changed,
+            "html_kb": round(len(html.encode("utf-8")) / 1024, 1)}
+
+
+def rebuild_dashboard() -> bool:
+    """Действие этапа пайплайна"""
+    result = build_dashboard()
+    print(f"  📺 Дашборд: снимков {result['snapshots']}, пересобрано фрагментов {result['rebuilt']}, "
+          f"{DASHBOARD_FILE} — {result['html_kb']} КБ")
+    return True
+
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="ru">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>HH_Watcher — рынок труда Владивостока</title>
+<style>
+body { font: 14px/1.4 -apple-system, "Segoe UI", Roboto, Arial, sans-serif; margin: 0; background: #f4f5f7; color: #222; }
+header { background: #1f3b57; color: #fff; padding: 14px 24px; display: flex; align-items: center; gap: 24px; flex-wrap: wrap; }
+header h1 { font-size: 18px; margin: 0; font-weight: 600; }
+header select { font-size: 14px; padding: 4px 8px; }
+header .meta { opacity: .75; font-size: 12px; }
+main { padding: 16px 24px; display: grid; grid-template-columns: repeat(auto-fit, minmax(460px, 1fr)); gap: 16px; }
+section { background: #fff; border-radius: 6px; padding: 12px 16px; box-shadow: 0 1px 2px rgba(0,0,0,.08); }
+section h2 { font-size: 15px; margin: 0 0 8px; font-weight: 600; }
+.kpis { grid-column: 1 / -1; display: flex; flex-wrap: wrap; gap: 12px; }
+.kpi { flex: 1 1 140px; background: #fff; border-radius: 6px; padding: 10px 14px; box-shadow: 0 1px 2px rgba(0,0,0,.08); }
+.kpi b { display: block; font-size: 20px; }
+.kpi span { color: #666; font-size: 12px; }
+.kpi i { font-style: normal; font-size: 12px; }
+.up { color: #1a7f37; } .down { color: #c62828; }
+svg { width: 100%; display: block; }
+svg text { font-size: 11px; fill: #444; }
+.legend span { display: inline-block; margin-right: 12px; font-size: 12px; }
+.legend i { display: inline-block; width: 10px; height: 10px; margin-right: 4px; border-radius: 2px; }
+</style>
+</head>
+<body>
+<header>
+  <h1>🔍 HH_Watcher — рынок труда Владивостока</h1>
+  <label>Снимок: <select id="snapshot"></select></label>
+  <span class="meta">Снимков: __SNAPSHOTS__, последний — __LATEST__</span>
+</header>
+<main>
+  <div class="kpis" id="kpis"></div>
+  <section><h2>Распределение зарплат</h2><div id="histogram"></div></section>
+  <section><h2>Медиана по категориям ролей</h2><div id="roles"></div></section>
+  <section><h2>Топ работодателей (вакансий с зарплатой)</h2><div id="employers"></div></section>
+  <section><h2>Регионы (вакансий с зарплатой)</h2><div id="areas"></div></section>
+  <section><h2>Динамика зарплат</h2><div id="salaryDynamics"></div></section>
+  <section><h2>Динамика вакансий и компаний</h2><div id="countDynamics"></div></section>
+</main>
+<script type="application/json" id="dashboard-data">__DATA__</script>
+<script>
+"use strict";
+const DATA = JSON.parse(document.getElementById("dashboard-data").textContent);
+const COLORS = ["#2e86de", "#e67e22", "#27ae60", "#8e44ad", "#c0392b"];
+const NS = "http://www.w3.org/2000/svg";
+const fmt = v => Math.round(v).toLocaleString("ru-RU");
+const rub = v => fmt(v) + " ₽";
+
+function svg(width, height) {
+  const el = document.createElementNS(NS, "svg");
+  el.setAttribute("viewBox", `0 0 ${width} ${height}`);
+  return el;
+}
+function add(parent, tag, attrs, text) {
+  const el = document.createElementNS(NS, tag);
+  for (const [k, v] of Object.entries(attrs)) el.setAttribute(k, v);
+  if (text !== undefined) el.textContent = text;
+  parent.appendChild(el);
+  return el;
+}
+function tip(el, text) { add(el, "title", {}, text); }
+
+function bars(target, rows, format) {
+  const W = 560, row = 20, left = 210, height = rows.length * row + 4;
+  const el = svg(W, height), max = Math.max(1, ...rows.map(r => r[1]));
+  rows.forEach(([label, value, note], i) => {
+    const y = i * row + 2, w = (W - left - 90) * value / max;
+    add(el, "text", {x: left - 6, y: y + 13, "text-anchor": "end"}, label.length > 32 ? label.slice(0, 31) + "…" : label);
+    tip(add(el, "rect", {x: left, y: y + 2, width: Math.max(w, 1), height: row - 5, fill: COLORS[0], rx: 2}),
+        `${label}: ${format(value)}${note ? " · " + note : ""}`);
+    add(el, "text", {x: left + w + 4, y: y + 13}, format(value));
+  });
+  target.replaceChildren(el);
+}
+
+function histogram(target, hist) {
+  const W = 560, H = 220, pad = 34, n = hist.counts.length;
+  const el = svg(W, H), max = Math.max(1, ...hist.counts), bw = (W - 2 * pad) / Math.max(n, 1);
+  hist.counts.forEach((c, i) => {
+    const h = (H - 2 * pad) * c / max;
+    tip(add(el, "rect", {x: pad + i * bw, y: H - pad - h, width: Math.max(bw - 1, 1), height: h, fill: COLORS[0]}),
+        `${rub(hist.edges[i])} – ${rub(hist.edges[i + 1])}: ${c}`);
+  });
+  add(el, "line", {x1: pad, x2: W - pad, y1: H - pad, y2: H - pad, stroke: "#999"});
+  [0, Math.floor(n / 2), n].forEach(i => {
+    if (hist.edges[i] !== undefined)
+      add(el, "text", {x: pad + i * bw, y: H - pad + 14, "text-anchor": "middle"}, fmt(hist.edges[i] / 1000) + " т");
+  });
+  add(el, "text", {x: pad, y: pad - 10}, "max " + fmt(max));
+  target.replaceChildren(el);
+}
+
+function lines(target, keys) {
+  const W = 560, H = 220, pad = 44, series = keys.map(k => DATA.dynamics.series[k]);
+  const el = svg(W, H), all = series.flatMap(s => s.points);
+  if (!all.length) { target.textContent = "Нет данных"; return; }
+  const xs = all.map(p => Date.parse(p[0])), ys = all.map(p => p[1]);
+  const x0 = Math.min(...xs), x1 = Math.max(...xs), y0 = Math.min(0, ...ys), y1 = Math.max(1, ...ys);
+  const X = t => pad + (W - 2 * pad) * (x1 > x0 ? (t - x0) / (x1 - x0) : 0.5);
+  const Y = v => H - pad - (H - 2 * pad) * (v - y0) / (y1 - y0);
+  add(el, "line", {x1: pad, x2: W - pad, y1: H - pad, y2: H - pad, stroke: "#999"});
+  add(el, "text", {x: pad - 4, y: Y(y1) + 4, "text-anchor": "end"}, fmt(y1));
+  add(el, "text", {x: pad - 4, y: H - pad + 4, "text-anchor": "end"}, fmt(y0));
+  const day = t => new Date(t).toISOString().slice(0, 10);
+  add(el, "text", {x: pad, y: H - pad + 16}, day(x0));
+  add(el, "text", {x: W - pad, y: H - pad + 16, "text-anchor": "end"}, day(x1));
+  const legend = document.createElement("div");
+  legend.className = "legend";
+  series.forEach((s, i) => {
+    const color = COLORS[i % COLORS.length];
+    add(el, "polyline", {fill: "none", stroke: color, "stroke-width": 2,
+                         points: s.points.map(p => `${X(Date.parse(p[0]))},${Y(p[1])}`).join(" ")});
+    s.points.forEach(p => tip(add(el, "circle", {cx: X(Date.parse(p[0])), cy: Y(p[1]), r: 3, fill: color}),
+                              `${s.label}, ${p[0]}: ${fmt(p[1])}`));
+    legend.insertAdjacentHTML("beforeend", `<span><i style="background:${color}"></i>${s.label}</span>`);
+  });
+  target.replaceChildren(el, legend);
+}
+
+function kpis(snapshot, previous) {
+  const s = snapshot.stats, p = previous && previous.stats;
+  const cards = [
+    ["Вакансий всего", snapshot.vacancies, fmt, previous && previous.vacancies],
+    ["С зарплатой", s.with_salary, fmt, p && p.with_salary],
+    ["Компаний", s.unique_companies, fmt, p && p.unique_companies],
+    ["Медиана", s.median_salary, rub, p && p.median_salary],
+    ["Средняя", s.mean_salary, rub, p && p.mean_salary],
+    ["Усечённая средняя", s.trimmed_mean_salary, rub, p && p.trimmed_mean_salary],
+  ];
+  document.getElementById("kpis").innerHTML = cards.map(([label, value, format, old]) => {
+    let change = "";
+    if (old) {
+      const pct = (value - old) / old * 100;
+      change = `<i class="${pct >= 0 ? "up" : "down"}">${pct >= 0 ? "+" : ""}${pct.toFixed(1)}% к ${previous.date}</i>`;
+    }
+    return `<div class="kpi"><span>${label}</span><b>${format(value)}</b>${change}</div>`;
+  }).join("");
+}
+
+function render(date) {
+  const dates = Object.keys(DATA.snapshots).sort(), snapshot = DATA.snapshots[date];
+  const previous = DATA.snapshots[dates[dates.indexOf(date) - 1]];
+  kpis(snapshot, previous);
+  histogram(document.getElementById("histogram"), snapshot.histogram);
+  bars(document.getElementById("roles"), snapshot.roles.map(r => [r[0], r[3], `${r[1]} вакансий, средняя ${rub(r[2])}`]), rub);
+  bars(document.getElementById("employers"), snapshot.employers, fmt);
+  bars(document.getElementById("areas"), snapshot.areas.map(r => [r[0], r[1], `медиана ${rub(r[2])}`]), fmt);
+}
+
+const select = document.getElementById("snapshot");
+const dates = Object.keys(DATA.snapshots).sort().reverse();
+select.innerHTML = dates.map(d => `<option>${d}</option>`).join("");
+select.addEventListener("change", () => render(select.value));
+if (dates.length) render(dates[0]);
+lines(document.getElementById("salaryDynamics"), ["median_salary", "mean_salary", "trimmed_mean_salary"]);
+lines(document.getElementById("countDynamics"), ["with_salary", "unique_companies"]);
+</script>
+</body>
+</html>
+"""
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Статический HTML-дашборд по кубу агрегатов")
+    parser.add_argument("--force", action="store_true", help="пересобрать все фрагменты")
+    args = parser.parse_args()
+
+    print("📺 СТАТИЧЕСКИЙ HTML-ДАШБОРД")
+    print("=" * 60)
+    if not DATA_DIR.exists():
+        print("❌ Нет папки data/")
+        return 1
+    rollup_cube.update_cube()
+    result = build_dashboard(force=args.force)
+    print(f"✅ {DASHBOARD_FILE}: снимков {result['snapshots']}, пересобрано фрагментов {result['rebuilt']}, "
+          f"{result['html_kb']} КБ{'' if result['html_changed'] else ' (без изменений)'}")
+    metrics.write_metrics("dashboard")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
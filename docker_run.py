@@ -74,6 +74,13 @@ def run_specific_script(script_name):
     cmd = f"docker run --rm -v {os.getcwd()}/data:/app/data -v {os.getcwd()}/report_oct5:/app/report_oct5 -v {os.getcwd()}/report_dynamics:/app/report_dynamics -v {os.getcwd()}/report_automated:/app/report_automated hh-watcher python {script_name}"
     return run_command(cmd, f"Запуск {script_name}")
 
+def run_pipeline_dry_run():
+    """Показывает, какие этапы пайплайна будут выполнены."""
+    return run_command(
+        "docker-compose run --rm hh-watcher python pipeline.py --dry-run",
+        "Проверка пайплайна (dry-run)"
+    )
+
 def clean_docker():
     """Очищает Docker ресурсы."""
     print("\n🧹 Очистка Docker ресурсов...")
@@ -90,7 +97,8 @@ def show_menu():
     print("4. 📈 Только анализ данных")
     print("5. 🎯 Запустить конкретный скрипт")
     print("6. 🧹 Очистить Docker ресурсы")
-    print("7. ❌ Выход")
+    print("7. 🔎 Что будет выполнено (dry-run пайплайна)")
+    print("8. ❌ Выход")
     print("=" * 50)
 
 def main():
@@ -100,7 +108,7 @@ def main():
     
     while True:
         show_menu()
-        choice = input("\nВыберите опцию (1-7): ").strip()
+        choice = input("\nВыберите опцию (1-8): ").strip()
         
         if choice == "1":
             build_image()
@@ -113,6 +121,7 @@ def main():
         elif choice == "5":
             print("\nДоступные скрипты:")
             scripts = [
+                "pipeline.py",
                 "sales_parser.py",
                 "zakup_parser.py", 
                 "vacancy_analysis_oct5.py",
@@ -123,8 +132,8 @@ def main():
                 print(f"  {i}. {script}")
             
             try:
-                script_choice = int(input("\nВыберите номер скрипта (1-5): "))
-                if 1 <= script_choice <= 5:
+                script_choice = int(input(f"\nВыберите номер скрипта (1-{len(scripts)}): "))
+                if 1 <= script_choice <= len(scripts):
                     run_specific_script(scripts[script_choice - 1])
                 else:
                     print("❌ Неверный номер!")
@@ -133,6 +142,8 @@ def main():
         elif choice == "6":
             clean_docker()
         elif choice == "7":
+            run_pipeline_dry_run()
+        elif choice == "8":
             print("👋 До свидания!")
             break
         else:
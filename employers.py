@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+🏢 Нормализация работодателей
+Индекс «вариант названия → канонический работодатель». Ключ работодателя —
+целое число: id работодателя hh.ru, если он известен, иначе отрицательный
+номер, выданный по нормализованному названию. Группировка компаний в отчётах
+идёт по этому ключу, а не по сырому отображаемому названию.
+
+Индекс строится по всем снимкам data/*/*.csv один раз и кэшируется в
+data/employer_index.json (перестраивается, когда меняются снимки).
+"""
+
+import csv
+import json
+import re
+from collections import Counter
+from pathlib import Path
+
+import metrics
+from snapshot_store import all_snapshot_files
+
+DATA_DIR = Path("data")
+INDEX_FILE = DATA_DIR / "employer_index.json"
+
+# Колонка CSV с id работодателя hh.ru (в старых снимках её нет)
+EMPLOYER_ID_COLUMN = "ID работодателя"
+
+# Организационно-правовые формы, которые не отличают одного работодателя от другого
+LEGAL_FORMS = [
+    "общество с ограниченной ответственностью", "индивидуальный предприниматель",
+    "публичное акционерное общество", "акционерное общество", "группа компаний",
+    "ооо", "оао", "зао", "пао", "нао", "ао", "ип", "гк", "llc", "ltd", "inc",
+]
+LEGAL_FORM_RE = re.compile(r'(?<!\w)(?:' + "|".join(re.escape(form) for form in LEGAL_FORMS) + r')(?!\w)')
+QUOTES_RE = re.compile(r'[«»"\'“”„`]')
+PUNCT_RE = re.compile(r'[^\w]+')
+
+
+def normalize_company_name(name) -> str:
+    """Нормализованное название: без кавычек, ОПФ, регистра и лишней пунктуации.
+
+    «ООО "Восток Пак"», «ВОСТОК ПАК» и «Восток-Пак (ООО)» → «восток пак».
+    """
+    if not isinstance(name, str):
+        return ""
+    text = QUOTES_RE.sub("", name.lower().replace("ё", "е"))
+    text = LEGAL_FORM_RE.sub(" ", text)
+    text = PUNCT_RE.sub(" ", text).strip()
+    # Если название состояло только из ОПФ («ИП»), оставляем его как есть
+    return text or PUNCT_RE.sub(" ", name.lower()).strip()
+
+
+class EmployerIndex:
+    """Соответствие вариантов названий и id hh.ru целочисленному ключу работодателя"""
+
+    def __init__(self):
+        self.by_employer_id = {}   # id hh.ru (строка) → ключ
+        self.by_name = {}          # нормализованное название → ключ
+        self.names = {}            # ключ → каноническое (самое частое) название
+        self.next_local_key = -1
+        self._name_counts = {}
+
+    def _remember_name(self, key: int, name: str):
+        if key not in self._name_counts:
+            # После загрузки из кэша частоты неизвестны — каноническое название получает фору
+            self._name_counts[key] = Counter({self.names[key]: 1} if key in self.names else {})
+        counts = self._name_counts[key]
+        counts[name] += 1
+        self.names[key] = counts.most_common(1)[0][0]
+
+    def add(self, name: str, employer_id: str = "") -> int:
+        """Добавляет вариант названия (и id hh.ru, если есть); возвращает ключ"""
+        normalized = normalize_company_name(name)
+        employer_id = str(employer_id or "").strip()
+        if employer_id.isdigit():
+            key = self.by_employer_id.setdefault(employer_id, int(employer_id))
+            # Пустое название — не вариант названия: иначе к этому работодателю
+            # приписывались бы все строки без компании и без id
+            if normalized:
+                self.by_name.setdefault(normalized, key)
+        else:
+            key = self.by_name.get(normalized)
+            if key is None:
+                key = self.next_local_key
+                self.next_local_key -= 1
+                self.by_name[normalized] = key
+        if isinstance(name, str) and name:
+            self._remember_name(key, name)
+        return key
+
+    def key_for(self, name, employer_id: str = "") -> int:
+        """Ключ работодателя; неизвестные id и названия добавляются в индекс.
+
+        id hh.ru главнее названия: разные работодатели с одинаковым названием не сливаются.
+        """
+        employer_id = str(employer_id or "").strip()
+        if employer_id.isdigit():
+            key = self.by_employer_id.get(employer_id)
+            return key if key is not None else self.add(name, employer_id)
+        key = self.by_name.get(normalize_company_name(name))
+        return key if key is not None else self.add(name)
+
+    def display_name(self, key: int) -> str:
+        return self.names.get(key, "Не указана")
+
+    def to_dict(self) -> dict:
+        return {
+            "by_employer_id": self.by_employer_id,
+            "by_name": self.by_name,
+            "names": {str(key): name for key, name in self.names.items()},
+            "next_local_key": self.next_local_key,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "EmployerIndex":
+        index = cls()
+        index.by_employer_id = dict(data.get("by_employer_id", {}))
+        index.by_name = dict(data.get("by_name", {}))
+        # Кэш, записанный до исправления, мог связать пустое название с id hh.ru
+        if index.by_name.get("", 0) > 0:
+            del index.by_name[""]
+        index.names = {int(key): name for key, name in data.get("names", {}).items()}
+        index.next_local_key = data.get("next_local_key", -1)
+        return index
+
+
+def snapshot_files() -> list:
+    return all_snapshot_files()
+
+
+def sources_signature(paths: list) -> dict:
+    """(размер, mtime) снимков — по ним видно, что кэш индекса устарел"""
+    signature = {}
+    for path in paths:
+        stat = path.stat()
+        signature[str(path)] = [stat.st_size, stat.st_mtime_ns]
+    return signature
+
+
+@metrics.timed("employer_index_build")
+def build_index(paths: list = None) -> EmployerIndex:
+    """Строит индекс по снимкам: сначала строки с id hh.ru, затем только с названием"""
+    paths = snapshot_files() if paths is None else paths
+    rows = []
+    for path in paths:
+        with path.open("r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f, delimiter=";"):
+                rows.append((row.get("Компания", ""), row.get(EMPLOYER_ID_COLUMN, "")))
+
+    index = EmployerIndex()
+    # Два прохода: вариант без id, встретившийся раньше варианта с id, всё равно получит id hh.ru
+    for name, employer_id in rows:
+        if str(employer_id or "").strip().isdigit():
+            index.add(name, employer_id)
+    for name, employer_id in rows:
+        if not str(employer_id or "").strip().isdigit():
+            index.add(name)
+    return index
+
+
+_cached_index = None
+
+
+def load_index(force: bool = False) -> EmployerIndex:
+    """Индекс из кэша data/employer_index.json; перестраивается при изменении снимков"""
+    global _cached_index
+    paths = snapshot_files()
+    signature = sources_signature(paths)
+
+    if not force and _cached_index is not None and _cached_index[0] == signature:
+        return _cached_index[1]
+
+    if not force and INDEX_FILE.exists():
+        try:
+            cached = json.loads(INDEX_FILE.read_text(encoding="utf-8"))
+        except ValueError:
+            cached = {}
+        if cached.get("sources") == signature:
+            metrics.increment("employer_index_cache_hits")
+            index = EmployerIndex.from_dict(cached["index"])
+            _cached_index = (signature, index)
+            return index
+
+    metrics.increment("employer_index_cache_misses")
+    index = build_index(paths)
+    if DATA_DIR.exists():
+        tmp_file = INDEX_FILE.with_suffix(".tmp")
+        tmp_file.write_text(json.dumps({"sources": signature, "index": index.to_dict()}, ensure_ascii=False),
+                            encoding="utf-8")
+        tmp_file.replace(INDEX_FILE)
+    _cached_index = (signature, index)
+    return index
+
+
+def rebuild_index() -> bool:
+    """Действие этапа пайплайна: принудительно перестраивает кэш индекса"""
+    index = load_index(force=True)
+    print(f"  🏢 Работодателей в индексе: {len(index.names)} (вариантов названий: {len(index.by_name)})")
+    return True
+
+
+@metrics.timed()
+def add_employer_keys(df, index: EmployerIndex = None):
+    """Добавляет колонки employer_key (int64) и employer_name (каноническое название).
+
+    Нормализуются только уникальные пары (название, id), а не каждая строка.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if len(df) == 0:
+        df = df.copy()
+        df["employer_key"] = pd.Series(dtype="int64")
+        df["employer_name"] = pd.Series(dtype="object")
+        return df
+
+    index = index or load_index()
+    names = df["Компания"] if "Компания" in df else pd.Series([""] * len(df), index=df.index)
+    name_codes, name_uniques = pd.factorize(names)
+    if EMPLOYER_ID_COLUMN in df:
+        # pandas читает колонку как int64 (или float64 при пропусках) — факторизуем числа, не строки
+        employer_ids = pd.to_numeric(df[EMPLOYER_ID_COLUMN], errors="coerce").fillna(-1).astype("int64")
+        id_codes, id_uniques = pd.factorize(employer_ids)
+    else:
+        id_codes, id_uniques = np.zeros(len(df), dtype=np.int64), np.array([-1])
+
+    # Уникальные пары (название, id) через комбинированный целочисленный код
+    pair_codes, pair_uniques = pd.factorize(name_codes.astype(np.int64) * len(id_uniques) + id_codes)
+    unique_keys = np.empty(len(pair_uniques), dtype=np.int64)
+    for i, pair in enumerate(pair_uniques):
+        name_code, id_code = divmod(int(pair), len(id_uniques))
+        name = name_uniques[name_code] if name_code >= 0 else ""
+        employer_id = int(id_uniques[id_code])
+        unique_keys[i] = index.key_for(name, str(employer_id) if employer_id >= 0 else "")
+    keys = unique_keys[pair_codes]
+
+    df = df.copy()
+    df["employer_key"] = keys
+    key_names = {key: index.display_name(key) for key in np.unique(unique_keys)}
+    df["employer_name"] = pd.Series(keys, index=df.index).map(key_names)
+    return df
+
+
+def top_employers(df, limit: int):
+    """Топ работодателей по числу вакансий: Series {каноническое название: количество}"""
+    counts = df["employer_key"].value_counts().head(limit)
+    names = df.drop_duplicates("employer_key").set_index("employer_key")["employer_name"]
+    counts.index = names.reindex(counts.index).values
+    return counts
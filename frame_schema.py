@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+🧱 СХЕМА ТАБЛИЦЫ АНАЛИЗА
+Одна явная схема колонок для всех загрузчиков снимков data/<дата>/*.csv.
+По умолчанию pandas хранит компанию, запрос, «Когда» и ссылку строкой в каждой
+строке; по схеме:
+
+- колонки с небольшим числом значений (компания, запрос, «Когда», текст
+  зарплаты, флаг gross, регион) — категории: строка хранится один раз, в строках — коды;
+- ссылка сводится к целому id вакансии (vacancy_id, Int64) — сама ссылка
+  восстанавливается по id для листов Excel (with_links);
+- дата публикации — datetime, id работодателя — Int64 с пропусками.
+
+Категории разных файлов и снимков объединяются при склейке (concat_frames),
+иначе pandas превращает категориальную колонку обратно в строки.
+
+Запуск из корня проекта (отчёт о памяти по всем снимкам или одному):
+    python frame_schema.py
+    python frame_schema.py --date 2025-10-05
+"""
+
+import argparse
+import sys
+
+import metrics
+
+# Колонки, читаемые сразу как категории
+CATEGORY_COLUMNS = ["Компания", "Когда", "Зарплата", "Запрос", "До вычета налогов", "Регион"]
+
+# Целые с пропусками
+INTEGER_COLUMNS = ["ID работодателя"]
+
+DATETIME_COLUMNS = {"Дата публикации": "%Y-%m-%d %H:%M"}
+
+URL_COLUMN = "Ссылка"
+ID_COLUMN = "vacancy_id"
+VACANCY_URL = "https://hh.ru/vacancy/{}"
+VACANCY_ID_PATTERN = r'/vacancy/(\d+)'
+
+
+def read_snapshot_csv(path):
+    """Читает CSV снимка сразу в схеме анализа"""
+    import pandas as pd
+
+    with path.open("r", encoding="utf-8-sig") as f:
+        header = f.readline().rstrip("\r\n").split(";")
+    dtype = {column: "category" for column in CATEGORY_COLUMNS if column in header}
+    dtype.update({column: "Int64" for column in INTEGER_COLUMNS if column in header})
+    return apply_schema(pd.read_csv(path, sep=';', encoding='utf-8-sig', dtype=dtype))
+
+
+@metrics.timed()
+def apply_schema(df):
+    """Приводит таблицу снимка к схеме анализа (уже приведённые колонки не трогает)"""
+    import pandas as pd
+
+    df = df.copy()
+    for column in CATEGORY_COLUMNS:
+        if column in df and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype("category")
+    for column in INTEGER_COLUMNS:
+        if column in df and df[column].dtype != "Int64":
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype("Int64")
+    for column, date_format in DATETIME_COLUMNS.items():
+        if column in df and not pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = pd.to_datetime(df[column], format=date_format, errors="coerce")
+    if URL_COLUMN in df:
+        position = df.columns.get_loc(URL_COLUMN)
+        ids = df.pop(URL_COLUMN).astype("string").str.extract(VACANCY_ID_PATTERN, expand=False)
+        df.insert(position, ID_COLUMN, pd.to_numeric(ids).astype("Int64"))
+    return df
+
+
+def concat_frames(frames: list):
+    """pd.concat с объединением категорий — категориальные колонки остаются категориями"""
+    import pandas as pd
+
+    frames = [frame for frame in frames if len(frame.columns)]
+    if not frames:
+        return pd.DataFrame()
+    frames = [frame.copy() for frame in frames]
+    categorical = {}
+    for frame in frames:
+        for column, dtype in frame.dtypes.items():
+            if isinstance(dtype, pd.CategoricalDtype):
+                categorical.setdefault(column, []).append(dtype.categories)
+    for column, parts in categorical.items():
+        categories = pd.api.types.union_categoricals(
+            [pd.Categorical([], categories=part) for part in parts]).categories
+        for frame in frames:
+            if column in frame:
+                frame[column] = frame[column].astype(pd.CategoricalDtype(categories))
+    df = pd.concat(frames, ignore_index=True)
+    # Колонка, которой нет в части файлов (старые снимки), после склейки снова категория
+    for column, parts in categorical.items():
+        if not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(pd.CategoricalDtype(df[column].dropna().unique()))
+    return df
+
+
+def load_snapshot(date_str: str, data_dir=None):
+    """Все CSV снимка одной таблицей в схеме анализа (пустая таблица, если файлов нет)"""
+    from snapshot_store import snapshot_files
+
+    files = snapshot_files(date_str, data_dir)
+    return concat_frames([read_snapshot_csv(path) for path in files])
+
+
+def map_unique(series, func):
+    """func для каждого уникального значения (а не строки) → категориальная колонка"""
+    import numpy as np
+    import pandas as pd
+
+    codes, uniques = pd.factorize(series)
+    # Последний элемент — результат для пропуска (код -1)
+    results = [func(value) for value in uniques] + [func(np.nan)]
+    result_codes, categories = pd.factorize(pd.Series(results, dtype="object"))
+    return pd.Series(pd.Categorical.from_codes(result_codes[codes], categories), index=series.index)
+
+
+def vacancy_ids(df):
+    """id вакансий строками ('' — без id) для таблиц в схеме и в исходном виде"""
+    from snapshot_diff import vacancy_id_from_url
+
+    if ID_COLUMN in df:
+        return df[ID_COLUMN].astype("string").fillna("")
+    return df[URL_COLUMN].map(lambda url: vacancy_id_from_url(url) if isinstance(url, str) else "")
+
+
+def with_links(df):
+    """Копия для выгрузки в Excel: ссылка на вакансию вместо vacancy_id"""
+    if ID_COLUMN not in df:
+        return df
+    df = df.copy()
+    position = df.columns.get_loc(ID_COLUMN)
+    links = df.pop(ID_COLUMN).map(lambda value: VACANCY_URL.format(value), na_action="ignore")
+    df.insert(position, URL_COLUMN, links.astype("object"))
+    return df
+
+
+def memory_report(df):
+    """Память по колонкам: DataFrame (тип, МБ) с итоговой строкой"""
+    import pandas as pd
+
+    usage = df.memory_usage(deep=True, index=False) / 2 ** 20
+    report = pd.DataFrame({"dtype": df.dtypes.astype(str), "mb": usage.round(2)})
+    report.loc["Итого"] = ["", round(usage.sum(), 2)]
+    return report
+
+
+def print_memory_report(df, title: str, baseline=None):
+    """Печатает memory_report; с baseline (таблица в исходных типах) — и сравнение"""
+    report = memory_report(df)
+    print(f"\n🧱 {title}: {len(df)} строк, {report.loc['Итого', 'mb']:.2f} МБ")
+    before = memory_report(baseline)["mb"] if baseline is not None else None
+    for column, row in report.drop(index="Итого").iterrows():
+        line = f"  • {column:<22} {row['dtype']:<16} {row['mb']:>9.2f} МБ"
+        source = URL_COLUMN if column == ID_COLUMN else column
+        if before is not None and source in before:
+            line += f"   (было {before[source]:.2f} МБ)"
+        print(line)
+    if before is not None:
+        total_before = before["Итого"]
+        share = report.loc["Итого", "mb"] / total_before * 100 if total_before else 0
+        print(f"  📉 Было {total_before:.2f} МБ, стало {report.loc['Итого', 'mb']:.2f} МБ ({share:.0f}%)")
+
+
+def main():
+    """Отчёт о памяти таблицы анализа: исходные типы против схемы"""
+    import pandas as pd
+    from snapshot_diff import list_snapshots
+    from snapshot_store import snapshot_files
+
+    parser = argparse.ArgumentParser(description="Память таблицы анализа в схеме frame_schema")
+    parser.add_argument("--date", help="только один снимок (по умолчанию — все)")
+    args = parser.parse_args()
+
+    dates = [args.date] if args.date else list_snapshots()
+    files = [path for date_str in dates for path in snapshot_files(date_str)]
+    if not files:
+        print("❌ Нет снимков")
+        return 1
+
+    baseline = pd.concat([pd.read_csv(path, sep=';', encoding='utf-8-sig') for path in files], ignore_index=True)
+    df = concat_frames([read_snapshot_csv(path) for path in files])
+    print_memory_report(df, f"Снимки: {', '.join(dates)}", baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
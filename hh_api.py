@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+🌐 Клиент API hh.ru с пулом keep-alive соединений
+Общий для парсеров, демона и пайплайна
+"""
+
+import gzip
+import http.client
+import json
+import os
+import threading
+import time
+import urllib.parse
+import zlib
+
+import metrics
+from rate_limiter import (AdaptiveRateLimiter, CircuitBreaker, FetchError, RETRY_BUDGETS,
+                          backoff_delay, classify_status, parse_retry_after)
+
+# Базовый адрес API можно подменить (например, на локальный стенд)
+API_BASE_URL = os.environ.get("HH_API_BASE_URL", "https://api.hh.ru")
+
+# Размер страницы /vacancies и предел глубины выдачи API (дальше 2000 вакансий не отдаёт)
+VACANCIES_PER_PAGE = 100
+MAX_SEARCH_DEPTH = 2000
+
+
+def iter_decompressed(chunks, encoding: str, out_chunk: int = 16384):
+    """Распаковывает поток кусков gzip/deflate, отдавая не больше out_chunk байт за раз
+    (сжатие у JSON ~15x, без ограничения один кусок сети превращается в мегабайт)"""
+    if encoding == "gzip":
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif encoding == "deflate":
+        decompressor = zlib.decompressobj()
+    else:
+        yield from chunks
+        return
+
+    for chunk in chunks:
+        data = decompressor.decompress(chunk, out_chunk)
+        while data:
+            yield data
+            data = decompressor.decompress(decompressor.unconsumed_tail, out_chunk)
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+
+
+class HHClient:
+    """HTTP-клиент с отдельным постоянным соединением на каждый поток"""
+
+    def __init__(self, base_url: str = API_BASE_URL, timeout: float = 30,
+                 limiter: AdaptiveRateLimiter = None, breaker: CircuitBreaker = None):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.base_path = parsed.path.rstrip("/")
+        self.timeout = timeout
+        self.limiter = limiter or AdaptiveRateLimiter()
+        self.breaker = breaker or CircuitBreaker()
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            conn = conn_class(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _reset_connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+        self._local.conn = None
+
+    def close(self):
+        """Закрывает соединение текущего потока"""
+        self._reset_connection()
+
+    def _open(self, path: str, params: dict = None, headers: dict = None) -> http.client.HTTPResponse:
+        """Отправляет GET и возвращает ответ с прочитанными заголовками (тело не прочитано)"""
+        url = self.base_path + path
+        if params:
+            url += "?" + urllib.parse.urlencode(params)
+
+        headers = dict(headers or {})
+        # Brotli без сторонних библиотек не распаковать, просим только gzip/deflate
+        headers["Accept-Encoding"] = "gzip, deflate"
+        headers.pop("Connection", None)
+
+        # Один повтор на случай, если сервер закрыл простаивающее соединение
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request("GET", url, headers=headers)
+                response = conn.getresponse()
+                break
+            except (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                    BrokenPipeError, ConnectionResetError):
+                self._reset_connection()
+                if attempt == 1:
+                    raise
+
+        metrics.increment("http_requests")
+        return response
+
+    def _finish(self, response: http.client.HTTPResponse):
+        """Освобождает соединение после полностью прочитанного ответа"""
+        if response.will_close:
+            self._reset_connection()
+
+    def _iter_body(self, response: http.client.HTTPResponse, chunk_size: int = 65536):
+        """Читает тело кусками и распаковывает gzip/deflate на лету"""
+        def raw_chunks():
+            while True:
+                chunk = response.read(chunk_size)
+                if not chunk:
+                    break
+                metrics.increment("http_bytes", len(chunk))
+                yield chunk
+
+        return iter_decompressed(raw_chunks(), response.getheader("Content-Encoding", ""))
+
+    def request(self, path: str, params: dict = None, headers: dict = None):
+        """Выполняет GET и возвращает (статус, заголовки, распакованное тело)"""
+        with metrics.timer("http_request"):
+            response = self._open(path, params, headers)
+            body = response.read()
+        self._finish(response)
+
+        metrics.increment("http_bytes", len(body))
+
+        encoding = response.getheader("Content-Encoding", "")
+        with metrics.timer("http_decompress"):
+            if encoding == "gzip":
+                body = gzip.decompress(body)
+            elif encoding == "deflate":
+                body = zlib.decompress(body)
+
+        return response.status, response.headers, body
+
+    def _fetch_once(self, path: str, params: dict, headers: dict, decoder):
+        """Один GET: (статус, заголовки, разобранные данные или None при статусе не 200).
+
+        С decoder тело не собирается целиком: распакованные куски сразу уходят
+        в decoder(итератор байт) — так разбираются большие страницы /vacancies.
+        """
+        if decoder is None:
+            status, response_headers, body = self.request(path, params, headers)
+            if status != 200:
+                return status, response_headers, None
+            with metrics.timer("json_decode"):
+                return status, response_headers, json.loads(body.decode("utf-8"))
+
+        with metrics.timer("http_request"):
+            response = self._open(path, params, headers)
+            if response.status != 200:
+                metrics.increment("http_bytes", len(response.read()))
+                self._finish(response)
+                return response.status, response.headers, None
+            body = self._iter_body(response)
+            with metrics.timer("json_decode"):
+                data = decoder(body)
+            # Дочитываем хвост, чтобы соединение можно было переиспользовать
+            for _ in body:
+                pass
+        self._finish(response)
+        return response.status, response.headers, data
+
+    def fetch_json(self, path: str, params: dict = None, headers: dict = None, stop_event=None,
+                   decoder=None) -> dict:
+        """GET с лимитером, повторами и circuit breaker; при неудаче бросает FetchError.
+
+        decoder — функция потокового разбора тела (см. vacancy_decode); по умолчанию json.loads.
+        """
+        return self.fetch_response(path, params, headers, stop_event, decoder)[2]
+
+    def fetch_response(self, path: str, params: dict = None, headers: dict = None, stop_event=None,
+                       decoder=None):
+        """Как fetch_json, но возвращает (статус, заголовки, данные).
+
+        Успехом считается и 304 Not Modified (данные None) — ответ на условный
+        запрос с If-None-Match, когда закэшированная копия ещё актуальна.
+        """
+        attempts = {error_class: 0 for error_class in RETRY_BUDGETS}
+        total_attempts = 0
+
+        while True:
+            if not self.breaker.allow():
+                raise FetchError("circuit breaker разомкнут", "circuit_open", total_attempts)
+            if not self.limiter.acquire(stop_event):
+                raise FetchError("остановлено", "stopped", total_attempts)
+
+            total_attempts += 1
+            retry_after = 0.0
+            status = None
+            try:
+                status, response_headers, data = self._fetch_once(path, params, headers, decoder)
+            except (OSError, http.client.HTTPException) as e:
+                self._reset_connection()
+                error_class, message = "network", f"{type(e).__name__}: {e}"
+            except (ValueError, zlib.error) as e:
+                # Тело могло остаться недочитанным — соединение не переиспользуем
+                self._reset_connection()
+                status = 200
+                error_class, message = "server", f"некорректный JSON: {e}"
+            else:
+                if status in (200, 304):
+                    self.limiter.on_success()
+                    self.breaker.record_success()
+                    return status, response_headers, data
+                error_class, message = classify_status(status), f"HTTP {status}"
+                if error_class == "throttle":
+                    retry_after = parse_retry_after(response_headers.get("Retry-After"))
+                    self.limiter.on_throttle(retry_after)
+                    metrics.increment("http_throttled")
+
+            if error_class != "client":
+                self.breaker.record_failure()
+
+            attempts[error_class] += 1
+            if attempts[error_class] > RETRY_BUDGETS[error_class]:
+                metrics.increment(f"http_gave_up_{error_class}")
+                raise FetchError(message, error_class, total_attempts, status)
+            metrics.increment(f"http_retries_{error_class}")
+
+            delay = max(retry_after, backoff_delay(attempts[error_class]))
+            print(f"  🔁 {message}, повтор через {delay:.1f} сек ({error_class} {attempts[error_class]}/{RETRY_BUDGETS[error_class]})")
+            if stop_event is None:
+                time.sleep(delay)
+            elif stop_event.wait(delay):
+                raise FetchError("остановлено", "stopped", total_attempts, status)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HHClient:
+    """Общий экземпляр клиента на процесс (соединения остаются тёплыми между запросами)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HHClient()
+        return _client
+
+
+def configure_client(base_url: str = API_BASE_URL, **kwargs) -> HHClient:
+    """Заменяет общий клиент (другой адрес API, свой лимитер — например, для бенчмарков)"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = HHClient(base_url, **kwargs)
+        return _client
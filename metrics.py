@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+⏱️ МЕТРИКИ ЗАПУСКА
+Лёгкие таймеры и счётчики для горячих участков (сеть, JSON, фильтры, зарплаты,
+графики, Excel). В конце запуска пишутся metrics/<запуск>.json и, по желанию,
+metrics/<запуск>.prom в текстовом формате Prometheus.
+"""
+
+import functools
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+METRICS_DIR = Path(os.environ.get("HH_METRICS_DIR", "metrics"))
+
+# Писать ли файл для Prometheus (node_exporter textfile collector и т.п.)
+PROMETHEUS_ENABLED = os.environ.get("HH_METRICS_PROMETHEUS", "") not in ("", "0", "false")
+
+# Сколько последних измерений хранить на таймер для перцентилей
+MAX_SAMPLES = 10000
+
+_lock = threading.Lock()
+_timers = {}
+_samples = {}
+_counters = {}
+_started_at = time.time()
+
+
+class Stopwatch:
+    """Таймер участка кода: как контекстный менеджер или через явный stop()"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.elapsed = None
+
+    def stop(self) -> float:
+        if self.elapsed is None:
+            self.elapsed = time.perf_counter() - self.started
+            observe(self.name, self.elapsed)
+        return self.elapsed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+def observe(name: str, seconds: float):
+    """Добавляет одно измерение длительности"""
+    with _lock:
+        timer = _timers.setdefault(name, {"count": 0, "total_sec": 0.0, "max_sec": 0.0})
+        timer["count"] += 1
+        timer["total_sec"] += seconds
+        timer["max_sec"] = max(timer["max_sec"], seconds)
+        samples = _samples.setdefault(name, [])
+        if len(samples) < MAX_SAMPLES:
+            samples.append(seconds)
+        else:
+            samples[timer["count"] % MAX_SAMPLES] = seconds
+
+
+def timer(name: str) -> Stopwatch:
+    """Запускает таймер; длительность учитывается при stop() или выходе из with"""
+    return Stopwatch(name)
+
+
+def timed(name: str = None):
+    """Декоратор: время каждого вызова функции"""
+    def decorator(func):
+        metric_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Stopwatch(metric_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def increment(name: str, value: float = 1):
+    """Увеличивает счётчик"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def percentile(values: list, q: float) -> float:
+    """Перцентиль по ближайшему рангу (q от 0 до 100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def snapshot() -> dict:
+    """Текущее состояние всех метрик"""
+    with _lock:
+        timers = {}
+        for name, values in sorted(_timers.items()):
+            timers[name] = dict(values)
+            timers[name]["p50_sec"] = percentile(_samples.get(name, []), 50)
+            timers[name]["p99_sec"] = percentile(_samples.get(name, []), 99)
+        return {
+            "timers": timers,
+            "counters": dict(sorted(_counters.items())),
+        }
+
+
+def reset():
+    """Сбрасывает метрики (например, между циклами демона)"""
+    global _started_at
+    with _lock:
+        _timers.clear()
+        _samples.clear()
+        _counters.clear()
+        _started_at = time.time()
+
+
+def _prometheus_name(name: str) -> str:
+    return "hh_watcher_" + re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def format_prometheus(data: dict, run_name: str) -> str:
+    """Метрики в текстовом формате Prometheus"""
+    label = f'{{run="{run_name}"}}'
+    lines = []
+    for name, values in data["timers"].items():
+        metric = _prometheus_name(name)
+        lines.append(f"# TYPE {metric}_seconds summary")
+        lines.append(f'{metric}_seconds{{run="{run_name}",quantile="0.5"}} {values["p50_sec"]:.6f}')
+        lines.append(f'{metric}_seconds{{run="{run_name}",quantile="0.99"}} {values["p99_sec"]:.6f}')
+        lines.append(f"{metric}_seconds_sum{label} {values['total_sec']:.6f}")
+        lines.append(f"{metric}_seconds_count{label} {values['count']}")
+        lines.append(f"# TYPE {metric}_seconds_max gauge")
+        lines.append(f"{metric}_seconds_max{label} {values['max_sec']:.6f}")
+    for name, value in data["counters"].items():
+        metric = _prometheus_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric}{label} {value}")
+    lines.append("# TYPE hh_watcher_run_duration_seconds gauge")
+    lines.append(f"hh_watcher_run_duration_seconds{label} {data['duration_sec']:.3f}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(run_name: str, prometheus: bool = None) -> Path:
+    """Сохраняет метрики запуска в metrics/<run_name>.json (и .prom при необходимости)"""
+    data = snapshot()
+    data["run"] = run_name
+    data["finished_at"] = datetime.now().isoformat(timespec="seconds")
+    data["duration_sec"] = round(time.time() - _started_at, 3)
+
+    METRICS_DIR.mkdir(parents=True, exist_ok=True)
+    json_file = METRICS_DIR / f"{run_name}.json"
+    json_file.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if PROMETHEUS_ENABLED if prometheus is None else prometheus:
+        prom_file = METRICS_DIR / f"{run_name}.prom"
+        # Пишем через временный файл, чтобы сборщик не прочитал половину
+        tmp_file = prom_file.with_suffix(".prom.tmp")
+        tmp_file.write_text(format_prometheus(data, run_name), encoding="utf-8")
+        tmp_file.replace(prom_file)
+
+    print(f"⏱️ Метрики запуска: {json_file}")
+    return json_file
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+👯 ПОИСК ПОЧТИ-ДУБЛИКАТОВ ВАКАНСИЙ
+Парсеры отсеивают только точные повторы (тот же id или то же «название_компания»).
+Работодатели же перевыкладывают ту же вакансию под новым id или с мелкой правкой
+названия, и такие копии раздувают счётчики в сравнении динамики.
+
+Вакансия описывается символьными 3-граммами нормализованных названия, компании
+и зарплаты; от них считается MinHash-сигнатура, а кандидаты в
+дубликаты находятся LSH-бандингом: вакансии, совпавшие хотя бы в одной полосе
+сигнатуры, сравниваются по доле совпавших хэшей. Связные компоненты пар с
+оценкой сходства Жаккара не ниже порога — кластеры дубликатов. Сравниваются
+только вакансии одного работодателя (по нормализованному названию): одинаковые
+типовые названия у разных компаний дубликатами не считаются.
+
+Всё векторно и примерно линейно по числу вакансий: хэши 3-грамм считаются
+скользящим полиномом сразу по всем строкам, сигнатуры — пакетами NumPy и только
+для уникальных значений полей, полосы — сортировкой.
+
+Запуск из корня проекта:
+    python near_duplicates.py                  # кластеры по всем снимкам
+    python near_duplicates.py --date 2025-10-05
+"""
+
+import argparse
+import re
+import sys
+
+import numpy as np
+
+import metrics
+from employers import normalize_company_name
+from frame_schema import concat_frames, read_snapshot_csv
+
+SHINGLE_SIZE = 3
+NUM_PERM = 64
+BANDS = 16                      # 16 полос × 4 хэша: кандидат при сходстве ≳ 0.5
+SIMILARITY_THRESHOLD = 0.8      # оценка Жаккара, начиная с которой вакансии — дубликаты
+SHINGLE_BATCH = 2 ** 17         # 3-грамм в одном пакете MinHash (память: NUM_PERM × пакет × 8 байт)
+SEED = 1
+
+CLUSTER_COLUMN = "dup_cluster"
+DUPLICATE_COLUMN = "is_duplicate"
+
+_WORD_SEPARATOR_RE = re.compile(r'[^\w]+')
+
+_rng = np.random.default_rng(SEED)
+# Хэши перестановок вида (a · h + b) mod 2^64 >> 32 с нечётным a
+_PERM_A = (_rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) | np.uint64(1))[:, None]
+_PERM_B = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)[:, None]
+
+
+def normalize_title(title) -> str:
+    """Название без регистра, «ё» и пунктуации"""
+    if not isinstance(title, str):
+        return ""
+    return _WORD_SEPARATOR_RE.sub(" ", title.lower().replace("ё", "е")).strip()
+
+
+def normalize_salary(salary) -> str:
+    """Текст зарплаты без пробелов и разделителей тысяч"""
+    return re.sub(r'[\s,]', "", salary).lower() if isinstance(salary, str) else ""
+
+
+def _field_codes(values, normalize):
+    """Коды нормализованных значений поля и сами уникальные значения (нормализуются только уникальные)"""
+    import pandas as pd
+
+    # Категориальная колонка (frame_schema) факторизуется по готовым кодам
+    values = values if isinstance(values, pd.Series) else pd.Series(values, dtype="object")
+    raw_codes, raw_uniques = pd.factorize(values)
+    normalized = [normalize(value) for value in raw_uniques] + [normalize(None)]  # последний — для NaN (код −1)
+    codes, uniques = pd.factorize(pd.Series(normalized, dtype="object"))
+    return codes[raw_codes], [f"|{value}|" for value in uniques]
+
+
+def shingle_hashes(texts: list):
+    """Хэши символьных 3-грамм всех строк: (хэши uint32, индекс строки каждого хэша)"""
+    texts = [text.ljust(SHINGLE_SIZE) for text in texts]
+    codepoints = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    # Полиномиальный хэш окна из SHINGLE_SIZE символов по всей склейке строк
+    window = len(codepoints) - SHINGLE_SIZE + 1
+    hashes = np.zeros(window, dtype=np.uint64)
+    for offset in range(SHINGLE_SIZE):
+        hashes = hashes * np.uint64(1_000_003) + codepoints[offset:offset + window]
+
+    # Окна, не пересекающие границу строки: [start, start + len − k]
+    per_text = lengths - SHINGLE_SIZE + 1
+    owner = np.repeat(np.arange(len(texts)), per_text)
+    positions = np.arange(len(owner)) - np.repeat(np.cumsum(per_text) - per_text, per_text) + starts[owner]
+    return (hashes[positions] & np.uint64(0xFFFFFFFF)).astype(np.uint64), owner
+
+
+def minhash_signatures(texts: list):
+    """MinHash-сигнатуры строк: массив (число строк, NUM_PERM) uint32"""
+    hashes, owner = shingle_hashes(texts)
+    signatures = np.empty((len(texts), NUM_PERM), dtype=np.uint32)
+    first = 0
+    while first < len(texts):
+        # Пакет строк так, чтобы в нём было не больше SHINGLE_BATCH 3-грамм
+        begin = np.searchsorted(owner, first)
+        end_position = min(begin + SHINGLE_BATCH, len(owner))
+        last = max(int(owner[end_position - 1]) + (end_position == len(owner)), first + 1)
+        end = np.searchsorted(owner, last)
+        permuted = ((_PERM_A * hashes[begin:end] + _PERM_B) >> np.uint64(32)).astype(np.uint32)
+        boundaries = np.searchsorted(owner[begin:end], np.arange(first, last))
+        signatures[first:last] = np.minimum.reduceat(permuted, boundaries, axis=1).T
+        first = last
+    return signatures
+
+
+def candidate_pairs(signatures, groups=None):
+    """Пары (i, j), совпавшие хотя бы в одной полосе LSH; j — первый в своей корзине.
+
+    groups — номер группы каждой строки (работодатель): корзины не пересекают группы.
+    """
+    if len(signatures) < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    rows = NUM_PERM // BANDS
+    left, right = [], []
+    for band in range(BANDS):
+        block = signatures[:, band * rows:(band + 1) * rows].astype(np.uint64)
+        keys = np.zeros(len(signatures), dtype=np.uint64) if groups is None else groups.astype(np.uint64)
+        for column in range(rows):
+            keys = keys * np.uint64(0x9E3779B97F4A7C15) + block[:, column]
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        bucket_start = np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))
+        head = order[np.maximum.accumulate(np.where(bucket_start, np.arange(len(order)), 0))]
+        member = ~bucket_start
+        left.append(order[member])
+        right.append(head[member])
+    if not sum(len(part) for part in left):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    # Одна пара могла совпасть в нескольких полосах — убираем повторы по целочисленному ключу
+    pairs = np.concatenate(left).astype(np.int64) * len(signatures) + np.concatenate(right)
+    pairs.sort()
+    pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))]
+    return pairs // len(signatures), pairs % len(signatures)
+
+
+def similar_pairs(signatures, left, right):
+    """Маска пар-кандидатов с долей совпавших хэшей не ниже порога (по пакетам — память ограничена)"""
+    confirmed = np.empty(len(left), dtype=bool)
+    step = max(1, SHINGLE_BATCH * 8 // NUM_PERM)
+    for first in range(0, len(left), step):
+        part = slice(first, first + step)
+        matches = (signatures[left[part]] == signatures[right[part]]).sum(axis=1)
+        confirmed[part] = matches >= SIMILARITY_THRESHOLD * NUM_PERM
+    return confirmed
+
+
+def connected_components(count: int, left, right):
+    """Метка компоненты каждой вершины (минимальный номер) распространением меток"""
+    labels = np.arange(count)
+    while len(left):
+        smaller = np.minimum(labels[left], labels[right])
+        updated = labels.copy()
+        np.minimum.at(updated, left, smaller)
+        np.minimum.at(updated, right, smaller)
+        updated = updated[updated]  # сжатие путей
+        if np.array_equal(updated, labels):
+            break
+        labels = updated
+    return labels
+
+
+@metrics.timed()
+def cluster_ids(titles, companies, salaries):
+    """Номер кластера дубликатов для каждой вакансии — позиция первого его члена.
+
+    Множество 3-грамм вакансии — объединение 3-грамм названия, компании и
+    зарплаты, а MinHash объединения — поэлементный минимум MinHash частей.
+    Поэтому сигнатуры считаются только для уникальных названий, компаний и
+    зарплат, которых в разы меньше, чем вакансий.
+    """
+    import pandas as pd
+
+    if not len(titles):
+        return np.empty(0, dtype=np.int64)
+    fields = [_field_codes(titles, normalize_title), _field_codes(companies, normalize_company_name),
+              _field_codes(salaries, normalize_salary)]
+
+    # Уникальные сочетания полей (точные копии сравниваются один раз)
+    codes = np.zeros(len(titles), dtype=np.int64)
+    for field_codes, uniques in fields:
+        codes, _ = pd.factorize(codes * len(uniques) + field_codes)
+    _, first_rows = np.unique(codes, return_index=True)
+
+    signatures = None
+    for field_codes, uniques in fields:
+        field_signatures = minhash_signatures(uniques)[field_codes[first_rows]]
+        signatures = field_signatures if signatures is None else np.minimum(signatures, field_signatures, out=signatures)
+
+    # Перевыкладывает вакансию тот же работодатель: пары ищутся только внутри одной компании
+    company_codes = fields[1][0][first_rows]
+    left, right = candidate_pairs(signatures, company_codes)
+    confirmed = similar_pairs(signatures, left, right)
+    metrics.increment("near_duplicate_candidates", int(len(left)))
+    metrics.increment("near_duplicate_pairs", int(confirmed.sum()))
+    labels = connected_components(len(signatures), left[confirmed], right[confirmed])
+
+    # Метка уникального сочетания → позиция первой вакансии кластера
+    row_labels = labels[codes]
+    _, label_first_rows = np.unique(row_labels, return_index=True)
+    first_of_label = np.empty(len(signatures), dtype=np.int64)
+    first_of_label[row_labels[label_first_rows]] = label_first_rows
+    return first_of_label[row_labels]
+
+
+def mark_duplicates(df):
+    """Добавляет dup_cluster (номер кластера) и is_duplicate (не первая вакансия кластера).
+
+    Агрегаты, которые должны считать перевыложенную вакансию один раз, считают
+    df['dup_cluster'].nunique() вместо len(df).
+    """
+    df = df.copy()
+    if len(df) == 0:
+        df[CLUSTER_COLUMN] = np.empty(0, dtype=np.int64)
+        df[DUPLICATE_COLUMN] = np.empty(0, dtype=bool)
+        return df
+    clusters = cluster_ids(df["Название вакансии"], df["Компания"], df["Зарплата"])
+    df[CLUSTER_COLUMN] = clusters
+    df[DUPLICATE_COLUMN] = clusters != np.arange(len(df))
+    return df
+
+
+def mark_across(frames: list) -> list:
+    """mark_duplicates общим проходом по нескольким снимкам; возвращает размеченные копии.
+
+    Номера кластеров общие для всех снимков, так что перевыложенная вакансия
+    попадает в один кластер и в старом, и в новом снимке; в каждом снимке
+    кластер по-прежнему считается через nunique.
+    """
+    present = [frame for frame in frames if len(frame)]
+    if not present:
+        return [mark_duplicates(frame) for frame in frames]
+    marked = mark_duplicates(concat_frames(present))
+    result, offset = [], 0
+    for frame in frames:
+        if not len(frame):
+            result.append(mark_duplicates(frame))
+            continue
+        part = marked.iloc[offset:offset + len(frame)]
+        result.append(part.set_axis(frame.index))
+        offset += len(frame)
+    return result
+
+
+def main():
+    """Печать найденных кластеров дубликатов"""
+    from snapshot_diff import list_snapshots
+    from snapshot_store import snapshot_files
+
+    parser = argparse.ArgumentParser(description="Почти-дубликаты вакансий в снимках")
+    parser.add_argument("--date", help="только один снимок (по умолчанию — все)")
+    parser.add_argument("--limit", type=int, default=20, help="сколько кластеров показать")
+    args = parser.parse_args()
+
+    dates = [args.date] if args.date else list_snapshots()
+    frames = [read_snapshot_csv(path).assign(**{"Снимок": date_str})
+              for date_str in dates for path in snapshot_files(date_str)]
+    if not frames:
+        print("❌ Нет снимков для поиска дубликатов")
+        return 1
+
+    df = mark_duplicates(concat_frames(frames))
+    sizes = df[CLUSTER_COLUMN].value_counts()
+    clusters = sizes[sizes > 1]
+    print(f"👯 Вакансий: {len(df)}, кластеров: {df[CLUSTER_COLUMN].nunique()}, "
+          f"с повторами: {len(clusters)} (повторных записей: {int(df[DUPLICATE_COLUMN].sum())})")
+    for cluster, size in clusters.head(args.limit).items():
+        members = df[df[CLUSTER_COLUMN] == cluster]
+        print(f"\n  🔁 {size} записей:")
+        for _, row in members.iterrows():
+            print(f"    • [{row['Снимок']}] {row['Название вакансии']} — {row['Компания']} — {row['Зарплата']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+"""
+📨 УВЕДОМЛЕНИЯ В TELEGRAM ПО ПОДПИСКАМ WATCHLIST
+Совпадения новых и изменившихся вакансий с подписками (data/watchlist/<дата>.json)
+превращаются в сводки по чатам и отправляются через Bot API.
+
+Всё состояние — в исходящей очереди data/notifications.sqlite:
+
+- events — события «вакансия × подписка × чат» за снимок; ключ уникален,
+  поэтому повторная постановка того же снимка ничего не дублирует;
+- messages — готовые сводки: все ещё не упакованные события чата собираются
+  в одно сообщение (при превышении 4096 символов — в несколько с пометкой
+  «(1/N)»), статус pending → sent / failed.
+
+Отправка идёт параллельно по чатам (внутри чата — строго по порядку) под
+общим ограничением частоты и отдельным на каждый чат (rate_limiter); 429 с
+retry_after тормозит лимитер чата, 5xx и сетевые ошибки повторяются с
+backoff в пределах RETRY_BUDGETS. Если бюджет исчерпан, сообщение остаётся
+в очереди до следующего запуска — после перезапуска процесс продолжает с
+неотправленного. Гарантия «хотя бы один раз»: если процесс упадёт между
+ответом Bot API и записью статуса, это сообщение уйдёт повторно.
+
+Транспорт подменяемый: адрес API задаётся TELEGRAM_API_BASE_URL (для
+проверки — локальный стенд benchmarks/telegram_stub_server.py), а Dispatcher
+принимает любой объект с методом send(chat, text). --dry-run печатает то,
+что ушло бы, ничего не меняя в очереди: постановка идёт в её копию в памяти.
+
+Переменные окружения:
+    TELEGRAM_BOT_TOKEN     — токен бота (без него сообщения копятся в очереди)
+    TELEGRAM_CHAT_ID       — чат для подписок без своего списка chats
+    TELEGRAM_API_BASE_URL  — адрес Bot API (по умолчанию https://api.telegram.org)
+
+Запуск из корня проекта:
+    python notifier.py                     # поставить последний снимок в очередь и отправить
+    python notifier.py enqueue --date 2025-10-05
+    python notifier.py --dry-run           # что ушло бы по последнему снимку, без записи в очередь
+    python notifier.py send --dry-run
+    python notifier.py status
+"""
+
+import argparse
+import http.client
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import metrics
+from rate_limiter import RETRY_BUDGETS, AdaptiveRateLimiter, FetchError, backoff_delay
+from snapshot_diff import DATA_DIR, list_snapshots
+from watchlist import matches_path
+
+NOTIFY_DB = DATA_DIR / "notifications.sqlite"
+
+# Версия схемы базы (PRAGMA user_version): при несовпадении таблицы пересоздаются
+SCHEMA_VERSION = 1
+
+TELEGRAM_API_BASE_URL = os.environ.get("TELEGRAM_API_BASE_URL", "https://api.telegram.org")
+
+# Ограничения Bot API: не длиннее 4096 символов, ~30 сообщений/с всего и ~1/с в один чат
+MAX_MESSAGE_CHARS = 4096
+GLOBAL_RATE = 25.0
+CHAT_RATE = 1.0
+
+# После стольких неудачных попыток (за все запуски) сообщение помечается failed
+MAX_ATTEMPTS = 10
+
+# Вакансий одной подписки в сводке; остальные — строкой «… и ещё N»
+MAX_VACANCIES_PER_SUBSCRIPTION = 30
+
+EVENT_ICONS = {"new": "🆕", "changed": "✏️"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    key TEXT PRIMARY KEY,
+    chat TEXT NOT NULL,
+    subscription TEXT NOT NULL,
+    title TEXT NOT NULL,
+    snapshot TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    message_id INTEGER,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_unpacked ON events(message_id, chat);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat TEXT NOT NULL,
+    text TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    remote_id INTEGER,
+    created_at TEXT NOT NULL,
+    sent_at TEXT
+);
+CREATE INDEX IF NOT EXISTS messages_pending ON messages(status, chat, id);
+"""
+
+
+def _prepare(connection: sqlite3.Connection) -> sqlite3.Connection:
+    if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        connection.executescript("DROP TABLE IF EXISTS events; DROP TABLE IF EXISTS messages;")
+        connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def connect(path: Path = NOTIFY_DB) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Отправители чатов пишут из разных потоков — каждый со своим соединением
+    connection = sqlite3.connect(path, timeout=30)
+    connection.execute("PRAGMA journal_mode = WAL")
+    return _prepare(connection)
+
+
+def connect_copy(path: Path = NOTIFY_DB) -> sqlite3.Connection:
+    """Копия очереди в памяти для --dry-run: постановка и предпросмотр без записи в файл"""
+    connection = sqlite3.connect(":memory:")
+    if path.exists():
+        source = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30)
+        try:
+            source.backup(connection)
+        finally:
+            source.close()
+    return _prepare(connection)
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def enqueue_matches(connection: sqlite3.Connection, path: Path, default_chat: str = None) -> int:
+    """Ставит совпадения файла data/watchlist/<дата>.json в очередь; возвращает число новых событий.
+
+    Подписка без своего списка chats уходит в default_chat; если нет и его,
+    её совпадения пропускаются. Файлы, построенные по всем вакансиям снимка
+    (watchlist.py --all), не ставятся — это не новости.
+    """
+    result = json.loads(Path(path).read_text(encoding="utf-8"))
+    if not result.get("only_changes"):
+        print(f"  ⏭️ {path}: совпадения по всем вакансиям снимка, а не по новым — не отправляем")
+        return 0
+    rows = []
+    skipped = 0
+    for subscription_id, item in result["subscriptions"].items():
+        chats = item.get("chats") or ([default_chat] if default_chat else [])
+        if not chats:
+            skipped += len(item["matches"])
+            continue
+        for chat in chats:
+            for record in item["matches"]:
+                key = f"{chat}|{subscription_id}|{result['date']}|{record['vacancy_id']}"
+                rows.append((key, str(chat), subscription_id, item["title"], result["date"],
+                             json.dumps(record, ensure_ascii=False), _now()))
+    if skipped:
+        print(f"  ⚠️ {skipped} совпадений без чата (нет chats у подписки и TELEGRAM_CHAT_ID)")
+    with connection:
+        before = connection.total_changes
+        connection.executemany("INSERT OR IGNORE INTO events (key, chat, subscription, title, snapshot, payload,"
+                               " created_at) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        added = connection.total_changes - before
+    metrics.increment("notify_events", added)
+    return added
+
+
+def format_vacancy(record: dict) -> str:
+    """Строки одной вакансии в сводке"""
+    parts = [record.get("title") or "—", record.get("company") or "—"]
+    if record.get("salary"):
+        parts.append(record["salary"])
+    if record.get("area"):
+        parts.append(record["area"])
+    lines = [f"{EVENT_ICONS.get(record.get('event'), '•')} " + " — ".join(parts)]
+    for field, (old, new) in (record.get("changes") or {}).items():
+        lines.append(f"   {field}: {old or '—'} → {new or '—'}")
+    if record.get("url"):
+        lines.append(f"   {record['url']}")
+    return "\n".join(lines)
+
+
+def render_digest(events: list) -> list:
+    """Тексты сообщений сводки для одного чата: события [(подписка, название, снимок, запись)].
+
+    Сводка режется по границам вакансий так, чтобы каждое сообщение вместе
+    с пометкой «(i/N)» укладывалось в MAX_MESSAGE_CHARS.
+    """
+    snapshots = sorted({snapshot for _, _, snapshot, _ in events})
+    header = f"👀 Подписки: {len(events)} новых и изменившихся вакансий (снимок {', '.join(snapshots)})"
+    blocks = []
+    by_subscription = {}
+    for subscription, title, _, record in events:
+        by_subscription.setdefault((subscription, title), []).append(record)
+    for (_, title), records in by_subscription.items():
+        blocks.append(f"\n🎯 {title} — {len(records)}")
+        blocks.extend(format_vacancy(record) for record in records[:MAX_VACANCIES_PER_SUBSCRIPTION])
+        if len(records) > MAX_VACANCIES_PER_SUBSCRIPTION:
+            blocks.append(f"… и ещё {len(records) - MAX_VACANCIES_PER_SUBSCRIPTION}")
+
+    # Запас под пометку «(12/34) »
+    limit = MAX_MESSAGE_CHARS - 16
+    parts = [header]
+    for block in blocks:
+        block = block[:limit]
+        if len(parts[-1]) + 1 + len(block) > limit:
+            parts.append(block.lstrip("\n"))
+        else:
+            parts[-1] += "\n" + block
+    if len(parts) > 1:
+        parts = [f"({i}/{len(parts)}) {text}" for i, text in enumerate(parts, start=1)]
+    return parts
+
+
+def pack_digests(connection: sqlite3.Connection) -> int:
+    """Собирает неупакованные события каждого чата в сообщения; возвращает число сообщений"""
+    events = {}
+    for key, chat, subscription, title, snapshot, payload in connection.execute(
+            "SELECT key, chat, subscription, title, snapshot, payload FROM events"
+            " WHERE message_id IS NULL ORDER BY chat, subscription, snapshot, key"):
+        events.setdefault(chat, []).append((key, (subscription, title, snapshot, json.loads(payload))))
+    created = 0
+    # События и сообщения пишутся одной транзакцией: упавший процесс не оставит «полусводку»
+    with connection:
+        for chat, items in events.items():
+            message_ids = []
+            for text in render_digest([event for _, event in items]):
+                cursor = connection.execute("INSERT INTO messages (chat, text, created_at) VALUES (?, ?, ?)",
+                                            (chat, text, _now()))
+                message_ids.append(cursor.lastrowid)
+            connection.executemany("UPDATE events SET message_id = ? WHERE key = ?",
+                                   [(message_ids[0], key) for key, _ in items])
+            created += len(message_ids)
+    metrics.increment("notify_messages", created)
+    return created
+
+
+class SendError(FetchError):
+    """Bot API не принял сообщение; retry_after — пауза, которую просит сервер при 429"""
+
+    def __init__(self, message: str, error_class: str, status: int = None, retry_after: float = 0.0):
+        super().__init__(message, error_class, status=status)
+        self.retry_after = retry_after
+
+
+def classify_telegram_error(status: int) -> str:
+    """Класс ошибки Bot API: у Telegram 403 — «бот заблокирован», повтор не поможет"""
+    if status == 429:
+        return "throttle"
+    if status >= 500:
+        return "server"
+    return "client"
+
+
+class TelegramTransport:
+    """sendMessage Bot API; у каждого потока своё постоянное соединение"""
+
+    def __init__(self, token: str, base_url: str = TELEGRAM_API_BASE_URL, timeout: float = 30):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.path = f"{parsed.path.rstrip('/')}/bot{token}/sendMessage"
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            conn = conn_class(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _reset_connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+        self._local.conn = None
+
+    def send(self, chat: str, text: str):
+        """Отправляет сообщение; возвращает message_id или бросает SendError"""
+        body = json.dumps({"chat_id": chat, "text": text, "disable_web_page_preview": True},
+                          ensure_ascii=False).encode("utf-8")
+        headers = {"Content-Type": "application/json; charset=utf-8"}
+        try:
+            # Один повтор на случай, если сервер закрыл простаивающее соединение
+            for attempt in range(2):
+                conn = self._connection()
+                try:
+                    conn.request("POST", self.path, body=body, headers=headers)
+                    response = conn.getresponse()
+                    break
+                except (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                        BrokenPipeError, ConnectionResetError):
+                    self._reset_connection()
+                    if attempt == 1:
+                        raise
+            payload = response.read()
+            if response.will_close:
+                self._reset_connection()
+        except (OSError, http.client.HTTPException) as e:
+            self._reset_connection()
+            raise SendError(f"{type(e).__name__}: {e}", "network") from e
+        metrics.increment("telegram_requests")
+
+        try:
+            data = json.loads(payload.decode("utf-8"))
+        except ValueError:
+            data = {}
+        if response.status == 200 and data.get("ok"):
+            return data.get("result", {}).get("message_id")
+        status = data.get("error_code") or response.status
+        retry_after = float((data.get("parameters") or {}).get("retry_after") or 0)
+        description = data.get("description") or f"HTTP {response.status}"
+        raise SendError(f"{status}: {description}", classify_telegram_error(status), status, retry_after)
+
+
+class Dispatcher:
+    """Отправляет сообщения очереди: чаты параллельно, внутри чата — по порядку"""
+
+    def __init__(self, transport, path: Path = NOTIFY_DB, global_rate: float = GLOBAL_RATE,
+                 chat_rate: float = CHAT_RATE, workers: int = 8, stop_event: threading.Event = None):
+        self.transport = transport
+        self.path = path
+        self.chat_rate = chat_rate
+        self.workers = workers
+        self.stop_event = stop_event or threading.Event()
+        self.global_limiter = AdaptiveRateLimiter(initial_rate=global_rate, min_rate=1.0, max_rate=global_rate)
+        self.stats = {"sent": 0, "failed": 0, "deferred": 0, "retries": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+        metrics.increment(f"notify_{name}")
+
+    def run(self) -> dict:
+        connection = connect(self.path)
+        chats = [chat for chat, in connection.execute(
+            "SELECT DISTINCT chat FROM messages WHERE status = 'pending' AND next_attempt_at <= ?", (time.time(),))]
+        connection.close()
+        if chats:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                list(pool.map(self._drain_chat, chats))
+        return dict(self.stats)
+
+    def _drain_chat(self, chat: str):
+        """Сообщения одного чата по порядку; на отложенном сообщении чат останавливается"""
+        limiter = AdaptiveRateLimiter(initial_rate=self.chat_rate, min_rate=self.chat_rate / 10,
+                                      max_rate=self.chat_rate)
+        connection = connect(self.path)
+        try:
+            while not self.stop_event.is_set():
+                row = connection.execute(
+                    "SELECT id, text, attempts, next_attempt_at FROM messages WHERE chat = ? AND status = 'pending'"
+                    " ORDER BY id LIMIT 1", (chat,)).fetchone()
+                # Следующее по порядку сообщение отложено — остальные ждут его, чтобы не нарушить порядок
+                if row is None or row[3] > time.time():
+                    break
+                message_id, text, attempts, _ = row
+                if not self._deliver(connection, limiter, chat, message_id, text, attempts):
+                    break
+        finally:
+            connection.close()
+
+    def _deliver(self, connection: sqlite3.Connection, limiter: AdaptiveRateLimiter, chat: str,
+                 message_id: int, text: str, attempts: int) -> bool:
+        """Отправляет одно сообщение с повторами; False — чат откладывается до следующего запуска"""
+        retries = {error_class: 0 for error_class in RETRY_BUDGETS}
+        while True:
+            if not limiter.acquire(self.stop_event) or not self.global_limiter.acquire(self.stop_event):
+                return False
+            attempts += 1
+            try:
+                with metrics.timer("telegram_send"):
+                    remote_id = self.transport.send(chat, text)
+            except SendError as e:
+                error = e
+            else:
+                limiter.on_success()
+                self.global_limiter.on_success()
+                with connection:
+                    connection.execute("UPDATE messages SET status = 'sent', attempts = ?, last_error = NULL,"
+                                       " remote_id = ?, sent_at = ? WHERE id = ?",
+                                       (attempts, remote_id, _now(), message_id))
+                self._count("sent")
+                return True
+
+            if error.error_class == "throttle":
+                limiter.on_throttle(error.retry_after)
+            retries[error.error_class] += 1
+            if error.error_class == "client" or attempts >= MAX_ATTEMPTS:
+                with connection:
+                    connection.execute("UPDATE messages SET status = 'failed', attempts = ?, last_error = ?"
+                                       " WHERE id = ?", (attempts, str(error), message_id))
+                print(f"  ❌ Чат {chat}: сообщение {message_id} не отправлено: {error}")
+                self._count("failed")
+                # Клиентская ошибка касается этого сообщения — остальные сообщения чата идут дальше
+                return error.error_class == "client"
+            if retries[error.error_class] > RETRY_BUDGETS[error.error_class]:
+                delay = max(error.retry_after, backoff_delay(attempts, base=5.0, cap=3600.0))
+                with connection:
+                    connection.execute("UPDATE messages SET attempts = ?, last_error = ?, next_attempt_at = ?"
+                                       " WHERE id = ?", (attempts, str(error), time.time() + delay, message_id))
+                print(f"  ⏸️ Чат {chat}: {error}, отложено на {delay:.0f} сек")
+                self._count("deferred")
+                return False
+
+            self._count("retries")
+            if error.error_class != "throttle":
+                if self.stop_event.wait(backoff_delay(retries[error.error_class])):
+                    return False
+
+
+def get_transport():
+    """Транспорт по окружению: None, если токен бота не задан"""
+    token = os.environ.get("TELEGRAM_BOT_TOKEN")
+    if not token:
+        return None
+    return TelegramTransport(token, os.environ.get("TELEGRAM_API_BASE_URL", TELEGRAM_API_BASE_URL))
+
+
+def queue_status(connection: sqlite3.Connection) -> dict:
+    """Сообщения очереди по статусам и число неупакованных событий"""
+    status = dict(connection.execute("SELECT status, COUNT(*) FROM messages GROUP BY status").fetchall())
+    status["unpacked_events"] = connection.execute(
+        "SELECT COUNT(*) FROM events WHERE message_id IS NULL").fetchone()[0]
+    return status
+
+
+def preview(connection: sqlite3.Connection):
+    """Печатает ждущие отправки сообщения и сводки по ещё не упакованным событиям (--dry-run)"""
+    for chat, text in connection.execute("SELECT chat, text FROM messages WHERE status = 'pending' ORDER BY id"):
+        print(f"\n📨 → {chat}\n{text}")
+    events = {}
+    for chat, subscription, title, snapshot, payload in connection.execute(
+            "SELECT chat, subscription, title, snapshot, payload FROM events"
+            " WHERE message_id IS NULL ORDER BY chat, subscription, snapshot, key"):
+        events.setdefault(chat, []).append((subscription, title, snapshot, json.loads(payload)))
+    for chat, items in events.items():
+        for text in render_digest(items):
+            print(f"\n📨 → {chat}\n{text}")
+
+
+def send_pending(transport, path: Path = NOTIFY_DB, stop_event: threading.Event = None) -> dict:
+    """Упаковывает новые события в сводки и отправляет всё, что ждёт отправки"""
+    connection = connect(path)
+    try:
+        pack_digests(connection)
+    finally:
+        connection.close()
+    return Dispatcher(transport, path, stop_event=stop_event).run()
+
+
+def notify() -> bool:
+    """Действие этапа пайплайна: совпадения последнего снимка в очередь и отправка"""
+    snapshots = list_snapshots() if DATA_DIR.exists() else []
+    if not snapshots or not matches_path(snapshots[-1]).exists():
+        print("  ⏭️ Совпадений с подписками нет")
+        return True
+    connection = connect()
+    try:
+        added = enqueue_matches(connection, matches_path(snapshots[-1]), os.environ.get("TELEGRAM_CHAT_ID"))
+    finally:
+        connection.close()
+    transport = get_transport()
+    if transport is None:
+        print(f"  📥 В очереди событий: +{added}; TELEGRAM_BOT_TOKEN не задан — сообщения ждут отправки")
+        return True
+    stats = send_pending(transport)
+    print(f"  📨 Событий: +{added}, отправлено сообщений {stats['sent']}, отложено {stats['deferred']}, "
+          f"ошибок {stats['failed']}")
+    return True
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Уведомления в Telegram по совпадениям watchlist")
+    parser.add_argument("command", nargs="?", default="run", choices=["run", "enqueue", "send", "status"],
+                        help="run — enqueue + send (по умолчанию)")
+    parser.add_argument("--date", help="снимок для enqueue (по умолчанию — последний)")
+    parser.add_argument("--chat", default=os.environ.get("TELEGRAM_CHAT_ID"),
+                        help="чат для подписок без chats (по умолчанию TELEGRAM_CHAT_ID)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="напечатать сообщения вместо отправки, не меняя очередь")
+    args = parser.parse_args()
+
+    print("📨 УВЕДОМЛЕНИЯ WATCHLIST")
+    print("=" * 60)
+    connection = connect_copy() if args.dry_run else connect()
+
+    if args.command in ("run", "enqueue"):
+        snapshots = list_snapshots() if DATA_DIR.exists() else []
+        date_str = args.date or (snapshots[-1] if snapshots else None)
+        path = matches_path(date_str) if date_str else None
+        if path is None or not path.exists():
+            print(f"❌ Нет совпадений за {date_str}: сначала python watchlist.py" if date_str else "❌ Нет снимков")
+            return 1
+        added = enqueue_matches(connection, path, args.chat)
+        suffix = " (--dry-run: очередь не изменена)" if args.dry_run else ""
+        print(f"📥 {path}: новых событий в очереди {added}{suffix}")
+
+    if args.command in ("run", "send"):
+        transport = get_transport()
+        if args.dry_run:
+            preview(connection)
+        elif transport is None:
+            print("⚠️ TELEGRAM_BOT_TOKEN не задан — сообщения остаются в очереди (см. --dry-run)")
+        else:
+            stats = send_pending(transport)
+            print(f"📨 Отправлено {stats['sent']}, повторов {stats['retries']}, отложено {stats['deferred']}, "
+                  f"ошибок {stats['failed']}")
+
+    status = queue_status(connection)
+    connection.close()
+    print("📊 Очередь: " + ", ".join(f"{name} {count}" for name, count in sorted(status.items())))
+    print(f"✅ {NOTIFY_DB}")
+    metrics.write_metrics("notifier")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
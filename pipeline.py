@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+"""
+🧩 ПАЙПЛАЙН HH_WATCHER
+Инкрементальный DAG-раннер: парсинг профилей → хранилище → агрегаты → графики и Excel.
+Этапы с неизменными входами пропускаются, независимые этапы выполняются параллельно.
+"""
+
+import argparse
+import hashlib
+import json
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+import dashboard
+import employers
+import metrics
+import notifier
+import rollup_cube
+import sales_parser
+import search_index
+import snapshot_diff
+import snapshot_store
+import vacancy_details
+import watchlist
+import zakup_parser
+
+STATE_FILE = Path("data") / ".pipeline_state.json"
+STORE_INDEX_FILE = Path("data") / "store_index.json"
+AGGREGATES_FILE = Path("data") / "aggregates.json"
+
+
+@dataclass
+class Stage:
+    """Этап пайплайна с объявленными входами и выходами.
+
+    deps — жёсткие зависимости (ошибка в них блокирует этап),
+    after — только порядок: этап ждёт их завершения, но запускается и после ошибки.
+    optional — этап запускается только по --with-optional или явно через --only.
+    rewrites_outputs — этап каждый раз переписывает выходы: успех засчитывается, только
+    если они новее начала этапа (старый отчёт не выдаётся за свежий).
+    """
+    name: str
+    description: str
+    action: Callable[[], bool]
+    deps: list = field(default_factory=list)
+    after: list = field(default_factory=list)
+    inputs: Callable[[], list] = lambda: []
+    outputs: Callable[[], list] = lambda: []
+    params: Callable[[], dict] = lambda: {}
+    fetch: bool = False
+    optional: bool = False
+    rewrites_outputs: bool = False
+
+
+def today_str() -> str:
+    """Дата текущего снимка в формате data/<дата>"""
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+def expand_paths(patterns) -> list:
+    """Раскрывает glob-шаблоны в отсортированный список существующих файлов"""
+    paths = set()
+    for pattern in patterns:
+        pattern = str(pattern)
+        if any(ch in pattern for ch in "*?["):
+            paths.update(p for p in Path(".").glob(pattern) if p.is_file())
+        elif Path(pattern).is_file():
+            paths.add(Path(pattern))
+    return sorted(paths)
+
+
+class FingerprintCache:
+    """Кэш хэшей файлов по (размер, mtime), чтобы не перечитывать неизменные файлы"""
+
+    def __init__(self, entries: Optional[dict] = None):
+        self.entries = entries or {}
+
+    def file_hash(self, path: Path) -> str:
+        stat = path.stat()
+        key = str(path)
+        cached = self.entries.get(key)
+        if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+            metrics.increment("fingerprint_cache_hits")
+            return cached["sha256"]
+        metrics.increment("fingerprint_cache_misses")
+
+        digest = hashlib.sha256()
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+
+        self.entries[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+        return digest.hexdigest()
+
+    def fingerprint(self, stage: Stage) -> str:
+        """Общий отпечаток входов и параметров этапа"""
+        digest = hashlib.sha256()
+        digest.update(json.dumps(stage.params(), sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        for path in expand_paths(stage.inputs()):
+            digest.update(str(path).encode("utf-8"))
+            digest.update(self.file_hash(path).encode("ascii"))
+        return digest.hexdigest()
+
+
+def load_state() -> dict:
+    """Загружает состояние прошлых запусков"""
+    if STATE_FILE.exists():
+        try:
+            return json.loads(STATE_FILE.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            print(f"⚠️ Состояние пайплайна повреждено, начинаем заново: {STATE_FILE}")
+    return {"stages": {}, "files": {}}
+
+
+def save_state(state: dict):
+    """Атомарно сохраняет состояние пайплайна"""
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = STATE_FILE.with_suffix(".tmp")
+    tmp_file.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp_file.replace(STATE_FILE)
+
+
+def outputs_exist(stage: Stage, since: float = None) -> bool:
+    """Проверяет, что все объявленные выходы этапа на месте (и, если задан since, записаны не раньше него)"""
+    for pattern in stage.outputs():
+        pattern = str(pattern)
+        paths = expand_paths([pattern]) if any(ch in pattern for ch in "*?[") else [Path(pattern)]
+        paths = [path for path in paths if path.exists()]
+        if not paths:
+            return False
+        if since is not None and not any(path.stat().st_mtime >= since for path in paths):
+            return False
+    return True
+
+
+def run_script(script_name: str) -> bool:
+    """Запускает скрипт проекта отдельным процессом и выводит его лог"""
+    result = subprocess.run([sys.executable, script_name], capture_output=True, text=True)
+    prefix = f"  [{script_name}] "
+    for line in (result.stdout + result.stderr).splitlines():
+        print(prefix + line)
+    return result.returncode == 0
+
+
+# ---------------------------------------------------------------------------
+# Этапы: хранилище и агрегаты
+# ---------------------------------------------------------------------------
+
+def latest_snapshot() -> list:
+    """[дата последнего снимка] или [], если снимков нет"""
+    snapshots = snapshot_diff.list_snapshots() if snapshot_diff.DATA_DIR.exists() else []
+    return snapshots[-1:]
+
+
+def snapshot_csv_files() -> list:
+    """Опубликованные CSV снимков data/<дата>/ (по манифестам snapshot_store)"""
+    return snapshot_store.all_snapshot_files()
+
+
+def snapshot_manifests() -> list:
+    """Манифесты снимков data/<дата>/manifest.json (не data/dashboard/manifest.json и т.п.)"""
+    snapshots = snapshot_diff.list_snapshots() if snapshot_diff.DATA_DIR.exists() else []
+    return [snapshot_store.manifest_path(date_str) for date_str in snapshots]
+
+
+def build_store_index() -> bool:
+    """Строит индекс снимков: даты, файлы, число строк и хэши.
+    Для снимков с манифестом строки и sha256 берутся из него без чтения CSV"""
+    cache = FingerprintCache()
+    index = {}
+    manifests = {}
+    for csv_file in snapshot_csv_files():
+        date_str = csv_file.parent.name
+        if date_str not in manifests:
+            manifests[date_str] = snapshot_store.read_manifest(date_str)
+        published = (manifests[date_str] or {"files": {}})["files"].get(csv_file.name)
+        if published:
+            rows, sha256 = published["rows"], published["sha256"]
+        else:
+            with csv_file.open(encoding="utf-8-sig") as f:
+                rows = max(sum(1 for _ in f) - 1, 0)
+            sha256 = cache.file_hash(csv_file)
+        entry = {
+            "file": csv_file.name,
+            "rows": rows,
+            "sha256": sha256,
+        }
+        if published:
+            entry["run_id"] = published["run_id"]
+        # Метаданные сбора: неполные снимки (часть запросов не выполнена) помечаются
+        meta_file = csv_file.with_suffix(".meta.json")
+        if meta_file.exists():
+            metadata = json.loads(meta_file.read_text(encoding="utf-8"))
+            entry["complete"] = metadata.get("complete", True)
+            entry["failed_queries"] = [item["query"] for item in metadata.get("failed_queries", [])]
+            if not entry["complete"]:
+                print(f"  ⚠️ Неполный снимок {date_str}/{csv_file.name}: "
+                      f"не выполнено запросов — {len(entry['failed_queries'])}")
+        index.setdefault(date_str, []).append(entry)
+
+    STORE_INDEX_FILE.parent.mkdir(parents=True, exist_ok=True)
+    STORE_INDEX_FILE.write_text(json.dumps(index, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"  📦 Снимков в хранилище: {len(index)}")
+    return True
+
+
+def build_aggregates() -> bool:
+    """Считает сводную статистику по каждому снимку (по срезам куба, без строк вакансий)"""
+    index = json.loads(STORE_INDEX_FILE.read_text(encoding="utf-8"))
+    cube = rollup_cube.load_cube(sorted(index), update=False)
+
+    aggregates = {}
+    for date_str in sorted(index):
+        stats = cube.slice(snapshot=date_str).stats(date_str)
+        aggregates[date_str] = {key: (float(value) if key != 'date' else value) for key, value in stats.items()}
+
+    AGGREGATES_FILE.write_text(json.dumps(aggregates, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"  📊 Агрегаты посчитаны для {len(aggregates)} снимков")
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Описание графа
+# ---------------------------------------------------------------------------
+
+def build_stages(run_report=None) -> list:
+    """Описывает граф этапов пайплайна.
+
+    run_report(имя модуля) -> bool запускает отчёт в текущем процессе (так делает демон,
+    у которого куб и модули отчётов уже в памяти); по умолчанию отчёт — отдельный процесс.
+    """
+    def report(module_name: str):
+        if run_report is None:
+            return lambda: run_script(f"{module_name}.py")
+        return lambda: run_report(module_name)
+
+    return [
+        Stage(
+            name="parse_sales",
+            description="Парсинг вакансий по продажам",
+            action=lambda: run_script("sales_parser.py"),
+            rewrites_outputs=True,
+            inputs=lambda: ["sales_parser.py"],
+            outputs=lambda: [f"data/{today_str()}/{sales_parser.CSV_PREFIX}_{today_str()}.csv"],
+            params=lambda: {"date": today_str()},
+            fetch=True,
+        ),
+        Stage(
+            name="parse_zakup",
+            description="Парсинг вакансий по закупкам",
+            action=lambda: run_script("zakup_parser.py"),
+            rewrites_outputs=True,
+            inputs=lambda: ["zakup_parser.py"],
+            outputs=lambda: [f"data/{today_str()}/{zakup_parser.CSV_PREFIX}_{today_str()}.csv"],
+            params=lambda: {"date": today_str()},
+            fetch=True,
+        ),
+        Stage(
+            name="store",
+            description="Индекс снимков в хранилище",
+            action=build_store_index,
+            after=["parse_sales", "parse_zakup"],
+            inputs=lambda: ["data/*/*.csv", "data/*/*.meta.json"] + snapshot_manifests(),
+            outputs=lambda: [STORE_INDEX_FILE],
+        ),
+        Stage(
+            name="employers",
+            description="Индекс нормализации работодателей",
+            action=employers.rebuild_index,
+            deps=["store"],
+            inputs=lambda: ["data/*/*.csv", "employers.py"],
+            outputs=lambda: [employers.INDEX_FILE],
+        ),
+        Stage(
+            name="cube",
+            description="Куб агрегатов снимок × роль × работодатель × регион",
+            action=rollup_cube.rebuild_cube,
+            deps=["store"],
+            inputs=lambda: ["data/*/*.csv"] + rollup_cube.RULE_SOURCES,
+            outputs=lambda: [rollup_cube.CUBE_DB],
+        ),
+        Stage(
+            name="aggregates",
+            description="Сводная статистика по снимкам",
+            action=build_aggregates,
+            deps=["cube", "employers"],
+            inputs=lambda: [STORE_INDEX_FILE, employers.INDEX_FILE, rollup_cube.CUBE_DB],
+            outputs=lambda: [AGGREGATES_FILE],
+        ),
+        Stage(
+            name="dashboard",
+            description="Статический HTML-дашборд",
+            action=dashboard.rebuild_dashboard,
+            deps=["cube", "employers"],
+            inputs=lambda: [rollup_cube.CUBE_DB, employers.INDEX_FILE, "dashboard.py"],
+            outputs=lambda: [dashboard.DASHBOARD_FILE],
+        ),
+        Stage(
+            name="search_index",
+            description="Полнотекстовый индекс вакансий",
+            action=search_index.rebuild_search_index,
+            deps=["store"],
+            inputs=lambda: ["data/*/*.csv", "search_index.py", "russian_stemmer.py"] + search_index.RULE_SOURCES,
+            outputs=lambda: [search_index.INDEX_DB],
+        ),
+        Stage(
+            name="details",
+            description="Карточки новых и изменившихся вакансий",
+            action=vacancy_details.refresh_details,
+            deps=["store"],
+            inputs=lambda: ["data/*/*.csv", "vacancy_details.py"],
+            outputs=lambda: [vacancy_details.DETAILS_DB],
+            fetch=True,
+            optional=True,
+        ),
+        Stage(
+            name="changes",
+            description="Журналы изменений вакансий между снимками",
+            action=snapshot_diff.build_changelogs,
+            deps=["store"],
+            inputs=lambda: ["data/*/*.csv", "snapshot_diff.py"],
+            outputs=lambda: [snapshot_diff.CHANGES_DIR],
+        ),
+        Stage(
+            name="watchlist",
+            description="Совпадения новых и изменившихся вакансий с подписками",
+            action=watchlist.refresh_matches,
+            deps=["store"],
+            inputs=lambda: ["data/*/*.csv", watchlist.WATCHLIST_FILE, "watchlist.py", "salary_normalization.py",
+                            "data/currency_rates.csv"],
+            outputs=lambda: [watchlist.matches_path(date_str) for date_str in latest_snapshot()],
+        ),
+        Stage(
+            name="notify",
+            description="Уведомления в Telegram по совпадениям подписок",
+            action=notifier.notify,
+            deps=["watchlist"],
+            inputs=lambda: [watchlist.matches_path(date_str) for date_str in latest_snapshot()] + ["notifier.py"],
+            outputs=lambda: [notifier.NOTIFY_DB],
+        ),
+        Stage(
+            name="report_oct5",
+            description="Графики и Excel за 5 октября",
+            action=report("vacancy_analysis_oct5"),
+            rewrites_outputs=True,
+            deps=["aggregates"],
+            inputs=lambda: [rollup_cube.CUBE_DB, "data/2025-10-05/*.csv", "vacancy_analysis_oct5.py"],
+            outputs=lambda: ["report_oct5/oct5_detailed_report.xlsx"],
+        ),
+        Stage(
+            name="report_dynamics",
+            description="Графики и Excel динамики",
+            action=report("vacancy_dynamics_comparison"),
+            rewrites_outputs=True,
+            deps=["aggregates"],
+            after=["details"],
+            inputs=lambda: [rollup_cube.CUBE_DB, "data/2025-09-26/*.csv", "data/2025-10-05/*.csv",
+                            vacancy_details.DETAILS_DB, "vacancy_dynamics_comparison.py"],
+            outputs=lambda: ["report_dynamics/dynamics_report.xlsx"],
+        ),
+        Stage(
+            name="report_automated",
+            description="Автоматический отчёт",
+            action=report("create_automated_report"),
+            rewrites_outputs=True,
+            deps=["aggregates"],
+            inputs=lambda: [rollup_cube.CUBE_DB, "create_automated_report.py"],
+            outputs=lambda: ["report_automated/automated_report.xlsx"],
+        ),
+    ]
+
+
+def select_stages(stages: list, only: Optional[list], skip_fetch: bool, with_optional: bool = False) -> list:
+    """Отбирает этапы для запуска; зависимости вне выборки считаются выполненными"""
+    names = {stage.name for stage in stages}
+    if only:
+        unknown = set(only) - names
+        if unknown:
+            raise ValueError(f"Неизвестные этапы: {', '.join(sorted(unknown))}")
+    selected = [s for s in stages
+                if (s.name in only if only else with_optional or not s.optional) and not (skip_fetch and s.fetch)]
+    selected_names = {s.name for s in selected}
+    for stage in selected:
+        stage.deps = [dep for dep in stage.deps if dep in selected_names]
+        stage.after = [dep for dep in stage.after if dep in selected_names]
+    return selected
+
+
+def run_pipeline(stages: list, dry_run: bool = False, force: bool = False, jobs: int = 4) -> dict:
+    """Выполняет граф этапов и возвращает статусы: ran, planned, skipped, failed, blocked"""
+    state = load_state()
+    cache = FingerprintCache(state.get("files"))
+    by_name = {stage.name: stage for stage in stages}
+    status = {}
+
+    def needs_run(stage: Stage) -> bool:
+        previous = state["stages"].get(stage.name, {})
+        upstream_ran = any(status.get(dep) in ("ran", "planned") for dep in stage.deps + stage.after)
+        if force or upstream_ran or not outputs_exist(stage):
+            return True
+        return previous.get("fingerprint") != cache.fingerprint(stage)
+
+    def execute(stage: Stage) -> bool:
+        started = time.perf_counter()
+        # Точность mtime у некоторых ФС — секунда
+        started_at = int(time.time())
+        print(f"▶️  {stage.name}: {stage.description}")
+        metrics.increment("stages_run")
+        try:
+            ok = bool(stage.action())
+            if ok and not outputs_exist(stage, started_at if stage.rewrites_outputs else None):
+                if outputs_exist(stage):
+                    print(f"  ❌ {stage.name}: выходы не обновлены")
+                ok = False
+        except Exception as e:
+            print(f"  ❌ {stage.name}: {e}")
+            ok = False
+        elapsed = time.perf_counter() - started
+        metrics.observe(f"stage_{stage.name}", elapsed)
+        if ok:
+            # Отпечаток считаем заново: этап мог сам изменить свои входы
+            state["stages"][stage.name] = {
+                "fingerprint": cache.fingerprint(stage),
+                "finished_at": datetime.now().isoformat(timespec="seconds"),
+                "duration_sec": round(elapsed, 3),
+            }
+            print(f"✅ {stage.name} ({elapsed:.1f} сек)")
+        else:
+            print(f"❌ {stage.name} завершился с ошибкой ({elapsed:.1f} сек)")
+        return ok
+
+    pending = {stage.name for stage in stages}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+        while pending or running:
+            for name in sorted(pending):
+                stage = by_name[name]
+                dep_status = [status.get(dep) for dep in stage.deps]
+                if any(status.get(dep) is None for dep in stage.deps + stage.after):
+                    continue
+                pending.discard(name)
+
+                if any(s in ("failed", "blocked") for s in dep_status):
+                    status[name] = "blocked"
+                    print(f"⛔ {name}: пропущен из-за ошибки в зависимостях")
+                    continue
+
+                changed = needs_run(stage)
+                if not changed:
+                    status[name] = "skipped"
+                    print(f"⏭️  {name}: входы не изменились")
+                elif dry_run:
+                    status[name] = "planned"
+                    print(f"🔎 {name}: будет выполнен — {stage.description}")
+                else:
+                    running[pool.submit(execute, stage)] = name
+
+            if not running:
+                if pending and all(
+                    any(dep not in status for dep in by_name[n].deps + by_name[n].after) for n in pending
+                ):
+                    raise RuntimeError("Цикл в графе этапов: " + ", ".join(sorted(pending)))
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                status[name] = "ran" if future.result() else "failed"
+
+    if not dry_run:
+        state["files"] = cache.entries
+        save_state(state)
+    return status
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Инкрементальный пайплайн HH_Watcher")
+    parser.add_argument("--dry-run", action="store_true", help="показать, какие этапы будут выполнены")
+    parser.add_argument("--force", action="store_true", help="выполнить все этапы независимо от отпечатков")
+    parser.add_argument("--only", nargs="+", metavar="STAGE", help="запустить только указанные этапы")
+    parser.add_argument("--skip-fetch", action="store_true", help="не запускать парсеры (только анализ)")
+    parser.add_argument("--jobs", type=int, default=4, help="число параллельных этапов")
+    parser.add_argument("--with-optional", action="store_true",
+                        help="включить необязательные этапы (карточки вакансий)")
+    args = parser.parse_args()
+
+    print("🧩 ПАЙПЛАЙН HH_WATCHER" + (" (dry-run)" if args.dry_run else ""))
+    print("=" * 60)
+
+    started = time.perf_counter()
+    stages = select_stages(build_stages(), args.only, args.skip_fetch, args.with_optional)
+    status = run_pipeline(stages, dry_run=args.dry_run, force=args.force, jobs=args.jobs)
+
+    print("\n📋 ИТОГ:")
+    for stage in stages:
+        print(f"  • {stage.name}: {status.get(stage.name)}")
+    print(f"⏱️ Время: {time.perf_counter() - started:.2f} сек")
+    if not args.dry_run:
+        metrics.write_metrics("pipeline")
+
+    return 1 if any(s in ("failed", "blocked") for s in status.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+🚦 АДАПТИВНОЕ ОГРАНИЧЕНИЕ ЧАСТОТЫ ЗАПРОСОВ К API
+AIMD по скорости запросов, учёт Retry-After, экспоненциальный backoff с джиттером,
+бюджеты повторов по классам ошибок и circuit breaker.
+"""
+
+import email.utils
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+# Классы ошибок и сколько повторов разрешено на каждый
+RETRY_BUDGETS = {
+    "throttle": 5,   # 429 / 403 — сервер просит снизить частоту
+    "server": 3,     # 5xx
+    "network": 3,    # таймауты, обрывы соединения
+    "client": 0,     # прочие 4xx — повтор не поможет
+}
+
+
+class FetchError(Exception):
+    """Запрос окончательно не удался (после всех повторов)"""
+
+    def __init__(self, message: str, error_class: str, attempts: int = 0, status: int = None):
+        super().__init__(message)
+        self.error_class = error_class
+        self.attempts = attempts
+        self.status = status
+
+    def as_dict(self) -> dict:
+        return {
+            "error_class": self.error_class,
+            "attempts": self.attempts,
+            "status": self.status,
+            "message": str(self),
+        }
+
+
+def classify_status(status: int) -> str:
+    """Класс ошибки по HTTP-статусу"""
+    if status in (429, 403):
+        return "throttle"
+    if status >= 500:
+        return "server"
+    return "client"
+
+
+def parse_retry_after(value) -> float:
+    """Retry-After в секундах (поддерживаются число секунд и HTTP-дата)"""
+    if not value:
+        return 0.0
+    value = str(value).strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return 0.0
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Экспоненциальная задержка с полным джиттером"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class AdaptiveRateLimiter:
+    """AIMD-лимитер: аддитивно ускоряется на успехах, мультипликативно тормозит на 429/403"""
+
+    def __init__(self, initial_rate: float = 1.0, min_rate: float = 0.1, max_rate: float = 5.0,
+                 increase: float = 0.1, decrease_factor: float = 0.5):
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.next_slot = time.monotonic()
+        self.blocked_until = 0.0
+        self.throttle_events = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, stop_event=None) -> bool:
+        """Ждёт своего слота; возвращает False, если ожидание прервано stop_event"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot, self.blocked_until)
+            self.next_slot = slot + 1.0 / self.rate
+        delay = slot - time.monotonic()
+        if delay <= 0:
+            return True
+        if stop_event is None:
+            time.sleep(delay)
+            return True
+        return not stop_event.wait(delay)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after: float = 0.0):
+        with self._lock:
+            self.throttle_events += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            if retry_after > 0:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+
+class CircuitBreaker:
+    """Размыкается после серии подряд идущих неудач и пропускает пробный запрос после паузы.
+
+    В half_open проходит ровно один пробный запрос, остальные получают отказ, как
+    при open, пока он не завершится: успех замыкает breaker, неудача снова
+    размыкает. Пробный запрос, не сообщивший исход за cooldown (остановлен,
+    ответ 4xx), считается потерянным — пропускается следующий.
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 120.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state != "half_open":
+                return state == "closed"
+            now = time.monotonic()
+            if self.probe_started_at is not None and now - self.probe_started_at < self.cooldown:
+                return False
+            self.probe_started_at = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probe_started_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self.probe_started_at = None
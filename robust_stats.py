@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+🛡️ Устойчивая статистика зарплат
+Одна ошибочная вакансия на 5 000 000 ₽ заметно сдвигает обычную среднюю, поэтому
+рядом с ней в отчётах показываются оценки, нечувствительные к выбросам:
+
+- флаги выбросов по MAD (модифицированный z-score), а при MAD = 0 — по IQR;
+- усечённая и винзоризованная средние (по 10% с каждой стороны);
+- 95% доверительный интервал медианы бутстрэпом.
+
+Всё считается векторно за один проход по группам (роль, работодатель):
+значения сортируются внутри групп один раз, границы групп дают медианы,
+квартили и суммы через cumsum. Бутстрэп — пакетная выборка индексов NumPy
+сразу для всех групп, без циклов Python по повторам.
+
+sketch_summary считает те же колонки по скетчу «значение → сколько раз»
+(куб rollup_cube): ранги берутся из накопленных весов, а ДИ медианы — по
+порядковым статистикам, без бутстрэпа (повторять нечего — строк нет).
+"""
+
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+import metrics
+
+# Порог модифицированного z-score (Iglewicz & Hoaglin): 0.6745 · |x − медиана| / MAD
+MAD_THRESHOLD = 3.5
+MAD_SCALE = 0.6745
+
+# Правило Тьюки для групп с MAD = 0: за пределами [Q1 − 1.5·IQR, Q3 + 1.5·IQR]
+IQR_FACTOR = 1.5
+
+# В группах меньше этого размера выбросы не ищутся
+MIN_OUTLIER_GROUP = 5
+
+# Доля отсекаемых значений с каждой стороны для усечённой и винзоризованной средних
+TRIM_PROPORTION = 0.1
+
+BOOTSTRAP_SAMPLES = 1000
+CONFIDENCE = 0.95
+# Большие группы ресэмплируются по m из n значений с поправкой ширины √(m/n)
+BOOTSTRAP_MAX_VALUES = 400
+# Ячеек (повторы × значения) в одном пакете бутстрэпа — ограничивает память
+BOOTSTRAP_BATCH_CELLS = 2 ** 22
+BOOTSTRAP_SEED = 0
+
+# Подписи колонок grouped_summary для Excel-отчётов
+COLUMN_LABELS = {
+    "count": "Количество",
+    "mean": "Средняя",
+    "trimmed_mean": "Усечённая средняя",
+    "winsorized_mean": "Винзоризованная средняя",
+    "median": "Медиана",
+    "median_ci_low": "Медиана: 95% ДИ от",
+    "median_ci_high": "Медиана: 95% ДИ до",
+    "q25": "25-й процентиль",
+    "q75": "75-й процентиль",
+    "mad": "MAD",
+    "min": "Минимум",
+    "max": "Максимум",
+    "std": "Разброс",
+    "outliers": "Выбросов",
+}
+
+
+def _group_layout(values, codes):
+    """Сортировка по (группа, значение): отсортированные значения, порядок, начала и размеры групп"""
+    order = np.lexsort((values, codes))
+    sorted_codes = codes[order]
+    group_count = int(sorted_codes[-1]) + 1 if len(sorted_codes) else 0
+    sizes = np.bincount(sorted_codes, minlength=group_count)
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int64)
+    return values[order], order, starts, sizes
+
+
+def _quantile(sorted_values, starts, sizes, q):
+    """Квантиль каждой группы с линейной интерполяцией (как np.percentile)"""
+    position = starts + q * (sizes - 1)
+    low = np.floor(position).astype(np.int64)
+    high = np.minimum(low + 1, starts + sizes - 1)
+    fraction = position - low
+    return sorted_values[low] * (1 - fraction) + sorted_values[high] * fraction
+
+
+def _median(sorted_values, starts, sizes):
+    return (sorted_values[starts + (sizes - 1) // 2] + sorted_values[starts + sizes // 2]) / 2
+
+
+def _bootstrap_median_ci(sorted_values, starts, sizes, samples, confidence, seed):
+    """ДИ медианы по группам: пакеты повторов × все группы одним массивом индексов.
+
+    Индексы повтора для группы g лежат в [start_g, start_g + n_g), а значения
+    внутри группы отсортированы, поэтому после сортировки строки индексов
+    медиана группы берётся по фиксированным позициям — без сортировки значений.
+    """
+    rng = np.random.default_rng(seed)
+    draws = np.minimum(sizes, BOOTSTRAP_MAX_VALUES)
+    draw_offsets = np.concatenate(([0], np.cumsum(draws)[:-1]))
+    slot_group = np.repeat(np.arange(len(sizes)), draws)
+    slot_start = starts[slot_group].astype(np.int32)
+    slot_size = sizes[slot_group]
+    low_slot = draw_offsets + (draws - 1) // 2
+    high_slot = draw_offsets + draws // 2
+
+    medians = np.empty((samples, len(sizes)))
+    batch = max(1, BOOTSTRAP_BATCH_CELLS // max(len(slot_group), 1))
+    for first in range(0, samples, batch):
+        rows = min(batch, samples - first)
+        indices = slot_start + (rng.random((rows, len(slot_group))) * slot_size).astype(np.int32)
+        indices.sort(axis=1)
+        medians[first:first + rows] = (sorted_values[indices[:, low_slot]] + sorted_values[indices[:, high_slot]]) / 2
+
+    alpha = (1 - confidence) / 2
+    ci_low, ci_high = np.quantile(medians, [alpha, 1 - alpha], axis=0)
+    # m из n: ширина интервала по выборке из m значений масштабируется на √(m/n)
+    center = _median(sorted_values, starts, sizes)
+    scale = np.sqrt(draws / sizes)
+    return center - (center - ci_low) * scale, center + (ci_high - center) * scale
+
+
+def _robust_frame(values, codes, bootstrap_samples, confidence, seed):
+    """Статистики по группам (индекс — код группы) и флаги выбросов в исходном порядке"""
+    sorted_values, order, starts, sizes = _group_layout(values, codes)
+    ends = starts + sizes
+    group_of_sorted = np.repeat(np.arange(len(sizes)), sizes)
+
+    median = _median(sorted_values, starts, sizes)
+    q25 = _quantile(sorted_values, starts, sizes, 0.25)
+    q75 = _quantile(sorted_values, starts, sizes, 0.75)
+
+    # MAD: медиана отклонений, отсортированных внутри групп вторым lexsort
+    deviation = np.abs(sorted_values - median[group_of_sorted])
+    sorted_deviation = deviation[np.lexsort((deviation, group_of_sorted))]
+    mad = _median(sorted_deviation, starts, sizes)
+
+    # Выбросы: MAD, а если MAD = 0 (больше половины одинаковых значений) — IQR
+    iqr = q75 - q25
+    with np.errstate(divide="ignore", invalid="ignore"):
+        by_mad = MAD_SCALE * deviation / mad[group_of_sorted] > MAD_THRESHOLD
+    by_iqr = ((sorted_values < (q25 - IQR_FACTOR * iqr)[group_of_sorted])
+              | (sorted_values > (q75 + IQR_FACTOR * iqr)[group_of_sorted]))
+    flags_sorted = np.where(mad[group_of_sorted] > 0, by_mad, by_iqr)
+    flags_sorted &= (sizes >= MIN_OUTLIER_GROUP)[group_of_sorted]
+    flags = np.empty(len(values), dtype=bool)
+    flags[order] = flags_sorted
+
+    # Усечённая и винзоризованная средние через префиксные суммы
+    trim = np.floor(sizes * TRIM_PROPORTION).astype(np.int64)
+    prefix = np.concatenate(([0.0], np.cumsum(sorted_values)))
+    middle_sum = prefix[ends - trim] - prefix[starts + trim]
+    trimmed_mean = middle_sum / (sizes - 2 * trim)
+    winsorized_mean = (middle_sum + trim * sorted_values[starts + trim]
+                       + trim * sorted_values[ends - trim - 1]) / sizes
+
+    total = prefix[ends] - prefix[starts]
+    mean = total / sizes
+    squares = np.concatenate(([0.0], np.cumsum((sorted_values - mean[group_of_sorted]) ** 2)))
+    std = np.sqrt((squares[ends] - squares[starts]) / sizes)
+
+    stats = {
+        "count": sizes,
+        "mean": mean,
+        "trimmed_mean": trimmed_mean,
+        "winsorized_mean": winsorized_mean,
+        "median": median,
+    }
+    if bootstrap_samples:
+        stats["median_ci_low"], stats["median_ci_high"] = _bootstrap_median_ci(
+            sorted_values, starts, sizes, bootstrap_samples, confidence, seed)
+    stats.update({
+        "q25": q25,
+        "q75": q75,
+        "mad": mad,
+        "min": sorted_values[starts],
+        "max": sorted_values[ends - 1],
+        "std": std,
+        "outliers": np.bincount(group_of_sorted[flags_sorted], minlength=len(sizes)),
+    })
+    return pd.DataFrame(stats), flags
+
+
+def _prepare(df, by, column):
+    """Значения с зарплатой и коды групп (NaN в ключе группы — отдельно не считается)"""
+    values = df[column].to_numpy(dtype="float64", na_value=np.nan)
+    valid = ~np.isnan(values)
+    if by is None:
+        codes, uniques = np.zeros(len(df), dtype=np.int64), pd.Index(["Все"])
+    else:
+        codes, uniques = pd.factorize(df[by])
+        valid &= codes >= 0
+    return values, valid, codes, uniques
+
+
+@metrics.timed()
+def grouped_summary(df, by=None, column: str = "salary_avg", bootstrap_samples: int = BOOTSTRAP_SAMPLES,
+                    confidence: float = CONFIDENCE, seed: int = BOOTSTRAP_SEED):
+    """Устойчивая статистика по группам `by` (или по всей таблице) — DataFrame, индекс — группа.
+
+    Колонки: count, mean, trimmed_mean, winsorized_mean, median, median_ci_low,
+    median_ci_high, q25, q75, mad, min, max, std, outliers (см. COLUMN_LABELS).
+    """
+    values, valid, codes, uniques = _prepare(df, by, column)
+    if not valid.any():
+        return pd.DataFrame(columns=list(COLUMN_LABELS), index=pd.Index([], name=by))
+
+    # Перекодируем только группы, где есть зарплаты
+    present, group_codes = np.unique(codes[valid], return_inverse=True)
+    stats, _ = _robust_frame(values[valid], group_codes.astype(np.int64), bootstrap_samples, confidence, seed)
+    stats.index = pd.Index(np.asarray(uniques)[present], name=by)
+    return stats
+
+
+@metrics.timed()
+def flag_outliers(df, by=None, column: str = "salary_avg"):
+    """Булев Series: зарплата — выброс внутри своей группы `by` (или всей таблицы)"""
+    values, valid, codes, _ = _prepare(df, by, column)
+    flags = np.zeros(len(df), dtype=bool)
+    if valid.any():
+        _, group_codes = np.unique(codes[valid], return_inverse=True)
+        _, flags[valid] = _robust_frame(values[valid], group_codes.astype(np.int64), 0, CONFIDENCE, BOOTSTRAP_SEED)
+    return pd.Series(flags, index=df.index, name="salary_outlier")
+
+
+def summarize(values, bootstrap_samples: int = BOOTSTRAP_SAMPLES, confidence: float = CONFIDENCE,
+              seed: int = BOOTSTRAP_SEED) -> dict:
+    """Устойчивая статистика одного набора зарплат: {колонка grouped_summary: число}"""
+    frame = pd.DataFrame({"salary_avg": np.asarray(values, dtype="float64")})
+    stats = grouped_summary(frame, bootstrap_samples=bootstrap_samples, confidence=confidence, seed=seed)
+    if stats.empty:
+        return {name: 0 for name in COLUMN_LABELS}
+    summary = {name: float(value) for name, value in stats.iloc[0].items()}
+    summary["count"], summary["outliers"] = int(summary["count"]), int(summary["outliers"])
+    return summary
+
+
+def trimmed_mean(values, proportion: float = TRIM_PROPORTION) -> float:
+    """Средняя без доли `proportion` наименьших и наибольших значений"""
+    ordered = np.sort(np.asarray(values, dtype="float64"))
+    trim = int(len(ordered) * proportion)
+    return float(ordered[trim:len(ordered) - trim].mean()) if len(ordered) else float("nan")
+
+
+def winsorized_mean(values, proportion: float = TRIM_PROPORTION) -> float:
+    """Средняя, где крайние доли `proportion` заменены ближайшими оставшимися значениями"""
+    ordered = np.sort(np.asarray(values, dtype="float64"))
+    trim = int(len(ordered) * proportion)
+    if not len(ordered):
+        return float("nan")
+    if trim:
+        ordered[:trim] = ordered[trim]
+        ordered[len(ordered) - trim:] = ordered[len(ordered) - trim - 1]
+    return float(ordered.mean())
+
+
+@metrics.timed()
+def sketch_summary(values, counts, codes, group_count: int = None, confidence: float = CONFIDENCE):
+    """Колонки grouped_summary по взвешенным значениям: значение values[i] встречается counts[i] раз в группе codes[i].
+
+    Индекс результата — код группы 0..group_count-1 (в каждой группе должно быть хоть одно значение).
+    """
+    values = np.asarray(values, dtype="float64")
+    counts = np.asarray(counts, dtype=np.int64)
+    codes = np.asarray(codes, dtype=np.int64)
+    if group_count is None:
+        group_count = int(codes.max()) + 1 if len(codes) else 0
+    if not len(values):
+        return pd.DataFrame(columns=list(COLUMN_LABELS))
+
+    order = np.lexsort((values, codes))
+    sorted_values, weights, group_of_sorted = values[order], counts[order], codes[order]
+    sizes = np.bincount(group_of_sorted, weights=weights, minlength=group_count).astype(np.int64)
+    ends = np.cumsum(sizes)
+    starts = ends - sizes
+    cumulative = np.cumsum(weights)
+
+    def value_at(ranks, cumulative=cumulative, ordered=sorted_values):
+        """Значение с рангом ranks (с нуля) среди всех значений, развёрнутых по весам"""
+        return ordered[np.searchsorted(cumulative, ranks, side="right")]
+
+    def quantile(q):
+        position = starts + q * (sizes - 1)
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, ends - 1)
+        fraction = position - low
+        return value_at(low) * (1 - fraction) + value_at(high) * fraction
+
+    # Сумма значений с рангом меньше ranks — для средних через префиксные суммы
+    weighted = sorted_values * weights
+    sum_before = np.cumsum(weighted) - weighted
+    rank_before = cumulative - weights
+
+    def sum_below(ranks):
+        position = np.minimum(np.searchsorted(cumulative, ranks, side="right"), len(sorted_values) - 1)
+        return sum_before[position] + (ranks - rank_before[position]) * sorted_values[position]
+
+    median = (value_at(starts + (sizes - 1) // 2) + value_at(starts + sizes // 2)) / 2
+    q25, q75 = quantile(0.25), quantile(0.75)
+
+    # MAD: взвешенная медиана отклонений, отсортированных внутри групп вторым lexsort
+    deviation = np.abs(sorted_values - median[group_of_sorted])
+    deviation_order = np.lexsort((deviation, group_of_sorted))
+    deviation_cumulative = np.cumsum(weights[deviation_order])
+    sorted_deviation = deviation[deviation_order]
+    mad = (value_at(starts + (sizes - 1) // 2, deviation_cumulative, sorted_deviation)
+           + value_at(starts + sizes // 2, deviation_cumulative, sorted_deviation)) / 2
+
+    # Выбросы — те же правила, что в _robust_frame, с учётом кратности значений
+    iqr = q75 - q25
+    with np.errstate(divide="ignore", invalid="ignore"):
+        by_mad = MAD_SCALE * deviation / mad[group_of_sorted] > MAD_THRESHOLD
+    by_iqr = ((sorted_values < (q25 - IQR_FACTOR * iqr)[group_of_sorted])
+              | (sorted_values > (q75 + IQR_FACTOR * iqr)[group_of_sorted]))
+    flags = np.where(mad[group_of_sorted] > 0, by_mad, by_iqr) & (sizes >= MIN_OUTLIER_GROUP)[group_of_sorted]
+
+    trim = np.floor(sizes * TRIM_PROPORTION).astype(np.int64)
+    middle_sum = sum_below(ends - trim) - sum_below(starts + trim)
+    mean = (sum_below(ends) - sum_below(starts)) / sizes
+    squares = np.bincount(group_of_sorted, weights=weights * (sorted_values - mean[group_of_sorted]) ** 2,
+                          minlength=group_count)
+
+    # ДИ медианы по порядковым статистикам: ранги n/2 ∓ z·√n/2 (1-based)
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    half_width = z * np.sqrt(sizes) / 2
+    low_rank = np.clip(np.floor(sizes / 2 - half_width).astype(np.int64), 1, sizes)
+    high_rank = np.clip(np.ceil(1 + sizes / 2 + half_width).astype(np.int64), 1, sizes)
+
+    return pd.DataFrame({
+        "count": sizes,
+        "mean": mean,
+        "trimmed_mean": middle_sum / (sizes - 2 * trim),
+        "winsorized_mean": (middle_sum + trim * value_at(starts + trim) + trim * value_at(ends - trim - 1)) / sizes,
+        "median": median,
+        "median_ci_low": value_at(starts + low_rank - 1),
+        "median_ci_high": value_at(starts + high_rank - 1),
+        "q25": q25,
+        "q75": q75,
+        "mad": mad,
+        "min": value_at(starts),
+        "max": value_at(ends - 1),
+        "std": np.sqrt(squares / sizes),
+        "outliers": np.bincount(group_of_sorted, weights=weights * flags, minlength=group_count).astype(np.int64),
+    })
+
+
+def label_columns(stats):
+    """Копия grouped_summary с русскими подписями колонок и целыми рублями"""
+    return stats.round(0).rename(columns=COLUMN_LABELS)
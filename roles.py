@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+🏷️ КАТЕГОРИИ РОЛЕЙ
+Одни правила для куба агрегатов, поискового индекса и листов с данными
+отчётов: категория определяется по ключевым словам в названии вакансии,
+срабатывает первое подходящее правило. Модуль входит в RULE_SOURCES куба и
+поискового индекса — при изменении правил пересчитываются оба.
+"""
+
+import functools
+
+import metrics
+
+UNKNOWN_ROLE = "Неизвестно"
+OTHER_ROLE = "Другое"
+
+# (категория, ключевые слова в названии) в порядке проверки
+ROLE_RULES = [
+    ("Продажи", ["продаж", "sales", "менеджер по продаж", "руководитель продаж"]),
+    ("Закупки", ["закуп", "закупк", "закупщик", "снабжен"]),
+    ("Проекты", ["проект", "project", "менеджер проект", "руководитель проект"]),
+    ("Менеджмент", ["менеджер", "руководитель", "директор"]),
+]
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def role_category(title) -> str:
+    """Категория роли по названию вакансии; ответы кэшируются на время жизни процесса
+    (в демоне названия повторяются от цикла к циклу)"""
+    if not isinstance(title, str):
+        return UNKNOWN_ROLE
+    title_lower = title.lower()
+    for category, keywords in ROLE_RULES:
+        if any(keyword in title_lower for keyword in keywords):
+            return category
+    return OTHER_ROLE
+
+
+@metrics.timed()
+def categorize_roles(df):
+    """Добавляет категориальную колонку role_category (считается по уникальным названиям)"""
+    from frame_schema import map_unique
+
+    if len(df) == 0:
+        return df
+    df['role_category'] = map_unique(df['Название вакансии'], role_category)
+    return df
@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+🧊 КУБ АГРЕГАТОВ: СНИМОК × РОЛЬ × РАБОТОДАТЕЛЬ × РЕГИОН
+Отчёты считают графики и листы Excel не по строкам вакансий, а по срезам
+заранее посчитанного куба data/rollup_cube.sqlite. Одна ячейка куба —
+сочетание (снимок, категория роли, работодатель, регион) с мерами:
+
+- vacancies / unique_vacancies — вакансий всего и без почти-дубликатов;
+- with_salary / unique_with_salary — то же среди вакансий с зарплатой;
+- salary_sum, salary_sq_sum, salary_min, salary_max — точные средняя, σ,
+  минимум и максимум при любом объединении ячеек;
+- скетч зарплат ячейки (таблица sketch): зарплата, округлённая до
+  SKETCH_DIGITS значащих цифр → число вакансий. Скетчи складываются, поэтому
+  медиана, квантили, усечённые средние, MAD и выбросы любого среза считаются
+  по нему (robust_stats.sketch_summary) без исходных строк.
+
+Куб обновляется по снимку: пересчитываются только новые и изменившиеся
+снимки (имена, размеры, mtime CSV), удалённые — выбрасываются. Если меняются
+правила (категории ролей, нормализация зарплат, курсы, поиск дубликатов),
+куб перестраивается целиком.
+
+Работодатель хранится устойчивым идентификатором («id:<id hh.ru>» или
+«name:<нормализованное название>»), а ключ и каноническое название
+подставляются из индекса employers при чтении — куб не устаревает, когда
+индекс работодателей перестраивается.
+
+Запуск из корня проекта:
+    python rollup_cube.py                      # обновить куб и показать итоги по снимкам
+    python rollup_cube.py --by role --date 2025-10-05
+    python rollup_cube.py --rebuild
+"""
+
+import argparse
+import hashlib
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+import metrics
+from search_index import snapshot_signature
+from snapshot_diff import DATA_DIR, list_snapshots
+
+CUBE_DB = DATA_DIR / "rollup_cube.sqlite"
+
+# Версия схемы базы (PRAGMA user_version): при несовпадении таблицы пересоздаются
+SCHEMA_VERSION = 1
+
+# Значащих цифр зарплаты в скетче: 123 456 ₽ → 123 000 ₽ (погрешность квантилей ≤ 0.5%)
+SKETCH_DIGITS = 3
+
+AREA_COLUMN = "Регион"
+UNKNOWN_AREA = "Не указан"
+
+# Файлы, от которых зависят значения ячеек: изменились — куб перестраивается
+RULE_SOURCES = ["rollup_cube.py", "roles.py", "salary_normalization.py", "near_duplicates.py",
+                "data/currency_rates.csv"]
+
+DIMENSIONS = ["snapshot", "role", "employer", "area"]
+COUNT_MEASURES = ["vacancies", "unique_vacancies", "with_salary", "unique_with_salary"]
+SUM_MEASURES = COUNT_MEASURES + ["salary_sum", "salary_sq_sum"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    date TEXT PRIMARY KEY,
+    signature TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    cells INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cells (
+    id INTEGER PRIMARY KEY,
+    snapshot TEXT NOT NULL,
+    role TEXT NOT NULL,
+    employer TEXT NOT NULL,
+    area TEXT NOT NULL,
+    vacancies INTEGER NOT NULL,
+    unique_vacancies INTEGER NOT NULL,
+    with_salary INTEGER NOT NULL,
+    unique_with_salary INTEGER NOT NULL,
+    salary_sum REAL NOT NULL,
+    salary_sq_sum REAL NOT NULL,
+    salary_min REAL,
+    salary_max REAL
+);
+CREATE INDEX IF NOT EXISTS cells_snapshot ON cells(snapshot);
+CREATE TABLE IF NOT EXISTS sketch (
+    cell INTEGER NOT NULL,
+    value INTEGER NOT NULL,
+    count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sketch_cell ON sketch(cell);
+"""
+
+
+def connect(path: Path = CUBE_DB) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(path)
+    if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        connection.executescript("DROP TABLE IF EXISTS sketch; DROP TABLE IF EXISTS cells;"
+                                 " DROP TABLE IF EXISTS snapshots; DROP TABLE IF EXISTS meta;")
+        connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def rules_signature() -> str:
+    """Хэш файлов RULE_SOURCES — по нему видно, что ячейки надо пересчитать все"""
+    digest = hashlib.sha1()
+    for name in RULE_SOURCES:
+        path = Path(name)
+        digest.update(name.encode("utf-8"))
+        digest.update(path.read_bytes() if path.exists() else b"")
+    return digest.hexdigest()
+
+
+def quantize(values):
+    """Округление до SKETCH_DIGITS значащих цифр (целые рубли не дробятся)"""
+    values = np.asarray(values, dtype="float64")
+    magnitude = np.floor(np.log10(np.maximum(np.abs(values), 1)))
+    step = 10 ** np.maximum(magnitude - (SKETCH_DIGITS - 1), 0)
+    return np.round(values / step) * step
+
+
+def employer_identities(df):
+    """Устойчивый идентификатор работодателя каждой строки (категориальная колонка).
+
+    Как в employers.add_employer_keys, разбираются только уникальные пары (название, id).
+    """
+    import pandas as pd
+    from employers import EMPLOYER_ID_COLUMN, normalize_company_name
+
+    names = df["Компания"] if "Компания" in df else pd.Series([""] * len(df), index=df.index)
+    name_codes, name_uniques = pd.factorize(names)
+    if EMPLOYER_ID_COLUMN in df:
+        employer_ids = pd.to_numeric(df[EMPLOYER_ID_COLUMN], errors="coerce").fillna(-1).astype("int64")
+        id_codes, id_uniques = pd.factorize(employer_ids)
+    else:
+        id_codes, id_uniques = np.zeros(len(df), dtype=np.int64), np.array([-1])
+
+    pair_codes, pair_uniques = pd.factorize(name_codes.astype(np.int64) * len(id_uniques) + id_codes)
+    identities = []
+    for pair in pair_uniques:
+        name_code, id_code = divmod(int(pair), len(id_uniques))
+        employer_id = int(id_uniques[id_code])
+        if employer_id >= 0:
+            identities.append(f"id:{employer_id}")
+        else:
+            identities.append(f"name:{normalize_company_name(name_uniques[name_code] if name_code >= 0 else '')}")
+    identity_codes, categories = pd.factorize(pd.Series(identities, dtype="object"))
+    return pd.Series(pd.Categorical.from_codes(identity_codes[pair_codes], categories), index=df.index)
+
+
+@metrics.timed()
+def snapshot_cells(df):
+    """Ячейки и скетч одного снимка: (cells без колонки snapshot, sketch с локальными номерами ячеек)"""
+    import pandas as pd
+    from roles import categorize_roles
+    from near_duplicates import mark_duplicates
+    from salary_normalization import normalize_salaries
+
+    df = categorize_roles(normalize_salaries(mark_duplicates(df)))
+    area = df[AREA_COLUMN] if AREA_COLUMN in df else pd.Series(np.nan, index=df.index)
+    dimensions = pd.DataFrame({
+        "role": df["role_category"],
+        "employer": employer_identities(df),
+        "area": area.astype("object").where(area.notna() & (area.astype("object") != ""), UNKNOWN_AREA),
+    })
+    codes = dimensions.groupby(["role", "employer", "area"], observed=True, sort=True).ngroup().to_numpy()
+    cell_count = int(codes.max()) + 1
+    _, first_rows = np.unique(codes, return_index=True)
+
+    salary = df["salary_avg"].to_numpy(dtype="float64", na_value=np.nan)
+    has_salary = ~np.isnan(salary)
+    first_of_cluster = ~df["is_duplicate"].to_numpy()
+    # Кластер без дубликатов среди вакансий с зарплатой считается по первой вакансии с зарплатой
+    clusters = df["dup_cluster"].to_numpy()
+    salaried_rows = np.flatnonzero(has_salary)
+    first_salaried = np.zeros(len(df), dtype=bool)
+    first_salaried[salaried_rows[np.unique(clusters[salaried_rows], return_index=True)[1]]] = True
+
+    paid = np.where(has_salary, salary, 0.0)
+    cells = dimensions.iloc[first_rows].astype("object").reset_index(drop=True)
+    cells["vacancies"] = np.bincount(codes, minlength=cell_count)
+    cells["unique_vacancies"] = np.bincount(codes, weights=first_of_cluster, minlength=cell_count).astype(np.int64)
+    cells["with_salary"] = np.bincount(codes, weights=has_salary, minlength=cell_count).astype(np.int64)
+    cells["unique_with_salary"] = np.bincount(codes, weights=first_salaried, minlength=cell_count).astype(np.int64)
+    cells["salary_sum"] = np.bincount(codes, weights=paid, minlength=cell_count)
+    cells["salary_sq_sum"] = np.bincount(codes, weights=paid ** 2, minlength=cell_count)
+    extremes = pd.Series(salary[has_salary]).groupby(codes[has_salary]).agg(["min", "max"]).reindex(range(cell_count))
+    cells["salary_min"] = extremes["min"].to_numpy()
+    cells["salary_max"] = extremes["max"].to_numpy()
+
+    sketch = (pd.DataFrame({"cell": codes[has_salary], "value": quantize(salary[has_salary]).astype(np.int64)})
+              .groupby(["cell", "value"]).size().rename("count").reset_index())
+    return cells, sketch
+
+
+def drop_snapshot(connection: sqlite3.Connection, date_str: str):
+    connection.execute("DELETE FROM sketch WHERE cell IN (SELECT id FROM cells WHERE snapshot = ?)", (date_str,))
+    connection.execute("DELETE FROM cells WHERE snapshot = ?", (date_str,))
+    connection.execute("DELETE FROM snapshots WHERE date = ?", (date_str,))
+
+
+def store_snapshot(connection: sqlite3.Connection, date_str: str, signature: str) -> int:
+    """Заменяет ячейки снимка в кубе (одна транзакция); возвращает число ячеек"""
+    from frame_schema import load_snapshot
+
+    df = load_snapshot(date_str)
+    with connection:
+        drop_snapshot(connection, date_str)
+        cell_count = 0
+        if len(df):
+            cells, sketch = snapshot_cells(df)
+            cell_count = len(cells)
+            first_id = connection.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM cells").fetchone()[0]
+            cells.insert(0, "snapshot", date_str)
+            cells.insert(0, "id", np.arange(first_id, first_id + cell_count))
+            columns = list(cells.columns)
+            rows = (tuple(None if value != value else value for value in row)
+                    for row in cells.astype("object").itertuples(index=False, name=None))
+            connection.executemany(f"INSERT INTO cells ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                                   rows)
+            connection.executemany("INSERT INTO sketch (cell, value, count) VALUES (?, ?, ?)",
+                                   zip((sketch["cell"] + first_id).tolist(), sketch["value"].tolist(),
+                                       sketch["count"].tolist()))
+        connection.execute("INSERT INTO snapshots (date, signature, rows, cells) VALUES (?, ?, ?, ?)",
+                           (date_str, signature, len(df), cell_count))
+    return cell_count
+
+
+@metrics.timed("rollup_cube_update")
+def update_cube(force: bool = False) -> dict:
+    """Пересчитывает ячейки новых и изменившихся снимков; возвращает {дата: ячеек}"""
+    connection = connect()
+    try:
+        rules = rules_signature()
+        stored_rules = connection.execute("SELECT value FROM meta WHERE key = 'rules'").fetchone()
+        if force or stored_rules is None or stored_rules[0] != rules:
+            with connection:
+                connection.execute("DELETE FROM sketch")
+                connection.execute("DELETE FROM cells")
+                connection.execute("DELETE FROM snapshots")
+                connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('rules', ?)", (rules,))
+
+        known = dict(connection.execute("SELECT date, signature FROM snapshots"))
+        snapshots = list_snapshots() if DATA_DIR.exists() else []
+        for date_str in set(known) - set(snapshots):
+            with connection:
+                drop_snapshot(connection, date_str)
+            print(f"  🗑️ Снимок {date_str} удалён из куба")
+
+        updated = {}
+        for date_str in snapshots:
+            signature = snapshot_signature(date_str)
+            if known.get(date_str) == signature:
+                continue
+            updated[date_str] = store_snapshot(connection, date_str, signature)
+            metrics.increment("rollup_cube_snapshots")
+            print(f"  🧊 Снимок {date_str} в кубе: {updated[date_str]} ячеек")
+        return updated
+    finally:
+        connection.close()
+
+
+def rebuild_cube() -> bool:
+    """Действие этапа пайплайна"""
+    update_cube()
+    return True
+
+
+class Cube:
+    """Срез куба: ячейки (строка — снимок × роль × работодатель × регион) и скетч их зарплат.
+
+    cells — DataFrame с индексом id ячейки, измерениями snapshot, role, area,
+    employer_key, employer_name и мерами; sketch — колонки cell, value, count.
+    """
+
+    def __init__(self, cells, sketch):
+        self.cells = cells
+        self.sketch = sketch
+
+    def __len__(self):
+        return len(self.cells)
+
+    @property
+    def snapshots(self) -> list:
+        return sorted(self.cells["snapshot"].unique())
+
+    def slice(self, **filters) -> "Cube":
+        """Подкуб: значение измерения — скаляр или список (snapshot='2025-10-05', role=['Продажи'])"""
+        mask = np.ones(len(self.cells), dtype=bool)
+        for column, value in filters.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            mask &= self.cells[column].isin(values).to_numpy()
+        cells = self.cells[mask]
+        return Cube(cells, self.sketch[self.sketch["cell"].isin(cells.index)])
+
+    def rollup(self, by) -> "pd.DataFrame":
+        """Суммы мер по измерениям by (строка или список), с минимумом и максимумом зарплаты"""
+        grouped = self.cells.groupby(by, observed=True, sort=True)
+        totals = grouped[SUM_MEASURES].sum()
+        totals["salary_min"] = grouped["salary_min"].min()
+        totals["salary_max"] = grouped["salary_max"].max()
+        return totals
+
+    def employer_names(self):
+        """Series: ключ работодателя → каноническое название"""
+        return self.cells.drop_duplicates("employer_key").set_index("employer_key")["employer_name"]
+
+    @metrics.timed("rollup_cube_summary")
+    def summary(self, by=None):
+        """Колонки robust_stats.grouped_summary по группам by (или по всему срезу) из скетча.
+
+        Средняя, σ, минимум и максимум — точные (по суммам ячеек), квантили и
+        устойчивые оценки — по скетчу.
+        """
+        import pandas as pd
+        from robust_stats import COLUMN_LABELS, sketch_summary
+
+        cells = self.cells[self.cells["with_salary"] > 0]
+        if cells.empty:
+            return pd.DataFrame(columns=list(COLUMN_LABELS), index=pd.Index([], name=by))
+        if by is None:
+            codes, groups = np.zeros(len(cells), dtype=np.int64), pd.Index(["Все"])
+        else:
+            grouped = cells.groupby(by, observed=True, sort=True)
+            codes, groups = grouped.ngroup().to_numpy(), grouped.size().index
+
+        sketch_codes = pd.Series(codes, index=cells.index).reindex(self.sketch["cell"]).to_numpy()
+        stats = sketch_summary(self.sketch["value"].to_numpy(), self.sketch["count"].to_numpy(), sketch_codes,
+                               len(groups))
+        count = np.bincount(codes, weights=cells["with_salary"], minlength=len(groups))
+        mean = np.bincount(codes, weights=cells["salary_sum"], minlength=len(groups)) / count
+        squares = np.bincount(codes, weights=cells["salary_sq_sum"], minlength=len(groups)) / count
+        stats["mean"] = mean
+        stats["std"] = np.sqrt(np.maximum(squares - mean ** 2, 0))
+        stats["min"] = pd.Series(cells["salary_min"].to_numpy()).groupby(codes).min().to_numpy()
+        stats["max"] = pd.Series(cells["salary_max"].to_numpy()).groupby(codes).max().to_numpy()
+        stats.index = groups
+        return stats
+
+    def top_employers(self, limit: int):
+        """Топ работодателей по числу вакансий с зарплатой: Series {каноническое название: количество}"""
+        counts = self.rollup("employer_key")["with_salary"]
+        counts = counts[counts > 0].sort_values(ascending=False, kind="stable").head(limit)
+        counts.index = self.employer_names().reindex(counts.index).values
+        return counts
+
+    def histogram(self, bins: int):
+        """Гистограмма зарплат по скетчу: (число вакансий, границы интервалов) как у np.histogram"""
+        if self.sketch.empty:
+            return np.zeros(bins, dtype=np.int64), np.zeros(bins + 1)
+        salaried = self.cells[self.cells["with_salary"] > 0]
+        counts, edges = np.histogram(self.sketch["value"], bins=bins, weights=self.sketch["count"],
+                                     range=(salaried["salary_min"].min(), salaried["salary_max"].max()))
+        return counts.astype(np.int64), edges
+
+    def salary_sample(self):
+        """Зарплаты скетча, развёрнутые по весам, — для plt.hist и прочего, что ждёт значения"""
+        return np.repeat(self.sketch["value"].to_numpy(dtype="float64"), self.sketch["count"].to_numpy())
+
+    def stats(self, date_name: str) -> dict:
+        """Сводка среза в формате get_stats отчётов (по вакансиям с зарплатой)"""
+        summary = self.summary()
+        if summary.empty:
+            return {key: 0 for key in STATS_KEYS} | {'date': date_name}
+        robust = summary.iloc[0]
+        totals = self.cells[COUNT_MEASURES].sum()
+        return {
+            'date': date_name,
+            'total_vacancies': int(totals['with_salary']),
+            'unique_vacancies': int(totals['unique_with_salary']),
+            'with_salary': int(totals['with_salary']),
+            'unique_companies': int(self.cells.loc[self.cells['with_salary'] > 0, 'employer_key'].nunique()),
+            'mean_salary': float(robust['mean']),
+            'median_salary': float(robust['median']),
+            'std_salary': float(robust['std']),
+            'min_salary': float(robust['min']),
+            'max_salary': float(robust['max']),
+            'q25_salary': float(robust['q25']),
+            'q75_salary': float(robust['q75']),
+            'trimmed_mean_salary': float(robust['trimmed_mean']),
+            'winsorized_mean_salary': float(robust['winsorized_mean']),
+            'median_ci_low': float(robust['median_ci_low']),
+            'median_ci_high': float(robust['median_ci_high']),
+            'outliers': int(robust['outliers']),
+        }
+
+
+STATS_KEYS = ['date', 'total_vacancies', 'unique_vacancies', 'with_salary', 'unique_companies', 'mean_salary',
+              'median_salary', 'std_salary', 'min_salary', 'max_salary', 'q25_salary', 'q75_salary',
+              'trimmed_mean_salary', 'winsorized_mean_salary', 'median_ci_low', 'median_ci_high', 'outliers']
+
+
+def resolve_employers(identities, index=None):
+    """(ключи, канонические названия) работодателей для уникальных идентификаторов куба"""
+    from employers import load_index
+
+    index = index or load_index()
+    keys = []
+    for identity in identities:
+        kind, _, value = identity.partition(":")
+        keys.append(index.key_for("", value) if kind == "id" else index.key_for(value))
+    return keys, [index.display_name(key) for key in keys]
+
+
+@metrics.timed("rollup_cube_load")
+def load_cube(dates: list = None, update: bool = True, path: Path = CUBE_DB) -> Cube:
+    """Куб (или его снимки dates) из data/rollup_cube.sqlite; по умолчанию сначала обновляется"""
+    import pandas as pd
+
+    if update and DATA_DIR.exists():
+        update_cube()
+    connection = connect(path)
+    try:
+        where, params = "", []
+        if dates is not None:
+            where = f" WHERE snapshot IN ({', '.join('?' * len(dates))})"
+            params = list(dates)
+        cells = pd.read_sql_query(f"SELECT * FROM cells{where}", connection, params=params, index_col="id")
+        sketch = pd.read_sql_query(
+            f"SELECT cell, value, count FROM sketch WHERE cell IN (SELECT id FROM cells{where})", connection,
+            params=params)
+    finally:
+        connection.close()
+    return make_cube(cells, sketch)
+
+
+def make_cube(cells, sketch, index=None) -> Cube:
+    """Cube из таблиц ячеек и скетча: измерения — категории, работодатели — ключи индекса employers"""
+    cells = cells.copy()
+    for column in ("snapshot", "role", "area", "employer"):
+        cells[column] = cells[column].astype("category")
+    keys, names = resolve_employers(cells["employer"].cat.categories, index)
+    codes = cells["employer"].cat.codes.to_numpy()
+    cells["employer_key"] = np.asarray(keys, dtype=np.int64).reshape(-1)[codes] if keys else np.int64(0)
+    cells["employer_name"] = np.asarray(names, dtype=object).reshape(-1)[codes] if names else ""
+    return Cube(cells, sketch)
+
+
+def main():
+    """Обновление куба и сводка по измерению"""
+    from robust_stats import label_columns
+
+    parser = argparse.ArgumentParser(description="Куб агрегатов снимок × роль × работодатель × регион")
+    parser.add_argument("--rebuild", action="store_true", help="пересчитать все снимки")
+    parser.add_argument("--date", help="только один снимок")
+    parser.add_argument("--by", default="snapshot", choices=["snapshot", "role", "area", "employer_name"],
+                        help="измерение сводки (по умолчанию snapshot)")
+    args = parser.parse_args()
+
+    print("🧊 КУБ АГРЕГАТОВ")
+    print("=" * 60)
+    started = time.perf_counter()
+    update_cube(force=args.rebuild)
+    cube = load_cube([args.date] if args.date else None, update=False)
+    print(f"  📦 Ячеек: {len(cube)}, значений в скетчах: {len(cube.sketch)}, снимков: {len(cube.snapshots)}")
+    summary = cube.summary(args.by)
+    if summary.empty:
+        print("❌ Нет вакансий с зарплатой")
+        return 1
+    columns = ["Количество", "Средняя", "Медиана", "Усечённая средняя", "Выбросов"]
+    print(label_columns(summary)[columns].sort_values("Количество", ascending=False).head(20).to_string())
+    print(f"⏱️ Время: {time.perf_counter() - started:.2f} сек")
+    metrics.write_metrics("rollup_cube")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
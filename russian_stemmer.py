@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+🔤 Русский стеммер
+Компактная реализация алгоритма Snowball (Porter) для русского языка: отрезает
+окончания, чтобы «менеджера», «менеджеров» и «менеджер» искались одинаково.
+Латиница только приводится к нижнему регистру.
+"""
+
+import re
+from functools import lru_cache
+
+VOWELS = "аеиоуыэюя"
+
+PERFECTIVE_GERUND_1 = ("вшись", "вши", "в")                      # после «а» / «я»
+PERFECTIVE_GERUND_2 = ("ившись", "ывшись", "ивши", "ывши", "ив", "ыв")
+ADJECTIVE = ("ими", "ыми", "его", "ого", "ему", "ому", "ее", "ие", "ые", "ое", "ей", "ий", "ый", "ой", "ем",
+             "им", "ым", "ом", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею")
+PARTICIPLE_1 = ("ем", "нн", "вш", "ющ", "щ")                      # после «а» / «я»
+PARTICIPLE_2 = ("ивш", "ывш", "ующ")
+REFLEXIVE = ("ся", "сь")
+VERB_1 = ("ете", "йте", "ешь", "нно", "ла", "на", "ли", "ем", "ло", "но", "ет", "ют", "ны", "ть", "й", "л", "н")
+VERB_2 = ("ейте", "уйте", "ила", "ыла", "ена", "ите", "или", "ыли", "ило", "ыло", "ено", "ует", "уют", "ены",
+          "ить", "ыть", "ишь", "ей", "уй", "ил", "ыл", "им", "ым", "ен", "ят", "ит", "ыт", "ую", "ю")
+NOUN = ("иями", "ями", "ами", "ией", "иям", "ием", "иях", "ев", "ов", "ие", "ье", "еи", "ии", "ей", "ой", "ий",
+        "ям", "ем", "ам", "ом", "ах", "ях", "ию", "ью", "ия", "ья", "а", "е", "и", "й", "о", "у", "ы", "ь",
+        "ю", "я")
+SUPERLATIVE = ("ейше", "ейш")
+DERIVATIONAL = ("ость", "ост")
+
+TOKEN_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile(r'[а-я]')
+
+
+def _regions(word: str):
+    """Начала областей RV и R2 (индексы в слове)"""
+    rv = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+
+    def next_region(start):
+        for i in range(start + 1, len(word)):
+            if word[i] not in VOWELS and word[i - 1] in VOWELS:
+                return i + 1
+        return len(word)
+
+    r1 = next_region(0)
+    return rv, next_region(r1)
+
+
+def _longest(word: str, start: int, endings) -> str:
+    """Самое длинное окончание из endings, целиком лежащее в области [start:]"""
+    best = ""
+    for ending in endings:
+        if len(ending) > len(best) and word.endswith(ending) and len(word) - len(ending) >= start:
+            best = ending
+    return best
+
+
+def _remove_grouped(word: str, rv: int, group_1, group_2):
+    """Удаляет окончание; окончания группы 1 — только после «а» или «я» (та остаётся)"""
+    ending = _longest(word, rv, group_1 + group_2)
+    if not ending:
+        return word, False
+    if ending in group_2 and _longest(word, rv, group_2) == ending:
+        return word[:-len(ending)], True
+    position = len(word) - len(ending) - 1
+    if position >= rv and word[position] in "ая":
+        return word[:-len(ending)], True
+    return word, False
+
+
+def _stem_cyrillic(word: str) -> str:
+    rv, r2 = _regions(word)
+
+    # Шаг 1: деепричастие, иначе возвратная частица + прилагательное / глагол / существительное
+    word, removed = _remove_grouped(word, rv, PERFECTIVE_GERUND_1, PERFECTIVE_GERUND_2)
+    if not removed:
+        ending = _longest(word, rv, REFLEXIVE)
+        if ending:
+            word = word[:-len(ending)]
+        ending = _longest(word, rv, ADJECTIVE)
+        if ending:
+            word = word[:-len(ending)]
+            word, _ = _remove_grouped(word, rv, PARTICIPLE_1, PARTICIPLE_2)
+        else:
+            word, removed = _remove_grouped(word, rv, VERB_1, VERB_2)
+            if not removed:
+                ending = _longest(word, rv, NOUN)
+                if ending:
+                    word = word[:-len(ending)]
+
+    # Шаг 2: «и» на конце
+    if word.endswith("и") and len(word) - 1 >= rv:
+        word = word[:-1]
+
+    # Шаг 3: словообразовательные окончания в R2
+    ending = _longest(word, r2, DERIVATIONAL)
+    if ending:
+        word = word[:-len(ending)]
+
+    # Шаг 4: «нн» → «н», превосходная степень, мягкий знак
+    ending = _longest(word, rv, SUPERLATIVE)
+    if ending:
+        word = word[:-len(ending)]
+    if word.endswith("нн") and len(word) - 2 >= rv:
+        word = word[:-1]
+    elif word.endswith("ь") and len(word) - 1 >= rv:
+        word = word[:-1]
+    return word
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """Основа слова в нижнем регистре («ё» → «е»)"""
+    word = word.lower().replace("ё", "е")
+    if not CYRILLIC_RE.search(word):
+        return word
+    return _stem_cyrillic(word)
+
+
+def tokenize(text) -> list:
+    """Слова текста в нижнем регистре"""
+    if not isinstance(text, str):
+        return []
+    return TOKEN_RE.findall(text.lower().replace("ё", "е"))
+
+
+def stem_text(text) -> str:
+    """Основы всех слов текста через пробел — так текст хранится в поисковом индексе"""
+    return " ".join(stem(token) for token in tokenize(text))
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+💱 Нормализация зарплат
+Разбор текста зарплаты («85,000–130,000 RUR», «от 2,000 USD») векторно по всей
+таблице, перевод в рубли по локальной таблице курсов data/currency_rates.csv
+(без обращения к сети во время анализа) и приведение «до вычета налогов» к
+сумме на руки.
+
+Курс берётся на дату публикации вакансии: последний известный на эту дату,
+а если дата раньше начала таблицы — самый ранний. Курсы кэшируются по
+(валюта, дата), так что на каждую уникальную пару поиск выполняется один раз.
+"""
+
+import bisect
+import csv
+from pathlib import Path
+
+import metrics
+
+RATES_FILE = Path("data") / "currency_rates.csv"
+
+# Базовая валюта hh.ru (рубль в API обозначается RUR)
+BASE_CURRENCY = "RUR"
+
+# Колонка CSV с флагом «зарплата указана до вычета налогов»
+GROSS_COLUMN = "До вычета налогов"
+
+# НДФЛ для пересчёта gross → на руки
+NDFL_RATE = 0.13
+
+# Диапазон | от | до — по компактной строке без пробелов и разделителей тысяч
+SALARY_RE = r'(\d+)–(\d+)|от(\d+)|до(\d+)'
+CURRENCY_RE = r'([A-Za-z]{3})\s*$'
+
+_rates = None
+_rates_mtime = None
+_rate_cache = {}
+
+
+def load_rates(path: Path = RATES_FILE) -> dict:
+    """Таблица курсов {валюта: (отсортированные даты, курсы)}; перечитывается при изменении файла"""
+    global _rates, _rates_mtime
+    mtime = path.stat().st_mtime_ns if path.exists() else None
+    if _rates is not None and mtime == _rates_mtime:
+        return _rates
+
+    by_currency = {}
+    if mtime is not None:
+        with path.open("r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f, delimiter=";"):
+                by_currency.setdefault(row["Валюта"].strip().upper(), []).append(
+                    (row["Дата"].strip(), float(row["Рублей за единицу"])))
+    else:
+        print(f"⚠️ Нет таблицы курсов {path} — зарплаты в валюте не будут учтены")
+
+    _rates = {currency: ([d for d, _ in sorted(items)], [r for _, r in sorted(items)])
+              for currency, items in by_currency.items()}
+    _rates_mtime = mtime
+    _rate_cache.clear()
+    return _rates
+
+
+def rate_for(currency: str, date_str: str) -> float:
+    """Рублей за единицу валюты на дату (YYYY-MM-DD); NaN, если валюта неизвестна"""
+    key = (currency, date_str)
+    if key in _rate_cache:
+        return _rate_cache[key]
+
+    if currency in (BASE_CURRENCY, "RUB"):
+        rate = 1.0
+    elif currency not in _rates:
+        rate = float("nan")
+    else:
+        dates, values = _rates[currency]
+        position = bisect.bisect_right(dates, date_str or dates[-1]) - 1
+        rate = values[max(position, 0)]
+    _rate_cache[key] = rate
+    return rate
+
+
+def parse_salary_text(text):
+    """Векторный разбор колонки «Зарплата»: DataFrame (from, to, currency).
+
+    Разбираются только уникальные строки: у снимка их в разы меньше, чем вакансий.
+    """
+    import numpy as np
+    import pandas as pd
+
+    codes, uniques = pd.factorize(text)
+    unique_text = pd.Series(uniques, dtype="object").astype("string")
+    compact = unique_text.str.replace(r"[\s,]", "", regex=True).str.lower()
+
+    # Приоритет как у прежнего parse_salary: диапазон, затем «от», затем «до»
+    parts = compact.str.extract(SALARY_RE).astype("float64")
+    has_range = parts[0].notna() & parts[1].notna()
+    salary_from = parts[0].where(has_range, parts[2])
+    salary_to = parts[1].where(has_range, parts[3].where(parts[2].isna()))
+    currency = unique_text.str.extract(CURRENCY_RE)[0].str.upper().fillna(BASE_CURRENCY)
+    # «не указано» и пустые значения — без валюты
+    currency = currency.where(salary_from.notna() | salary_to.notna()).astype("object")
+
+    def expand(values):
+        # Код -1 (NaN в исходной колонке) → пустое значение
+        expanded = np.append(np.asarray(values, dtype=object), np.nan)[codes]
+        return pd.Series(expanded, index=text.index)
+
+    return pd.DataFrame({
+        "from": expand(salary_from).astype("float64"),
+        "to": expand(salary_to).astype("float64"),
+        "currency": expand(currency.where(currency.notna(), np.nan)),
+    })
+
+
+@metrics.timed()
+def normalize_salaries(df):
+    """Добавляет salary_from / salary_to / salary_avg в рублях на руки и salary_currency.
+
+    Курс — на дату публикации, gross-зарплаты уменьшаются на НДФЛ. Суммы — целые
+    рубли (Int64); вакансии в валюте без курса в таблице получают пропуск (и
+    отбрасываются при очистке).
+    """
+    import numpy as np
+    import pandas as pd
+
+    load_rates()
+    parsed = parse_salary_text(df["Зарплата"])
+    currencies = parsed["currency"]
+    has_currency = currencies.notna().to_numpy()
+
+    rates = np.full(len(df), np.nan)
+    if has_currency.any():
+        # Дата публикации → день; дат и валют немного, поэтому курс ищется по уникальным парам
+        if "Дата публикации" in df:
+            date_codes, date_uniques = pd.factorize(df["Дата публикации"].to_numpy()[has_currency])
+            days = [str(value)[:10] for value in date_uniques] + [""]
+            date_codes = np.where(date_codes < 0, len(days) - 1, date_codes)  # пропуск даты → ""
+        else:
+            date_codes, days = np.zeros(int(has_currency.sum()), dtype=np.int64), [""]
+        currency_codes, currency_uniques = pd.factorize(currencies.to_numpy()[has_currency])
+        pair_codes, pair_uniques = pd.factorize(currency_codes.astype(np.int64) * len(days) + date_codes)
+        unique_rates = np.empty(len(pair_uniques), dtype="float64")
+        for i, pair in enumerate(pair_uniques):
+            currency_code, date_code = divmod(int(pair), len(days))
+            unique_rates[i] = rate_for(currency_uniques[currency_code], days[date_code])
+        rates[has_currency] = unique_rates[pair_codes]
+
+    unknown = has_currency & np.isnan(rates)
+    if unknown.any():
+        metrics.increment("salary_unknown_currency", int(unknown.sum()))
+        print(f"  ⚠️ Нет курса для валют: {', '.join(sorted(currencies[unknown].unique()))} — {int(unknown.sum())} вакансий без зарплаты")
+
+    factor = rates
+    if GROSS_COLUMN in df:
+        gross_codes, gross_uniques = pd.factorize(df[GROSS_COLUMN])
+        is_gross = np.array([str(value).strip().lower() == "да" for value in gross_uniques] + [False])
+        factor = np.where(is_gross[gross_codes], rates * (1 - NDFL_RATE), rates)
+
+    df = df.copy()
+    df['salary_currency'] = currencies
+    df['salary_from'] = parsed["from"] * factor
+    df['salary_to'] = parsed["to"] * factor
+    df['salary_avg'] = np.where(
+        df['salary_to'].notna() & df['salary_from'].notna(),
+        (df['salary_from'] + df['salary_to']) / 2,
+        np.where(
+            df['salary_from'].notna(),
+            df['salary_from'],
+            df['salary_to']
+        )
+    )
+    for column in ('salary_from', 'salary_to', 'salary_avg'):
+        df[column] = df[column].round().astype("Int64")
+    return df
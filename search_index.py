@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+🔎 ПОИСКОВЫЙ ИНДЕКС ВАКАНСИЙ
+SQLite-база data/search_index.sqlite со всеми снимками: таблица вакансий с
+зарплатой в рублях на руки, категорией роли и датой публикации (обычные
+индексы под фильтры) и полнотекстовая таблица FTS5 по названию, компании и
+поисковому запросу. Текст хранится основами слов (russian_stemmer), поэтому
+«менеджеров по продажам» находит «Менеджер по продажам».
+
+Индекс обновляется по снимкам: снимок переиндексируется, только если
+изменились его CSV (имя, размер, mtime); удалённые снимки вычищаются.
+
+Запуск из корня проекта:
+    python search_index.py update
+    python search_index.py search "key account" --min-salary 150000 --days 30
+    python search_index.py search --role Закупки --company "восток пак" --since 2025-10-01
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import metrics
+import snapshot_store
+from russian_stemmer import stem, tokenize, stem_text
+from snapshot_diff import DATA_DIR, list_snapshots
+
+INDEX_DB = DATA_DIR / "search_index.sqlite"
+
+# Меняется при изменении схемы: индекс — кэш, старая база просто строится заново
+SCHEMA_VERSION = 1
+
+# Файлы, от которых зависят категория роли и зарплата в строках индекса:
+# изменились — переиндексируются все снимки
+RULE_SOURCES = ["roles.py", "salary_normalization.py", "data/currency_rates.csv"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    date TEXT PRIMARY KEY,
+    signature TEXT NOT NULL,
+    rows INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS vacancies (
+    id INTEGER PRIMARY KEY,
+    snapshot TEXT NOT NULL,
+    vacancy_key TEXT NOT NULL,
+    title TEXT,
+    company TEXT,
+    query TEXT,
+    url TEXT,
+    published TEXT,
+    salary_text TEXT,
+    salary_avg REAL,
+    role TEXT,
+    is_latest INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS vacancies_snapshot ON vacancies(snapshot);
+CREATE INDEX IF NOT EXISTS vacancies_key ON vacancies(vacancy_key);
+CREATE INDEX IF NOT EXISTS vacancies_salary ON vacancies(salary_avg);
+CREATE INDEX IF NOT EXISTS vacancies_latest_published ON vacancies(is_latest, published);
+CREATE INDEX IF NOT EXISTS vacancies_role ON vacancies(role);
+CREATE VIRTUAL TABLE IF NOT EXISTS vacancy_fts USING fts5(
+    title, company, query, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+def connect(path: Path = INDEX_DB) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(path)
+    if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        connection.executescript("DROP TABLE IF EXISTS vacancy_fts; DROP TABLE IF EXISTS vacancies;"
+                                 " DROP TABLE IF EXISTS snapshots;")
+        connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def snapshot_signature(date_str: str) -> str:
+    """Отпечаток опубликованных CSV снимка — по нему видно, что снимок изменился"""
+    return snapshot_store.snapshot_signature(date_str, DATA_DIR)
+
+
+def rules_signature() -> str:
+    """Хэш файлов RULE_SOURCES"""
+    digest = hashlib.sha1()
+    for name in RULE_SOURCES:
+        path = Path(name)
+        digest.update(name.encode("utf-8"))
+        digest.update(path.read_bytes() if path.exists() else b"")
+    return digest.hexdigest()
+
+
+def index_signature(date_str: str, rules: str) -> str:
+    """Отпечаток строк снимка в индексе: сам снимок и правила, по которым считаны роль и зарплата"""
+    return json.dumps([snapshot_signature(date_str), rules])
+
+
+def snapshot_rows(date_str: str) -> list:
+    """Строки таблицы vacancies для снимка: зарплата в рублях на руки и категория роли"""
+    import pandas as pd
+    from roles import categorize_roles
+    from frame_schema import VACANCY_URL, DATETIME_COLUMNS, load_snapshot, vacancy_ids
+    from salary_normalization import normalize_salaries
+
+    df = load_snapshot(date_str)
+    if df.empty:
+        return []
+    df = categorize_roles(normalize_salaries(df))
+    # Дата публикации хранится строкой «YYYY-MM-DD HH:MM» — по ней фильтруют --since / --until
+    published_text = df["Дата публикации"].dt.strftime(DATETIME_COLUMNS["Дата публикации"]).fillna("")
+
+    rows = []
+    for title, company, query, vacancy_id, published, salary_text, salary_avg, role in zip(
+            df["Название вакансии"], df["Компания"], df["Запрос"], vacancy_ids(df), published_text,
+            df["Зарплата"], df["salary_avg"], df["role_category"]):
+        title, company = (value if isinstance(value, str) else "" for value in (title, company))
+        vacancy_key = vacancy_id or f"{title}_{company}"
+        rows.append((date_str, vacancy_key, title, company, query if isinstance(query, str) else "",
+                     VACANCY_URL.format(vacancy_id) if vacancy_id else "", published,
+                     salary_text if isinstance(salary_text, str) else "",
+                     None if pd.isna(salary_avg) else float(salary_avg), role))
+    return rows
+
+
+def index_snapshot(connection: sqlite3.Connection, date_str: str, signature: str) -> int:
+    """Заменяет строки снимка в индексе (одна транзакция)"""
+    rows = snapshot_rows(date_str)
+    with connection:
+        drop_snapshot(connection, date_str)
+        cursor = connection.cursor()
+        for row in rows:
+            cursor.execute(
+                "INSERT INTO vacancies (snapshot, vacancy_key, title, company, query, url, published, salary_text,"
+                " salary_avg, role) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+            cursor.execute("INSERT INTO vacancy_fts (rowid, title, company, query) VALUES (?, ?, ?, ?)",
+                           (cursor.lastrowid, stem_text(row[2]), stem_text(row[3]), stem_text(row[4])))
+        connection.execute("INSERT OR REPLACE INTO snapshots (date, signature, rows) VALUES (?, ?, ?)",
+                           (date_str, signature, len(rows)))
+        _touch_snapshot(connection, date_str)
+        _refresh_latest(connection)
+    return len(rows)
+
+
+def _touch_snapshot(connection: sqlite3.Connection, date_str: str):
+    """Запоминает ключи вакансий снимка: для них пересчитывается флаг is_latest"""
+    connection.execute("CREATE TEMP TABLE IF NOT EXISTS touched (vacancy_key TEXT PRIMARY KEY)")
+    connection.execute("INSERT OR IGNORE INTO touched SELECT vacancy_key FROM vacancies WHERE snapshot = ?",
+                       (date_str,))
+
+
+def _refresh_latest(connection: sqlite3.Connection):
+    """is_latest = 1 у одной строки на вакансию — из самого свежего снимка (только для затронутых ключей)"""
+    connection.execute(
+        "UPDATE vacancies SET is_latest = (id = (SELECT v2.id FROM vacancies v2"
+        " WHERE v2.vacancy_key = vacancies.vacancy_key ORDER BY v2.snapshot DESC, v2.id DESC LIMIT 1))"
+        " WHERE vacancy_key IN (SELECT vacancy_key FROM touched)")
+    connection.execute("DELETE FROM touched")
+
+
+def drop_snapshot(connection: sqlite3.Connection, date_str: str):
+    _touch_snapshot(connection, date_str)
+    connection.execute("DELETE FROM vacancy_fts WHERE rowid IN (SELECT id FROM vacancies WHERE snapshot = ?)",
+                       (date_str,))
+    connection.execute("DELETE FROM vacancies WHERE snapshot = ?", (date_str,))
+    connection.execute("DELETE FROM snapshots WHERE date = ?", (date_str,))
+
+
+@metrics.timed("search_index_update")
+def update_index(force: bool = False) -> dict:
+    """Переиндексирует новые и изменившиеся снимки; возвращает {дата: строк}"""
+    connection = connect()
+    try:
+        known = dict(connection.execute("SELECT date, signature FROM snapshots"))
+        snapshots = list_snapshots() if DATA_DIR.exists() else []
+        for date_str in set(known) - set(snapshots):
+            with connection:
+                drop_snapshot(connection, date_str)
+                _refresh_latest(connection)
+            print(f"  🗑️ Снимок {date_str} удалён из индекса")
+
+        updated = {}
+        rules = rules_signature()
+        for date_str in snapshots:
+            signature = index_signature(date_str, rules)
+            if not force and known.get(date_str) == signature:
+                continue
+            updated[date_str] = index_snapshot(connection, date_str, signature)
+            metrics.increment("search_index_snapshots")
+            print(f"  🔎 Проиндексирован снимок {date_str}: {updated[date_str]} вакансий")
+        return updated
+    finally:
+        connection.close()
+
+
+def rebuild_search_index() -> bool:
+    """Действие этапа пайплайна"""
+    update_index()
+    return True
+
+
+def match_expression(text: str = "", company: str = "") -> str:
+    """Выражение FTS5: основы слов с префиксным поиском; компания — фильтр по колонке"""
+    parts = []
+    terms = [f'"{stem(token)}"*' for token in tokenize(text)]
+    if terms:
+        parts.append(" AND ".join(terms))
+    company_terms = [f'"{stem(token)}"*' for token in tokenize(company)]
+    if company_terms:
+        parts.append("company : (" + " AND ".join(company_terms) + ")")
+    return " AND ".join(parts)
+
+
+def _filters(text: str = "", company: str = "", role: str = None, min_salary: float = None,
+             max_salary: float = None, since: str = None, until: str = None):
+    """Условия WHERE и параметры поиска"""
+    # Одна строка на вакансию — из самого свежего снимка, где она встречалась
+    where, params = ["v.is_latest = 1"], []
+    expression = match_expression(text, company)
+    if expression:
+        # Подзапрос выполняется один раз — совпадения FTS не проверяются построчно
+        where.append("v.id IN (SELECT rowid FROM vacancy_fts WHERE vacancy_fts MATCH ?)")
+        params.append(expression)
+    if role:
+        where.append("v.role = ?")
+        params.append(role)
+    if min_salary is not None:
+        where.append("v.salary_avg >= ?")
+        params.append(min_salary)
+    if max_salary is not None:
+        where.append("v.salary_avg <= ?")
+        params.append(max_salary)
+    if since:
+        where.append("v.published >= ?")
+        params.append(since)
+    if until:
+        # Дата публикации хранится как «YYYY-MM-DD HH:MM» — включаем весь день until
+        where.append("v.published < ?")
+        params.append(until + "~")
+    return "WHERE " + " AND ".join(where), params
+
+
+def search(text: str = "", company: str = "", role: str = None, min_salary: float = None,
+           max_salary: float = None, since: str = None, until: str = None, limit: int = 20, offset: int = 0,
+           connection: sqlite3.Connection = None) -> list:
+    """Поиск по индексу; одна строка на вакансию (из самого свежего снимка), новые сверху"""
+    own_connection = connection is None
+    connection = connection or connect()
+    try:
+        where, params = _filters(text, company, role, min_salary, max_salary, since, until)
+        sql = ("SELECT v.title, v.company, v.salary_text, v.salary_avg, v.published, v.role, v.url, v.snapshot"
+               f" FROM vacancies v {where} ORDER BY v.published DESC, v.id DESC LIMIT ? OFFSET ?")
+        columns = ["title", "company", "salary_text", "salary_avg", "published", "role", "url", "snapshot"]
+        return [dict(zip(columns, row)) for row in connection.execute(sql, params + [limit, offset])]
+    finally:
+        if own_connection:
+            connection.close()
+
+
+def count_matches(text: str = "", company: str = "", role: str = None, min_salary: float = None,
+                  max_salary: float = None, since: str = None, until: str = None,
+                  connection: sqlite3.Connection = None) -> int:
+    """Число вакансий, подходящих под фильтры search (для постраничной выдачи)"""
+    own_connection = connection is None
+    connection = connection or connect()
+    try:
+        where, params = _filters(text, company, role, min_salary, max_salary, since, until)
+        return connection.execute(f"SELECT COUNT(*) FROM vacancies v {where}", params).fetchone()[0]
+    finally:
+        if own_connection:
+            connection.close()
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Полнотекстовый поиск по всем снимкам вакансий")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    update_parser = commands.add_parser("update", help="проиндексировать новые и изменившиеся снимки")
+    update_parser.add_argument("--force", action="store_true", help="переиндексировать все снимки")
+
+    search_parser = commands.add_parser("search", help="поиск с фильтрами")
+    search_parser.add_argument("text", nargs="?", default="", help="слова в названии, компании или запросе")
+    search_parser.add_argument("--company", default="", help="слова в названии компании")
+    search_parser.add_argument("--role", help="категория роли: Продажи, Закупки, Проекты, Менеджмент, Другое")
+    search_parser.add_argument("--min-salary", type=float, help="от, ₽ на руки")
+    search_parser.add_argument("--max-salary", type=float, help="до, ₽ на руки")
+    search_parser.add_argument("--since", help="опубликовано не раньше (YYYY-MM-DD)")
+    search_parser.add_argument("--until", help="опубликовано не позже (YYYY-MM-DD)")
+    search_parser.add_argument("--days", type=int, help="опубликовано за последние N дней")
+    search_parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "update":
+        updated = update_index(force=args.force)
+        print(f"✅ Индекс {INDEX_DB}: обновлено снимков — {len(updated)}")
+        return 0
+
+    if not INDEX_DB.exists():
+        print("❌ Индекс ещё не построен: python search_index.py update")
+        return 1
+    since = args.since or ((date.today() - timedelta(days=args.days)).isoformat() if args.days else None)
+    started = time.perf_counter()
+    results = search(args.text, args.company, args.role, args.min_salary, args.max_salary, since, args.until,
+                     args.limit)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    for item in results:
+        salary = f"{item['salary_avg']:,.0f} ₽" if item["salary_avg"] is not None else "не указано"
+        print(f"  📋 {item['published'][:10]} | {item['title']} — {item['company']} — {salary} "
+              f"[{item['role']}] {item['url']}")
+    print(f"🔎 Найдено: {len(results)} за {elapsed_ms:.1f} мс")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+🔀 ИЗМЕНЕНИЯ ВАКАНСИЙ МЕЖДУ СНИМКАМИ
+Сравнивает два снимка data/<дата>/ по id вакансии hh.ru: добавленные, снятые
+и изменённые (название, компания, зарплата). Результат сохраняется в компактный
+журнал изменений data/changes/<старый>__<новый>.jsonl, который можно
+«проиграть» поверх старого снимка: состав вакансий и отслеживаемые поля
+(TRACKED_FIELDS) совпадут с новым снимком, прочие колонки останутся старыми.
+
+Рядом с журналом лежит <старый>__<новый>.sig.json — отпечатки обоих снимков
+(snapshot_store.snapshot_signature): журнал пересобирается, если переопубликован
+любой из них. Журналы пар, которые больше не соседние (между ними появился
+снимок, например из backfill), удаляются при сборке всех пар.
+"""
+
+import argparse
+import csv
+import json
+import re
+import sys
+from pathlib import Path
+
+from snapshot_store import snapshot_files, snapshot_signature
+
+DATA_DIR = Path("data")
+CHANGES_DIR = DATA_DIR / "changes"
+
+# Поля записи, которые попадают в журнал изменений
+RECORD_FIELDS = ["Название вакансии", "Компания", "Ссылка", "Дата публикации", "Зарплата", "Запрос"]
+
+# Поля, изменение которых считается изменением вакансии
+TRACKED_FIELDS = ["Название вакансии", "Компания", "Зарплата"]
+
+VACANCY_ID_RE = re.compile(r'/vacancy/(\d+)')
+SNAPSHOT_DIR_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+def vacancy_id_from_url(url: str) -> str:
+    """Извлекает id вакансии из ссылки вида https://hh.ru/vacancy/123"""
+    match = VACANCY_ID_RE.search(url or "")
+    return match.group(1) if match else ""
+
+
+def list_snapshots() -> list:
+    """Даты всех снимков в хранилище по возрастанию"""
+    return sorted(p.name for p in DATA_DIR.iterdir() if p.is_dir() and SNAPSHOT_DIR_RE.match(p.name))
+
+
+def load_snapshot_records(date_str: str) -> dict:
+    """Загружает снимок как {id вакансии: запись}; одна запись на id"""
+    records = {}
+    for csv_file in snapshot_files(date_str, DATA_DIR):
+        with csv_file.open(encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f, delimiter=";"):
+                vacancy_id = vacancy_id_from_url(row.get("Ссылка", ""))
+                if not vacancy_id:
+                    # Без ссылки id нет — используем название + компания, как парсеры при дедупликации
+                    vacancy_id = f"{row.get('Название вакансии', '')}_{row.get('Компания', '')}"
+                if vacancy_id not in records:
+                    records[vacancy_id] = {field: row.get(field, "") for field in RECORD_FIELDS}
+    return records
+
+
+def diff_records(old_records: dict, new_records: dict) -> list:
+    """События изменений между двумя снимками (линейно по числу записей)"""
+    old_ids = old_records.keys()
+    new_ids = new_records.keys()
+    events = []
+
+    for vacancy_id in sorted(new_ids - old_ids):
+        events.append({"op": "add", "id": vacancy_id, "record": new_records[vacancy_id]})
+
+    for vacancy_id in sorted(old_ids - new_ids):
+        events.append({"op": "remove", "id": vacancy_id})
+
+    for vacancy_id in sorted(old_ids & new_ids):
+        old, new = old_records[vacancy_id], new_records[vacancy_id]
+        fields = {field: [old[field], new[field]] for field in TRACKED_FIELDS if old[field] != new[field]}
+        if fields:
+            events.append({"op": "change", "id": vacancy_id, "fields": fields})
+
+    return events
+
+
+def changelog_path(old_date: str, new_date: str) -> Path:
+    return CHANGES_DIR / f"{old_date}__{new_date}.jsonl"
+
+
+def signature_path(old_date: str, new_date: str) -> Path:
+    return CHANGES_DIR / f"{old_date}__{new_date}.sig.json"
+
+
+def pair_signature(old_date: str, new_date: str) -> dict:
+    """Отпечатки обоих снимков пары: изменился любой — журнал устарел"""
+    return {"old": snapshot_signature(old_date, DATA_DIR), "new": snapshot_signature(new_date, DATA_DIR)}
+
+
+def write_changelog(old_date: str, new_date: str, events: list) -> Path:
+    """Сохраняет журнал изменений (одно событие на строку)"""
+    CHANGES_DIR.mkdir(parents=True, exist_ok=True)
+    path = changelog_path(old_date, new_date)
+    tmp_path = path.with_suffix(".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n")
+    tmp_path.replace(path)
+    return path
+
+
+def read_changelog(path: Path) -> list:
+    """Читает журнал изменений"""
+    with Path(path).open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def replay(records: dict, events: list) -> dict:
+    """Применяет журнал изменений к снимку: состав вакансий и поля TRACKED_FIELDS — как в следующем
+    снимке; остальные колонки изменённых вакансий (ссылка, дата, запрос) журнал не хранит"""
+    result = dict(records)
+    for event in events:
+        if event["op"] == "add":
+            result[event["id"]] = dict(event["record"])
+        elif event["op"] == "remove":
+            result.pop(event["id"], None)
+        elif event["op"] == "change":
+            record = dict(result[event["id"]])
+            for field, (_, new_value) in event["fields"].items():
+                record[field] = new_value
+            result[event["id"]] = record
+    return result
+
+
+def summarize(events: list) -> dict:
+    """Сводка по журналу изменений"""
+    summary = {"added": 0, "removed": 0, "changed": 0, "salary_changed": 0, "title_changed": 0}
+    for event in events:
+        if event["op"] == "add":
+            summary["added"] += 1
+        elif event["op"] == "remove":
+            summary["removed"] += 1
+        else:
+            summary["changed"] += 1
+            summary["salary_changed"] += "Зарплата" in event["fields"]
+            summary["title_changed"] += "Название вакансии" in event["fields"]
+    return summary
+
+
+def diff_snapshots(old_date: str, new_date: str) -> list:
+    """Сравнивает два снимка и сохраняет журнал изменений с отпечатками снимков"""
+    # Отпечатки берутся до чтения: снимок, переопубликованный во время сравнения, пересоберётся в следующий раз
+    signature = pair_signature(old_date, new_date)
+    events = diff_records(load_snapshot_records(old_date), load_snapshot_records(new_date))
+    path = write_changelog(old_date, new_date, events)
+    signature_path(old_date, new_date).write_text(json.dumps(signature, ensure_ascii=False), encoding="utf-8")
+    summary = summarize(events)
+    print(f"🔀 {old_date} → {new_date}: +{summary['added']} / −{summary['removed']} / "
+          f"изменено {summary['changed']} (зарплата: {summary['salary_changed']}, "
+          f"название: {summary['title_changed']}) → {path}")
+    return events
+
+
+def stored_signature(old_date: str, new_date: str):
+    try:
+        return json.loads(signature_path(old_date, new_date).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def build_changelogs(force: bool = False) -> bool:
+    """Строит журналы соседних пар снимков, которых нет или чьи снимки изменились;
+    журналы несоседних пар удаляет"""
+    CHANGES_DIR.mkdir(parents=True, exist_ok=True)
+    snapshots = list_snapshots()
+    pairs = set(zip(snapshots, snapshots[1:]))
+    for path in sorted(CHANGES_DIR.glob("*__*.jsonl")) + sorted(CHANGES_DIR.glob("*__*.sig.json")):
+        old_date, _, new_date = path.name.split(".", 1)[0].partition("__")
+        if (old_date, new_date) not in pairs:
+            path.unlink()
+            if path.suffix == ".jsonl":
+                print(f"🗑️ {old_date} → {new_date}: снимки больше не соседние, журнал удалён")
+    for old_date, new_date in sorted(pairs):
+        if (not force and changelog_path(old_date, new_date).exists()
+                and stored_signature(old_date, new_date) == pair_signature(old_date, new_date)):
+            continue
+        diff_snapshots(old_date, new_date)
+    return True
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Изменения вакансий между снимками")
+    parser.add_argument("dates", nargs="*", metavar="DATE", help="две даты снимков (по умолчанию — все соседние пары)")
+    parser.add_argument("--show", action="store_true", help="вывести изменения зарплат и названий")
+    args = parser.parse_args()
+
+    if len(args.dates) not in (0, 2):
+        print("❌ Укажите две даты снимков или ни одной")
+        return 2
+
+    if not args.dates:
+        build_changelogs()
+        return 0
+
+    events = diff_snapshots(*args.dates)
+    if args.show:
+        for event in events:
+            if event["op"] == "change":
+                changes = "; ".join(f"{field}: {old} → {new}" for field, (old, new) in event["fields"].items())
+                print(f"  ✏️ {event['id']}: {changes}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
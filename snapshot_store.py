@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+🗄️ ХРАНИЛИЩЕ СНИМКОВ: АТОМАРНАЯ ПУБЛИКАЦИЯ И МАНИФЕСТЫ
+Сервисы hh-watcher, hh-parser и hh-analyzer монтируют один и тот же ./data,
+поэтому файлы снимка не пишутся на месте:
+
+1. писатель (SnapshotWriter) готовит файлы во временной папке
+   data/.staging/<запуск>/ на той же файловой системе;
+2. берёт эксклюзивную advisory-блокировку data/.snapshot.lock (fcntl.flock) —
+   публикации разных процессов не перемешиваются;
+3. переносит файлы в data/<дата>/ через os.replace: читатель, открывший файл,
+   видит либо старую, либо новую версию целиком, но не половину;
+4. записывает манифест запуска data/<дата>/manifests/<запуск>.json и
+   атомарно заменяет манифест снимка data/<дата>/manifest.json — это и есть
+   момент публикации.
+
+Манифест снимка перечисляет опубликованные файлы (число строк, размер, sha256,
+id запуска) и номер поколения, который растёт с каждой публикацией. Читатели
+берут список файлов снимка только из манифеста (snapshot_files), а по
+sha256 и поколению видно, что данные изменились, без повторного чтения CSV.
+Старые папки без манифеста (снимки до появления хранилища) читаются как
+раньше — все *.csv папки.
+
+Запуск из корня проекта:
+    python snapshot_store.py                  # манифесты всех снимков
+    python snapshot_store.py --adopt          # создать манифесты для старых папок
+"""
+
+import argparse
+import csv
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import socket
+import sys
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import metrics
+
+DATA_DIR = Path("data")
+STAGING_DIR = DATA_DIR / ".staging"
+LOCK_FILE = DATA_DIR / ".snapshot.lock"
+MANIFEST_NAME = "manifest.json"
+RUN_MANIFESTS_DIR = "manifests"
+
+# Версия формата манифеста
+MANIFEST_VERSION = 1
+
+# id запуска для файлов, которые лежали в папке снимка до первого манифеста
+LEGACY_RUN_ID = "legacy"
+
+
+def new_run_id() -> str:
+    """Уникальный id запуска: время, хост, pid и случайный хвост"""
+    return f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def manifest_path(date_str: str, data_dir: Path = None) -> Path:
+    return (data_dir or DATA_DIR) / date_str / MANIFEST_NAME
+
+
+def read_manifest(date_str: str, data_dir: Path = None):
+    """Опубликованный манифест снимка или None (старая папка без манифеста)"""
+    path = manifest_path(date_str, data_dir)
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def snapshot_files(date_str: str, data_dir: Path = None) -> list:
+    """CSV снимка, которые можно читать: из опубликованного манифеста или, без него, все *.csv папки"""
+    directory = (data_dir or DATA_DIR) / date_str
+    manifest = read_manifest(date_str, data_dir)
+    if manifest is None:
+        return sorted(directory.glob("*.csv"))
+    return sorted(directory / name for name in manifest["files"] if name.endswith(".csv"))
+
+
+def all_snapshot_files() -> list:
+    """Опубликованные CSV всех снимков data/<дата>/ по возрастанию даты"""
+    from snapshot_diff import list_snapshots
+
+    if not DATA_DIR.exists():
+        return []
+    return [path for date_str in list_snapshots() for path in snapshot_files(date_str)]
+
+
+def snapshot_signature(date_str: str, data_dir: Path = None) -> str:
+    """Отпечаток содержимого снимка: sha256 файлов из манифеста, у старых папок — размеры и mtime"""
+    manifest = read_manifest(date_str, data_dir)
+    if manifest is None:
+        return json.dumps([[path.name, path.stat().st_size, path.stat().st_mtime_ns]
+                           for path in snapshot_files(date_str, data_dir)])
+    return json.dumps([[name, entry["sha256"]] for name, entry in sorted(manifest["files"].items())
+                       if name.endswith(".csv")])
+
+
+def file_entry(path: Path) -> dict:
+    """Размер, sha256 и (для CSV) число строк без заголовка"""
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    entry = {"size": path.stat().st_size, "sha256": digest.hexdigest()}
+    if path.suffix == ".csv":
+        with path.open(encoding="utf-8-sig", newline="") as f:
+            entry["rows"] = max(sum(1 for _ in csv.reader(f, delimiter=";")) - 1, 0)
+    return entry
+
+
+def _fsync_dir(path: Path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_json_atomic(path: Path, data: dict):
+    """JSON во временный файл рядом, fsync и os.replace: читатель видит старую или новую версию"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def publish_lock(shared: bool = False):
+    """Advisory-блокировка хранилища: эксклюзивная у писателей, разделяемая — у читателей,
+    которым нужно прочитать несколько файлов снимка в одном согласованном состоянии"""
+    LOCK_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with LOCK_FILE.open("a") as lock:
+        with metrics.timer("snapshot_lock_wait"):
+            fcntl.flock(lock, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _empty_manifest(date_str: str) -> dict:
+    return {"version": MANIFEST_VERSION, "date": date_str, "generation": 0, "updated_at": None,
+            "files": {}, "runs": []}
+
+
+def _adopt_legacy(date_str: str) -> dict:
+    """Манифест для папки без манифеста: её файлы становятся опубликованными как есть"""
+    manifest = _empty_manifest(date_str)
+    directory = DATA_DIR / date_str
+    if directory.is_dir():
+        for path in sorted(directory.glob("*.csv")) + sorted(directory.glob("*.meta.json")):
+            manifest["files"][path.name] = {**file_entry(path), "run_id": LEGACY_RUN_ID}
+    if manifest["files"]:
+        manifest["runs"].append(LEGACY_RUN_ID)
+    return manifest
+
+
+class SnapshotWriter:
+    """Файлы одного запуска для снимка date_str; публикуются все вместе при выходе из with.
+
+        with SnapshotWriter(date_str, source="sales") as snapshot:
+            with snapshot.stage("file.csv").open("w") as f:
+                ...
+        snapshot.target("file.csv")   # data/<дата>/file.csv
+
+    При исключении внутри with ничего не публикуется, временная папка удаляется.
+    """
+
+    def __init__(self, date_str: str, source: str = "", run_id: str = None):
+        self.date_str = date_str
+        self.source = source
+        self.run_id = run_id or new_run_id()
+        self.staging_dir = STAGING_DIR / self.run_id
+        self.manifest = None
+
+    def __enter__(self) -> "SnapshotWriter":
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.publish()
+        finally:
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+        return False
+
+    def stage(self, name: str) -> Path:
+        """Путь для записи файла во временной папке запуска"""
+        return self.staging_dir / name
+
+    def target(self, name: str) -> Path:
+        """Где файл окажется после публикации"""
+        return DATA_DIR / self.date_str / name
+
+    @metrics.timed("snapshot_publish")
+    def publish(self) -> dict:
+        """Переносит подготовленные файлы в снимок и публикует манифест; возвращает манифест запуска"""
+        staged = sorted(path for path in self.staging_dir.iterdir() if path.is_file())
+        # Хэши и строки считаются до блокировки, чтобы не держать её дольше нужного
+        entries = {}
+        for path in staged:
+            entries[path.name] = {**file_entry(path), "run_id": self.run_id}
+            with path.open("rb") as f:
+                os.fsync(f.fileno())
+        run_manifest = {
+            "version": MANIFEST_VERSION,
+            "run_id": self.run_id,
+            "date": self.date_str,
+            "source": self.source,
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "published_at": datetime.now().isoformat(timespec="seconds"),
+            "files": entries,
+        }
+
+        directory = DATA_DIR / self.date_str
+        with publish_lock():
+            directory.mkdir(parents=True, exist_ok=True)
+            manifest = read_manifest(self.date_str) or _adopt_legacy(self.date_str)
+            for path in staged:
+                os.replace(path, directory / path.name)
+            _fsync_dir(directory)
+            write_json_atomic(directory / RUN_MANIFESTS_DIR / f"{self.run_id}.json", run_manifest)
+            manifest["files"].update(entries)
+            manifest["runs"].append(self.run_id)
+            manifest["generation"] += 1
+            manifest["updated_at"] = run_manifest["published_at"]
+            write_json_atomic(directory / MANIFEST_NAME, manifest)
+            _fsync_dir(directory)
+        metrics.increment("snapshot_files_published", len(staged))
+        self.manifest = manifest
+        return run_manifest
+
+
+def adopt_snapshots(dates: list) -> list:
+    """Создаёт манифесты для старых папок без манифеста; возвращает даты, которые получили манифест"""
+    adopted = []
+    for date_str in dates:
+        with publish_lock():
+            if read_manifest(date_str) is not None:
+                continue
+            manifest = _adopt_legacy(date_str)
+            if not manifest["files"]:
+                continue
+            manifest["generation"] = 1
+            manifest["updated_at"] = datetime.now().isoformat(timespec="seconds")
+            write_json_atomic(manifest_path(date_str), manifest)
+        adopted.append(date_str)
+    return adopted
+
+
+def main():
+    """Основная функция"""
+    from snapshot_diff import list_snapshots
+
+    parser = argparse.ArgumentParser(description="Манифесты снимков data/<дата>/")
+    parser.add_argument("--adopt", action="store_true", help="создать манифесты для папок без манифеста")
+    args = parser.parse_args()
+
+    print("🗄️ ХРАНИЛИЩЕ СНИМКОВ")
+    print("=" * 60)
+    snapshots = list_snapshots() if DATA_DIR.exists() else []
+    if args.adopt:
+        for date_str in adopt_snapshots(snapshots):
+            print(f"  📝 {date_str}: манифест создан по существующим файлам")
+    for date_str in snapshots:
+        manifest = read_manifest(date_str)
+        if manifest is None:
+            files = snapshot_files(date_str)
+            print(f"📅 {date_str}: без манифеста, CSV {len(files)}")
+            continue
+        rows = sum(entry.get("rows", 0) for entry in manifest["files"].values())
+        print(f"📅 {date_str}: поколение {manifest['generation']}, файлов {len(manifest['files'])}, "
+              f"строк {rows}, запусков {len(manifest['runs'])}, обновлён {manifest['updated_at']}")
+    metrics.write_metrics("snapshot_store")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,17 +2,29 @@
 """
 🔍 ГЛУБОКИЙ АНАЛИЗ ВАКАНСИЙ ВЛАДИВОСТОКА ЗА 5 ОКТЯБРЯ 2025
 Анализ только данных за 5 октября (без дублей и исторических данных)
+Статистика, графики и сводные листы строятся по срезу куба rollup_cube;
+строки вакансий читаются только для листа со всеми данными и примеров вакансий.
 """
 
 import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 from pathlib import Path
-import re
 from datetime import datetime
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+import metrics
+import roles
+from salary_normalization import normalize_salaries
+from robust_stats import flag_outliers, label_columns
+from employers import add_employer_keys
+from frame_schema import concat_frames, read_snapshot_csv, with_links
+from rollup_cube import load_cube
+from snapshot_store import snapshot_files
+
+SNAPSHOT_DATE = "2025-10-05"
+
 # Настройка matplotlib для русских шрифтов
 plt.rcParams['font.family'] = ['DejaVu Sans', 'Arial Unicode MS', 'sans-serif']
 plt.rcParams['axes.unicode_minus'] = False
@@ -29,14 +41,14 @@ def load_oct5_data():
     print("📂 Загружаем данные за 5 октября 2025...")
     
     data_dir = Path("data/2025-10-05")
-    csv_files = list(data_dir.glob("*.csv"))
+    csv_files = snapshot_files(data_dir.name, data_dir.parent)
     print(f"🔍 Найдено CSV файлов за 5 октября: {len(csv_files)}")
     
     all_data = []
     for csv_file in csv_files:
         print(f"  📄 Загружаем: {csv_file.name}")
         try:
-            df = pd.read_csv(csv_file, sep=';', encoding='utf-8-sig')
+            df = read_snapshot_csv(csv_file)
             all_data.append(df)
         except Exception as e:
             print(f"  ❌ Ошибка при загрузке {csv_file}: {e}")
@@ -45,58 +57,18 @@ def load_oct5_data():
         raise ValueError("❌ Не найдено данных за 5 октября!")
     
     # Объединяем данные за 5 октября
-    combined_df = pd.concat(all_data, ignore_index=True)
+    combined_df = add_employer_keys(concat_frames(all_data))
     print(f"✅ Загружено {len(combined_df)} записей за 5 октября")
     
     return combined_df
 
+@metrics.timed()
 def clean_salary_data(df):
     """Очищает и обрабатывает данные о зарплатах"""
     print("🧹 Очищаем данные о зарплатах...")
     
-    def parse_salary(salary_text):
-        """Парсит текст зарплаты и возвращает числовые значения"""
-        if pd.isna(salary_text) or salary_text == "не указано":
-            return None, None
-        
-        salary_str = str(salary_text).replace(" ", "").replace(",", "").lower()
-        
-        # Диапазон зарплат
-        range_match = re.search(r'(\d+)–(\d+)', salary_str)
-        if range_match:
-            from_salary = int(range_match.group(1))
-            to_salary = int(range_match.group(2))
-            return from_salary, to_salary
-        
-        # "от X"
-        from_match = re.search(r'от(\d+)', salary_str)
-        if from_match:
-            from_salary = int(from_match.group(1))
-            return from_salary, None
-        
-        # "до X"
-        to_match = re.search(r'до(\d+)', salary_str)
-        if to_match:
-            to_salary = int(to_match.group(1))
-            return None, to_salary
-        
-        return None, None
-    
-    # Парсим зарплаты
-    salary_data = df['Зарплата'].apply(parse_salary)
-    df['salary_from'] = salary_data.apply(lambda x: x[0] if x[0] is not None else np.nan)
-    df['salary_to'] = salary_data.apply(lambda x: x[1] if x[1] is not None else np.nan)
-    
-    # Вычисляем среднюю зарплату
-    df['salary_avg'] = np.where(
-        df['salary_to'].notna() & df['salary_from'].notna(),
-        (df['salary_from'] + df['salary_to']) / 2,
-        np.where(
-            df['salary_from'].notna(),
-            df['salary_from'],
-            df['salary_to']
-        )
-    )
+    # Разбор текста, перевод в рубли по курсу на дату публикации и gross → на руки
+    df = normalize_salaries(df)
     
     # Удаляем строки без зарплаты
     initial_count = len(df)
@@ -110,38 +82,10 @@ def clean_salary_data(df):
     return df
 
 def categorize_roles(df):
-    """Определяет категории ролей"""
+    """Определяет категории ролей (правила — в roles.py)"""
     print("🏷️ Определяем категории ролей...")
     
-    def get_role_category(title):
-        if pd.isna(title):
-            return "Неизвестно"
-        
-        title_lower = title.lower()
-        
-        # Продажи
-        sales_keywords = ["продаж", "sales", "менеджер по продаж", "руководитель продаж"]
-        if any(keyword in title_lower for keyword in sales_keywords):
-            return "Продажи"
-        
-        # Закупки
-        procurement_keywords = ["закуп", "закупк", "закупщик", "снабжен"]
-        if any(keyword in title_lower for keyword in procurement_keywords):
-            return "Закупки"
-        
-        # Проекты
-        project_keywords = ["проект", "project", "менеджер проект", "руководитель проект"]
-        if any(keyword in title_lower for keyword in project_keywords):
-            return "Проекты"
-        
-        # Менеджмент
-        management_keywords = ["менеджер", "руководитель", "директор"]
-        if any(keyword in title_lower for keyword in management_keywords):
-            return "Менеджмент"
-        
-        return "Другое"
-    
-    df['role_category'] = df['Название вакансии'].apply(get_role_category)
+    df = roles.categorize_roles(df)
     
     # Статистика по категориям
     role_counts = df['role_category'].value_counts()
@@ -151,32 +95,30 @@ def categorize_roles(df):
     
     return df
 
-def calculate_detailed_statistics(df):
-    """Вычисляет детальную статистику за 5 октября"""
+def load_oct5_cube(cube=None):
+    """Срез куба за 5 октября (из уже загруженного куба, если он передан)"""
+    cube = load_cube([SNAPSHOT_DATE]) if cube is None else cube.slice(snapshot=SNAPSHOT_DATE)
+    if len(cube) == 0:
+        raise ValueError("❌ Не найдено данных за 5 октября!")
+    print(f"🧊 Срез куба за 5 октября: {len(cube)} ячеек")
+    return cube
+
+@metrics.timed()
+def calculate_detailed_statistics(cube):
+    """Вычисляет детальную статистику за 5 октября (по срезу куба)"""
     print("📊 Вычисляем детальную статистику за 5 октября...")
     
-    salaries = df['salary_avg'].dropna()
-    
-    stats = {
-        'date': '2025-10-05',
-        'total_vacancies': len(df),
-        'with_salary': len(salaries),
-        'mean_salary': np.mean(salaries),
-        'median_salary': np.median(salaries),
-        'std_salary': np.std(salaries),
-        'min_salary': np.min(salaries),
-        'max_salary': np.max(salaries),
-        'q25_salary': np.percentile(salaries, 25),
-        'q75_salary': np.percentile(salaries, 75),
-        'unique_companies': df['Компания'].nunique()
-    }
+    stats = cube.stats(SNAPSHOT_DATE)
     
     print("  📈 ДЕТАЛЬНАЯ СТАТИСТИКА за 5 октября:")
     print(f"    • Всего вакансий: {stats['total_vacancies']}")
     print(f"    • С зарплатой: {stats['with_salary']}")
     print(f"    • Уникальных компаний: {stats['unique_companies']}")
     print(f"    • Средняя зарплата: {stats['mean_salary']:,.0f} ₽")
-    print(f"    • Медианная зарплата: {stats['median_salary']:,.0f} ₽")
+    print(f"    • Усечённая средняя (10%): {stats['trimmed_mean_salary']:,.0f} ₽")
+    print(f"    • Медианная зарплата: {stats['median_salary']:,.0f} ₽ "
+          f"(95% ДИ {stats['median_ci_low']:,.0f}–{stats['median_ci_high']:,.0f} ₽)")
+    print(f"    • Выбросов (MAD): {stats['outliers']}")
     print(f"    • Разброс (σ): {stats['std_salary']:,.0f} ₽")
     print(f"    • Минимум: {stats['min_salary']:,.0f} ₽")
     print(f"    • Максимум: {stats['max_salary']:,.0f} ₽")
@@ -185,24 +127,25 @@ def calculate_detailed_statistics(df):
     
     return stats
 
-def create_oct5_visualizations(df, report_dir):
+def create_oct5_visualizations(cube, stats, report_dir):
     """Создаёт визуализации для 5 октября"""
     print("📊 Создаём визуализации за 5 октября...")
     
-    df_with_salary = df.dropna(subset=['salary_avg'])
-    print(f"  📊 Анализируем {len(df_with_salary)} вакансий с зарплатой")
+    print(f"  📊 Анализируем {stats['with_salary']} вакансий с зарплатой")
     
-    # 1. Гистограмма распределения зарплат за 5 октября
+    # 1. Гистограмма распределения зарплат за 5 октября (интервалы — по скетчу куба)
+    chart_timer = metrics.timer("chart_oct5_salary_distribution")
     plt.figure(figsize=(12, 7))
-    plt.hist(df_with_salary['salary_avg'], bins=25, color='lightblue', edgecolor='navy', alpha=0.7)
+    counts, edges = cube.histogram(25)
+    plt.hist(edges[:-1], bins=edges, weights=counts, color='lightblue', edgecolor='navy', alpha=0.7)
     plt.title('💰 Распределение зарплат во Владивостоке\n5 октября 2025 года (данные за 3-5 октября)', fontsize=16, fontweight='bold')
     plt.xlabel('Зарплата, ₽', fontsize=12)
     plt.ylabel('Количество вакансий', fontsize=12)
     plt.grid(True, alpha=0.3)
     
     # Статистики на графике
-    mean_salary = np.mean(df_with_salary['salary_avg'])
-    median_salary = np.median(df_with_salary['salary_avg'])
+    mean_salary = stats['mean_salary']
+    median_salary = stats['median_salary']
     plt.axvline(mean_salary, color='red', linestyle='--', linewidth=2, label=f'Средняя: {mean_salary:,.0f} ₽')
     plt.axvline(median_salary, color='orange', linestyle='--', linewidth=2, label=f'Медиана: {median_salary:,.0f} ₽')
     plt.legend(fontsize=10)
@@ -210,10 +153,12 @@ def create_oct5_visualizations(df, report_dir):
     plt.tight_layout()
     plt.savefig(report_dir / 'oct5_salary_distribution.png', dpi=300, bbox_inches='tight')
     plt.close()
+    chart_timer.stop()
     print("  ✅ Создан: oct5_salary_distribution.png")
     
     # 2. Топ-15 компаний за 5 октября
-    top_companies = df_with_salary['Компания'].value_counts().head(15)
+    chart_timer = metrics.timer("chart_oct5_top_companies")
+    top_companies = cube.top_employers(15)
     
     plt.figure(figsize=(14, 10))
     bars = plt.barh(range(len(top_companies)), top_companies.values, color='lightcoral')
@@ -231,10 +176,12 @@ def create_oct5_visualizations(df, report_dir):
     plt.tight_layout()
     plt.savefig(report_dir / 'oct5_top_companies.png', dpi=300, bbox_inches='tight')
     plt.close()
+    chart_timer.stop()
     print("  ✅ Создан: oct5_top_companies.png")
     
     # 3. Зарплаты по категориям ролей
-    role_salaries = df_with_salary.groupby('role_category')['salary_avg'].agg(['mean', 'count']).sort_values('mean', ascending=False)
+    chart_timer = metrics.timer("chart_oct5_salary_by_role")
+    role_salaries = cube.summary('role')[['mean', 'count']].sort_values('mean', ascending=False)
     
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
     
@@ -265,10 +212,12 @@ def create_oct5_visualizations(df, report_dir):
     plt.tight_layout()
     plt.savefig(report_dir / 'oct5_salary_by_role.png', dpi=300, bbox_inches='tight')
     plt.close()
+    chart_timer.stop()
     print("  ✅ Создан: oct5_salary_by_role.png")
 
-def create_oct5_summary_report(df, stats, report_dir):
-    """Создаёт детальный отчёт за 5 октября"""
+@metrics.timed()
+def create_oct5_summary_report(df, cube, stats, report_dir):
+    """Создаёт детальный отчёт за 5 октября: сводные листы — из куба, лист данных — из строк"""
     print("📋 Создаём детальный отчёт за 5 октября...")
     
     excel_file = report_dir / 'oct5_detailed_report.xlsx'
@@ -278,10 +227,13 @@ def create_oct5_summary_report(df, stats, report_dir):
         # Общая статистика
         summary_data = {
             'Показатель': ['Дата анализа', 'Всего вакансий', 'С зарплатой', 'Уникальных компаний',
-                          'Средняя зарплата', 'Медианная зарплата', 'Минимальная зарплата', 
+                          'Средняя зарплата', 'Усечённая средняя (10%)', 'Винзоризованная средняя (10%)',
+                          'Медианная зарплата', 'Медиана: 95% ДИ', 'Выбросов (MAD)', 'Минимальная зарплата', 
                           'Максимальная зарплата', 'Разброс (σ)', '25-й процентиль', '75-й процентиль'],
             'Значение': [stats['date'], stats['total_vacancies'], stats['with_salary'], stats['unique_companies'],
-                        f"{stats['mean_salary']:,.0f} ₽", f"{stats['median_salary']:,.0f} ₽",
+                        f"{stats['mean_salary']:,.0f} ₽", f"{stats['trimmed_mean_salary']:,.0f} ₽",
+                        f"{stats['winsorized_mean_salary']:,.0f} ₽", f"{stats['median_salary']:,.0f} ₽",
+                        f"{stats['median_ci_low']:,.0f}–{stats['median_ci_high']:,.0f} ₽", stats['outliers'],
                         f"{stats['min_salary']:,.0f} ₽", f"{stats['max_salary']:,.0f} ₽",
                         f"{stats['std_salary']:,.0f} ₽", f"{stats['q25_salary']:,.0f} ₽",
                         f"{stats['q75_salary']:,.0f} ₽"]
@@ -289,29 +241,34 @@ def create_oct5_summary_report(df, stats, report_dir):
         summary_df = pd.DataFrame(summary_data)
         summary_df.to_excel(writer, sheet_name='Общая статистика 5 октября', index=False)
         
-        # Статистика по ролям
-        role_stats = df_with_salary.groupby('role_category')['salary_avg'].agg([
-            'count', 'mean', 'median', 'min', 'max', 'std'
-        ]).round(0)
-        role_stats.columns = ['Количество', 'Средняя', 'Медиана', 'Минимум', 'Максимум', 'Разброс']
+        # Статистика по ролям (вместе с устойчивыми оценками)
+        role_stats = label_columns(cube.summary('role')).rename_axis('role_category')
         role_stats.to_excel(writer, sheet_name='По категориям ролей')
         
         # Детальная статистика по компаниям
-        company_stats = df_with_salary.groupby('Компания').agg({
-            'salary_avg': ['count', 'mean', 'median'],
-            'Название вакансии': lambda x: ', '.join(x.unique()[:3])  # Первые 3 уникальных названия
-        }).round(0)
-        company_stats.columns = ['Количество вакансий', 'Средняя зарплата', 'Медианная зарплата', 'Примеры вакансий']
+        # Группировка по ключу работодателя: варианты написания одной компании не дробятся
+        company_summary = cube.summary('employer_key')
+        company_stats = company_summary[['count', 'mean', 'median']].round(0)
+        company_stats.columns = ['Количество вакансий', 'Средняя зарплата', 'Медианная зарплата']
+        company_stats.insert(0, 'Компания', cube.employer_names().reindex(company_stats.index).values)
+        # Примеры названий в кубе не хранятся — берутся из строк снимка
+        examples = df_with_salary.groupby('employer_key')['Название вакансии'].agg(
+            lambda x: ', '.join(x.unique()[:3]))  # Первые 3 уникальных названия
+        company_stats['Примеры вакансий'] = examples.reindex(company_stats.index).values
+        company_robust = company_summary[['trimmed_mean', 'median_ci_low', 'median_ci_high', 'outliers']]
+        company_stats = company_stats.join(label_columns(company_robust))
+        company_stats = company_stats.set_index('Компания')
         company_stats = company_stats.sort_values('Количество вакансий', ascending=False)
         company_stats.to_excel(writer, sheet_name='По компаниям (детально)')
         
-        # Все данные с зарплатой
-        df_with_salary.to_excel(writer, sheet_name='Все данные 5 октября', index=False)
+        # Все данные с зарплатой; выбросы отмечены внутри своей категории роли
+        df_with_salary = df_with_salary.assign(**{'Выброс': flag_outliers(df_with_salary, 'role_category')})
+        with_links(df_with_salary).to_excel(writer, sheet_name='Все данные 5 октября', index=False)
     
     print(f"  ✅ Создан: {excel_file}")
 
-def main():
-    """Основная функция анализа за 5 октября"""
+def main(cube=None):
+    """Основная функция анализа за 5 октября; cube — куб, который демон держит в памяти"""
     print("🔍 ГЛУБОКИЙ АНАЛИЗ ВАКАНСИЙ ВЛАДИВОСТОКА ЗА 5 ОКТЯБРЯ 2025")
     print("=" * 70)
     
@@ -319,23 +276,20 @@ def main():
         # 1. Создаём папку для отчётов
         report_dir = setup_report_folder()
         
-        # 2. Загружаем только данные за 5 октября
-        df = load_oct5_data()
+        # 2. Срез куба за 5 октября и детальная статистика по нему
+        cube = load_oct5_cube(cube)
+        stats = calculate_detailed_statistics(cube)
         
-        # 3. Очищаем данные
-        df = clean_salary_data(df)
+        # 3. Создаём визуализации
+        create_oct5_visualizations(cube, stats, report_dir)
         
-        # 4. Категоризируем роли
+        # 4. Строки за 5 октября — только для листа со всеми данными
+        df = load_oct5_data()
+        df = clean_salary_data(df)
         df = categorize_roles(df)
         
-        # 5. Вычисляем детальную статистику
-        stats = calculate_detailed_statistics(df)
-        
-        # 6. Создаём визуализации
-        create_oct5_visualizations(df, report_dir)
-        
-        # 7. Создаём детальный отчёт
-        create_oct5_summary_report(df, stats, report_dir)
+        # 5. Создаём детальный отчёт
+        create_oct5_summary_report(df, cube, stats, report_dir)
         
         print("\n🎉 ГЛУБОКИЙ АНАЛИЗ ЗА 5 ОКТЯБРЯ ЗАВЕРШЁН!")
         print(f"📁 Все файлы сохранены в папке: {report_dir.absolute()}")
@@ -348,8 +302,11 @@ def main():
     except Exception as e:
         print(f"❌ Ошибка: {e}")
         return False
+    finally:
+        metrics.write_metrics("vacancy_analysis_oct5")
     
     return True
 
 if __name__ == "__main__":
-    main()
+    # Код выхода — для пайплайна: main() возвращает False, если отчёт не построен
+    sys.exit(0 if main() else 1)
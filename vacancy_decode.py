@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+📦 Потоковый разбор страниц /vacancies API hh.ru
+Из каждого элемента оставляются только поля, которые используют парсеры;
+остальное (описания, адреса, роли и т.п.) не материализуется в памяти надолго.
+
+Бэкенд по умолчанию: orjson, если установлен, иначе потоковый разбор на stdlib.
+ijson (события yajl) доступен явно — на страницах hh.ru он медленнее stdlib-потока.
+Принудительно: HH_JSON_BACKEND=orjson|ijson|stream|full.
+"""
+
+import codecs
+import json
+import os
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Поля элемента items[], которые нужны парсерам (employer сужается до id и name)
+PROJECTED_FIELDS = ("id", "name", "employer", "alternate_url", "salary", "published_at", "area")
+
+# Поля страницы помимо items
+PAGE_FIELDS = ("found", "pages", "page", "per_page")
+
+ITEMS_START_RE = re.compile(r'\s*\{\s*"items"\s*:\s*\[')
+SEPARATOR_RE = re.compile(r'[\s,]*')
+
+# Сколько символов ждать начала "items", прежде чем перейти к полному разбору
+HEAD_LIMIT = 4096
+
+
+def default_backend() -> str:
+    """Бэкенд по умолчанию с учётом HH_JSON_BACKEND и установленных библиотек"""
+    backend = os.environ.get("HH_JSON_BACKEND", "")
+    if backend:
+        return backend
+    return "orjson" if orjson is not None else "stream"
+
+
+def project_item(item: dict) -> dict:
+    """Оставляет в элементе только нужные поля (отсутствующие так и остаются отсутствующими)"""
+    projected = {field: item[field] for field in PROJECTED_FIELDS if field in item}
+    employer = projected.get("employer")
+    if employer:
+        projected["employer"] = {key: employer[key] for key in ("id", "name") if key in employer}
+    return projected
+
+
+def project_page(data: dict) -> dict:
+    """Проекция уже разобранной страницы"""
+    page = {field: data.get(field) for field in PAGE_FIELDS}
+    page["items"] = [project_item(item) for item in data.get("items", [])]
+    return page
+
+
+def decode_full(chunks) -> dict:
+    """Эталон: json.loads всего документа и проекция"""
+    return project_page(json.loads(b"".join(chunks).decode("utf-8")))
+
+
+def decode_orjson(chunks) -> dict:
+    """orjson разбирает документ целиком, но заметно быстрее json"""
+    return project_page(orjson.loads(b"".join(chunks)))
+
+
+class _ChunkReader:
+    """Файлоподобная обёртка над итератором байтовых кусков (для ijson)"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buffer = b""
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self.buffer) < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buffer += chunk
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+def decode_ijson(chunks) -> dict:
+    """События ijson: собираются только поля из PROJECTED_FIELDS"""
+    page = {field: None for field in PAGE_FIELDS}
+    page["items"] = []
+    item = None
+    builder = None
+    builder_field = None
+
+    for prefix, event, value in ijson.parse(_ChunkReader(chunks), use_float=True):
+        if builder is not None:
+            if prefix == f"items.item.{builder_field}" and event in ("end_map", "end_array"):
+                builder.event(event, value)
+                if builder.containers == []:
+                    item[builder_field] = builder.value
+                    builder = None
+                continue
+            builder.event(event, value)
+            continue
+
+        if prefix == "items.item":
+            if event == "start_map":
+                item = {}
+            elif event == "end_map":
+                page["items"].append(item)
+                item = None
+        elif item is not None and prefix.startswith("items.item."):
+            field = prefix[len("items.item."):]
+            if field in ("employer.id", "employer.name"):
+                item.setdefault("employer", {})[field[len("employer."):]] = value
+            elif field in ("salary", "area") and event in ("start_map", "start_array"):
+                builder = ijson.ObjectBuilder()
+                builder_field = field
+                builder.event(event, value)
+            elif field == "employer" and event == "null":
+                item["employer"] = None
+            elif field in PROJECTED_FIELDS and field != "employer" and event != "map_key":
+                item[field] = value
+        elif prefix in PAGE_FIELDS:
+            page[prefix] = value
+    return page
+
+
+def decode_stream(chunks) -> dict:
+    """Потоковый разбор на stdlib: элементы items[] декодируются по одному
+    по мере распаковки, проецируются и сразу отпускаются."""
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buffer = ""
+    head = None
+    items = []
+    items_done = False
+    finished = False
+
+    while not finished:
+        chunk = next(chunks, None)
+        finished = chunk is None
+        buffer += utf8.decode(chunk or b"", final=finished)
+
+        if head is None:
+            match = ITEMS_START_RE.match(buffer)
+            if match is None:
+                if finished or len(buffer) > HEAD_LIMIT:
+                    # Непривычный порядок ключей — разбираем целиком
+                    rest = "".join(utf8.decode(c) for c in chunks) + utf8.decode(b"", final=True)
+                    return project_page(json.loads(buffer + rest))
+                continue
+            head = buffer[:match.end() - 1]
+            buffer = buffer[match.end():]
+
+        if not items_done:
+            pos = 0
+            while True:
+                pos = SEPARATOR_RE.match(buffer, pos).end()
+                if pos >= len(buffer):
+                    break
+                if buffer[pos] == "]":
+                    items_done = True
+                    pos += 1
+                    break
+                if buffer[pos] != "{":
+                    raise ValueError(f"неожиданный символ в items: {buffer[pos]!r}")
+                try:
+                    item, pos_end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if finished:
+                        raise
+                    break
+                items.append(project_item(item))
+                pos = pos_end
+            buffer = buffer[pos:]
+
+    if not items_done:
+        raise ValueError("документ оборвался внутри items")
+    page = json.loads(head + "[]" + buffer)
+    result = {field: page.get(field) for field in PAGE_FIELDS}
+    result["items"] = items
+    return result
+
+
+BACKENDS = {
+    "full": decode_full,
+    "orjson": decode_orjson,
+    "ijson": decode_ijson,
+    "stream": decode_stream,
+}
+
+
+# Ошибки бэкендов, которые не наследуют ValueError (у ijson — JSONError → Exception)
+BACKEND_ERRORS = (ijson.JSONError,) if ijson is not None else ()
+
+
+def available_backends() -> list:
+    """Бэкенды, которые можно использовать в этом окружении"""
+    return [name for name in BACKENDS
+            if (name != "orjson" or orjson is not None) and (name != "ijson" or ijson is not None)]
+
+
+def decode_vacancies_page(chunks, backend: str = None) -> dict:
+    """Разбирает страницу /vacancies из итератора распакованных кусков байт.
+    Ошибки разбора любого бэкенда приводятся к ValueError — её клиент hh_api повторяет"""
+    try:
+        return BACKENDS[backend or default_backend()](chunks)
+    except BACKEND_ERRORS as e:
+        raise ValueError(f"{type(e).__name__}: {e}") from e
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+📄 КАРТОЧКИ ВАКАНСИЙ /vacancies/{id}
+Выдача поиска не содержит опыта, графика, типа занятости, ключевых навыков и
+полного описания — они есть только в карточке вакансии. Этап обогащения
+запрашивает карточки последнего снимка и складывает их в постоянный кэш
+data/vacancy_details.sqlite (одна строка на id).
+
+Карточка скачивается один раз за жизнь вакансии:
+- новые id (нет в кэше) запрашиваются целиком;
+- если в выдаче изменились название, компания или зарплата, карточка
+  перепроверяется условным запросом с If-None-Match — ответ 304 тела не несёт;
+- неизменные вакансии не запрашиваются вовсе.
+
+Запросы идут через общий клиент hh_api (адаптивный лимитер, повторы, circuit
+breaker) из ограниченного пула потоков: в работе не больше DETAIL_WORKERS
+запросов, а очередь задач не растёт дальше удвоенного числа потоков.
+
+Запуск из корня проекта:
+    python vacancy_details.py                # карточки последнего снимка
+    python vacancy_details.py --date 2025-10-05 --workers 8 --limit 200
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+
+import hh_api
+import metrics
+from rate_limiter import FetchError
+from snapshot_diff import DATA_DIR, TRACKED_FIELDS, list_snapshots, load_snapshot_records
+
+DETAILS_DB = DATA_DIR / "vacancy_details.sqlite"
+
+# Потоков, одновременно ждущих ответа API (общий темп всё равно задаёт лимитер)
+DETAIL_WORKERS = 4
+
+# Сколько готовых карточек записывать в базу одной транзакцией
+COMMIT_BATCH = 200
+
+# Ошибки, после которых продолжать бессмысленно: API недоступен или сбор остановлен
+FATAL_ERRORS = ("circuit_open", "stopped")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS details (
+    id TEXT PRIMARY KEY,
+    listing_hash TEXT NOT NULL,
+    etag TEXT,
+    status INTEGER NOT NULL,
+    fetched_at TEXT,
+    checked_at TEXT NOT NULL,
+    experience TEXT,
+    schedule TEXT,
+    employment TEXT,
+    key_skills TEXT,
+    description TEXT
+);
+"""
+
+TAG_RE = re.compile(r'<[^>]+>')
+SPACE_RE = re.compile(r'[ \t\r\f\v]+')
+BLOCK_TAG_RE = re.compile(r'</?(?:p|br|li|ul|ol|div|h\d)[^>]*>', re.IGNORECASE)
+
+# Колонки, которые add_details добавляет к таблице снимка
+DETAIL_COLUMNS = {
+    "experience": "Опыт",
+    "schedule": "График",
+    "employment": "Занятость",
+    "key_skills": "Ключевые навыки",
+}
+
+
+def connect(path: Path = DETAILS_DB) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def listing_hash(record: dict) -> str:
+    """Отпечаток отслеживаемых полей выдачи: изменился — карточку пора перепроверить"""
+    payload = "\x1f".join(record.get(field, "") for field in TRACKED_FIELDS)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def html_to_text(value) -> str:
+    """Описание из HTML карточки в простой текст (абзацы и пункты — с новой строки)"""
+    if not value:
+        return ""
+    text = html.unescape(TAG_RE.sub("", BLOCK_TAG_RE.sub("\n", value)))
+    lines = (SPACE_RE.sub(" ", line).strip() for line in text.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def parse_detail(data: dict) -> dict:
+    """Нужные поля карточки: названия справочных значений, навыки списком, текст описания"""
+    def name_of(key):
+        return (data.get(key) or {}).get("name", "")
+
+    return {
+        "experience": name_of("experience"),
+        "schedule": name_of("schedule"),
+        "employment": name_of("employment"),
+        "key_skills": json.dumps([skill.get("name", "") for skill in data.get("key_skills") or []],
+                                 ensure_ascii=False),
+        "description": html_to_text(data.get("description")),
+    }
+
+
+def select_pending(connection: sqlite3.Connection, records: dict) -> list:
+    """Вакансии снимка, чью карточку нужно скачать или перепроверить: [(id, отпечаток, ETag)]"""
+    cached = dict(((vacancy_id, (digest, etag)) for vacancy_id, digest, etag
+                   in connection.execute("SELECT id, listing_hash, etag FROM details")))
+    pending = []
+    for vacancy_id, record in records.items():
+        # Без числового id (вакансия без ссылки) карточку не запросить
+        if not vacancy_id.isdigit():
+            continue
+        digest = listing_hash(record)
+        previous = cached.get(vacancy_id)
+        if previous is None:
+            pending.append((vacancy_id, digest, None))
+        elif previous[0] != digest:
+            pending.append((vacancy_id, digest, previous[1]))
+    return pending
+
+
+def fetch_detail(vacancy_id: str, etag: str = None, stop_event=None):
+    """Запрашивает карточку (условно, если известен ETag): (статус, ETag, данные или None)"""
+    headers = {"If-None-Match": etag} if etag else None
+    try:
+        status, response_headers, data = hh_api.get_client().fetch_response(
+            f"/vacancies/{vacancy_id}", headers=headers, stop_event=stop_event)
+    except FetchError as e:
+        # 404 — вакансию удалили: запоминаем, чтобы не спрашивать снова до изменения в выдаче
+        if e.status == 404:
+            return 404, None, None
+        raise
+    return status, response_headers.get("ETag"), data
+
+
+def store_result(connection: sqlite3.Connection, vacancy_id: str, digest: str, status: int, etag, data):
+    """Записывает результат запроса карточки в кэш"""
+    now = datetime.now().isoformat(timespec="seconds")
+    if status == 304:
+        connection.execute("UPDATE details SET listing_hash = ?, checked_at = ? WHERE id = ?",
+                           (digest, now, vacancy_id))
+        return
+    fields = parse_detail(data) if data else dict.fromkeys(
+        ("experience", "schedule", "employment", "key_skills", "description"), None)
+    connection.execute(
+        "INSERT OR REPLACE INTO details (id, listing_hash, etag, status, fetched_at, checked_at, experience,"
+        " schedule, employment, key_skills, description) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (vacancy_id, digest, etag, status, now, now, fields["experience"], fields["schedule"],
+         fields["employment"], fields["key_skills"], fields["description"]))
+
+
+@metrics.timed()
+def enrich_snapshot(date_str: str = None, workers: int = DETAIL_WORKERS, limit: int = None,
+                    stop_event=None) -> dict:
+    """Докачивает карточки новых и изменившихся вакансий снимка (по умолчанию последнего).
+
+    Возвращает счётчики: pending, fetched, not_modified, gone, failed и aborted
+    (True, если сбор прерван circuit breaker'ом или сигналом остановки).
+    """
+    snapshots = list_snapshots()
+    date_str = date_str or (snapshots[-1] if snapshots else None)
+    counts = {"pending": 0, "fetched": 0, "not_modified": 0, "gone": 0, "failed": 0, "aborted": False}
+    if date_str is None:
+        print("  ⚠️ Снимков нет — карточки не запрашиваются")
+        return counts
+
+    connection = connect()
+    try:
+        pending = select_pending(connection, load_snapshot_records(date_str))
+        if limit is not None:
+            pending = pending[:limit]
+        counts["pending"] = len(pending)
+        print(f"  📄 {date_str}: карточек к загрузке или перепроверке — {len(pending)}")
+        if not pending:
+            return counts
+
+        tasks = iter(pending)
+        in_flight = {}
+        uncommitted = 0
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            while True:
+                # Очередь ограничена: новые задачи ставятся по мере завершения старых
+                while not counts["aborted"] and len(in_flight) < 2 * max(workers, 1):
+                    task = next(tasks, None)
+                    if task is None:
+                        break
+                    vacancy_id, digest, etag = task
+                    in_flight[pool.submit(fetch_detail, vacancy_id, etag, stop_event)] = (vacancy_id, digest)
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    vacancy_id, digest = in_flight.pop(future)
+                    try:
+                        status, etag, data = future.result()
+                    except FetchError as e:
+                        counts["failed"] += 1
+                        if e.error_class in FATAL_ERRORS and not counts["aborted"]:
+                            counts["aborted"] = True
+                            print(f"  🛑 Загрузка карточек прервана ({e.error_class}): {e}")
+                        continue
+                    store_result(connection, vacancy_id, digest, status, etag, data)
+                    counts[{200: "fetched", 304: "not_modified"}.get(status, "gone")] += 1
+                    uncommitted += 1
+                    if uncommitted >= COMMIT_BATCH:
+                        connection.commit()
+                        uncommitted = 0
+        connection.commit()
+    finally:
+        connection.close()
+
+    for name in ("fetched", "not_modified", "gone", "failed"):
+        metrics.increment(f"details_{name}", counts[name])
+    print(f"  ✅ Скачано: {counts['fetched']}, не изменилось (304): {counts['not_modified']}, "
+          f"удалено: {counts['gone']}, ошибок: {counts['failed']}")
+    return counts
+
+
+def refresh_details() -> bool:
+    """Действие этапа пайплайна: карточки последнего снимка; ошибка — если API недоступен"""
+    return not enrich_snapshot()["aborted"]
+
+
+def load_details(path: Path = DETAILS_DB):
+    """Кэш карточек как DataFrame с индексом — id вакансии (только успешно скачанные)"""
+    import pandas as pd
+
+    if not path.exists():
+        return pd.DataFrame(columns=list(DETAIL_COLUMNS) + ["description"], index=pd.Index([], name="id"))
+    connection = connect(path)
+    try:
+        return pd.read_sql_query(
+            "SELECT id, experience, schedule, employment, key_skills, description FROM details WHERE status = 200",
+            connection, index_col="id")
+    finally:
+        connection.close()
+
+
+def add_details(df, details=None):
+    """Добавляет к таблице снимка колонки карточек (DETAIL_COLUMNS); без карточки — пусто"""
+    from frame_schema import vacancy_ids
+
+    details = load_details() if details is None else details
+    ids = vacancy_ids(df)
+    df = df.copy()
+    for column, label in DETAIL_COLUMNS.items():
+        values = details[column]
+        if column == "key_skills":
+            values = values.map(lambda skills: ", ".join(json.loads(skills)) if skills else "")
+        df[label] = ids.map(values)
+    return df
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Загрузка карточек вакансий /vacancies/{id}")
+    parser.add_argument("--date", help="снимок YYYY-MM-DD (по умолчанию последний)")
+    parser.add_argument("--workers", type=int, default=DETAIL_WORKERS, help="потоков загрузки")
+    parser.add_argument("--limit", type=int, help="не больше N карточек за запуск")
+    args = parser.parse_args()
+
+    print("📄 КАРТОЧКИ ВАКАНСИЙ")
+    print("=" * 60)
+    started = time.perf_counter()
+    counts = enrich_snapshot(args.date, args.workers, args.limit)
+    print(f"⏱️ Время: {time.perf_counter() - started:.2f} сек")
+    metrics.write_metrics("vacancy_details")
+    return 1 if counts["aborted"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,17 +2,32 @@
 """
 📈 АНАЛИЗ ДИНАМИКИ РЫНКА ТРУДА ВЛАДИВОСТОКА
 Сравнение данных 26 сентября vs 5 октября 2025
+Сравнительная статистика, графики и лист по ролям строятся по срезам куба
+rollup_cube; строки вакансий читаются только для листов с данными по датам.
 """
 
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from pathlib import Path
-import re
 from datetime import datetime
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+import metrics
+from salary_normalization import normalize_salaries
+from robust_stats import label_columns
+from roles import categorize_roles
+from employers import add_employer_keys
+from near_duplicates import mark_across
+from frame_schema import concat_frames, read_snapshot_csv, with_links
+from rollup_cube import load_cube
+from snapshot_store import snapshot_files
+from vacancy_details import add_details, load_details
+
+SNAPSHOT_DATES = ("2025-09-26", "2025-10-05")
+
 # Настройка matplotlib для русских шрифтов
 plt.rcParams['font.family'] = ['DejaVu Sans', 'Arial Unicode MS', 'sans-serif']
 plt.rcParams['axes.unicode_minus'] = False
@@ -34,13 +49,13 @@ def load_data_by_date():
     # Данные за 26 сентября
     sep_dir = Path("data/2025-09-26")
     if sep_dir.exists():
-        sep_files = list(sep_dir.glob("*.csv"))
+        sep_files = snapshot_files(sep_dir.name, sep_dir.parent)
         print(f"🔍 Найдено файлов за 26 сентября: {len(sep_files)}")
         
         for csv_file in sep_files:
             print(f"  📄 Загружаем: {csv_file.name}")
             try:
-                df = pd.read_csv(csv_file, sep=';', encoding='utf-8-sig')
+                df = read_snapshot_csv(csv_file)
                 data_26sep.append(df)
             except Exception as e:
                 print(f"  ❌ Ошибка: {e}")
@@ -48,26 +63,29 @@ def load_data_by_date():
     # Данные за 5 октября
     oct_dir = Path("data/2025-10-05")
     if oct_dir.exists():
-        oct_files = list(oct_dir.glob("*.csv"))
+        oct_files = snapshot_files(oct_dir.name, oct_dir.parent)
         print(f"🔍 Найдено файлов за 5 октября: {len(oct_files)}")
         
         for csv_file in oct_files:
             print(f"  📄 Загружаем: {csv_file.name}")
             try:
-                df = pd.read_csv(csv_file, sep=';', encoding='utf-8-sig')
+                df = read_snapshot_csv(csv_file)
                 data_5oct.append(df)
             except Exception as e:
                 print(f"  ❌ Ошибка: {e}")
     
     # Объединяем данные по датам
-    df_26sep = pd.concat(data_26sep, ignore_index=True) if data_26sep else pd.DataFrame()
-    df_5oct = pd.concat(data_5oct, ignore_index=True) if data_5oct else pd.DataFrame()
+    df_26sep = add_employer_keys(concat_frames(data_26sep) if data_26sep else pd.DataFrame())
+    df_5oct = add_employer_keys(concat_frames(data_5oct) if data_5oct else pd.DataFrame())
+    # Кластеры почти-дубликатов общие для обеих дат: перевыложенная вакансия считается один раз
+    df_26sep, df_5oct = mark_across([df_26sep, df_5oct])
     
     print(f"✅ 26 сентября: {len(df_26sep)} записей")
     print(f"✅ 5 октября: {len(df_5oct)} записей")
     
     return df_26sep, df_5oct
 
+@metrics.timed()
 def clean_salary_data(df, date_name):
     """Очищает данные о зарплатах"""
     print(f"🧹 Очищаем данные за {date_name}...")
@@ -75,48 +93,8 @@ def clean_salary_data(df, date_name):
     if len(df) == 0:
         return df
     
-    def parse_salary(salary_text):
-        if pd.isna(salary_text) or salary_text == "не указано":
-            return None, None
-        
-        salary_str = str(salary_text).replace(" ", "").replace(",", "").lower()
-        
-        # Диапазон зарплат
-        range_match = re.search(r'(\d+)–(\d+)', salary_str)
-        if range_match:
-            from_salary = int(range_match.group(1))
-            to_salary = int(range_match.group(2))
-            return from_salary, to_salary
-        
-        # "от X"
-        from_match = re.search(r'от(\d+)', salary_str)
-        if from_match:
-            from_salary = int(from_match.group(1))
-            return from_salary, None
-        
-        # "до X"
-        to_match = re.search(r'до(\d+)', salary_str)
-        if to_match:
-            to_salary = int(to_match.group(1))
-            return None, to_salary
-        
-        return None, None
-    
-    # Парсим зарплаты
-    salary_data = df['Зарплата'].apply(parse_salary)
-    df['salary_from'] = salary_data.apply(lambda x: x[0] if x[0] is not None else np.nan)
-    df['salary_to'] = salary_data.apply(lambda x: x[1] if x[1] is not None else np.nan)
-    
-    # Вычисляем среднюю зарплату
-    df['salary_avg'] = np.where(
-        df['salary_to'].notna() & df['salary_from'].notna(),
-        (df['salary_from'] + df['salary_to']) / 2,
-        np.where(
-            df['salary_from'].notna(),
-            df['salary_from'],
-            df['salary_to']
-        )
-    )
+    # Разбор текста, перевод в рубли по курсу на дату публикации и gross → на руки
+    df = normalize_salaries(df)
     
     # Удаляем строки без зарплаты
     initial_count = len(df)
@@ -127,79 +105,46 @@ def clean_salary_data(df, date_name):
     
     return df
 
-def categorize_roles(df):
-    """Определяет категории ролей"""
-    if len(df) == 0:
-        return df
-    
-    def get_role_category(title):
-        if pd.isna(title):
-            return "Неизвестно"
-        
-        title_lower = title.lower()
-        
-        # Продажи
-        sales_keywords = ["продаж", "sales", "менеджер по продаж", "руководитель продаж"]
-        if any(keyword in title_lower for keyword in sales_keywords):
-            return "Продажи"
-        
-        # Закупки
-        procurement_keywords = ["закуп", "закупк", "закупщик", "снабжен"]
-        if any(keyword in title_lower for keyword in procurement_keywords):
-            return "Закупки"
-        
-        # Проекты
-        project_keywords = ["проект", "project", "менеджер проект", "руководитель проект"]
-        if any(keyword in title_lower for keyword in project_keywords):
-            return "Проекты"
-        
-        # Менеджмент
-        management_keywords = ["менеджер", "руководитель", "директор"]
-        if any(keyword in title_lower for keyword in management_keywords):
-            return "Менеджмент"
-        
-        return "Другое"
-    
-    df['role_category'] = df['Название вакансии'].apply(get_role_category)
-    return df
+@metrics.timed()
+def role_experience_breakdown(frames):
+    """Роль × опыт по карточкам вакансий (data/vacancy_details.sqlite): число вакансий
+    и медианная зарплата. Опыт есть только в карточке; без карточек — None"""
+    details = load_details()
+    if len(details) == 0:
+        return None
+    
+    breakdowns = {}
+    for date_name, df in frames.items():
+        if len(df) == 0:
+            continue
+        df = add_details(categorize_roles(df), details)
+        df['Опыт'] = df['Опыт'].fillna('Нет карточки')
+        breakdowns[date_name] = (df.groupby(['role_category', 'Опыт'], observed=True)['salary_avg']
+                                 .agg(['count', 'median'])
+                                 .rename(columns={'count': 'Вакансий', 'median': 'Медианная зарплата'}))
+    if not breakdowns:
+        return None
+    return pd.concat(breakdowns, names=['Дата'])
+
+def load_cube_slices(cube=None):
+    """Срезы куба за 26 сентября и 5 октября (из уже загруженного куба, если он передан)"""
+    cube = load_cube(list(SNAPSHOT_DATES)) if cube is None else cube.slice(snapshot=list(SNAPSHOT_DATES))
+    slices = [cube.slice(snapshot=date_str) for date_str in SNAPSHOT_DATES]
+    print(f"🧊 Ячеек куба: 26 сентября — {len(slices[0])}, 5 октября — {len(slices[1])}")
+    return slices
 
-def calculate_comparison_stats(df_26sep, df_5oct):
-    """Вычисляет сравнительную статистику"""
+@metrics.timed()
+def calculate_comparison_stats(cube_26sep, cube_5oct):
+    """Вычисляет сравнительную статистику по срезам куба"""
     print("📊 Вычисляем сравнительную статистику...")
     
-    def get_stats(df, date_name):
-        if len(df) == 0:
-            return {
-                'date': date_name,
-                'total_vacancies': 0,
-                'with_salary': 0,
-                'unique_companies': 0,
-                'mean_salary': 0,
-                'median_salary': 0,
-                'std_salary': 0,
-                'min_salary': 0,
-                'max_salary': 0
-            }
-        
-        salaries = df['salary_avg'].dropna()
-        return {
-            'date': date_name,
-            'total_vacancies': len(df),
-            'with_salary': len(salaries),
-            'unique_companies': df['Компания'].nunique(),
-            'mean_salary': np.mean(salaries),
-            'median_salary': np.median(salaries),
-            'std_salary': np.std(salaries),
-            'min_salary': np.min(salaries),
-            'max_salary': np.max(salaries)
-        }
-    
-    stats_26sep = get_stats(df_26sep, "26 сентября")
-    stats_5oct = get_stats(df_5oct, "5 октября")
+    stats_26sep = cube_26sep.stats("26 сентября")
+    stats_5oct = cube_5oct.stats("5 октября")
     
     # Вычисляем изменения
     changes = {}
-    for key in ['total_vacancies', 'with_salary', 'unique_companies', 'mean_salary', 'median_salary']:
+    for key in ['total_vacancies', 'unique_vacancies', 'with_salary', 'unique_companies', 'mean_salary',
+                'trimmed_mean_salary', 'median_salary']:
         if key in stats_26sep and key in stats_5oct:
             old_val = stats_26sep[key]
             new_val = stats_5oct[key]
@@ -213,8 +158,10 @@ def calculate_comparison_stats(df_26sep, df_5oct):
                 }
     
     print("  📈 СРАВНИТЕЛЬНАЯ СТАТИСТИКА:")
-    print(f"    📅 26 сентября: {stats_26sep['with_salary']} вакансий, средняя {stats_26sep['mean_salary']:,.0f} ₽")
-    print(f"    📅 5 октября: {stats_5oct['with_salary']} вакансий, средняя {stats_5oct['mean_salary']:,.0f} ₽")
+    print(f"    📅 26 сентября: {stats_26sep['with_salary']} вакансий (без дубликатов {stats_26sep['unique_vacancies']}), "
+          f"средняя {stats_26sep['mean_salary']:,.0f} ₽")
+    print(f"    📅 5 октября: {stats_5oct['with_salary']} вакансий (без дубликатов {stats_5oct['unique_vacancies']}), "
+          f"средняя {stats_5oct['mean_salary']:,.0f} ₽")
     
     if 'with_salary' in changes:
         change = changes['with_salary']
@@ -226,12 +173,13 @@ def calculate_comparison_stats(df_26sep, df_5oct):
     
     return stats_26sep, stats_5oct, changes
 
-def create_dynamics_visualizations(df_26sep, df_5oct, stats_26sep, stats_5oct, changes, report_dir):
+def create_dynamics_visualizations(cube_26sep, cube_5oct, stats_26sep, stats_5oct, changes, report_dir):
     """Создаёт визуализации динамики"""
     print("📊 Создаём визуализации динамики...")
     
     # 1. Сравнение основных показателей
-    metrics = ['Количество вакансий', 'Средняя зарплата', 'Медианная зарплата', 'Уникальных компаний']
+    chart_timer = metrics.timer("chart_dynamics_comparison")
+    indicators = ['Количество вакансий', 'Средняя зарплата', 'Медианная зарплата', 'Уникальных компаний']
     sep_values = [stats_26sep['with_salary'], stats_26sep['mean_salary'], 
                  stats_26sep['median_salary'], stats_26sep['unique_companies']]
     oct_values = [stats_5oct['with_salary'], stats_5oct['mean_salary'], 
@@ -351,16 +299,16 @@ def create_dynamics_visualizations(df_26sep, df_5oct, stats_26sep, stats_5oct, c
     plt.tight_layout()
     plt.savefig(report_dir / 'dynamics_comparison.png', dpi=300, bbox_inches='tight')
     plt.close()
+    chart_timer.stop()
     print("  ✅ Создан: dynamics_comparison.png")
     
     # 2. Сравнение по категориям ролей (если есть данные)
-    if len(df_26sep) > 0 and len(df_5oct) > 0:
-        df_26sep_clean = categorize_roles(df_26sep)
-        df_5oct_clean = categorize_roles(df_5oct)
+    if stats_26sep['with_salary'] > 0 and stats_5oct['with_salary'] > 0:
+        chart_timer = metrics.timer("chart_dynamics_by_roles")
         
         # Получаем категории для обеих дат
-        sep_roles = df_26sep_clean.groupby('role_category')['salary_avg'].agg(['count', 'mean']).fillna(0)
-        oct_roles = df_5oct_clean.groupby('role_category')['salary_avg'].agg(['count', 'mean']).fillna(0)
+        sep_roles = cube_26sep.summary('role')[['count', 'mean']].fillna(0)
+        oct_roles = cube_5oct.summary('role')[['count', 'mean']].fillna(0)
         
         # Объединяем все категории
         all_categories = set(sep_roles.index) | set(oct_roles.index)
@@ -396,10 +344,12 @@ def create_dynamics_visualizations(df_26sep, df_5oct, stats_26sep, stats_5oct, c
         plt.tight_layout()
         plt.savefig(report_dir / 'dynamics_by_roles.png', dpi=300, bbox_inches='tight')
         plt.close()
+        chart_timer.stop()
         print("  ✅ Создан: dynamics_by_roles.png")
 
-def create_dynamics_report(df_26sep, df_5oct, stats_26sep, stats_5oct, changes, report_dir):
-    """Создаёт отчёт по динамике"""
+@metrics.timed()
+def create_dynamics_report(df_26sep, df_5oct, slices, stats_26sep, stats_5oct, changes, report_dir):
+    """Создаёт отчёт по динамике: сводные листы — из куба, листы данных — из строк"""
     print("📋 Создаём отчёт по динамике...")
     
     excel_file = report_dir / 'dynamics_report.xlsx'
@@ -407,23 +357,28 @@ def create_dynamics_report(df_26sep, df_5oct, stats_26sep, stats_5oct, changes,
     with pd.ExcelWriter(excel_file, engine='openpyxl') as writer:
         # Сводная таблица сравнения
         comparison_data = {
-            'Показатель': ['Всего вакансий', 'С зарплатой', 'Уникальных компаний', 
-                          'Средняя зарплата', 'Медианная зарплата', 'Разброс (σ)', 
-                          'Минимальная зарплата', 'Максимальная зарплата'],
-            '26 сентября': [stats_26sep['total_vacancies'], stats_26sep['with_salary'], 
+            'Показатель': ['Всего вакансий', 'Без почти-дубликатов', 'С зарплатой', 'Уникальных компаний', 
+                          'Средняя зарплата', 'Усечённая средняя (10%)', 'Медианная зарплата', 'Медиана: 95% ДИ',
+                          'Выбросов (MAD)', 'Разброс (σ)', 'Минимальная зарплата', 'Максимальная зарплата'],
+            '26 сентября': [stats_26sep['total_vacancies'], stats_26sep['unique_vacancies'], stats_26sep['with_salary'], 
                            stats_26sep['unique_companies'], f"{stats_26sep['mean_salary']:,.0f} ₽",
-                           f"{stats_26sep['median_salary']:,.0f} ₽", f"{stats_26sep['std_salary']:,.0f} ₽",
+                           f"{stats_26sep['trimmed_mean_salary']:,.0f} ₽", f"{stats_26sep['median_salary']:,.0f} ₽",
+                           f"{stats_26sep['median_ci_low']:,.0f}–{stats_26sep['median_ci_high']:,.0f} ₽",
+                           stats_26sep['outliers'], f"{stats_26sep['std_salary']:,.0f} ₽",
                            f"{stats_26sep['min_salary']:,.0f} ₽", f"{stats_26sep['max_salary']:,.0f} ₽"],
-            '5 октября': [stats_5oct['total_vacancies'], stats_5oct['with_salary'], 
+            '5 октября': [stats_5oct['total_vacancies'], stats_5oct['unique_vacancies'], stats_5oct['with_salary'], 
                          stats_5oct['unique_companies'], f"{stats_5oct['mean_salary']:,.0f} ₽",
-                         f"{stats_5oct['median_salary']:,.0f} ₽", f"{stats_5oct['std_salary']:,.0f} ₽",
+                         f"{stats_5oct['trimmed_mean_salary']:,.0f} ₽", f"{stats_5oct['median_salary']:,.0f} ₽",
+                         f"{stats_5oct['median_ci_low']:,.0f}–{stats_5oct['median_ci_high']:,.0f} ₽",
+                         stats_5oct['outliers'], f"{stats_5oct['std_salary']:,.0f} ₽",
                          f"{stats_5oct['min_salary']:,.0f} ₽", f"{stats_5oct['max_salary']:,.0f} ₽"]
         }
         
         # Добавляем изменения
         change_values = []
-        for key in ['total_vacancies', 'with_salary', 'unique_companies', 'mean_salary', 'median_salary', 
-                   'std_salary', 'min_salary', 'max_salary']:
+        for key in ['total_vacancies', 'unique_vacancies', 'with_salary', 'unique_companies', 'mean_salary',
+                   'trimmed_mean_salary',
+                   'median_salary', 'median_ci', 'outliers', 'std_salary', 'min_salary', 'max_salary']:
             if key in changes:
                 change = changes[key]
                 change_values.append(f"{change['change']:+,.0f} ({change['change_pct']:+.1f}%)")
@@ -434,20 +389,31 @@ def create_dynamics_report(df_26sep, df_5oct, stats_26sep, stats_5oct, changes,
         comparison_df = pd.DataFrame(comparison_data)
         comparison_df.to_excel(writer, sheet_name='Сравнение показателей', index=False)
         
+        # Устойчивая статистика по ролям за обе даты
+        role_frames = {date_name: label_columns(cube_slice.summary('role')).rename_axis('role_category')
+                       for date_name, cube_slice in zip(["26 сентября", "5 октября"], slices) if len(cube_slice) > 0}
+        if role_frames:
+            pd.concat(role_frames, names=['Дата']).to_excel(writer, sheet_name='Роли (устойчиво)')
+        
+        # Роль × опыт — из карточек вакансий, если они скачаны
+        breakdown = role_experience_breakdown({"26 сентября": df_26sep, "5 октября": df_5oct})
+        if breakdown is not None:
+            breakdown.to_excel(writer, sheet_name='Роли × опыт')
+        
         # Данные за 26 сентября
         if len(df_26sep) > 0:
             df_26sep_clean = categorize_roles(df_26sep)
-            df_26sep_clean.to_excel(writer, sheet_name='Данные 26 сентября', index=False)
+            with_links(df_26sep_clean).to_excel(writer, sheet_name='Данные 26 сентября', index=False)
         
         # Данные за 5 октября
         if len(df_5oct) > 0:
             df_5oct_clean = categorize_roles(df_5oct)
-            df_5oct_clean.to_excel(writer, sheet_name='Данные 5 октября', index=False)
+            with_links(df_5oct_clean).to_excel(writer, sheet_name='Данные 5 октября', index=False)
     
     print(f"  ✅ Создан: {excel_file}")
 
-def main():
-    """Основная функция анализа динамики"""
+def main(cube=None):
+    """Основная функция анализа динамики; cube — куб, который демон держит в памяти"""
     print("📈 АНАЛИЗ ДИНАМИКИ РЫНКА ТРУДА ВЛАДИВОСТОКА")
     print("26 сентября vs 5 октября 2025")
     print("=" * 60)
@@ -456,25 +422,26 @@ def main():
         # 1. Создаём папку для отчётов
         report_dir = setup_report_folder()
         
-        # 2. Загружаем данные по датам
-        df_26sep, df_5oct = load_data_by_date()
+        # 2. Срезы куба по датам
+        slices = load_cube_slices(cube)
         
-        if len(df_26sep) == 0 and len(df_5oct) == 0:
+        if len(slices[0]) == 0 and len(slices[1]) == 0:
             print("❌ Нет данных для анализа!")
             return False
         
-        # 3. Очищаем данные
-        df_26sep = clean_salary_data(df_26sep, "26 сентября")
-        df_5oct = clean_salary_data(df_5oct, "5 октября")
+        # 3. Вычисляем сравнительную статистику
+        stats_26sep, stats_5oct, changes = calculate_comparison_stats(*slices)
         
-        # 4. Вычисляем сравнительную статистику
-        stats_26sep, stats_5oct, changes = calculate_comparison_stats(df_26sep, df_5oct)
+        # 4. Создаём визуализации динамики
+        create_dynamics_visualizations(*slices, stats_26sep, stats_5oct, changes, report_dir)
         
-        # 5. Создаём визуализации динамики
-        create_dynamics_visualizations(df_26sep, df_5oct, stats_26sep, stats_5oct, changes, report_dir)
+        # 5. Строки по датам — только для листов с данными
+        df_26sep, df_5oct = load_data_by_date()
+        df_26sep = clean_salary_data(df_26sep, "26 сентября")
+        df_5oct = clean_salary_data(df_5oct, "5 октября")
         
         # 6. Создаём отчёт по динамике
-        create_dynamics_report(df_26sep, df_5oct, stats_26sep, stats_5oct, changes, report_dir)
+        create_dynamics_report(df_26sep, df_5oct, slices, stats_26sep, stats_5oct, changes, report_dir)
         
         print("\n🎉 АНАЛИЗ ДИНАМИКИ ЗАВЕРШЁН!")
         print(f"📁 Все файлы сохранены в папке: {report_dir.absolute()}")
@@ -486,8 +453,11 @@ def main():
     except Exception as e:
         print(f"❌ Ошибка: {e}")
         return False
+    finally:
+        metrics.write_metrics("vacancy_dynamics_comparison")
     
     return True
 
 if __name__ == "__main__":
-    main()
+    # Код выхода — для пайплайна: main() возвращает False, если отчёт не построен
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+🧾 Компактная запись вакансии
+Общее представление вакансии в памяти для обоих парсеров: слотовый dataclass
+вместо словаря с кириллическими ключами. Повторяющиеся строки (компания, запрос,
+«когда») интернируются, а для записи CSV и анализа записи пакетно
+превращаются в колонки.
+"""
+
+import sys
+from dataclasses import dataclass
+from operator import attrgetter
+
+# Колонки CSV-снимка data/<дата>/*.csv (порядок важен)
+CSV_HEADERS = ["Название вакансии", "Компания", "Ссылка", "Дата публикации", "Когда", "Зарплата", "Запрос",
+               "ID работодателя", "До вычета налогов", "Регион"]
+
+# Атрибуты Vacancy в порядке CSV_HEADERS
+CSV_ATTRS = ["title", "company", "url", "published", "relative_date", "salary", "query", "employer_id", "salary_gross",
+             "area"]
+
+_intern = sys.intern
+
+
+@dataclass(slots=True)
+class Vacancy:
+    """Одна вакансия из выдачи API"""
+
+    id: str
+    title: str
+    company: str
+    url: str
+    published: str
+    relative_date: str
+    salary: str
+    query: str
+    employer_id: str = ""
+    salary_gross: str = ""  # «да» / «нет» / «» (зарплата не указана)
+    area: str = ""          # регион вакансии (area.name в API)
+
+    def __post_init__(self):
+        # Компаний, запросов и относительных дат немного — одна копия строки на всё
+        self.company = _intern(self.company or "")
+        self.query = _intern(self.query or "")
+        self.relative_date = _intern(self.relative_date or "")
+        self.employer_id = _intern(self.employer_id or "")
+        self.salary_gross = _intern(self.salary_gross or "")
+        self.area = _intern(self.area or "")
+
+    @property
+    def key(self) -> str:
+        """Ключ дедупликации: id hh.ru, а при его отсутствии — название + компания"""
+        return self.id or f"{self.title}_{self.company}"
+
+    @property
+    def has_salary(self) -> bool:
+        return self.salary != "не указано"
+
+    def as_row(self) -> list:
+        """Строка CSV в порядке CSV_HEADERS"""
+        return [self.title, self.company, self.url, self.published, self.relative_date, self.salary, self.query,
+                self.employer_id, self.salary_gross, self.area]
+
+    @classmethod
+    def from_row(cls, row: dict, vacancy_id: str = "") -> "Vacancy":
+        """Запись из строки CSV (csv.DictReader)"""
+        return cls(vacancy_id, *(row.get(header, "") or "" for header in CSV_HEADERS))
+
+
+def iter_rows(vacancies):
+    """Строки для csv.writer.writerows"""
+    return (vacancy.as_row() for vacancy in vacancies)
+
+
+def to_columns(vacancies: list) -> dict:
+    """Колоночное представление {заголовок CSV: список значений}"""
+    return {header: list(map(attrgetter(attr), vacancies)) for header, attr in zip(CSV_HEADERS, CSV_ATTRS)}
+
+
+def to_frame(vacancies: list):
+    """DataFrame в схеме CSV-снимка — вход для функций анализа без записи на диск"""
+    import pandas as pd
+    return pd.DataFrame(to_columns(vacancies), columns=CSV_HEADERS)
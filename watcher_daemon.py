@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+👁️ ДЕМОН HH_WATCHER
+Долгоживущий процесс: по расписанию собирает вакансии каждого профиля,
+держит тёплыми HTTP-соединения, кэши и последние агрегаты,
+а отчёты перестраивает только при появлении новых данных.
+
+Отчёты строятся в процессе демона, а не отдельными интерпретаторами: модули
+отчётов (matplotlib, openpyxl, pandas) импортируются один раз, куб агрегатов
+держится в памяти и перечитывается, только когда пайплайн обновил его базу
+или индекс работодателей, а классификатор ролей (roles.role_category) помнит
+уже встречавшиеся названия.
+"""
+
+import argparse
+import csv
+import json
+import random
+import re
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import create_automated_report
+import employers
+import metrics
+import pipeline
+import rollup_cube
+import sales_parser
+import vacancy_analysis_oct5
+import vacancy_dynamics_comparison
+import zakup_parser
+from hh_api import get_client
+from vacancy_record import CSV_HEADERS
+
+# Профили сбора: модуль парсера предоставляет QUERIES, CSV_PREFIX, collect_vacancies и save_vacancies_csv
+PROFILES = {
+    "sales": sales_parser,
+    "zakup": zakup_parser,
+}
+
+# Интервалы между циклами сбора, минуты
+DEFAULT_INTERVALS = {
+    "sales": 60,
+    "zakup": 120,
+}
+
+VACANCY_ID_RE = re.compile(r'/vacancy/(\d+)')
+
+# Отчёты пайплайна, которые демон строит в своём процессе: модуль и аргументы main() кроме cube
+REPORTS = {
+    "vacancy_analysis_oct5": (vacancy_analysis_oct5, {}),
+    "vacancy_dynamics_comparison": (vacancy_dynamics_comparison, {}),
+    "create_automated_report": (create_automated_report, {"argv": []}),
+}
+
+# Файлы, после изменения которых куб в памяти перечитывается
+CUBE_SOURCES = [rollup_cube.CUBE_DB, employers.INDEX_FILE]
+
+# Колонки, по которым цикл сравнивается с прошлым снимком; «Когда» считается от
+# текущего времени и меняется без изменения самой вакансии
+COMPARED_COLUMNS = [header for header in CSV_HEADERS if header != "Когда"]
+
+
+def vacancy_key(vacancy: dict) -> str:
+    """Ключ строки CSV-снимка: id hh.ru, а при его отсутствии — название + компания
+    (совпадает с Vacancy.key у свежесобранных вакансий)"""
+    vacancy_id = vacancy.get("id") or ""
+    if not vacancy_id:
+        match = VACANCY_ID_RE.search(vacancy.get("Ссылка", "") or "")
+        vacancy_id = match.group(1) if match else ""
+    return vacancy_id or f"{vacancy.get('Название вакансии', '')}_{vacancy.get('Компания', '')}"
+
+
+def row_fingerprint(row: dict) -> tuple:
+    """Значения сравниваемых колонок строки CSV-снимка"""
+    return tuple(str(row.get(column, "")) for column in COMPARED_COLUMNS)
+
+
+def parse_intervals(values: list) -> dict:
+    """Разбирает аргументы вида sales=60"""
+    intervals = dict(DEFAULT_INTERVALS)
+    for value in values or []:
+        profile, _, minutes = value.partition("=")
+        if profile not in PROFILES or not minutes:
+            raise ValueError(f"Некорректный интервал: {value} (ожидается профиль=минуты)")
+        intervals[profile] = float(minutes)
+    return intervals
+
+
+class WatcherDaemon:
+    """Планировщик циклов сбора с тёплым состоянием между запусками"""
+
+    def __init__(self, intervals: dict, jitter: float = 0.1, run_reports: bool = True):
+        self.intervals = intervals
+        self.jitter = jitter
+        self.run_reports = run_reports
+        self.stop_event = threading.Event()
+
+        # Тёплое состояние процесса
+        self.client = get_client()
+        self.known_date = None
+        self.known_rows = {}
+        self.reload_known_rows()
+        self.latest_aggregates = self.load_aggregates()
+        self.cube = None
+        self.cube_signature = None
+        self.next_run = {profile: time.monotonic() for profile in PROFILES}
+
+    @staticmethod
+    def load_today_rows(module, date_str: str) -> dict:
+        """{ключ вакансии: сравниваемые колонки} из снимка профиля за date_str (если он уже есть)"""
+        csv_file = Path("data") / date_str / f"{module.CSV_PREFIX}_{date_str}.csv"
+        if not csv_file.exists():
+            return {}
+        with csv_file.open(encoding="utf-8-sig", newline="") as f:
+            return {vacancy_key(row): row_fingerprint(row) for row in csv.DictReader(f, delimiter=";")}
+
+    def reload_known_rows(self):
+        """После полуночи сравнивать нужно со снимком нового дня, а не вчерашнего"""
+        date_str = datetime.now().strftime("%Y-%m-%d")
+        if date_str != self.known_date:
+            self.known_date = date_str
+            self.known_rows = {profile: self.load_today_rows(module, date_str) for profile, module in PROFILES.items()}
+
+    @staticmethod
+    def load_aggregates() -> dict:
+        """Последние агрегаты, посчитанные пайплайном"""
+        if pipeline.AGGREGATES_FILE.exists():
+            return json.loads(pipeline.AGGREGATES_FILE.read_text(encoding="utf-8"))
+        return {}
+
+    def schedule_next(self, profile: str):
+        """Планирует следующий цикл профиля с джиттером"""
+        interval = self.intervals[profile] * 60
+        delay = interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+        self.next_run[profile] = time.monotonic() + delay
+        print(f"  ⏰ {profile}: следующий цикл через {delay / 60:.1f} мин")
+
+    def run_cycle(self, profile: str) -> bool:
+        """Один цикл сбора профиля; возвращает True, если появились новые данные"""
+        module = PROFILES[profile]
+        print(f"\n🔄 Цикл сбора: {profile} ({datetime.now().strftime('%H:%M:%S')})")
+
+        vacancies, failed_queries = module.collect_vacancies(stop_event=self.stop_event)
+        if self.stop_event.is_set():
+            return False
+        if not vacancies:
+            print(f"  ❌ {profile}: нет данных")
+            return False
+        if failed_queries:
+            print(f"  ⚠️ {profile}: {len(failed_queries)} запросов не выполнено, снимок будет помечен как неполный")
+
+        self.reload_known_rows()
+        known = self.known_rows[profile]
+        rows = {v.key: row_fingerprint(dict(zip(CSV_HEADERS, v.as_row()))) for v in vacancies}
+        if rows == known:
+            print(f"  💤 {profile}: новых и изменившихся вакансий нет")
+            return False
+
+        module.save_vacancies_csv(vacancies, failed_queries)
+        changed = sum(1 for key, row in rows.items() if key in known and known[key] != row)
+        print(f"  🆕 {profile}: новых вакансий {len(rows.keys() - known.keys())}, изменилось {changed}, "
+              f"ушло {len(known.keys() - rows.keys())}")
+        self.known_rows[profile] = rows
+        return True
+
+    def warm_cube(self):
+        """Куб из памяти; перечитывается, если этап cube обновил базу или перестроен индекс работодателей"""
+        signature = [(path.stat().st_size, path.stat().st_mtime_ns) if path.exists() else None
+                     for path in map(Path, CUBE_SOURCES)]
+        if self.cube is None or signature != self.cube_signature:
+            self.cube = rollup_cube.load_cube(update=False)
+            self.cube_signature = signature
+            metrics.increment("daemon_cube_loads")
+        else:
+            metrics.increment("daemon_cube_reuses")
+        return self.cube
+
+    def run_report(self, module_name: str) -> bool:
+        """Действие этапа отчёта: main() уже импортированного модуля с кубом из памяти"""
+        module, kwargs = REPORTS[module_name]
+        return bool(module.main(cube=self.warm_cube(), **kwargs))
+
+    def print_aggregates_change(self, previous: dict):
+        """Итоги последнего снимка по агрегатам пайплайна в сравнении с прошлым циклом"""
+        if not self.latest_aggregates:
+            return
+        date_str = max(self.latest_aggregates)
+        current, before = self.latest_aggregates[date_str], previous.get(date_str)
+        line = (f"  📊 {date_str}: вакансий {current['total_vacancies']:.0f}, "
+                f"медианная зарплата {current['median_salary']:,.0f} ₽")
+        if before:
+            line += (f" (было {before['total_vacancies']:.0f} и {before['median_salary']:,.0f} ₽)")
+        print(line)
+
+    def regenerate_reports(self):
+        """Перестраивает хранилище, агрегаты и отчёты инкрементальным пайплайном"""
+        print("\n📈 Новые данные — обновляем отчёты")
+        stages = pipeline.select_stages(pipeline.build_stages(run_report=self.run_report), None, skip_fetch=True)
+        # Отчёты идут в этом процессе, а pyplot не потокобезопасен — этапы по одному
+        pipeline.run_pipeline(stages, jobs=1)
+        previous, self.latest_aggregates = self.latest_aggregates, self.load_aggregates()
+        self.print_aggregates_change(previous)
+
+    def handle_signal(self, signum, frame):
+        print(f"\n🛑 Получен сигнал {signal.Signals(signum).name}, завершаем работу...")
+        self.stop_event.set()
+
+    def run(self, once: bool = False):
+        """Основной цикл планировщика"""
+        signal.signal(signal.SIGTERM, self.handle_signal)
+        signal.signal(signal.SIGINT, self.handle_signal)
+
+        pending = set(PROFILES)
+        try:
+            while not self.stop_event.is_set():
+                profile = min(self.next_run, key=self.next_run.get)
+                delay = self.next_run[profile] - time.monotonic()
+                if delay > 0 and self.stop_event.wait(delay):
+                    break
+
+                has_new_data = self.run_cycle(profile)
+                if self.stop_event.is_set():
+                    break
+                if has_new_data and self.run_reports:
+                    self.regenerate_reports()
+                # Метрики накопительные за всё время жизни демона
+                metrics.write_metrics("watcher_daemon")
+
+                pending.discard(profile)
+                if once and not pending:
+                    break
+                if once:
+                    self.next_run[profile] = float("inf")
+                else:
+                    self.schedule_next(profile)
+        finally:
+            self.client.close()
+            print("👋 Демон остановлен")
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Демон HH_Watcher с планировщиком сбора")
+    parser.add_argument("--interval", action="append", metavar="PROFILE=MIN",
+                        help="интервал сбора профиля в минутах (например, sales=60)")
+    parser.add_argument("--jitter", type=float, default=0.1, help="доля случайного разброса интервала")
+    parser.add_argument("--no-reports", action="store_true", help="не перестраивать отчёты")
+    parser.add_argument("--once", action="store_true", help="один цикл по каждому профилю и выход")
+    args = parser.parse_args()
+
+    print("👁️ ДЕМОН HH_WATCHER")
+    print("=" * 60)
+
+    try:
+        intervals = parse_intervals(args.interval)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+
+    for profile, minutes in intervals.items():
+        print(f"  • {profile}: каждые {minutes:g} мин (±{args.jitter:.0%})")
+
+    daemon = WatcherDaemon(intervals, jitter=args.jitter, run_reports=not args.no_reports)
+    daemon.run(once=args.once)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+"""
+👀 WATCHLIST: ПОДПИСКИ НА РАБОТОДАТЕЛЕЙ И СОХРАНЁННЫЕ ПОИСКИ
+Подписки описываются в watchlist.json: работодатели (названия, части названий
+и id hh.ru),
+ключевые слова в названии вакансии, диапазон зарплаты (₽ на руки) и регионы.
+Условия внутри подписки объединяются через И, значения одного условия — через
+ИЛИ: «закуп|снабжен, от 120 000 ₽, Владивосток».
+
+Подписки компилируются в индекс, и каждая вакансия проверяется против всех
+подписок за один проход:
+
+- ключевые слова — автомат Ахо — Корасик по названию (все вхождения всех
+  слов за один просмотр строки);
+- работодатели — хэш нормализованных названий (employers.normalize_company_name)
+  и id hh.ru, а части названий (company_contains: «дикий улов» найдёт и «Дикий
+  Улов Трейд») — второй автомат по нормализованному названию;
+- зарплата — дерево интервалов: подписки, в диапазон которых попадает зарплата;
+- регионы — хэш названий.
+
+Каждый индекс возвращает только подходящие подписки, подписка срабатывает,
+когда выполнены все её условия, поэтому время растёт с числом вакансий и
+совпадений, а не с произведением «подписки × вакансии».
+
+У подписки может быть список чатов Telegram (chats), куда notifier.py
+отправляет сводки по её совпадениям.
+
+Запуск из корня проекта (по умолчанию — новые и изменившиеся вакансии
+последнего снимка относительно предыдущего; совпадения сохраняются в
+data/watchlist/<дата>.json, с --all — в data/watchlist/<дата>.all.json):
+    python watchlist.py
+    python watchlist.py --date 2025-10-05 --all
+    python watchlist.py --file my_watchlist.json
+"""
+
+import argparse
+import json
+import math
+import sys
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import metrics
+from employers import EMPLOYER_ID_COLUMN, normalize_company_name
+from snapshot_diff import DATA_DIR, list_snapshots
+
+WATCHLIST_FILE = Path("watchlist.json")
+MATCHES_DIR = DATA_DIR / "watchlist"
+
+# Поля вакансии в совпадении (то, что нужно для уведомления)
+MATCH_FIELDS = ["vacancy_id", "title", "company", "salary", "salary_avg", "area", "published", "url"]
+
+
+def _normalize_text(text) -> str:
+    return text.lower().replace("ё", "е") if isinstance(text, str) else ""
+
+
+@dataclass
+class Subscription:
+    """Сохранённый поиск: пустое условие не ограничивает"""
+    id: str
+    title: str = ""
+    keywords: list = field(default_factory=list)
+    companies: list = field(default_factory=list)
+    company_contains: list = field(default_factory=list)
+    employer_ids: list = field(default_factory=list)
+    min_salary: float = None
+    max_salary: float = None
+    areas: list = field(default_factory=list)
+    chats: list = field(default_factory=list)
+
+    @property
+    def has_salary_range(self) -> bool:
+        return self.min_salary is not None or self.max_salary is not None
+
+    @property
+    def conditions(self) -> int:
+        """Сколько условий должно выполниться (работодатели по названию, его части и id — одно условие)"""
+        return (bool(self.keywords) + bool(self.companies or self.company_contains or self.employer_ids)
+                + self.has_salary_range + bool(self.areas))
+
+
+def load_subscriptions(path: Path = WATCHLIST_FILE) -> list:
+    """Подписки из JSON-файла {"subscriptions": [...]}; подписка без условий — ошибка"""
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    subscriptions = []
+    for item in data.get("subscriptions", []):
+        subscription = Subscription(**item)
+        if not subscription.conditions:
+            raise ValueError(f"подписка {subscription.id!r}: не задано ни одного условия")
+        if (subscription.min_salary is not None and subscription.max_salary is not None
+                and subscription.min_salary > subscription.max_salary):
+            raise ValueError(f"подписка {subscription.id!r}: min_salary больше max_salary")
+        subscriptions.append(subscription)
+    ids = [subscription.id for subscription in subscriptions]
+    if len(ids) != len(set(ids)):
+        raise ValueError(f"повторяющиеся id подписок в {path}")
+    return subscriptions
+
+
+class KeywordAutomaton:
+    """Автомат Ахо — Корасик: все ключевые слова, встречающиеся в строке, за один её просмотр"""
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+    def add(self, keyword: str, value):
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(value)
+
+    def build(self):
+        """Суффиксные ссылки обходом в ширину; выходы наследуются по ним"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+        return self
+
+    def find(self, text: str) -> set:
+        found = set()
+        state = 0
+        goto, fail, output = self._goto, self._fail, self._output
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+class IntervalTree:
+    """Дерево интервалов с центрами: все интервалы [low, high], содержащие точку"""
+
+    def __init__(self, intervals: list):
+        """intervals — список (low, high, значение)"""
+        self.center = None
+        self.left = self.right = None
+        if not intervals:
+            return
+        points = sorted(point for low, high, _ in intervals for point in (low, high) if math.isfinite(point))
+        self.center = points[len(points) // 2] if points else 0.0
+        here = [interval for interval in intervals if interval[0] <= self.center <= interval[1]]
+        self.by_low = sorted(here, key=lambda interval: interval[0])
+        self.by_high = sorted(here, key=lambda interval: interval[1], reverse=True)
+        left = [interval for interval in intervals if interval[1] < self.center]
+        right = [interval for interval in intervals if interval[0] > self.center]
+        self.left = IntervalTree(left) if left else None
+        self.right = IntervalTree(right) if right else None
+
+    def stab(self, point: float) -> list:
+        found = []
+        node = self
+        while node is not None and node.center is not None:
+            if point < node.center:
+                for low, _, value in node.by_low:
+                    if low > point:
+                        break
+                    found.append(value)
+                node = node.left
+            elif point > node.center:
+                for _, high, value in node.by_high:
+                    if high < point:
+                        break
+                    found.append(value)
+                node = node.right
+            else:
+                found.extend(value for _, _, value in node.by_low)
+                break
+        return found
+
+
+class WatchlistIndex:
+    """Подписки, скомпилированные в индексы по видам условий"""
+
+    def __init__(self, subscriptions: list):
+        self.subscriptions = list(subscriptions)
+        self.required = [subscription.conditions for subscription in self.subscriptions]
+        self.keywords = KeywordAutomaton()
+        self.company_parts = KeywordAutomaton()
+        self.by_company = {}
+        self.by_employer_id = {}
+        self.by_area = {}
+        intervals = []
+        for position, subscription in enumerate(self.subscriptions):
+            for keyword in subscription.keywords:
+                self.keywords.add(_normalize_text(keyword), position)
+            for company in subscription.companies:
+                self.by_company.setdefault(normalize_company_name(company), set()).add(position)
+            for part in subscription.company_contains:
+                self.company_parts.add(normalize_company_name(part), position)
+            for employer_id in subscription.employer_ids:
+                self.by_employer_id.setdefault(str(employer_id).strip(), set()).add(position)
+            for area in subscription.areas:
+                self.by_area.setdefault(_normalize_text(area), set()).add(position)
+            if subscription.has_salary_range:
+                low = subscription.min_salary if subscription.min_salary is not None else -math.inf
+                high = subscription.max_salary if subscription.max_salary is not None else math.inf
+                # Пустой диапазон в индекс не попадает — такая подписка не срабатывает никогда
+                if low <= high:
+                    intervals.append((low, high, position))
+        self.keywords.build()
+        self.company_parts.build()
+        self.salaries = IntervalTree(intervals)
+
+    def keyword_positions(self, title) -> set:
+        return self.keywords.find(_normalize_text(title))
+
+    def employer_positions(self, company, employer_id: str = "") -> set:
+        name = normalize_company_name(company)
+        positions = self.by_company.get(name, set()) | self.company_parts.find(name)
+        if employer_id:
+            positions = positions | self.by_employer_id.get(str(employer_id), set())
+        return positions
+
+    def area_positions(self, area) -> set:
+        return self.by_area.get(_normalize_text(area), set())
+
+    def salary_positions(self, salary) -> list:
+        return self.salaries.stab(salary) if salary is not None and salary == salary else []
+
+    def _complete(self, *groups) -> list:
+        """Подписки, набравшие по одному попаданию на каждое своё условие"""
+        hits = {}
+        for group in groups:
+            for position in group:
+                hits[position] = hits.get(position, 0) + 1
+        required = self.required
+        return [position for position, count in hits.items() if count == required[position]]
+
+    def match(self, title: str, company: str, employer_id: str = "", area: str = "", salary: float = None) -> list:
+        """Подписки (позиции в self.subscriptions), все условия которых выполнены для вакансии"""
+        return self._complete(self.keyword_positions(title), self.employer_positions(company, employer_id),
+                              self.area_positions(area), self.salary_positions(salary))
+
+    @metrics.timed("watchlist_match")
+    def match_frame(self, df) -> dict:
+        """Совпадения по таблице снимка: {id подписки: [записи вакансий MATCH_FIELDS]}
+
+        Названия, компании, регионы и зарплаты в снимке повторяются — ответ
+        каждого индекса запоминается по значению на время прохода.
+        """
+        import pandas as pd
+        from frame_schema import URL_COLUMN, VACANCY_URL, vacancy_ids
+        from salary_normalization import normalize_salaries
+
+        matches = {subscription.id: [] for subscription in self.subscriptions}
+        if len(df) == 0:
+            return matches
+        df = normalize_salaries(df)
+        empty = pd.Series("", index=df.index)
+        # Итерация по категориям и Int64 pandas медленная — колонки берутся списками
+        columns = zip(df["Название вакансии"].tolist(), df["Компания"].tolist(),
+                      df.get(EMPLOYER_ID_COLUMN, empty).astype("string").fillna("").tolist(),
+                      df.get("Регион", empty).astype("string").fillna("").tolist(),
+                      df["salary_avg"].astype("float64").tolist())
+        by_title, by_employer, by_area, by_salary, by_hits = {}, {}, {}, {}, {}
+        # Одинаковые ответы индексов — один объект: тогда сочетание ответов задаётся их id
+        canonical = {}
+
+        def shared(positions):
+            positions = frozenset(positions)
+            return canonical.setdefault(positions, positions)
+
+        found = []
+        for row, (title, company, employer_id, area, salary_avg) in enumerate(columns):
+            keyword_hits = by_title.get(title)
+            if keyword_hits is None:
+                keyword_hits = by_title[title] = shared(self.keyword_positions(title))
+            employer_hits = by_employer.get((company, employer_id))
+            if employer_hits is None:
+                employer_hits = by_employer[(company, employer_id)] = shared(
+                    self.employer_positions(company, employer_id))
+            area_hits = by_area.get(area)
+            if area_hits is None:
+                area_hits = by_area[area] = shared(self.area_positions(area))
+            salary_avg = None if salary_avg != salary_avg else salary_avg
+            salary_hits = by_salary.get(salary_avg)
+            if salary_hits is None:
+                salary_hits = by_salary[salary_avg] = shared(self.salary_positions(salary_avg))
+            combination = (id(keyword_hits), id(employer_hits), id(area_hits), id(salary_hits))
+            positions = by_hits.get(combination)
+            if positions is None:
+                positions = by_hits[combination] = self._complete(keyword_hits, employer_hits, area_hits,
+                                                                  salary_hits)
+            if positions:
+                found.append((row, positions))
+
+        # Записи собираются только для подошедших строк
+        rows = [row for row, _ in found]
+        subset = df.iloc[rows]
+        ids = vacancy_ids(subset).tolist()
+        published = subset.get("Дата публикации", empty.iloc[rows])
+        if pd.api.types.is_datetime64_any_dtype(published):
+            published = published.dt.strftime("%Y-%m-%d %H:%M")
+        urls = (subset[URL_COLUMN].tolist() if URL_COLUMN in subset
+                else [VACANCY_URL.format(vacancy_id) if vacancy_id else "" for vacancy_id in ids])
+        salaries = subset["salary_avg"].astype("float64")
+        values = zip(ids, subset["Название вакансии"].tolist(), subset["Компания"].tolist(),
+                     subset["Зарплата"].tolist(), salaries.where(salaries.notna(), None).tolist(),
+                     subset.get("Регион", empty.iloc[rows]).astype("string").fillna("").tolist(),
+                     published.astype("string").fillna("").tolist(), urls)
+        matched = 0
+        for (_, positions), fields in zip(found, values):
+            record = dict(zip(MATCH_FIELDS, fields))
+            for position in positions:
+                matches[self.subscriptions[position].id].append(record)
+            matched += len(positions)
+        metrics.increment("watchlist_vacancies", len(df))
+        metrics.increment("watchlist_matches", matched)
+        return matches
+
+
+def load_index(path: Path = WATCHLIST_FILE) -> WatchlistIndex:
+    return WatchlistIndex(load_subscriptions(path))
+
+
+def vacancy_events(date_str: str) -> tuple:
+    """Новые и изменившиеся вакансии снимка относительно предыдущего (первый снимок — целиком новый).
+
+    Возвращает (таблица этих вакансий, {id вакансии: событие}); событие —
+    {"event": "new"} или {"event": "changed", "changes": {поле: [было, стало]}}
+    по полям snapshot_diff.TRACKED_FIELDS.
+    """
+    from frame_schema import load_snapshot, vacancy_ids
+    from snapshot_diff import TRACKED_FIELDS
+
+    df = load_snapshot(date_str)
+    ids = vacancy_ids(df)
+    earlier = [snapshot for snapshot in list_snapshots() if snapshot < date_str]
+    if not earlier or len(df) == 0:
+        return df, {vacancy_id: {"event": "new"} for vacancy_id in ids if vacancy_id}
+
+    previous = load_snapshot(earlier[-1])
+    previous = previous.assign(vacancy_key=vacancy_ids(previous)).drop_duplicates("vacancy_key")
+    before = {key: values for key, *values in zip(previous["vacancy_key"], *(
+        previous[field].astype("string").fillna("") for field in TRACKED_FIELDS)) if key}
+    events, keep = {}, []
+    current = zip(ids, *(df[field].astype("string").fillna("") for field in TRACKED_FIELDS))
+    for vacancy_id, *values in current:
+        old = before.get(vacancy_id)
+        if old is None:
+            events.setdefault(vacancy_id, {"event": "new"})
+            keep.append(True)
+            continue
+        changes = {field: [was, now] for field, was, now in zip(TRACKED_FIELDS, old, values) if was != now}
+        if changes:
+            events.setdefault(vacancy_id, {"event": "changed", "changes": changes})
+        keep.append(bool(changes))
+    events.pop("", None)
+    return df[keep], events
+
+
+def matches_path(date_str: str, only_changes: bool = True) -> Path:
+    """data/watchlist/<дата>.json — новые и изменившиеся вакансии (его читает notifier);
+    совпадения по всем вакансиям (--all) пишутся отдельно в <дата>.all.json"""
+    return MATCHES_DIR / (f"{date_str}.json" if only_changes else f"{date_str}.all.json")
+
+
+def match_snapshot(date_str: str, only_changes: bool = True, path: Path = WATCHLIST_FILE) -> dict:
+    """Совпадения новых и изменившихся (или всех) вакансий снимка; сохраняются в matches_path
+
+    У каждой записи совпадения есть поле event («new», «changed» или
+    «snapshot» для всех вакансий), у изменившихся — changes.
+    """
+    from frame_schema import load_snapshot
+
+    index = load_index(path)
+    if only_changes:
+        df, events = vacancy_events(date_str)
+    else:
+        df, events = load_snapshot(date_str), {}
+    matches = index.match_frame(df)
+    default = {"event": "new" if only_changes else "snapshot"}
+    for found in matches.values():
+        for record in found:
+            record.update(events.get(record["vacancy_id"], default))
+    result = {
+        "date": date_str,
+        "only_changes": only_changes,
+        "vacancies": len(df),
+        "subscriptions": {subscription.id: {"title": subscription.title or subscription.id,
+                                            "chats": [str(chat) for chat in subscription.chats],
+                                            "matches": matches[subscription.id]}
+                          for subscription in index.subscriptions},
+    }
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    output = matches_path(date_str, only_changes)
+    # Перезаписываем, только если совпадения изменились: mtime — вход следующих этапов пайплайна
+    if not output.exists() or output.read_text(encoding="utf-8") != text:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(text, encoding="utf-8")
+    return result
+
+
+def print_matches(matches: dict, subscriptions: list, limit: int = 10):
+    """Печатает совпадения по каждой подписке"""
+    for subscription in subscriptions:
+        found = matches.get(subscription.id, [])
+        title = subscription.title or subscription.id
+        if not found:
+            print(f"  ❌ {title}: совпадений нет")
+            continue
+        print(f"  🎯 {title}: {len(found)} вакансий")
+        for record in found[:limit]:
+            print(f"    - {record['title']} — {record['company']} — {record['salary']}")
+        if len(found) > limit:
+            print(f"    … и ещё {len(found) - limit}")
+
+
+def print_watchlist(vacancies: list, path: Path = WATCHLIST_FILE):
+    """Совпадения собранных вакансий с подписками (для итоговой статистики парсеров)"""
+    from vacancy_record import to_frame
+
+    if not Path(path).exists():
+        return
+    try:
+        subscriptions = load_subscriptions(path)
+    except (ValueError, TypeError) as e:
+        print(f"  ⚠️ {path}: {e}")
+        return
+    print(f"\n👀 Подписки ({path}):")
+    print_matches(WatchlistIndex(subscriptions).match_frame(to_frame(vacancies)), subscriptions)
+
+
+def refresh_matches() -> bool:
+    """Действие этапа пайплайна: новые и изменившиеся вакансии последнего снимка против подписок"""
+    if not WATCHLIST_FILE.exists():
+        print(f"  ⏭️ Нет {WATCHLIST_FILE} — подписок нет")
+        return True
+    snapshots = list_snapshots()
+    if not snapshots:
+        return True
+    result = match_snapshot(snapshots[-1])
+    total = sum(len(item["matches"]) for item in result["subscriptions"].values())
+    print(f"  👀 Снимок {result['date']}: новых и изменившихся вакансий {result['vacancies']}, "
+          f"совпадений с подписками {total}")
+    return True
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Совпадения вакансий снимка с подписками watchlist.json")
+    parser.add_argument("--date", help="снимок (по умолчанию — последний)")
+    parser.add_argument("--all", action="store_true", help="все вакансии снимка, а не только новые и изменившиеся")
+    parser.add_argument("--file", type=Path, default=WATCHLIST_FILE, help="файл подписок")
+    args = parser.parse_args()
+
+    print("👀 WATCHLIST")
+    print("=" * 60)
+    snapshots = list_snapshots() if DATA_DIR.exists() else []
+    date_str = args.date or (snapshots[-1] if snapshots else None)
+    if date_str not in snapshots:
+        print(f"❌ Снимок {date_str} не найден" if date_str else "❌ Нет снимков")
+        return 1
+    try:
+        subscriptions = load_subscriptions(args.file)
+    except (OSError, ValueError, TypeError) as e:
+        print(f"❌ {args.file}: {e}")
+        return 1
+
+    result = match_snapshot(date_str, only_changes=not args.all, path=args.file)
+    kind = "всех" if args.all else "новых и изменившихся"
+    print(f"📅 Снимок {date_str}: {kind} вакансий {result['vacancies']}, подписок {len(subscriptions)}")
+    print_matches({key: item["matches"] for key, item in result["subscriptions"].items()}, subscriptions)
+    print(f"✅ {matches_path(date_str, not args.all)}")
+    metrics.write_metrics("watchlist")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
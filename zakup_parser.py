@@ -4,17 +4,22 @@
 Использует только стандартные библиотеки Python
 """
 
-import urllib.request
-import urllib.parse
-import json
 import csv
+import json
 import re
-import gzip
+import sys
 from datetime import datetime
 from pathlib import Path
-import time
 import random
 
+import metrics
+from hh_api import MAX_SEARCH_DEPTH, VACANCIES_PER_PAGE, get_client
+from rate_limiter import FetchError
+from snapshot_store import SnapshotWriter
+from vacancy_decode import decode_vacancies_page
+from vacancy_record import CSV_HEADERS, Vacancy, iter_rows
+from watchlist import print_watchlist
+
 def get_random_headers():
     """Генерация случайных заголовков для обхода блокировок"""
     user_agents = [
@@ -35,126 +40,131 @@ def get_random_headers():
         "Referer": "https://hh.ru/"
     }
 
-def search_vacancies_api(query: str, area: str = "22") -> list:
-    """Поиск вакансий через API hh.ru"""
+def search_vacancies_api(query: str, area: str = "22", stop_event=None) -> list:
+    """Поиск вакансий через API hh.ru
+
+    При окончательной неудаче запроса бросает FetchError, а не возвращает пустой список:
+    иначе ограничение частоты выглядело бы как «вакансий нет».
+    """
     
     print(f"🔍 API поиск: {query}")
     
-    # Параметры запроса
+    # Проходим все страницы через общий клиент (лимитер, повторы, circuit breaker)
+    items = []
+    page = 0
+    while True:
+        data = search_page(query, area, page, stop_event)
+        items.extend(data.get('items') or [])
+        page += 1
+        if page >= search_depth(data):
+            break
+    
+    print(f"  📊 Найдено вакансий: {len(items)}")
+    return items_to_vacancies(items, query)
+
+def search_page(query: str, area: str = "22", page: int = 0, stop_event=None,
+                date_from: str = None, date_to: str = None) -> dict:
+    """Одна страница выдачи /vacancies; разбирается потоково, от элементов остаются только нужные поля.
+    date_from/date_to (ISO 8601) ограничивают выдачу окном публикации вместо последних 3 дней"""
     params = {
         "text": query,
         "area": area,  # 22 = Владивосток
-        "per_page": 50,
-        "page": 0
+        "period": 3,  # API сам отсекает вакансии старше 3 дней — меньше страниц
+        "per_page": VACANCIES_PER_PAGE,
+        "page": page
     }
+    if date_from:
+        # period и date_from API не принимает вместе
+        del params["period"]
+        params["date_from"] = date_from
+        if date_to:
+            params["date_to"] = date_to
+    return get_client().fetch_json("/vacancies", params, headers=get_random_headers(),
+                                   stop_event=stop_event, decoder=decode_vacancies_page)
+
+def search_depth(data: dict) -> int:
+    """Сколько страниц выдачи можно пройти (API отдаёт не глубже MAX_SEARCH_DEPTH вакансий)"""
+    return min(data.get('pages') or 1, MAX_SEARCH_DEPTH // VACANCIES_PER_PAGE)
+
+def items_to_vacancies(items: list, query: str, now: datetime = None) -> list:
+    """Свежие вакансии из элементов выдачи по запросу query; свежесть и «Когда» считаются
+    относительно now (по умолчанию — сейчас, для исторического снимка — его конец)"""
+    vacancies = []
+    metrics.increment("items_received", len(items))
+    parse_timer = metrics.timer("parse_items")
     
-    # Формируем URL
-    base_url = "https://api.hh.ru/vacancies"
-    query_string = urllib.parse.urlencode(params)
-    url = f"{base_url}?{query_string}"
-    
-    try:
-        # Создаем запрос
-        request = urllib.request.Request(url, headers=get_random_headers())
+    for item in items:
+        # Извлекаем основную информацию
+        title = item.get('name', '')
+        employer = item.get('employer') or {}
+        company = employer.get('name', 'Не указана')
+        employer_id = employer.get('id', '')
+        area_name = (item.get('area') or {}).get('name', '')
+        vacancy_id = item.get('id', '')
+        url = item.get('alternate_url', '')
         
-        # Выполняем запрос
-        with urllib.request.urlopen(request, timeout=30) as response:
-            if response.status == 200:
-                # Читаем данные
-                raw_data = response.read()
-                
-                # Проверяем, сжаты ли данные gzip
-                if response.headers.get('Content-Encoding') == 'gzip':
-                    raw_data = gzip.decompress(raw_data)
-                
-                data = json.loads(raw_data.decode('utf-8'))
-                
-                vacancies = []
-                items = data.get('items', [])
-                print(f"  📊 Найдено вакансий: {len(items)}")
-                
-                for item in items:
-                    # Извлекаем основную информацию
-                    title = item.get('name', '')
-                    company = item.get('employer', {}).get('name', 'Не указана')
-                    vacancy_id = item.get('id', '')
-                    url = item.get('alternate_url', '')
-                    
-                    # Зарплата
-                    salary = item.get('salary')
-                    if salary:
-                        salary_from = salary.get('from')
-                        salary_to = salary.get('to')
-                        currency = salary.get('currency', 'RUR')
-                        
-                        if salary_from and salary_to:
-                            salary_text = f"{salary_from:,}–{salary_to:,} {currency}"
-                        elif salary_from:
-                            salary_text = f"от {salary_from:,} {currency}"
-                        elif salary_to:
-                            salary_text = f"до {salary_to:,} {currency}"
-                        else:
-                            salary_text = "не указано"
-                    else:
-                        salary_text = "не указано"
-                    
-                    # Дата публикации
-                    published_at = item.get('published_at', '')
-                    if published_at:
-                        try:
-                            # Парсим ISO дату
-                            pub_datetime = datetime.fromisoformat(published_at.replace('Z', '+00:00'))
-                            date_text = pub_datetime.strftime("%Y-%m-%d %H:%M")
-                            
-                            # Определяем относительную дату
-                            now = datetime.now()
-                            diff = now - pub_datetime.replace(tzinfo=None)
-                            
-                            if diff.days == 0:
-                                relative_date = "сегодня"
-                            elif diff.days == 1:
-                                relative_date = "вчера"
-                            elif diff.days <= 7:
-                                relative_date = f"{diff.days} дней назад"
-                            else:
-                                relative_date = date_text
-                        except:
-                            date_text = published_at
-                            relative_date = "неизвестно"
-                    else:
-                        date_text = "не указано"
-                        relative_date = "неизвестно"
-                    
-                    # Проверяем, что вакансия свежая (за последние 3 дня)
-                    if not is_recent_vacancy(published_at):
-                        continue
-                    
-                    vacancy_data = {
-                        "id": vacancy_id,
-                        "Название вакансии": title,
-                        "Компания": company,
-                        "Ссылка": url,
-                        "Дата публикации": date_text,
-                        "Когда": relative_date,
-                        "Зарплата": salary_text,
-                        "Запрос": query
-                    }
-                    
-                    vacancies.append(vacancy_data)
-                    print(f"    📋 {title} - {company} - {salary_text} - {relative_date}")
-                
-                return vacancies
-                
+        # Зарплата
+        salary = item.get('salary')
+        if salary:
+            salary_from = salary.get('from')
+            salary_to = salary.get('to')
+            currency = salary.get('currency', 'RUR')
+            gross = salary.get('gross')
+            salary_gross = "" if gross is None else ("да" if gross else "нет")
+            
+            if salary_from and salary_to:
+                salary_text = f"{salary_from:,}–{salary_to:,} {currency}"
+            elif salary_from:
+                salary_text = f"от {salary_from:,} {currency}"
+            elif salary_to:
+                salary_text = f"до {salary_to:,} {currency}"
             else:
-                print(f"  ❌ Ошибка HTTP: {response.status}")
-                return []
+                salary_text = "не указано"
+        else:
+            salary_text = "не указано"
+            salary_gross = ""
+        
+        # Дата публикации
+        published_at = item.get('published_at', '')
+        if published_at:
+            try:
+                # Парсим ISO дату
+                pub_datetime = datetime.fromisoformat(published_at.replace('Z', '+00:00'))
+                date_text = pub_datetime.strftime("%Y-%m-%d %H:%M")
+                
+                # Определяем относительную дату
+                diff = (now or datetime.now()) - pub_datetime.replace(tzinfo=None)
                 
-    except Exception as e:
-        print(f"  ❌ Ошибка запроса: {e}")
-        return []
+                if diff.days == 0:
+                    relative_date = "сегодня"
+                elif diff.days == 1:
+                    relative_date = "вчера"
+                elif diff.days <= 7:
+                    relative_date = f"{diff.days} дней назад"
+                else:
+                    relative_date = date_text
+            except:
+                date_text = published_at
+                relative_date = "неизвестно"
+        else:
+            date_text = "не указано"
+            relative_date = "неизвестно"
+        
+        # Проверяем, что вакансия свежая (за последние 3 дня)
+        if not is_recent_vacancy(published_at, now):
+            metrics.increment("items_not_recent")
+            continue
+        
+        vacancy = Vacancy(vacancy_id, title, company, url, date_text, relative_date, salary_text, query,
+                          employer_id, salary_gross, area_name)
+        vacancies.append(vacancy)
+        print(f"    📋 {title} - {company} - {salary_text} - {relative_date}")
+    
+    parse_timer.stop()
+    return vacancies
 
-def is_recent_vacancy(published_at: str) -> bool:
-    """Проверяет, опубликована ли вакансия за последние 3 дня"""
+def is_recent_vacancy(published_at: str, now: datetime = None) -> bool:
+    """Проверяет, опубликована ли вакансия за последние 3 дня (относительно now, по умолчанию — сейчас)"""
     if not published_at:
         return False
     
@@ -163,8 +173,7 @@ def is_recent_vacancy(published_at: str) -> bool:
         pub_datetime = datetime.fromisoformat(published_at.replace('Z', '+00:00'))
         
         # Вычисляем разницу в днях
-        now = datetime.now()
-        diff = now - pub_datetime.replace(tzinfo=None)
+        diff = (now or datetime.now()) - pub_datetime.replace(tzinfo=None)
         
         # Возвращаем True если вакансия опубликована за последние 3 дня
         return diff.days <= 3
@@ -201,125 +210,155 @@ def is_relevant_vacancy(title: str) -> bool:
     
     return has_procurement or has_supply or has_project
 
-def main():
-    """Основная функция"""
-    print("🌐 ПРОСТОЙ ВЕБ-ПАРСЕР HH.RU")
-    print("📅 ФИЛЬТР: ТОЛЬКО ВАКАНСИИ ЗА ПОСЛЕДНИЕ 3 ДНЯ")
-    print("=" * 60)
-    
-    # Запросы для поиска
-    queries = [
-        # Закупки и снабжение
-        "менеджер по закупкам",
-        "менеджер по закупу", 
-        "менеджер по закупкам и снабжению",
-        "специалист по закупкам",
-        "закупщик",
-        "менеджер по снабжению",
-        "специалист по снабжению",
-        
-        # Проекты
-        "менеджер проектов",
-        "руководитель проектов",
-        "project manager"
-    ]
+# Запросы для поиска
+QUERIES = [
+    # Закупки и снабжение
+    "менеджер по закупкам",
+    "менеджер по закупу", 
+    "менеджер по закупкам и снабжению",
+    "специалист по закупкам",
+    "закупщик",
+    "менеджер по снабжению",
+    "специалист по снабжению",
     
+    # Проекты
+    "менеджер проектов",
+    "руководитель проектов",
+    "project manager"
+]
+
+# Префикс файла снимка в data/<дата>/
+CSV_PREFIX = "Закупки_Снабжение_Проекты_3дня"
+
+def collect_vacancies(queries: list = QUERIES, stop_event=None) -> tuple:
+    """Собирает вакансии по всем запросам и убирает дубликаты
+
+    Темп запросов задаёт адаптивный лимитер клиента. Возвращает кортеж (вакансии, неудавшиеся запросы);
+    stop_event (threading.Event) позволяет прервать сбор между запросами — невыполненные
+    запросы тогда попадают в неудавшиеся с error_class "stopped", и снимок помечается неполным.
+    """
     all_vacancies = []
+    failed_queries = []
     
     for i, query in enumerate(queries, 1):
         print(f"\n📋 {i}/{len(queries)}: {query}")
-        vacancies = search_vacancies_api(query)
+        try:
+            vacancies = search_vacancies_api(query, stop_event=stop_event)
+        except FetchError as e:
+            if e.error_class == "stopped":
+                print("  🛑 Получен сигнал остановки, прерываем сбор")
+                failed_queries.extend({"query": rest, **e.as_dict()} for rest in queries[i - 1:])
+                break
+            # Запрос помечается в метаданных снимка, а не теряется как «0 вакансий»
+            print(f"  ❌ Запрос не выполнен ({e.error_class}): {e}")
+            failed_queries.append({"query": query, **e.as_dict()})
+            continue
         
         # Фильтруем только релевантные вакансии
-        relevant_vacancies = [v for v in vacancies if is_relevant_vacancy(v['Название вакансии'])]
+        with metrics.timer("filter_relevance"):
+            relevant_vacancies = [v for v in vacancies if is_relevant_vacancy(v.title)]
+        metrics.increment("vacancies_relevant", len(relevant_vacancies))
         print(f"  ✅ Релевантных: {len(relevant_vacancies)}")
         
         all_vacancies.extend(relevant_vacancies)
-        
-        # Пауза между запросами
-        sleep_time = random.uniform(2, 4)
-        print(f"  ⏳ Пауза: {sleep_time:.1f} сек")
-        time.sleep(sleep_time)
     
-    # Дедупликация по ID
+    # Дедупликация по ID (без ID — по названию + компании)
     unique_vacancies = {}
     for vacancy in all_vacancies:
-        vacancy_id = vacancy.get("id", "")
-        if vacancy_id and vacancy_id not in unique_vacancies:
-            unique_vacancies[vacancy_id] = vacancy
-        elif not vacancy_id:
-            # Если нет ID, используем название + компания
-            key = f"{vacancy['Название вакансии']}_{vacancy['Компания']}"
-            if key not in unique_vacancies:
-                unique_vacancies[key] = vacancy
-    
-    final_vacancies = list(unique_vacancies.values())
+        unique_vacancies.setdefault(vacancy.key, vacancy)
     
-    print(f"\n🎯 ИТОГО: {len(final_vacancies)} уникальных вакансий")
+    return list(unique_vacancies.values()), failed_queries
+
+def save_vacancies_csv(final_vacancies: list, failed_queries: list = (), queries: list = QUERIES,
+                       date_str: str = None, extra_metadata: dict = None) -> Path:
+    """Сохраняет вакансии в CSV снимка (по умолчанию за сегодня) и метаданные сбора рядом с ним.
+    Файлы готовятся во временной папке и публикуются в data/<дата>/ вместе с манифестом
+    (snapshot_store), поэтому анализаторы не увидят недописанный CSV"""
+    date_str = date_str or datetime.now().strftime("%Y-%m-%d")
+    csv_name = f"{CSV_PREFIX}_{date_str}.csv"
+    meta_name = f"{CSV_PREFIX}_{date_str}.meta.json"
     
-    # Сохранение в CSV
-    if final_vacancies:
-        date_str = datetime.now().strftime("%Y-%m-%d")
-        output_dir = Path("data") / date_str
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        csv_file = output_dir / f"Закупки_Снабжение_Проекты_3дня_{date_str}.csv"
-        
-        with csv_file.open("w", newline="", encoding="utf-8-sig") as f:
+    with SnapshotWriter(date_str, source=CSV_PREFIX) as snapshot:
+        csv_timer = metrics.timer("csv_write")
+        with snapshot.stage(csv_name).open("w", newline="", encoding="utf-8-sig") as f:
             writer = csv.writer(f, delimiter=";")
             
-            # Заголовки
-            headers = ["Название вакансии", "Компания", "Ссылка", "Дата публикации", "Когда", "Зарплата", "Запрос"]
-            writer.writerow(headers)
-            
-            # Данные
-            for vacancy in final_vacancies:
-                row = [
-                    vacancy.get("Название вакансии", ""),
-                    vacancy.get("Компания", ""),
-                    vacancy.get("Ссылка", ""),
-                    vacancy.get("Дата публикации", ""),
-                    vacancy.get("Когда", ""),
-                    vacancy.get("Зарплата", ""),
-                    vacancy.get("Запрос", "")
-                ]
-                writer.writerow(row)
+            writer.writerow(CSV_HEADERS)
+            writer.writerows(iter_rows(final_vacancies))
+        csv_timer.stop()
         
-        print(f"✅ CSV файл создан: {csv_file}")
-        
-        # Статистика
-        with_salary = sum(1 for v in final_vacancies if v['Зарплата'] != "не указано")
-        with_date = sum(1 for v in final_vacancies if v['Дата публикации'] != "не указано")
-        companies = len(set(v['Компания'] for v in final_vacancies))
-        
-        print(f"\n📊 СТАТИСТИКА:")
-        print(f"  • Всего вакансий: {len(final_vacancies)}")
-        print(f"  • Компаний: {companies}")
-        print(f"  • С зарплатой: {with_salary}")
-        print(f"  • С датой: {with_date}")
-        
-        # Проверяем, есть ли "Дикий Улов"
-        wild_catch = [v for v in final_vacancies if "дикий улов" in v['Компания'].lower()]
-        if wild_catch:
-            print(f"  🎯 НАЙДЕНА 'Дикий Улов': {len(wild_catch)} вакансий")
-            for v in wild_catch:
-                print(f"    - {v['Название вакансии']} - {v['Зарплата']} ({v['Когда']})")
-        else:
-            print(f"  ❌ 'Дикий Улов' не найден")
-        
-        # Топ-5 компаний
-        company_counts = {}
-        for vacancy in final_vacancies:
-            company = vacancy['Компания']
-            company_counts[company] = company_counts.get(company, 0) + 1
-        
-        top_companies = sorted(company_counts.items(), key=lambda x: x[1], reverse=True)[:5]
-        print(f"\n🏢 Топ-5 компаний:")
-        for company, count in top_companies:
-            print(f"  • {company}: {count} вакансий")
+        # Метаданные: неполный снимок нельзя сравнивать с полным как есть
+        client = get_client()
+        metadata = {
+            "profile": CSV_PREFIX,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "queries_total": len(queries),
+            "queries_failed": len(failed_queries),
+            "complete": not failed_queries,
+            "failed_queries": list(failed_queries),
+            "final_rate_rps": round(client.limiter.rate, 3),
+            "throttle_events": client.limiter.throttle_events,
+            "run_id": snapshot.run_id,
+            **(extra_metadata or {}),
+        }
+        snapshot.stage(meta_name).write_text(json.dumps(metadata, ensure_ascii=False, indent=2), encoding="utf-8")
+    
+    csv_file = snapshot.target(csv_name)
+    meta_file = snapshot.target(meta_name)
+    print(f"✅ CSV файл создан: {csv_file} (запуск {snapshot.run_id})")
+    if failed_queries:
+        print(f"⚠️ Неудавшихся запросов: {len(failed_queries)} — снимок помечен как неполный ({meta_file.name})")
+    
+    return csv_file
+
+def print_statistics(final_vacancies: list):
+    """Выводит статистику по собранным вакансиям"""
+    with_salary = sum(1 for v in final_vacancies if v.has_salary)
+    with_date = sum(1 for v in final_vacancies if v.published != "не указано")
+    companies = len(set(v.company for v in final_vacancies))
+    
+    print(f"\n📊 СТАТИСТИКА:")
+    print(f"  • Всего вакансий: {len(final_vacancies)}")
+    print(f"  • Компаний: {companies}")
+    print(f"  • С зарплатой: {with_salary}")
+    print(f"  • С датой: {with_date}")
+    
+    # Топ-5 компаний
+    company_counts = {}
+    for vacancy in final_vacancies:
+        company = vacancy.company
+        company_counts[company] = company_counts.get(company, 0) + 1
     
+    top_companies = sorted(company_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+    print(f"\n🏢 Топ-5 компаний:")
+    for company, count in top_companies:
+        print(f"  • {company}: {count} вакансий")
+
+    # Работодатели и сохранённые поиски из watchlist.json (в т.ч. «Дикий Улов»)
+    print_watchlist(final_vacancies)
+
+def main():
+    """Основная функция"""
+    print("🌐 ПРОСТОЙ ВЕБ-ПАРСЕР HH.RU")
+    print("📅 ФИЛЬТР: ТОЛЬКО ВАКАНСИИ ЗА ПОСЛЕДНИЕ 3 ДНЯ")
+    print("=" * 60)
+    
+    final_vacancies, failed_queries = collect_vacancies()
+    
+    print(f"\n🎯 ИТОГО: {len(final_vacancies)} уникальных вакансий")
+    
+    # Сохранение в CSV
+    if final_vacancies:
+        save_vacancies_csv(final_vacancies, failed_queries)
+        print_statistics(final_vacancies)
     else:
         print("❌ Нет данных для сохранения")
+    if failed_queries:
+        print(f"⚠️ Не выполнено запросов: {len(failed_queries)} — снимок неполный, этап пайплайна повторится")
+    
+    metrics.write_metrics("zakup_parser")
+    # Неполный или пустой сбор — ошибка: пайплайн не засчитает день и соберёт его заново
+    return 0 if final_vacancies and not failed_queries else 1
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())